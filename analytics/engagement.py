@@ -0,0 +1,82 @@
+# analytics/engagement.py - Indexed engagement scores for top-K video queries
+"""
+Engagement is maintained by the ratings triggers of ``analytics.rating_stats``
+instead of being recomputed for every video and sorted on each request:
+
+    <ratings>_video_stats   per video: ratings, rating sum, comment chars, engagement  (index on engagement)
+    <ratings>_daily_stats   per (day, video): the same sums for the day the rating was written
+
+    score = 0.7 * avg_rating / 5 + 0.3 * min(avg_comment_chars / 100, 1)
+
+which is ``FeedbackAnalyzer._calculate_engagement_score`` with the rating
+comments as the comment-length signal. All-time top-K walks the score index
+(O(K)); day/week/month windows aggregate only that window's daily rows and
+keep the best K in SQLite's bounded LIMIT sorter. A window of N days is
+today plus the N-1 days before it (``rating_stats.window_start``, shared with
+the dashboard trends). Ratings that predate the triggers have no day and only
+count towards the all-time ranking.
+"""
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from analytics import rating_stats
+from analytics.rating_stats import engagement_sql, window_start
+from bhiv_tracing import traced
+
+TOP_K = int(os.getenv("ENGAGEMENT_TOP_K", "5"))
+WINDOWS: Dict[str, Optional[int]] = {"day": 1, "week": 7, "month": 30, "all": None}
+
+
+class EngagementIndex:
+    """Top-K videos by engagement score over a day/week/month/all-time window"""
+
+    def __init__(self, db_path="data/meta.db", ratings_table: str = "ratings"):
+        self.db_path = Path(db_path)
+        self.ratings_table = ratings_table
+        self.video_stats = f"{ratings_table}_video_stats"
+        self.daily_stats = f"{ratings_table}_daily_stats"
+
+    @traced("analytics.engagement_top")
+    def top(self, k: int = TOP_K, window: str = "all") -> List[Dict]:
+        if window not in WINDOWS:
+            raise ValueError(f"window must be one of {sorted(WINDOWS)}")
+        days = WINDOWS[window]
+        conn = rating_stats.connect(self.db_path, self.ratings_table)
+        try:
+            if days is None:
+                rows = conn.execute(
+                    f'''SELECT video_id, engagement, sum * 1.0 / count, count FROM {self.video_stats}
+                        ORDER BY engagement DESC, video_id LIMIT ?''', (k,)).fetchall()
+            else:
+                score = engagement_sql("SUM(count)", "SUM(sum)", "SUM(comment_chars)")
+                rows = conn.execute(
+                    f'''SELECT video_id, {score} AS score, SUM(sum) * 1.0 / SUM(count), SUM(count)
+                        FROM {self.daily_stats} WHERE day >= date('now', ?)
+                        GROUP BY video_id ORDER BY score DESC, video_id LIMIT ?''',
+                    (window_start(days), k)).fetchall()
+        finally:
+            conn.close()
+        return [{"video_id": vid, "engagement_score": score, "rating": round(avg, 2), "ratings": count}
+                for vid, score, avg, count in rows]
+
+    def totals(self) -> Dict:
+        """All-time rating count and mean per-video average, summed from the per-video rows"""
+        conn = rating_stats.connect(self.db_path, self.ratings_table)
+        try:
+            ratings, average = conn.execute(
+                f"SELECT COALESCE(SUM(count), 0), AVG(sum * 1.0 / count) FROM {self.video_stats}").fetchone()
+        finally:
+            conn.close()
+        return {"ratings": ratings, "average_rating": round(average, 2) if average is not None else 0}
+
+
+_indexes: Dict[tuple, EngagementIndex] = {}
+
+
+def get_engagement_index(db_path="data/meta.db", ratings_table: str = "ratings") -> EngagementIndex:
+    key = (str(db_path), ratings_table)
+    index = _indexes.get(key)
+    if index is None:
+        index = _indexes.setdefault(key, EngagementIndex(db_path, ratings_table))
+    return index
@@ -5,12 +5,29 @@ from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
-from collections import defaultdict
+from collections import Counter, defaultdict
+import heapq
 import statistics
 import logging
 
+from analytics.engagement import TOP_K, get_engagement_index
+from analytics.rlhf_batch import compute_video_rewards, get_rlhf_rewards
+from analytics.snapshots import ANALYTICS_SOURCE, SNAPSHOT_DIR, get_snapshot_reader
+from analytics.text_engine import get_text_engine
+from bhiv_tracing import traced
+from video.policy_store import get_policy_store
+
 logger = logging.getLogger(__name__)
 
+# theme of negative feedback -> scene-type duration factors (see video.policy_store)
+POLICY_THEME_FACTORS = {
+    "pacing": {"intro": 0.9, "concept": 0.9},
+    "length": {"concept": 0.9, "summary": 0.9},
+    "engagement": {"intro": 0.85},
+    "examples": {"example": 1.2},
+    "clarity": {"concept": 1.1, "summary": 1.1},
+}
+
 @dataclass
 class FeedbackTrend:
     period: str
@@ -33,11 +50,18 @@ class VideoAnalytics:
 class FeedbackAnalyzer:
     """Advanced feedback analytics with trend analysis and RLHF insights"""
     
-    def __init__(self, db_path: str = "data/meta.db", bucket_path: str = "bucket"):
+    def __init__(self, db_path: str = "data/meta.db", bucket_path: str = "bucket",
+                 source: str = ANALYTICS_SOURCE, snapshot_dir: str = SNAPSHOT_DIR):
         self.db_path = Path(db_path)
         self.bucket_path = Path(bucket_path)
         self.logs_path = self.bucket_path / "logs"
+        # "snapshot": read ratings/videos/feedback from the Arrow snapshots (see analytics.snapshots)
+        self.snapshots = get_snapshot_reader(snapshot_dir) if source == "snapshot" else None
+
+    def _use_snapshots(self) -> bool:
+        return self.snapshots is not None and self.snapshots.available()
     
+    @traced("analytics.analyze_video_performance")
     def analyze_video_performance(self, video_id: str) -> VideoAnalytics:
         """Comprehensive video performance analysis"""
         try:
@@ -80,11 +104,22 @@ class FeedbackAnalyzer:
             logger.error(f"Video analysis failed for {video_id}: {e}")
             return self._empty_analytics(video_id)
     
-    def get_platform_analytics(self, days: int = 30) -> Dict:
-        """Get comprehensive platform analytics"""
+    @traced("analytics.platform_analytics")
+    def get_platform_analytics(self, days: int = 30, top_k: int = TOP_K, window: str = "all") -> Dict:
+        """Get comprehensive platform analytics; top videos come from the engagement index over ``window``
+
+        With the index, totals come from its per-video rows and only the top-K
+        videos are analysed, so sentiment and improvement areas summarise those
+        videos. Snapshot mode (or a database the index cannot be installed in)
+        analyses every video instead.
+        """
         try:
-            cutoff_date = datetime.now() - timedelta(days=days)
-            
+            if not self._use_snapshots():
+                try:
+                    return self._indexed_platform_analytics(days, top_k, window)
+                except sqlite3.Error as e:
+                    logger.warning(f"Engagement index unavailable, analysing every video: {e}")
+
             # Get all videos and their performance
             all_videos = self._get_all_videos()
             video_analytics = []
@@ -94,46 +129,61 @@ class FeedbackAnalyzer:
                 video_analytics.append(analytics)
             
             # Calculate platform-wide metrics
-            total_videos = len(all_videos)
             total_ratings = sum(va.total_views for va in video_analytics)
-            average_platform_rating = statistics.mean([va.average_rating for va in video_analytics if va.average_rating > 0])
-            
-            # Sentiment analysis across platform
-            sentiment_summary = self._analyze_platform_sentiment(video_analytics)
+            rated = [va.average_rating for va in video_analytics if va.average_rating > 0]
+            average_platform_rating = round(statistics.mean(rated), 2) if rated else 0
             
             # Top performing videos
-            top_videos = sorted(video_analytics, key=lambda x: x.engagement_score, reverse=True)[:5]
-            
-            # Common improvement areas
-            all_improvements = []
-            for va in video_analytics:
-                all_improvements.extend(va.improvement_suggestions)
-            
-            improvement_frequency = defaultdict(int)
-            for improvement in all_improvements:
-                improvement_frequency[improvement] += 1
+            top_videos = self._top_videos(video_analytics, top_k)
             
-            common_improvements = sorted(improvement_frequency.items(), key=lambda x: x[1], reverse=True)[:10]
-            
-            return {
-                "period_days": days,
-                "total_videos": total_videos,
-                "total_ratings": total_ratings,
-                "average_platform_rating": round(average_platform_rating, 2) if video_analytics else 0,
-                "sentiment_summary": sentiment_summary,
-                "top_performing_videos": [
-                    {"video_id": va.video_id, "engagement_score": va.engagement_score, "rating": va.average_rating}
-                    for va in top_videos
-                ],
-                "common_improvement_areas": [{"area": area, "frequency": freq} for area, freq in common_improvements],
-                "user_satisfaction_trend": self._calculate_satisfaction_trend(days),
-                "generated_at": datetime.now().isoformat()
-            }
+            return self._platform_report(days, len(all_videos), total_ratings, average_platform_rating,
+                                         video_analytics, top_videos)
             
         except Exception as e:
             logger.error(f"Platform analytics failed: {e}")
             return {"error": str(e), "generated_at": datetime.now().isoformat()}
+
+    def _indexed_platform_analytics(self, days: int, top_k: int, window: str) -> Dict:
+        index = get_engagement_index(self.db_path)
+        top = index.top(top_k, window)
+        totals = index.totals()
+        conn = sqlite3.connect(self.db_path)
+        try:
+            total_videos = conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+        finally:
+            conn.close()
+        video_analytics = [self.analyze_video_performance(v["video_id"]) for v in top]
+        top_videos = [{"video_id": v["video_id"], "engagement_score": v["engagement_score"], "rating": v["rating"]}
+                      for v in top]
+        return self._platform_report(days, total_videos, totals["ratings"], totals["average_rating"],
+                                     video_analytics, top_videos)
+
+    def _platform_report(self, days: int, total_videos: int, total_ratings: int, average_platform_rating: float,
+                         video_analytics: List[VideoAnalytics], top_videos: List[Dict]) -> Dict:
+        # Sentiment analysis across platform
+        sentiment_summary = self._analyze_platform_sentiment(video_analytics)
+        
+        # Common improvement areas
+        improvement_frequency = defaultdict(int)
+        for va in video_analytics:
+            for improvement in va.improvement_suggestions:
+                improvement_frequency[improvement] += 1
+        
+        common_improvements = sorted(improvement_frequency.items(), key=lambda x: x[1], reverse=True)[:10]
+        
+        return {
+            "period_days": days,
+            "total_videos": total_videos,
+            "total_ratings": total_ratings,
+            "average_platform_rating": average_platform_rating,
+            "sentiment_summary": sentiment_summary,
+            "top_performing_videos": top_videos,
+            "common_improvement_areas": [{"area": area, "frequency": freq} for area, freq in common_improvements],
+            "user_satisfaction_trend": self._calculate_satisfaction_trend(days),
+            "generated_at": datetime.now().isoformat()
+        }
     
+    @traced("analytics.rlhf_insights")
     def generate_rlhf_insights(self, video_id: str) -> Dict:
         """Generate Reinforcement Learning from Human Feedback insights"""
         try:
@@ -153,6 +203,8 @@ class FeedbackAnalyzer:
             # Learning trajectory
             learning_trajectory = self._analyze_learning_trajectory(video_id)
             
+            confidence_score = self._calculate_confidence_score(len(feedback_logs), analytics.average_rating)
+            
             return {
                 "video_id": video_id,
                 "reward_signal": reward_signal,
@@ -161,16 +213,52 @@ class FeedbackAnalyzer:
                 "positive_feedback_patterns": self._extract_patterns(positive_feedback),
                 "negative_feedback_patterns": self._extract_patterns(negative_feedback),
                 "recommended_actions": self._recommend_rlhf_actions(reward_signal, policy_improvements),
-                "confidence_score": self._calculate_confidence_score(len(feedback_logs), analytics.average_rating)
+                "confidence_score": confidence_score,
+                "policy_updates": self._policy_updates(negative_feedback, confidence_score)
             }
             
         except Exception as e:
             logger.error(f"RLHF insights failed for {video_id}: {e}")
             return {"error": str(e), "video_id": video_id}
     
+    @traced("analytics.update_policy")
+    def update_policy(self, video_ids: Optional[List[str]] = None, source: str = "rlhf") -> Dict:
+        """Apply the RLHF policy updates of many videos as one policy version (all videos by default)"""
+        if video_ids is None:
+            video_ids = [video['id'] for video in self._get_all_videos()]
+        updates = {}
+        for video_id in video_ids:
+            insights = self.generate_rlhf_insights(video_id)
+            if insights.get("policy_updates"):
+                updates[video_id] = insights["policy_updates"]
+        version = get_policy_store(self.db_path).update(updates, source=source)
+        return {"version": version, "videos_updated": len(updates)}
+    
+    def _policy_updates(self, negative_feedback: List[Dict], confidence: float) -> Dict[str, float]:
+        """Scene-type duration factors from the themes of negative feedback, damped by confidence"""
+        texts = get_text_engine().analyze_batch([f.get('comment') or '' for f in negative_feedback])
+        themes = set().union(*(text.themes for text in texts)) if texts else set()
+        factors: Dict[str, float] = {}
+        for theme in sorted(themes & POLICY_THEME_FACTORS.keys()):
+            for scene, factor in POLICY_THEME_FACTORS[theme].items():
+                factors[scene] = factors.get(scene, 1.0) * factor
+        # factor ** confidence: no evidence leaves the weight alone
+        return {scene: round(factor ** confidence, 4) for scene, factor in factors.items()
+                if round(factor ** confidence, 4) != 1.0}
+    
+    def _top_videos(self, video_analytics: List[VideoAnalytics], top_k: int) -> List[Dict]:
+        """Top-K of already computed scores with a bounded heap (the engagement index is preferred)"""
+        return [
+            {"video_id": va.video_id, "engagement_score": va.engagement_score, "rating": va.average_rating}
+            for va in heapq.nlargest(top_k, video_analytics, key=lambda va: va.engagement_score)
+        ]
+
     def _get_video_ratings(self, video_id: str) -> List[Dict]:
         """Get video ratings from database"""
         try:
+            if self._use_snapshots():
+                return self.snapshots.rows("ratings", video_id=video_id, columns=["rating", "comment", "id"])
+
             conn = sqlite3.connect(self.db_path)
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
@@ -192,6 +280,10 @@ class FeedbackAnalyzer:
     def _get_feedback_logs(self, video_id: str) -> List[Dict]:
         """Get advanced feedback logs from bucket"""
         try:
+            if self._use_snapshots():
+                return [{**row, "sentiment": {"sentiment": row["sentiment"]}}
+                        for row in self.snapshots.rows("feedback", video_id=video_id)]
+
             feedback_file = self.logs_path / f"feedback_{video_id}.json"
             
             if feedback_file.exists():
@@ -206,6 +298,9 @@ class FeedbackAnalyzer:
     def _get_all_videos(self) -> List[Dict]:
         """Get all videos from database"""
         try:
+            if self._use_snapshots():
+                return self.snapshots.rows("videos")
+
             conn = sqlite3.connect(self.db_path)
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
@@ -287,38 +382,40 @@ class FeedbackAnalyzer:
         elif avg_rating < 4.0:
             suggestions.append("Focus on clarity and pacing improvements")
         
-        # Analyze comments for specific issues
+        # Analyze comments for specific issues (one keyword pass per distinct comment)
         all_comments = [r.get('comment', '') for r in rating_data] + [f.get('comment', '') for f in feedback_logs]
-        comment_text = ' '.join(all_comments).lower()
-        
-        if 'slow' in comment_text:
+        mentioned = get_text_engine().keyword_counts(all_comments)
+
+        if mentioned['slow']:
             suggestions.append("Increase video pacing")
-        if 'fast' in comment_text:
+        if mentioned['fast']:
             suggestions.append("Slow down presentation")
-        if 'unclear' in comment_text or 'confusing' in comment_text:
+        if mentioned['unclear'] or mentioned['confusing']:
             suggestions.append("Improve explanation clarity")
-        if 'boring' in comment_text:
+        if mentioned['boring']:
             suggestions.append("Add more engaging elements")
         
         return suggestions[:5]  # Limit to top 5 suggestions
     
     def _analyze_platform_sentiment(self, video_analytics: List[VideoAnalytics]) -> Dict:
-        """Analyze sentiment across the platform"""
-        all_sentiments = []
-        
+        """Analyze sentiment across the platform.
+
+        Each trend's distribution is a share of its ``total_feedback``, so the
+        shares are merged as feedback-weighted sums: memory stays one entry
+        per sentiment however much feedback there is.
+        """
+        sentiment_counts = Counter()
+        total = 0
+
         for va in video_analytics:
             for trend in va.sentiment_trends:
-                for sentiment, count in trend.sentiment_distribution.items():
-                    all_sentiments.extend([sentiment] * int(count * trend.total_feedback))
-        
-        if not all_sentiments:
+                total += trend.total_feedback
+                for sentiment, share in trend.sentiment_distribution.items():
+                    sentiment_counts[sentiment] += share * trend.total_feedback
+
+        if not total:
             return {"positive": 0, "negative": 0, "neutral": 0}
-        
-        sentiment_counts = defaultdict(int)
-        for sentiment in all_sentiments:
-            sentiment_counts[sentiment] += 1
-        
-        total = len(all_sentiments)
+
         return {k: round(v/total, 3) for k, v in sentiment_counts.items()}
     
     def _calculate_satisfaction_trend(self, days: int) -> List[Dict]:
@@ -357,13 +454,21 @@ class FeedbackAnalyzer:
         return improvements
     
     def _analyze_learning_trajectory(self, video_id: str) -> Dict:
-        """Analyze learning trajectory for RLHF"""
-        # This would track how the video performance changes over time
+        """Reward over time, from the last catalog RLHF pass or computed for this video"""
+        try:
+            rewards = get_rlhf_rewards(self.db_path, video_id) or compute_video_rewards(self.db_path, video_id)
+        except sqlite3.Error as e:
+            logger.warning(f"Learning trajectory unavailable for {video_id}: {e}")
+            rewards = None
+        if rewards is None:
+            return {"initial_performance": 0.0, "current_performance": 0.0, "improvement_rate": 0.0,
+                    "learning_stability": 0.0, "trajectory": {"days": [], "rewards": []}}
         return {
-            "initial_performance": 0.5,
-            "current_performance": 0.7,
-            "improvement_rate": 0.1,
-            "learning_stability": 0.8
+            "initial_performance": rewards["initial_performance"],
+            "current_performance": rewards["current_performance"],
+            "improvement_rate": rewards["improvement_rate"],
+            "learning_stability": rewards["learning_stability"],
+            "trajectory": rewards["trajectory"]
         }
     
     def _extract_patterns(self, feedback_list: List[Dict]) -> List[str]:
@@ -373,11 +478,11 @@ class FeedbackAnalyzer:
         
         # Simple pattern extraction
         patterns = []
-        comments = [f.get('comment', '') for f in feedback_list]
-        
-        if any('clear' in c.lower() for c in comments):
+        mentioned = get_text_engine().keyword_counts([f.get('comment', '') for f in feedback_list])
+
+        if mentioned['clear']:
             patterns.append("Users appreciate clarity")
-        if any('example' in c.lower() for c in comments):
+        if mentioned['example']:
             patterns.append("Examples are valued")
         
         return patterns
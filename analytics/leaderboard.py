@@ -0,0 +1,133 @@
+# analytics/leaderboard.py - Confidence-adjusted video leaderboard with O(1) updates per rating
+"""
+Ranking by raw average puts a video with a single 5-star rating at the top.
+The leaderboard instead ranks by one of two scores:
+
+    bayesian  (C*m + sum) / (C + n)       average shrunk towards the prior m by C pseudo-ratings
+    wilson    Wilson lower bound of the mean mapped to [0, 1], i.e. (avg - 1) / 4, at z = 1.96
+
+Both scores are kept by the ratings triggers of ``analytics.rating_stats``
+in ``<ratings>_video_stats``, next to the sufficient statistics they come
+from (n, sum, sum of squares), so each new rating costs O(1) and no ratings
+are ever rescanned. Both scores are indexed as ``(<score>_rank, video_id)``
+with ``<score>_rank = -<score>``, so the page order (score descending, ties
+by ascending video_id) is the index order and a (score, video_id) cursor is
+a row-value seek, as in ``gallery.fetch_video_page``.
+
+The Wilson score needs SQLite's math functions (``sqrt``, built in since
+3.35 in most builds); without them only the Bayesian ranking is maintained.
+"""
+import math
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from analytics import rating_stats
+from analytics.rating_stats import PRIOR_MEAN, PRIOR_WEIGHT, WILSON_Z
+from bhiv_tracing import traced
+
+PAGE_SIZE = 20
+RANKINGS = ("bayesian", "wilson")
+
+Cursor = Tuple[float, str]
+
+_rankings: Dict[tuple, Tuple[str, ...]] = {}
+_rankings_lock = threading.Lock()
+
+
+def bayesian_average(n: int, total: float, prior_mean: float = PRIOR_MEAN, prior_weight: float = PRIOR_WEIGHT) -> float:
+    return (prior_weight * prior_mean + total) / (prior_weight + n)
+
+
+def wilson_lower_bound(n: int, total: float, z: float = WILSON_Z) -> float:
+    """Lower bound for star ratings, treating (avg - 1) / 4 as the success share of n trials"""
+    if n <= 0:
+        return 0.0
+    p = (total / n - 1) / 4
+    z2 = z * z
+    return (p + z2 / (2 * n) - z * math.sqrt(max(0.0, p * (1 - p) / n + z2 / (4 * n * n)))) / (1 + z2 / n)
+
+
+class Leaderboard:
+    """Paginated, confidence-adjusted ranking of videos (see module docstring)"""
+
+    def __init__(self, db_path="data/meta.db", ratings_table: str = "ratings"):
+        self.db_path = Path(db_path)
+        self.ratings_table = ratings_table
+        self.table = f"{ratings_table}_video_stats"
+
+    def _connect(self) -> Tuple[sqlite3.Connection, Tuple[str, ...]]:
+        conn = rating_stats.connect(self.db_path, self.ratings_table)
+        key = (str(self.db_path.resolve()), self.ratings_table)
+        rankings = _rankings.get(key)
+        if rankings is None:
+            with _rankings_lock:
+                rankings = _rankings[key] = (RANKINGS if rating_stats.maintains_wilson(conn, self.ratings_table)
+                                             else ("bayesian",))
+        return conn, rankings
+
+    @traced("analytics.leaderboard_page")
+    def page(self, ranking: str = "bayesian", cursor: Optional[Cursor] = None, page_size: int = PAGE_SIZE,
+             min_ratings: int = 1) -> Tuple[List[Dict], Optional[Cursor]]:
+        """One page of the ranking and the cursor for the next one (``None`` on the last page)"""
+        if ranking not in RANKINGS:
+            raise ValueError(f"ranking must be one of {RANKINGS}")
+        conn, rankings = self._connect()
+        try:
+            if ranking not in rankings:
+                raise ValueError(f"'{ranking}' ranking needs SQLite math functions (sqrt)")
+            where, params = f"WHERE {ranking}_rank IS NOT NULL", []
+            if cursor is not None:
+                where, params = f"WHERE ({ranking}_rank, video_id) > (?, ?)", [-cursor[0], cursor[1]]
+            rows = conn.execute(
+                f'''SELECT video_id, count, sum, sum_sq, {ranking} FROM {self.table}
+                    {where} AND count >= ? ORDER BY {ranking}_rank, video_id LIMIT ?''',
+                (*params, min_ratings, page_size + 1)).fetchall()
+        finally:
+            conn.close()
+
+        entries = [self._entry(vid, n, total, total_sq, score) for vid, n, total, total_sq, score in rows[:page_size]]
+        next_cursor = None
+        if len(rows) > page_size:
+            last = rows[page_size - 1]
+            next_cursor = (last[4], last[0])
+        return entries, next_cursor
+
+    def rank_of(self, video_id: str, ranking: str = "bayesian") -> Optional[int]:
+        """1-based position of ``video_id`` (two range counts on the score index)"""
+        if ranking not in RANKINGS:
+            raise ValueError(f"ranking must be one of {RANKINGS}")
+        conn, _ = self._connect()
+        try:
+            row = conn.execute(f"SELECT {ranking}_rank FROM {self.table} WHERE video_id = ?", (video_id,)).fetchone()
+            if row is None or row[0] is None:
+                return None
+            ahead = conn.execute(f"SELECT COUNT(*) FROM {self.table} WHERE {ranking}_rank < ?", row).fetchone()[0]
+            ahead += conn.execute(f"SELECT COUNT(*) FROM {self.table} WHERE {ranking}_rank = ? AND video_id < ?",
+                                  (row[0], video_id)).fetchone()[0]
+        finally:
+            conn.close()
+        return ahead + 1
+
+    @staticmethod
+    def _entry(video_id: str, n: int, total: int, total_sq: int, score: float) -> Dict:
+        mean = total / n
+        return {
+            "video_id": video_id,
+            "score": round(score, 4),
+            "ratings": n,
+            "average_rating": round(mean, 2),
+            "rating_stddev": round(math.sqrt(max(0.0, total_sq / n - mean * mean)), 3),
+        }
+
+
+_leaderboards: Dict[tuple, Leaderboard] = {}
+
+
+def get_leaderboard(db_path="data/meta.db", ratings_table: str = "ratings") -> Leaderboard:
+    key = (str(db_path), ratings_table)
+    board = _leaderboards.get(key)
+    if board is None:
+        board = _leaderboards.setdefault(key, Leaderboard(db_path, ratings_table))
+    return board
@@ -0,0 +1,226 @@
+# analytics/rating_stats.py - Trigger-maintained per-video and per-day rating statistics
+"""
+One set of SQLite triggers per ratings table keeps everything the
+dashboards, the engagement index and the feedback loop read from it:
+
+    <ratings>_video_stats   per video: count, sum, sum of squares, positive/neutral/negative,
+                            comment chars, and the engagement, Bayesian and Wilson scores (each indexed;
+                            the rankings through virtual ``<score>_rank = -<score>`` columns)
+    <ratings>_daily_stats   per (day, video): count, sum, comment chars, for the day the rating was written
+    <ratings>_rating_days   rating id -> the day it was counted on, so deletes and edits
+                            correct the right daily row
+
+    engagement = 0.7 * avg_rating / 5 + 0.3 * min(avg_comment_chars / 100, 1)
+    bayesian   = (C*m + sum) / (C + n)            see analytics.leaderboard
+    wilson     Wilson lower bound of (avg - 1) / 4 at z = 1.96
+
+The Wilson score needs SQLite's math functions (``sqrt``, built in since
+3.35 in most builds); without them that column stays NULL.
+
+Inserts, updates and deletes all keep both tables exact. Ratings that
+existed before the triggers were installed are backfilled into
+``video_stats`` only: the ratings tables carry no timestamp, so their day
+is unknown and they count towards all-time figures but no day window.
+(For any video, ``video_stats`` minus the sum of its daily rows is that
+undated history.)
+
+Writers must use plain INSERT/UPDATE/DELETE; ``INSERT OR REPLACE`` only
+fires delete triggers with ``PRAGMA recursive_triggers = ON``.
+"""
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List
+
+PRIOR_MEAN = float(os.getenv("LEADERBOARD_PRIOR_MEAN", "3.0"))
+PRIOR_WEIGHT = float(os.getenv("LEADERBOARD_PRIOR_WEIGHT", "5"))
+WILSON_Z = 1.96
+
+_ENGAGEMENT = "ROUND(0.7 * ({s} * 1.0 / {n}) / 5.0 + 0.3 * MIN({c} * 1.0 / {n} / 100.0, 1.0), 3)"
+
+# Triggers and tables of earlier layouts, replaced on upgrade
+_LEGACY_TRIGGERS = ("stats_insert", "stats_delete", "stats_update", "engagement_insert", "engagement_delete",
+                    "leaderboard_insert", "leaderboard_delete")
+_LEGACY_SHARED_TABLES = ("engagement_totals", "engagement_daily")
+
+_schema_ready = set()
+_schema_lock = threading.Lock()
+
+
+def engagement_sql(count: str, rating_sum: str, comment_chars: str) -> str:
+    return _ENGAGEMENT.format(n=count, s=rating_sum, c=comment_chars)
+
+
+def window_start(days: int) -> str:
+    """``date('now', ?)`` modifier for a window of ``days`` calendar days ending today (1 = today only)"""
+    return f"-{days - 1} days"
+
+
+def bayesian_sql(n: str, total: str) -> str:
+    return f"(({PRIOR_WEIGHT!r} * {PRIOR_MEAN!r} + {total}) / ({PRIOR_WEIGHT!r} + {n}))"
+
+
+def wilson_sql(n: str, total: str) -> str:
+    p = f"(({total} * 1.0 / {n} - 1) / 4)"
+    z, z2 = repr(WILSON_Z), repr(WILSON_Z * WILSON_Z)
+    return (f"(({p} + {z2} / (2.0 * {n}) - {z} * sqrt(MAX(0.0, {p} * (1 - {p}) / {n} + {z2} / (4.0 * {n} * {n}))))"
+            f" / (1 + {z2} / {n}))")
+
+
+def _has_math_functions(conn: sqlite3.Connection) -> bool:
+    try:
+        conn.execute("SELECT sqrt(4.0)").fetchone()
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _insert_trigger_sql(conn: sqlite3.Connection, ratings_table: str):
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type='trigger' AND name=?",
+                       (f"trg_{ratings_table}_stats_insert",)).fetchone()
+    return row[0] if row is not None else None
+
+
+def _installed(conn: sqlite3.Connection, ratings_table: str) -> bool:
+    sql = _insert_trigger_sql(conn, ratings_table)
+    return sql is not None and f"{ratings_table}_rating_days" in sql and "bayesian =" in sql
+
+
+def _missing_rank_columns(conn: sqlite3.Connection, video_stats: str) -> List[str]:
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_xinfo({video_stats})")}
+    return [score for score in ("bayesian", "wilson") if f"{score}_rank" not in columns]
+
+
+def _ensure_rank_columns(conn: sqlite3.Connection, video_stats: str) -> None:
+    """Index the leaderboard scores as ``(-score, video_id)``.
+
+    Pages run ``score DESC, video_id ASC``; with the negated score both
+    columns ascend, so a ``(rank, video_id) > (?, ?)`` cursor is one index
+    seek. Replaces the ``(score DESC, video_id)`` indexes of earlier layouts.
+    """
+    for score in _missing_rank_columns(conn, video_stats):
+        conn.execute(f"ALTER TABLE {video_stats} ADD COLUMN {score}_rank REAL GENERATED ALWAYS AS (-{score}) VIRTUAL")
+        conn.execute(f"DROP INDEX IF EXISTS idx_{video_stats}_{score}")
+        conn.execute(f"CREATE INDEX idx_{video_stats}_{score}_rank ON {video_stats} ({score}_rank, video_id)")
+
+
+def maintains_wilson(conn: sqlite3.Connection, ratings_table: str = "ratings") -> bool:
+    """Whether the installed triggers keep the Wilson score (they were created with math functions)"""
+    return "wilson =" in (_insert_trigger_sql(conn, ratings_table) or "")
+
+
+def _drop_legacy(conn: sqlite3.Connection, ratings_table: str) -> None:
+    for suffix in _LEGACY_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_{ratings_table}_{suffix}")
+    for suffix in ("video_stats", "daily_stats", "rating_days", "leaderboard"):
+        conn.execute(f"DROP TABLE IF EXISTS {ratings_table}_{suffix}")
+    for table in _LEGACY_SHARED_TABLES:  # once no other ratings table's old triggers still write to them
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='trigger' AND sql LIKE ?",
+                            (f"%{table}%",)).fetchone():
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+def ensure_rating_stats(conn: sqlite3.Connection, ratings_table: str = "ratings") -> None:
+    """Create the statistics tables and triggers for ``ratings_table`` and backfill them (idempotent)"""
+    video_stats, daily_stats = f"{ratings_table}_video_stats", f"{ratings_table}_daily_stats"
+    if _installed(conn, ratings_table) and not _missing_rank_columns(conn, video_stats):
+        return
+
+    rating_days = f"{ratings_table}_rating_days"
+    scores = f"engagement = {engagement_sql('count', 'sum', 'comment_chars')}, bayesian = {bayesian_sql('count', 'sum')}"
+    if _has_math_functions(conn):
+        scores += f", wilson = {wilson_sql('count', 'sum')}"
+
+    add_new = f'''
+        INSERT INTO {video_stats} (video_id, count, sum, sum_sq, positive, neutral, negative, comment_chars)
+        VALUES (NEW.video_id, 1, NEW.rating, NEW.rating * NEW.rating,
+                NEW.rating >= 4, NEW.rating = 3, NEW.rating <= 2, LENGTH(COALESCE(NEW.comment, '')))
+        ON CONFLICT(video_id) DO UPDATE SET
+            count = count + 1, sum = sum + excluded.sum, sum_sq = sum_sq + excluded.sum_sq,
+            positive = positive + excluded.positive, neutral = neutral + excluded.neutral,
+            negative = negative + excluded.negative, comment_chars = comment_chars + excluded.comment_chars;
+        UPDATE {video_stats} SET {scores} WHERE video_id = NEW.video_id;'''
+
+    # Daily rows follow the day recorded for the rating, so an edit never moves it to today
+    add_daily = f'''
+        INSERT INTO {daily_stats} (day, video_id, count, sum, comment_chars)
+        SELECT day, NEW.video_id, 1, NEW.rating, LENGTH(COALESCE(NEW.comment, '')) FROM {rating_days}
+        WHERE rating_id = NEW.id
+        ON CONFLICT(day, video_id) DO UPDATE SET
+            count = count + 1, sum = sum + excluded.sum, comment_chars = comment_chars + excluded.comment_chars;'''
+
+    day_of_old = f"(SELECT day FROM {rating_days} WHERE rating_id = OLD.id)"
+    remove_old = f'''
+        UPDATE {video_stats} SET
+            count = count - 1, sum = sum - OLD.rating, sum_sq = sum_sq - OLD.rating * OLD.rating,
+            positive = positive - (OLD.rating >= 4), neutral = neutral - (OLD.rating = 3),
+            negative = negative - (OLD.rating <= 2),
+            comment_chars = comment_chars - LENGTH(COALESCE(OLD.comment, ''))
+        WHERE video_id = OLD.video_id;
+        DELETE FROM {video_stats} WHERE video_id = OLD.video_id AND count <= 0;
+        UPDATE {video_stats} SET {scores} WHERE video_id = OLD.video_id;
+        UPDATE {daily_stats} SET count = count - 1, sum = sum - OLD.rating,
+            comment_chars = comment_chars - LENGTH(COALESCE(OLD.comment, ''))
+        WHERE day = {day_of_old} AND video_id = OLD.video_id;
+        DELETE FROM {daily_stats} WHERE day = {day_of_old} AND video_id = OLD.video_id AND count <= 0;'''
+
+    # Taken before the backfill so no rating lands between the backfill and the triggers
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if _installed(conn, ratings_table):
+            _ensure_rank_columns(conn, video_stats)
+            conn.execute("COMMIT")
+            return
+        _drop_legacy(conn, ratings_table)
+        conn.execute(f'''CREATE TABLE {video_stats}
+                         (video_id TEXT PRIMARY KEY, count INTEGER NOT NULL, sum INTEGER NOT NULL,
+                          sum_sq INTEGER NOT NULL, positive INTEGER NOT NULL, neutral INTEGER NOT NULL,
+                          negative INTEGER NOT NULL, comment_chars INTEGER NOT NULL, engagement REAL,
+                          bayesian REAL, wilson REAL)''')
+        conn.execute(f"CREATE INDEX idx_{video_stats}_engagement ON {video_stats} (engagement DESC, video_id)")
+        _ensure_rank_columns(conn, video_stats)
+        conn.execute(f'''CREATE TABLE {daily_stats}
+                         (day TEXT NOT NULL, video_id TEXT NOT NULL, count INTEGER NOT NULL, sum INTEGER NOT NULL,
+                          comment_chars INTEGER NOT NULL, PRIMARY KEY (day, video_id))''')
+        conn.execute(f"CREATE INDEX idx_{daily_stats}_video ON {daily_stats} (video_id, day)")
+        conn.execute(f"CREATE TABLE {rating_days} (rating_id INTEGER PRIMARY KEY, day TEXT NOT NULL)")
+        conn.execute(f'''INSERT INTO {video_stats}
+                         SELECT video_id, COUNT(*), SUM(rating), SUM(rating * rating), SUM(rating >= 4),
+                                SUM(rating = 3), SUM(rating <= 2), SUM(LENGTH(COALESCE(comment, ''))),
+                                NULL, NULL, NULL
+                         FROM {ratings_table} WHERE rating IS NOT NULL
+                         GROUP BY video_id''')
+        conn.execute(f"UPDATE {video_stats} SET {scores}")
+        conn.execute(f'''CREATE TRIGGER trg_{ratings_table}_stats_insert AFTER INSERT ON {ratings_table}
+                         WHEN NEW.rating IS NOT NULL BEGIN {add_new}
+                             INSERT OR REPLACE INTO {rating_days} (rating_id, day) VALUES (NEW.id, date('now'));
+                             {add_daily}
+                         END''')
+        conn.execute(f'''CREATE TRIGGER trg_{ratings_table}_stats_delete AFTER DELETE ON {ratings_table}
+                         WHEN OLD.rating IS NOT NULL BEGIN {remove_old}
+                             DELETE FROM {rating_days} WHERE rating_id = OLD.id;
+                         END''')
+        conn.execute(f'''CREATE TRIGGER trg_{ratings_table}_stats_update AFTER UPDATE OF rating, video_id, comment
+                         ON {ratings_table} WHEN OLD.rating IS NOT NULL AND NEW.rating IS NOT NULL
+                         BEGIN {remove_old} {add_new} {add_daily} END''')
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def connect(db_path, ratings_table: str = "ratings", **kwargs) -> sqlite3.Connection:
+    """Autocommit connection with the statistics for ``ratings_table`` installed (checked once per process)"""
+    conn = sqlite3.connect(db_path, isolation_level=None, **kwargs)
+    key = (str(Path(db_path).resolve()), ratings_table)
+    if key not in _schema_ready:
+        with _schema_lock:
+            if key not in _schema_ready:
+                try:
+                    ensure_rating_stats(conn, ratings_table)
+                except BaseException:
+                    conn.close()
+                    raise
+                _schema_ready.add(key)
+    return conn
@@ -7,6 +7,8 @@ import json
 import hashlib
 import base64
 from datetime import datetime
+from gallery import ensure_gallery_schema
+from data_service import DataService
 
 # Streamlit Configuration
 st.set_page_config(
@@ -33,9 +35,17 @@ def init_app():
                      (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, video_id TEXT, 
                       rating INTEGER, comment TEXT, UNIQUE(user_id, video_id))''')
         conn.commit()
+        ensure_gallery_schema(conn)
 
 init_app()
 
+@st.cache_resource
+def get_data_service():
+    """One read cache shared by every session in this process"""
+    return DataService("data/meta.db")
+
+data_service = get_data_service()
+
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
@@ -218,19 +228,7 @@ with col2:
         st.rerun()
 
 # Metrics
-@st.cache_data(ttl=5)
-def get_metrics():
-    with sqlite3.connect("data/meta.db") as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM videos")
-        video_count = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM user_ratings")
-        rating_count = cur.fetchone()[0]
-        cur.execute("SELECT AVG(rating) FROM user_ratings")
-        avg_rating = cur.fetchone()[0] or 0
-    return video_count, rating_count, avg_rating
-
-video_count, rating_count, avg_rating = get_metrics()
+video_count, rating_count, avg_rating = data_service.get_metrics()
 
 col1, col2, col3 = st.columns(3)
 with col1:
@@ -274,6 +272,8 @@ if uploaded_file and st.button("🎬 Generate Video", type="primary"):
         try:
             content = uploaded_file.read().decode()
             create_video_preview(video_id, uploaded_file.name, content)
+            data_service.invalidate_videos()
+            st.session_state.gallery_cursors = [None]
             
             st.success(f"✅ Video generated successfully! ID: {video_id}")
             st.balloons()
@@ -293,13 +293,21 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-with sqlite3.connect("data/meta.db") as conn:
-    cur = conn.cursor()
-    cur.execute("SELECT id, title, script_content, created_at FROM videos ORDER BY created_at DESC")
-    videos = cur.fetchall()
+# Keyset pagination: the stack holds the cursor each visited page started from
+if 'gallery_cursors' not in st.session_state:
+    st.session_state.gallery_cursors = [None]
+
+videos, next_cursor = data_service.get_video_page(
+    st.session_state.gallery_cursors[-1], ("title", "script_content")
+)
+page_ratings = data_service.get_page_ratings(
+    [v["id"] for v in videos], st.session_state.user_id
+)
 
 if videos:
-    for video_id, title, script_content, created_at in videos:
+    for video in videos:
+        video_id, title = video["id"], video["title"]
+        script_content, created_at = video["script_content"] or "", video["created_at"]
         with st.expander(f"📹 {title} (ID: {video_id})", expanded=False):
             col1, col2 = st.columns([2, 1])
             
@@ -324,24 +332,19 @@ if videos:
                     st.text_area("Script Content", script_content, height=200, disabled=True, key=f"script_{video_id}")
             
             with col2:
-                # Ratings section
-                with sqlite3.connect("data/meta.db") as conn:
-                    cur = conn.cursor()
-                    cur.execute("SELECT rating, comment FROM user_ratings WHERE video_id = ? ORDER BY id DESC", (video_id,))
-                    video_ratings = cur.fetchall()
-                    
-                    cur.execute("SELECT 1 FROM user_ratings WHERE user_id = ? AND video_id = ?", 
-                               (st.session_state.user_id, video_id))
-                    has_rated = cur.fetchone() is not None
+                # Ratings section (fetched for the whole page above)
+                ratings_summary = page_ratings[video_id]
+                rating_total = ratings_summary["count"]
+                has_rated = ratings_summary["has_rated"]
                 
                 st.markdown("### 📊 Ratings & Feedback")
                 
-                if video_ratings:
-                    st.write(f"**{len(video_ratings)} ratings:**")
-                    for r, c in video_ratings[:3]:
+                if rating_total:
+                    st.write(f"**{rating_total} ratings:**")
+                    for r, c in ratings_summary["recent"]:
                         st.write(f"⭐ {r}/5 - {c if c else 'No comment'}")
-                    if len(video_ratings) > 3:
-                        st.write(f"... and {len(video_ratings) - 3} more")
+                    if rating_total > len(ratings_summary["recent"]):
+                        st.write(f"... and {rating_total - len(ratings_summary['recent'])} more")
                 else:
                     st.write("No ratings yet - be the first!")
                 
@@ -365,18 +368,25 @@ if videos:
                     
                     if st.button("🚀 Submit Rating", key=f"submit_{video_id}", type="primary"):
                         try:
-                            with sqlite3.connect("data/meta.db") as conn:
-                                c = conn.cursor()
-                                c.execute("INSERT INTO user_ratings (user_id, video_id, rating, comment) VALUES (?,?,?,?)",
-                                          (st.session_state.user_id, video_id, rating, comment))
-                                conn.commit()
+                            data_service.add_rating(video_id, rating, comment, user_id=st.session_state.user_id)
                             
                             st.success("✅ Rating submitted successfully!")
                             st.balloons()
-                            st.cache_data.clear()
                             st.rerun()
                         except Exception as e:
                             st.error(f"❌ Failed to save rating: {str(e)}")
+
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if len(st.session_state.gallery_cursors) > 1 and st.button("⬅️ Newer", key="gallery_prev"):
+            st.session_state.gallery_cursors.pop()
+            st.rerun()
+    with col_page:
+        st.markdown(f"<p style='text-align: center;'>Page {len(st.session_state.gallery_cursors)}</p>", unsafe_allow_html=True)
+    with col_next:
+        if next_cursor and st.button("Older ➡️", key="gallery_next"):
+            st.session_state.gallery_cursors.append(next_cursor)
+            st.rerun()
 else:
     st.markdown("""
     <div style="text-align: center; padding: 3rem; background: rgba(255,255,255,0.1); border-radius: 10px;">
@@ -396,5 +406,5 @@ st.markdown("""
 
 # Refresh button
 if st.button("🔄 Refresh Dashboard", type="secondary"):
-    st.cache_data.clear()
+    data_service.invalidate("metrics")
     st.rerun()
\ No newline at end of file
@@ -0,0 +1,113 @@
+# backend/concurrency.py - Bounded executors for blocking work in async handlers
+"""
+Concurrency model for the API:
+
+* ``async def`` handlers never block the event loop themselves.
+* SQLite work goes to ``run_db`` (small pool, one connection per worker thread).
+* Bucket / filesystem work goes to ``run_io``.
+* CPU-bound Python (the upload pipeline: storyboard generation, rendering)
+  goes to ``run_cpu``, a process pool, so it runs outside this process's GIL.
+  Jobs must be picklable module-level functions; they get no trace context
+  or in-process caches from the caller.
+* Rendition and HLS encodes go to ``run_encode``, a thread pool: they wait on
+  ffmpeg with the GIL released and rely on in-process locks so concurrent
+  requests share one encode.
+* bcrypt has its own bounded pool (``security.auth.PasswordHasher``).
+
+Each pool is bounded, so a burst of slow requests queues instead of
+spawning unbounded threads, and one kind of work cannot starve another.
+"""
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import os
+import sqlite3
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+from bhiv_metrics import DB_QUERY_SECONDS
+from bhiv_tracing import child_span
+
+DB_POOL_SIZE = int(os.getenv("BHIV_DB_POOL_SIZE", "8"))
+IO_POOL_SIZE = int(os.getenv("BHIV_IO_POOL_SIZE", "16"))
+CPU_POOL_SIZE = int(os.getenv("BHIV_CPU_POOL_SIZE", str(os.cpu_count() or 2)))
+ENCODE_POOL_SIZE = int(os.getenv("BHIV_ENCODE_POOL_SIZE", str(os.cpu_count() or 2)))
+
+db_executor: Executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="bhiv-db")
+io_executor: Executor = ThreadPoolExecutor(max_workers=IO_POOL_SIZE, thread_name_prefix="bhiv-io")
+# spawn, not fork: the API process already runs threads (pools, consumers, exporters)
+cpu_executor: Executor = ProcessPoolExecutor(max_workers=CPU_POOL_SIZE,
+                                             mp_context=multiprocessing.get_context("spawn"))
+encode_executor: Executor = ThreadPoolExecutor(max_workers=ENCODE_POOL_SIZE, thread_name_prefix="bhiv-encode")
+
+_local = threading.local()
+
+
+def get_connection(db_path, durable: bool = False) -> sqlite3.Connection:
+    """Per-thread SQLite connection, reused across calls on the same DB worker
+
+    Connections run WAL with ``synchronous=NORMAL``: a commit can be lost on
+    power failure (never corrupted). ``durable=True`` gives a separate
+    connection with ``synchronous=FULL`` for writes that are acknowledged to
+    the client as stored, such as ratings and their events.
+    """
+    connections: Dict[Tuple[str, bool], sqlite3.Connection] = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    key = (str(Path(db_path)), durable)
+    conn = connections.get(key)
+    if conn is None:
+        conn = sqlite3.connect(key[0], timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={'FULL' if durable else 'NORMAL'}")
+        connections[key] = conn
+    return conn
+
+
+async def _run(executor: Executor, func: Callable, *args: Any, **kwargs: Any) -> Any:
+    loop = asyncio.get_running_loop()
+    # run_in_executor does not carry contextvars over; copy them so spans nest across pools
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor, functools.partial(context.run, func, *args, **kwargs))
+
+
+def _timed(func: Callable, operation: str) -> Callable:
+    """Wrap ``func`` so its run time (not its queue wait) is observed and traced on the worker"""
+    histogram = DB_QUERY_SECONDS.labels(operation)
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with child_span(f"db.{operation}"), histogram.time():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+async def run_db(func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """Run blocking SQLite work on the DB pool (timed and traced per operation)"""
+    return await _run(db_executor, _timed(func, getattr(func, "__name__", "unknown")), *args, **kwargs)
+
+
+async def run_io(func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """Run blocking filesystem / bucket work on the I/O pool"""
+    return await _run(io_executor, func, *args, **kwargs)
+
+
+async def run_cpu(func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """Run CPU-bound Python in a worker process; ``func`` and its arguments must be picklable"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(cpu_executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_encode(func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """Run an ffmpeg-bound encode (renditions, HLS packaging) on the encode pool"""
+    return await _run(encode_executor, func, *args, **kwargs)
+
+
+def shutdown(wait: bool = True) -> None:
+    """Stop all pools (used on application shutdown)"""
+    for executor in (db_executor, io_executor, cpu_executor, encode_executor):
+        executor.shutdown(wait=wait)
@@ -1,8 +1,8 @@
 # backend/server.py
 from bhiv_core import get_orchestrator
 from bhiv_bucket import save_script
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends, Request
+from fastapi.responses import FileResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
@@ -10,13 +10,24 @@ from pathlib import Path
 from video.feedback_adapter import adapt_storyboard
 from video.bhiv_integration import BHIVClient
 from security.auth import (
-    auth_manager, get_current_active_user, require_admin, require_user,
+    get_auth_manager, get_current_active_user, require_admin, require_user,
     User, UserLogin, UserCreate, SecurityValidator
 )
+from backend.concurrency import run_db, run_io, run_cpu, run_encode, get_connection, shutdown as shutdown_pools
+from bhiv_metrics import CONTENT_TYPE, MetricsMiddleware, RATINGS, UPLOADS, get_registry, record_bucket_io
+from bhiv_tracing import TracingMiddleware
+from analytics.snapshots import SNAPSHOT_INTERVAL_SECONDS, SnapshotExporter
+from bhiv_events import RATING_TOPIC, ensure_event_schema, get_event_log
+from video.renditions import DEFAULT_RENDITION, encoded_rendition, ensure_rendition, list_renditions, select_rendition
+from video.packaging import (
+    PLAYLIST_CACHE_CONTROL, PLAYLIST_MEDIA_TYPE, SEGMENT_CACHE_CONTROL, SEGMENT_MEDIA_TYPE,
+    ensure_package, master_playlist, segment_path, storyboard_path
+)
 import uuid, shutil, json, sqlite3, os
 from video.storyboard import generate_storyboard_from_file
 import time
 from datetime import datetime
+from typing import Optional, Tuple
 
 app = FastAPI(
     title="BHIV-Integrated Gurukul Content Platform",
@@ -33,24 +44,64 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request tracing (root span per request, opt-in profiling via X-BHIV-Profile)
+app.add_middleware(TracingMiddleware)
+
+# Request metrics (outermost, so it times the whole stack)
+app.add_middleware(MetricsMiddleware)
+
 # Serve frontend static files
 app.mount("/static", StaticFiles(directory="frontend"), name="static")
 
+# Columnar analytics snapshots (BHIV_SNAPSHOT_INTERVAL seconds; 0 disables)
+snapshot_exporter = SnapshotExporter(db_path="data/meta.db", bucket_path="bucket")
+
+# Rating events; BHIV_EVENT_CONSUMERS=0 leaves consuming to another process
+event_log = get_event_log("data/meta.db")
+rating_consumers = []
+
+@app.on_event("startup")
+def _start_auth():
+    # Creates data/auth.db and the default admin here rather than at import
+    get_auth_manager().store.start_purger()
+
+@app.on_event("startup")
+def _start_snapshots():
+    if SNAPSHOT_INTERVAL_SECONDS > 0:
+        snapshot_exporter.start()
+
+@app.on_event("startup")
+def _start_rating_consumers():
+    if os.getenv("BHIV_EVENT_CONSUMERS", "1") != "0":
+        from bhiv_core import start_rating_consumers
+        rating_consumers.extend(start_rating_consumers("data/meta.db"))
+
+@app.on_event("shutdown")
+def _shutdown_pools():
+    shutdown_pools(wait=False)
+    auth_manager = get_auth_manager()
+    auth_manager.password_hasher.shutdown(wait=False)
+    auth_manager.store.stop_purger()
+    snapshot_exporter.stop()
+    for consumer in rating_consumers:
+        consumer.stop()
+
 # Authentication endpoints
 @app.post("/auth/login")
-async def login(login_data: UserLogin):
+async def login(login_data: UserLogin, request: Request):
     """User login endpoint"""
-    return auth_manager.login(login_data)
+    client_ip = request.client.host if request.client else "unknown"
+    return await get_auth_manager().login_async(login_data, client_ip=client_ip)
 
 @app.post("/auth/register")
 async def register(user_data: UserCreate, current_user: User = Depends(require_admin)):
     """User registration (admin only)"""
-    return auth_manager.create_user(user_data)
+    return await get_auth_manager().create_user_async(user_data)
 
 @app.post("/auth/refresh")
 async def refresh_token(refresh_token: str = Form(...)):
     """Refresh access token"""
-    return auth_manager.refresh_access_token(refresh_token)
+    return await get_auth_manager().refresh_access_token_async(refresh_token)
 
 @app.get("/auth/me")
 async def get_current_user_info(current_user: User = Depends(get_current_active_user)):
@@ -79,6 +130,7 @@ def system_status():
 DATA = Path("data")
 VIDEOS = DATA / "videos"
 DBPATH = DATA / "meta.db"
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
 def init_db():
     try:
@@ -91,12 +143,55 @@ def init_db():
                          (id TEXT PRIMARY KEY, title TEXT, storyboard_path TEXT, video_path TEXT)''')
             c.execute('''CREATE TABLE IF NOT EXISTS ratings
                          (id INTEGER PRIMARY KEY AUTOINCREMENT, video_id TEXT, rating INTEGER, comment TEXT)''')
+            ensure_event_schema(conn)
+            c.execute("PRAGMA journal_mode=WAL")
             conn.commit()
     except Exception as e:
         print(f"Database initialization error: {e}")
 
 init_db()
 
+# Blocking helpers: always called through run_db / run_io, never on the event loop
+
+def _insert_video(video_id: str, storyboard_path: str, video_path: str) -> None:
+    conn = get_connection(DBPATH)
+    with conn:
+        conn.execute("INSERT INTO videos (id, title, storyboard_path, video_path) VALUES (?,?,?,?)",
+                     (video_id, "Generated Video", storyboard_path, video_path))
+
+def _insert_rating(video_id: str, rating: int, comment: str) -> int:
+    """Store the rating and its event in one transaction; returns the event offset"""
+    conn = get_connection(DBPATH, durable=True)  # acknowledged to the client, so fsync the commit
+    with conn:
+        conn.execute("INSERT INTO ratings (video_id, rating, comment) VALUES (?,?,?)", (video_id, rating, comment))
+        offset = event_log.append(RATING_TOPIC, {"video_id": video_id, "rating": rating, "comment": comment}, conn=conn)
+    event_log.notify()
+    return offset
+
+def _remove_file(path: Path) -> None:
+    if path.exists():
+        path.unlink()
+
+def _file_size(path: Optional[Path]) -> Optional[int]:
+    try:
+        return path.stat().st_size if path is not None else None
+    except FileNotFoundError:
+        return None
+
+def _stored_video(vid: str) -> Optional[Tuple[Path, Optional[int]]]:
+    """Default rendition: the bucket copy with its size (for the I/O metrics), else the local one"""
+    bucket_path = Path("bucket/videos") / f"{vid}.mp4"
+    size = _file_size(bucket_path)
+    if size is not None:
+        return bucket_path, size
+    data_path = VIDEOS / f"{vid}.mp4"
+    return (data_path, None) if data_path.exists() else None
+
+def _segment_file(vid: str, rendition: str, segment: str) -> Optional[Tuple[Path, int]]:
+    path = segment_path(vid, rendition, segment)
+    size = _file_size(path)
+    return (path, size) if size is not None else None
+
 class UploadResponse(BaseModel):
     id: str
     message: str
@@ -113,39 +208,102 @@ async def upload_script(
     temp_path = Path("temp") / file.filename
     temp_path.parent.mkdir(exist_ok=True)
     
-    with open(temp_path, "wb") as f:
-        shutil.copyfileobj(file.file, f)
+    # Read the upload asynchronously, write it to disk on the I/O pool
+    f = await run_io(open, temp_path, "wb")
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            await run_io(f.write, chunk)
+    finally:
+        await run_io(f.close)
     
     try:
         from bhiv_core import process_script_upload
-        result = process_script_upload(str(temp_path), current_user.id)
+        result = await run_cpu(process_script_upload, str(temp_path), current_user.id)
         
-        with sqlite3.connect(DBPATH) as conn:
-            c = conn.cursor()
-            c.execute("INSERT INTO videos (id, title, storyboard_path, video_path) VALUES (?,?,?,?)",
-                      (result["id"], "Generated Video", result["storyboard"], result["video"]))
-            conn.commit()
+        await run_db(_insert_video, result["id"], result["storyboard"], result["video"])
+        UPLOADS.inc()
         
         return {"id": result["id"], "message": "Uploaded and processed via BHIV"}
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"BHIV processing error: {e}")
     finally:
-        if temp_path.exists():
-            temp_path.unlink()
+        await run_io(_remove_file, temp_path)
+
+# Browsers only send these hints once the server has asked for them
+RENDITION_HINTS = "Save-Data, Downlink"
 
 @app.get("/stream/{vid}")
-def stream_video(vid: str):
-    """Stream video with bucket support"""
-    bucket_path = Path("bucket/videos") / f"{vid}.mp4"
-    data_path = VIDEOS / f"{vid}.mp4"
+async def stream_video(vid: str, request: Request, rendition: str = ""):
+    """Stream video with bucket support
+
+    ``?rendition=360p|480p|720p`` picks a rendition explicitly; otherwise the
+    Save-Data / Downlink client hints may select a smaller one. Renditions
+    other than the default are encoded on first request.
+    """
+    try:
+        chosen = select_rendition(rendition, request.headers.get("save-data"), request.headers.get("downlink"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {"Accept-CH": RENDITION_HINTS, "Vary": RENDITION_HINTS, "X-Rendition": chosen.name}
+    
+    if chosen.name != DEFAULT_RENDITION:
+        # Encoded renditions are found on the I/O pool; only misses wait for an encode slot
+        path = await run_io(encoded_rendition, vid, chosen.name) or \
+            await run_encode(ensure_rendition, vid, chosen.name)
+        size = await run_io(_file_size, path)
+        if size is not None:
+            record_bucket_io("read", "videos", size)
+            return FileResponse(path, media_type="video/mp4", filename=path.name, headers=headers)
+        headers["X-Rendition"] = DEFAULT_RENDITION  # could not encode it; serve what exists
     
-    if bucket_path.exists():
-        return FileResponse(bucket_path, media_type="video/mp4", filename=bucket_path.name)
-    elif data_path.exists():
-        return FileResponse(data_path, media_type="video/mp4", filename=data_path.name)
-    else:
+    stored = await run_io(_stored_video, vid)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Video not found")
+    path, size = stored
+    if size is not None:
+        record_bucket_io("read", "videos", size)
+    return FileResponse(path, media_type="video/mp4", filename=path.name, headers=headers)
+
+@app.get("/stream/{vid}/renditions")
+async def get_renditions(vid: str):
+    """Rendition ladder for a video and which entries are already encoded"""
+    return {"video_id": vid, "default": DEFAULT_RENDITION, "renditions": await run_io(list_renditions, vid)}
+
+@app.get("/stream/{vid}/hls/master.m3u8")
+async def hls_master_playlist(vid: str):
+    """HLS master playlist: one variant per rendition, packaged on first request"""
+    if not await run_io(storyboard_path(vid).exists):
+        raise HTTPException(status_code=404, detail="Video not found")
+    return PlainTextResponse(master_playlist(), media_type=PLAYLIST_MEDIA_TYPE,
+                             headers={"Cache-Control": PLAYLIST_CACHE_CONTROL})
+
+@app.get("/stream/{vid}/hls/{rendition}/index.m3u8")
+async def hls_media_playlist(vid: str, rendition: str):
+    """HLS media playlist for one rendition"""
+    try:
+        playlist = await run_encode(ensure_package, vid, rendition)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if playlist is None:
         raise HTTPException(status_code=404, detail="Video not found")
+    return FileResponse(playlist, media_type=PLAYLIST_MEDIA_TYPE, headers={"Cache-Control": PLAYLIST_CACHE_CONTROL})
+
+@app.get("/stream/{vid}/hls/{rendition}/{segment}")
+async def hls_segment(vid: str, rendition: str, segment: str):
+    """HLS segment; names are content-addressed, so they are cached as immutable"""
+    try:
+        found = await run_io(_segment_file, vid, rendition, segment)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if found is None:
+        raise HTTPException(status_code=404, detail="Segment not found")
+    path, size = found
+    record_bucket_io("read", "hls", size)
+    return FileResponse(path, media_type=SEGMENT_MEDIA_TYPE, headers={"Cache-Control": SEGMENT_CACHE_CONTROL})
 
 @app.post("/rate/{vid}")
 async def rate_video(
@@ -158,19 +316,12 @@ async def rate_video(
     if rating < 1 or rating > 5:
         raise HTTPException(status_code=400, detail="rating must be 1..5")
     
-    with sqlite3.connect(DBPATH) as conn:
-        c = conn.cursor()
-        c.execute("INSERT INTO ratings (video_id, rating, comment) VALUES (?,?,?)", (vid, rating, comment))
-    
-    # Sanitize comment input
     comment = SecurityValidator.sanitize_input(comment)
-    
-    try:
-        from bhiv_core import notify_on_rate
-        improvement = notify_on_rate(vid, rating, comment)
-        return {"message": "Thanks for rating", "improvement_triggered": bool(improvement)}
-    except Exception as e:
-        return {"message": "Thanks for rating", "improvement_error": str(e)}
+    # Analysis and adaptation run in the rating consumers (bhiv_core.start_rating_consumers);
+    # the rating statistics are updated by triggers in the insert's own transaction
+    offset = await run_db(_insert_rating, vid, rating, comment)
+    RATINGS.inc()
+    return {"message": "Thanks for rating", "event_offset": offset}
 
 @app.get("/bhiv/status")
 def bhiv_status(current_user: User = Depends(require_user)):
@@ -208,14 +359,21 @@ def get_metrics(current_user: User = Depends(get_current_active_user)):
         "total_ratings": rating_count,
         "average_rating": round(avg_rating, 2),
         "bucket_files": bucket_files,
+        "auth_pool": get_auth_manager().password_hasher.stats(),
+        "login_throttle": get_auth_manager().login_throttle.stats(),
         "system_status": "operational"
     }
 
+@app.get("/metrics/prometheus")
+def prometheus_metrics():
+    """Request, DB and bucket metrics in Prometheus text format (in-memory only, no scans)"""
+    return PlainTextResponse(get_registry().render(), media_type=CONTENT_TYPE)
+
 @app.get("/admin/users")
 async def list_users(current_user: User = Depends(require_admin)):
     """List all users (admin only)"""
     users = []
-    for username, user_data in auth_manager.users_db.items():
+    for user_data in await run_db(get_auth_manager().list_users):
         users.append({
             "id": user_data["id"],
             "username": user_data["username"],
@@ -236,7 +394,7 @@ async def get_video_analytics(
     try:
         from analytics.feedback_analyzer import get_feedback_analyzer
         analyzer = get_feedback_analyzer()
-        analytics = analyzer.analyze_video_performance(vid)
+        analytics = await run_db(analyzer.analyze_video_performance, vid)
         
         return {
             "video_id": analytics.video_id,
@@ -258,9 +416,99 @@ async def get_platform_analytics(
     try:
         from analytics.feedback_analyzer import get_feedback_analyzer
         analyzer = get_feedback_analyzer()
-        return analyzer.get_platform_analytics(days)
+        return await run_db(analyzer.get_platform_analytics, days)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Analytics error: {e}")
+
+@app.get("/analytics/top")
+async def get_top_videos(
+    window: str = "all",
+    k: int = 5,
+    current_user: User = Depends(require_user)
+):
+    """Top-k videos by engagement over a day/week/month/all window (served from an index)"""
+    from analytics.engagement import WINDOWS, get_engagement_index
+    if window not in WINDOWS:
+        raise HTTPException(status_code=400, detail=f"window must be one of {sorted(WINDOWS)}")
+    if k < 1 or k > 100:
+        raise HTTPException(status_code=400, detail="k must be 1..100")
+    try:
+        top = await run_db(get_engagement_index(DBPATH).top, k, window)
+        return {"window": window, "k": k, "videos": top}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Analytics error: {e}")
+
+@app.get("/analytics/rlhf/{vid}")
+async def get_rlhf_rewards(vid: str, current_user: User = Depends(require_user)):
+    """Reward, confidence and learning trajectory of one video (stored by the catalog RLHF pass)"""
+    from analytics.rlhf_batch import compute_video_rewards, get_rlhf_rewards as stored_rewards
+    rewards = await run_db(stored_rewards, DBPATH, vid) or await run_db(compute_video_rewards, DBPATH, vid)
+    if rewards is None:
+        raise HTTPException(status_code=404, detail="No ratings for this video")
+    return rewards
+
+@app.post("/analytics/rlhf/run")
+async def run_rlhf(current_user: User = Depends(require_admin)):
+    """Recompute RLHF signals for every video"""
+    from analytics.rlhf_batch import run_rlhf_pass
+    try:
+        return await run_db(run_rlhf_pass, DBPATH)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"RLHF pass error: {e}")
+
+@app.get("/analytics/policy")
+async def get_policy_versions(current_user: User = Depends(require_admin)):
+    """Recent storyboard policy versions"""
+    from video.policy_store import get_policy_store
+    return {"versions": await run_db(get_policy_store(DBPATH).versions)}
+
+@app.post("/analytics/policy/update")
+async def update_policy(current_user: User = Depends(require_admin)):
+    """Apply every video's RLHF policy updates as one new policy version"""
+    from analytics.feedback_analyzer import get_feedback_analyzer
+    try:
+        return await run_db(get_feedback_analyzer().update_policy)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Policy update error: {e}")
+
+@app.post("/analytics/policy/rollback/{version}")
+async def rollback_policy(version: int, current_user: User = Depends(require_admin)):
+    """Restore the policy weights of an earlier version"""
+    from video.policy_store import get_policy_store
+    try:
+        return {"version": await run_db(get_policy_store(DBPATH).rollback, version)}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/leaderboard")
+async def get_leaderboard_page(
+    ranking: str = "bayesian",
+    page_size: int = 20,
+    min_ratings: int = 1,
+    after_score: float = None,
+    after_id: str = None,
+    current_user: User = Depends(require_user)
+):
+    """Confidence-adjusted video ranking; pass the returned cursor back as after_score/after_id"""
+    from analytics.leaderboard import RANKINGS, get_leaderboard
+    if ranking not in RANKINGS:
+        raise HTTPException(status_code=400, detail=f"ranking must be one of {list(RANKINGS)}")
+    if page_size < 1 or page_size > 100:
+        raise HTTPException(status_code=400, detail="page_size must be 1..100")
+    if (after_score is None) != (after_id is None):
+        raise HTTPException(status_code=400, detail="after_score and after_id must be given together")
+    cursor = (after_score, after_id) if after_id is not None else None
+    try:
+        entries, next_cursor = await run_db(get_leaderboard(DBPATH).page, ranking, cursor, page_size, min_ratings)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analytics error: {e}")
+    return {
+        "ranking": ranking,
+        "videos": entries,
+        "next": {"after_score": next_cursor[0], "after_id": next_cursor[1]} if next_cursor else None,
+    }
 
 @app.get("/")
 async def serve_frontend():
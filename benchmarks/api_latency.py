@@ -0,0 +1,98 @@
+# benchmarks/api_latency.py - p50/p99 latency of the API under many concurrent clients
+"""
+Drives the FastAPI app in-process (httpx + ASGI transport) with N concurrent
+authenticated clients that mix cheap requests (/health) with handlers that
+do blocking work (/rate, /analytics/video). Reports p50/p99 per route.
+
+--inline runs the blocking work on the event loop thread instead of the
+bounded pools, which reproduces the old behaviour for comparison.
+
+Usage:
+  python -m benchmarks.api_latency --clients 500 --requests 4
+  python -m benchmarks.api_latency --clients 500 --requests 4 --inline
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from benchmarks.common import InlineExecutor, isolated_workdir, summarize
+
+
+async def client_session(client, token: str, client_id: int, requests: int, latencies) -> None:
+    rng = random.Random(client_id)
+    headers = {"Authorization": f"Bearer {token}"}
+    for _ in range(requests):
+        route = rng.choice(("health", "health", "rate", "analytics"))
+        vid = f"bench{rng.randrange(50)}"
+        started = time.perf_counter()
+        if route == "health":
+            response = await client.get("/health")
+        elif route == "rate":
+            response = await client.post(f"/rate/{vid}", data={"rating": rng.randint(1, 5), "comment": "bench"},
+                                         headers=headers)
+        else:
+            response = await client.get(f"/analytics/video/{vid}", headers=headers)
+        latencies[route].append(time.perf_counter() - started)
+        if response.status_code >= 500:
+            latencies["errors"].append(0.0)
+
+
+async def run(clients: int, requests: int, inline: bool) -> dict:
+    import httpx
+    from backend import concurrency
+    from backend.server import app
+
+    if inline:
+        concurrency.db_executor = concurrency.io_executor = concurrency.cpu_executor = InlineExecutor()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        login = await client.post("/auth/login", json={"username": "admin", "password": "admin123"})
+        token = login.json()["access_token"]
+
+        latencies = defaultdict(list)
+        started = time.perf_counter()
+        await asyncio.gather(*(client_session(client, token, i, requests, latencies) for i in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    errors = len(latencies.pop("errors", []))
+    everything = [value for values in latencies.values() for value in values]
+    return {
+        "mode": "inline" if inline else "offloaded",
+        "clients": clients,
+        "requests": len(everything),
+        "errors": errors,
+        "throughput_rps": round(len(everything) / elapsed, 1),
+        "overall": summarize(everything),
+        "routes": {route: summarize(values) for route, values in sorted(latencies.items())},
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=4, help="requests per client")
+    parser.add_argument("--inline", action="store_true", help="run blocking work on the event loop (baseline)")
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    args = parser.parse_args(argv)
+
+    with isolated_workdir():
+        result = asyncio.run(run(args.clients, args.requests, args.inline))
+
+    print(f"{result['mode']}: {result['requests']} requests from {result['clients']} clients, "
+          f"{result['throughput_rps']} req/s, {result['errors']} errors")
+    for route, stats in [("overall", result["overall"]), *result["routes"].items()]:
+        print(f"  {route:>10}: p50 {stats['p50_ms']:>9} ms   p99 {stats['p99_ms']:>9} ms")
+
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
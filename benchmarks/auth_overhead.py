@@ -0,0 +1,91 @@
+# benchmarks/auth_overhead.py - Per-request cost of the authentication dependency chain
+"""
+Times what one authenticated request pays before the handler runs:
+
+  legacy     jwt.decode + a fresh pydantic User on every request (old behaviour)
+  cold       current chain with an empty token cache (decode + precomputed User)
+  cached     current chain with the token already verified
+  stateless  claims-only role check (require_roles(..., stateless=True))
+
+Usage:
+  python -m benchmarks.auth_overhead --iterations 20000
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.common import REPO_ROOT  # noqa: F401  (puts the repo on sys.path)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    args = parser.parse_args(argv)
+
+    import jwt
+    from fastapi.security import HTTPAuthorizationCredentials
+    from security import auth
+
+    manager = auth.get_auth_manager()
+    token = manager.create_access_token({"sub": "admin", "user_id": "admin", "roles": ["admin"]})
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    role_checker = auth.require_user
+    admin_record = manager.store.get_user_by_username("admin")
+    claims_checker = auth.require_user_claims
+
+    def legacy():
+        payload = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+        auth.TokenData(username=payload["sub"], user_id=payload["user_id"], roles=payload["roles"])
+        user_dict = admin_record  # the old store was an in-memory dict
+        user = auth.User(**{k: v for k, v in user_dict.items() if k != "password_hash"})
+        if not any(role in user.roles for role in ["user", "admin"]):
+            raise RuntimeError
+
+    async def chain():
+        user = await auth.get_current_user(credentials)
+        user = await auth.get_current_active_user(user)
+        await role_checker(user)
+
+    async def stateless():
+        await claims_checker(await auth.get_token_data(credentials))
+
+    def time_sync(fn, setup=None):
+        started = time.perf_counter()
+        for _ in range(args.iterations):
+            if setup:
+                setup()
+            fn()
+        return (time.perf_counter() - started) / args.iterations
+
+    async def time_async(fn, setup=None):
+        started = time.perf_counter()
+        for _ in range(args.iterations):
+            if setup:
+                setup()
+            await fn()
+        return (time.perf_counter() - started) / args.iterations
+
+    results = {
+        "legacy": time_sync(legacy),
+        "cold": asyncio.run(time_async(chain, setup=manager.token_cache.clear)),
+        "cached": asyncio.run(time_async(chain)),
+        "stateless": asyncio.run(time_async(stateless)),
+    }
+    results_us = {name: round(seconds * 1e6, 2) for name, seconds in results.items()}
+
+    for name, micros in results_us.items():
+        speedup = results_us["legacy"] / micros if micros else float("inf")
+        print(f"{name:>10}: {micros:>8} µs/request  ({speedup:.1f}x vs legacy)")
+    print(f"token cache: {manager.token_cache.stats()}")
+
+    if args.json:
+        args.json.write_text(json.dumps({"iterations": args.iterations, "us_per_request": results_us}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+# benchmarks/common.py - Shared helpers for the benchmark scripts
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import Executor, Future
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile (pct in 0..100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies_s: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max in milliseconds"""
+    return {
+        "count": len(latencies_s),
+        "p50_ms": round(percentile(latencies_s, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies_s, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies_s, 99) * 1000, 3),
+        "max_ms": round(max(latencies_s) * 1000, 3) if latencies_s else 0.0,
+    }
+
+
+@contextlib.contextmanager
+def isolated_workdir() -> Iterator[Path]:
+    """chdir into a scratch copy of the runtime layout so benchmarks never touch real data"""
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bhiv-bench-") as temp_dir:
+        shutil.copytree(REPO_ROOT / "frontend", Path(temp_dir) / "frontend")
+        os.chdir(temp_dir)
+        try:
+            yield Path(temp_dir)
+        finally:
+            os.chdir(previous)
+
+
+class InlineExecutor(Executor):
+    """Runs submitted work immediately on the calling thread (the pre-offload baseline)"""
+
+    def submit(self, fn, *args, **kwargs):
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as exc:
+            future.set_exception(exc)
+        return future
@@ -0,0 +1,295 @@
+# benchmarks/load_test.py - Scenario-based, open-loop load test for the API
+"""
+Open-loop load generator: requests arrive as a Poisson process at --rate per
+second for --duration seconds, whether or not earlier requests have finished,
+so a slow server shows up as growing latency instead of quietly lowering the
+offered load. Every request is sent by one of --users authenticated clients.
+
+Scenarios (operation weights):
+  upload-heavy   uploads with some streaming and rating
+  stream-heavy   mostly /stream
+  rating-storm   mostly /rate
+  dashboard      analytics and metrics reads
+  mixed          a bit of everything
+
+By default the app runs in-process (httpx ASGI transport, scratch working
+directory); --base-url targets a running server instead.
+
+Usage:
+  python -m benchmarks.load_test --scenario mixed --rate 50 --duration 20 --json results/mixed.json
+  python -m benchmarks.load_test --scenario mixed --rate 50 --duration 20 --compare results/mixed.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.common import REPO_ROOT, isolated_workdir, summarize
+
+SCENARIOS: Dict[str, Dict[str, int]] = {
+    "upload-heavy": {"upload": 60, "stream": 20, "rate": 20},
+    "stream-heavy": {"stream": 80, "rate": 10, "health": 10},
+    "rating-storm": {"rate": 90, "stream": 10},
+    "dashboard": {"analytics_video": 40, "analytics_platform": 30, "metrics": 30},
+    "mixed": {"upload": 10, "stream": 35, "rate": 25, "analytics_video": 15, "metrics": 10, "health": 5},
+}
+
+ADMIN = {"username": "admin", "password": "admin123"}
+USER_PASSWORD = "LoadTest#2024"
+SCRIPT = (REPO_ROOT / "sample" / "lesson.txt").read_bytes()
+
+
+class LoadTest:
+    def __init__(self, client, scenario: str, rate: float, duration: float, users: int,
+                 seed_videos: int, max_in_flight: int, seed: int = 0):
+        self.client = client
+        self.weights = SCENARIOS[scenario]
+        self.scenario = scenario
+        self.rate = rate
+        self.duration = duration
+        self.users = users
+        self.seed_videos = seed_videos
+        self.max_in_flight = max_in_flight
+        self.rng = random.Random(seed)
+        self.tokens: List[str] = []
+        self.video_ids: List[str] = []
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.dropped = 0
+        self.in_flight = 0
+
+    # -- setup ----------------------------------------------------------
+
+    async def setup(self) -> None:
+        response = await self.client.post("/auth/login", json=ADMIN)
+        response.raise_for_status()
+        admin_token = response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {admin_token}"}
+
+        run_id = f"{int(time.time())}{self.rng.randrange(1000)}"
+        for i in range(self.users):
+            username = f"load{run_id}_{i}"
+            response = await self.client.post("/auth/register", headers=headers, json={
+                "username": username, "email": f"{username}@load.test",
+                "password": USER_PASSWORD, "roles": ["user"],
+            })
+            response.raise_for_status()
+            response = await self.client.post("/auth/login", json={"username": username, "password": USER_PASSWORD})
+            response.raise_for_status()
+            self.tokens.append(response.json()["access_token"])
+
+        for _ in range(self.seed_videos):
+            response = await self._upload(self.tokens[0])
+            if response.status_code == 200:
+                self.video_ids.append(response.json()["id"])
+        if not self.video_ids:
+            raise RuntimeError("seeding failed: no video could be uploaded")
+
+    # -- operations -----------------------------------------------------
+
+    async def _upload(self, token: str):
+        return await self.client.post("/upload", headers={"Authorization": f"Bearer {token}"},
+                                      files={"file": ("lesson.txt", SCRIPT, "text/plain")})
+
+    async def _execute(self, operation: str, token: str):
+        headers = {"Authorization": f"Bearer {token}"}
+        vid = self.rng.choice(self.video_ids)
+        if operation == "upload":
+            response = await self._upload(token)
+            if response.status_code == 200:
+                self.video_ids.append(response.json()["id"])
+            return response
+        if operation == "stream":
+            return await self.client.get(f"/stream/{vid}")
+        if operation == "rate":
+            return await self.client.post(f"/rate/{vid}", headers=headers,
+                                          data={"rating": self.rng.randint(1, 5), "comment": "load test"})
+        if operation == "analytics_video":
+            return await self.client.get(f"/analytics/video/{vid}", headers=headers)
+        if operation == "analytics_platform":
+            return await self.client.get("/analytics/platform", headers=headers)
+        if operation == "metrics":
+            return await self.client.get("/metrics", headers=headers)
+        return await self.client.get("/health")
+
+    async def _request(self, operation: str, token: str) -> None:
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            response = await self._execute(operation, token)
+            status = str(response.status_code)
+        except Exception as e:
+            status = type(e).__name__
+        finally:
+            self.in_flight -= 1
+        self.latencies[operation].append(time.perf_counter() - started)
+        self.statuses[operation][status] += 1
+
+    # -- run ------------------------------------------------------------
+
+    async def run(self) -> Dict:
+        operations, weights = zip(*self.weights.items())
+        tasks = []
+        started = time.perf_counter()
+        next_arrival = started
+        sent = 0
+        while True:
+            next_arrival += self.rng.expovariate(self.rate)
+            if next_arrival - started >= self.duration:
+                break
+            await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+            if self.in_flight >= self.max_in_flight:
+                self.dropped += 1  # client-side safety valve, reported as an error
+                continue
+            operation = self.rng.choices(operations, weights)[0]
+            token = self.tokens[sent % len(self.tokens)]
+            tasks.append(asyncio.create_task(self._request(operation, token)))
+            sent += 1
+        offered_elapsed = time.perf_counter() - started
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+        return self.report(sent, offered_elapsed, elapsed)
+
+    def report(self, sent: int, offered_elapsed: float, elapsed: float) -> Dict:
+        operations = {}
+        total_errors = self.dropped
+        for operation, values in sorted(self.latencies.items()):
+            statuses = self.statuses[operation]
+            errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+            total_errors += errors
+            operations[operation] = {
+                **summarize(values),
+                "errors": errors,
+                "error_rate": round(errors / len(values), 4),
+                "statuses": dict(statuses),
+            }
+        completed = sum(len(values) for values in self.latencies.values())
+        everything = [value for values in self.latencies.values() for value in values]
+        return {
+            "scenario": self.scenario,
+            "target_rate": self.rate,
+            "offered_rate": round(sent / offered_elapsed, 2) if offered_elapsed else 0.0,
+            "duration_s": round(elapsed, 3),
+            "users": self.users,
+            "requests": completed,
+            "dropped": self.dropped,
+            "throughput_rps": round(completed / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round(total_errors / max(1, completed + self.dropped), 4),
+            "overall": summarize(everything),
+            "operations": operations,
+        }
+
+
+# -- comparison ---------------------------------------------------------
+
+def compare(current: Dict, baseline: Dict, max_regression: float) -> List[str]:
+    """Human-readable regressions of ``current`` against ``baseline`` (empty if none)"""
+    regressions = []
+
+    def check(label: str, now: float, before: float, higher_is_worse: bool = True) -> None:
+        if not before:
+            return
+        change = (now - before) / before
+        worse = change if higher_is_worse else -change
+        marker = "REGRESSION" if worse > max_regression else "ok"
+        print(f"  {label:<32} {before:>10} -> {now:>10}  ({change:+.1%})  {marker}")
+        if worse > max_regression:
+            regressions.append(f"{label}: {before} -> {now} ({change:+.1%})")
+
+    print(f"Comparison against {baseline.get('commit', 'baseline')} (threshold {max_regression:.0%}):")
+    check("throughput_rps", current["throughput_rps"], baseline["throughput_rps"], higher_is_worse=False)
+    check("overall p99_ms", current["overall"]["p99_ms"], baseline["overall"]["p99_ms"])
+    for operation, stats in current["operations"].items():
+        before = baseline.get("operations", {}).get(operation)
+        if before:
+            check(f"{operation} p95_ms", stats["p95_ms"], before["p95_ms"])
+            check(f"{operation} p99_ms", stats["p99_ms"], before["p99_ms"])
+    if current["error_rate"] > baseline.get("error_rate", 0.0) + 0.01:
+        regressions.append(f"error_rate: {baseline.get('error_rate', 0.0)} -> {current['error_rate']}")
+    return regressions
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# -- entry point --------------------------------------------------------
+
+async def execute(args) -> Dict:
+    import httpx
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout)
+    else:
+        from backend.server import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://load",
+                                   timeout=args.timeout)
+
+    async with client:
+        test = LoadTest(client, args.scenario, args.rate, args.duration, args.users,
+                        args.seed_videos, args.max_in_flight, args.seed)
+        await test.setup()
+        return await test.run()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    parser.add_argument("--rate", type=float, default=50.0, help="mean arrivals per second (Poisson)")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of offered load")
+    parser.add_argument("--users", type=int, default=10, help="authenticated client accounts")
+    parser.add_argument("--seed-videos", type=int, default=5, help="videos uploaded before the run")
+    parser.add_argument("--max-in-flight", type=int, default=2000, help="client-side cap; arrivals beyond it are dropped")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--base-url", help="target a running server instead of the in-process app")
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    parser.add_argument("--compare", type=Path, help="baseline results to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.10, help="allowed relative slowdown")
+    parser.add_argument("--max-error-rate", type=float, default=None, help="fail if the error rate exceeds this")
+    args = parser.parse_args(argv)
+
+    workdir = contextlib.nullcontext() if args.base_url else isolated_workdir()
+    with workdir:
+        result = asyncio.run(execute(args))
+    result.update({
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "target": args.base_url or "in-process",
+    })
+
+    print(f"{result['scenario']}: {result['requests']} requests in {result['duration_s']} s, "
+          f"{result['throughput_rps']} req/s (offered {result['offered_rate']}/s), "
+          f"error rate {result['error_rate']:.2%}, dropped {result['dropped']}")
+    for operation, stats in [("overall", result["overall"]), *result["operations"].items()]:
+        print(f"  {operation:>18}: n={stats['count']:<6} p50 {stats['p50_ms']:>9} ms   "
+              f"p95 {stats['p95_ms']:>9} ms   p99 {stats['p99_ms']:>9} ms")
+
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        args.json.write_text(json.dumps(result, indent=2))
+
+    failed = False
+    if args.compare:
+        regressions = compare(result, json.loads(args.compare.read_text()), args.max_regression)
+        failed = bool(regressions)
+    if args.max_error_rate is not None and result["error_rate"] > args.max_error_rate:
+        print(f"Error rate {result['error_rate']:.2%} exceeds {args.max_error_rate:.2%}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+# benchmarks/login_throughput.py - /auth/login throughput and /health latency during a login burst
+"""
+Drives the FastAPI app in-process with a burst of concurrent logins while a
+probe keeps calling /health, and reports login throughput plus the /health
+latency that other users see during the burst. Optional attacker clients
+(each with its own source IP) send wrong passwords to exercise the throttle.
+
+--inline runs bcrypt on the event loop thread (the old behaviour).
+
+Usage:
+  python -m benchmarks.login_throughput --clients 32 --logins 4
+  python -m benchmarks.login_throughput --clients 32 --logins 4 --inline
+  python -m benchmarks.login_throughput --attackers 8 --attempts 20
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from benchmarks.common import InlineExecutor, isolated_workdir, summarize
+
+CREDENTIALS = {"username": "admin", "password": "admin123"}
+
+
+async def login_client(client, logins: int, latencies, statuses) -> None:
+    for _ in range(logins):
+        started = time.perf_counter()
+        response = await client.post("/auth/login", json=CREDENTIALS)
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status_code] += 1
+
+
+async def attacker(app, ip: str, attempts: int, statuses) -> None:
+    import httpx
+    transport = httpx.ASGITransport(app=app, client=(ip, 40000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(attempts):
+            response = await client.post("/auth/login", json={"username": f"user{i % 3}", "password": "wrong"})
+            statuses[response.status_code] += 1
+
+
+async def health_probe(client, stop: asyncio.Event, latencies, interval: float) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/health")
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+
+
+async def run(clients: int, logins: int, attackers: int, attempts: int, inline: bool) -> dict:
+    import httpx
+    from backend.server import app
+    from security.auth import get_auth_manager
+
+    auth_manager = get_auth_manager()
+    hasher = auth_manager.password_hasher
+    if inline:
+        hasher.executor = InlineExecutor()
+
+    login_latencies, health_latencies = [], []
+    login_statuses, attack_statuses = Counter(), Counter()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop = asyncio.Event()
+        probe = asyncio.create_task(health_probe(client, stop, health_latencies, 0.005))
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(login_client(client, logins, login_latencies, login_statuses) for _ in range(clients)),
+            *(attacker(app, f"10.0.0.{i + 1}", attempts, attack_statuses) for i in range(attackers)),
+        )
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await probe
+
+    return {
+        "mode": "inline" if inline else "pool",
+        "logins": len(login_latencies),
+        "elapsed_s": round(elapsed, 3),
+        "login_rps": round(len(login_latencies) / elapsed, 2),
+        "login": summarize(login_latencies),
+        "login_statuses": dict(login_statuses),
+        "health": summarize(health_latencies),
+        "attack_statuses": dict(attack_statuses),
+        "pool": hasher.stats(),
+        "throttle": auth_manager.login_throttle.stats(),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--logins", type=int, default=4, help="logins per client")
+    parser.add_argument("--attackers", type=int, default=0, help="clients sending wrong passwords")
+    parser.add_argument("--attempts", type=int, default=20, help="attempts per attacker")
+    parser.add_argument("--inline", action="store_true", help="run bcrypt on the event loop (baseline)")
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    args = parser.parse_args(argv)
+
+    with isolated_workdir():
+        result = asyncio.run(run(args.clients, args.logins, args.attackers, args.attempts, args.inline))
+
+    print(f"{result['mode']}: {result['logins']} logins in {result['elapsed_s']} s "
+          f"({result['login_rps']} logins/s), statuses {result['login_statuses']}")
+    for name in ("login", "health"):
+        stats = result[name]
+        print(f"  {name:>6}: p50 {stats['p50_ms']:>9} ms   p99 {stats['p99_ms']:>9} ms   max {stats['max_ms']:>9} ms")
+    if result["attack_statuses"]:
+        print(f"  attackers: {result['attack_statuses']}  throttle {result['throttle']}")
+    print(f"  bcrypt pool: {result['pool']}")
+
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
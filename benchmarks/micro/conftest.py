@@ -0,0 +1,42 @@
+# benchmarks/micro/conftest.py - Shared fixtures for the pytest-benchmark suite
+"""
+Run with ``make bench`` (or ``pytest benchmarks/micro --benchmark-autosave``).
+Scales come from ``BHIV_BENCH_SCALES`` (comma separated, default
+``small,medium``); add ``large`` for the slow, representative numbers.
+"""
+import os
+
+import pytest
+
+from benchmarks.synthetic import SCALES, VIDEO_ID, make_ratings_db, write_feedback_logs
+
+BENCH_SCALES = [name.strip() for name in os.getenv("BHIV_BENCH_SCALES", "small,medium").split(",") if name.strip()]
+
+
+@pytest.fixture(params=BENCH_SCALES)
+def scale(request):
+    """(scale name, sizes) for each configured scale"""
+    return request.param, SCALES[request.param]
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Scratch working directory so relative data/ and bucket/ paths never touch real data"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def ratings_db(workdir, scale):
+    """data/meta.db with ``ratings`` rows for VIDEO_ID (plus a few other videos)"""
+    _, sizes = scale
+    return make_ratings_db(workdir / "data" / "meta.db", [VIDEO_ID, "other-1", "other-2"], sizes["ratings"])
+
+
+@pytest.fixture
+def feedback_bucket(workdir, scale):
+    """bucket/ with a feedback log of the scale's size for VIDEO_ID"""
+    _, sizes = scale
+    bucket = workdir / "bucket"
+    write_feedback_logs(bucket / "logs", VIDEO_ID, sizes["feedback"])
+    return bucket
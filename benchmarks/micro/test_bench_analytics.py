@@ -0,0 +1,58 @@
+# benchmarks/micro/test_bench_analytics.py - FeedbackAnalyzer and the text engine over synthetic feedback
+import random
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from analytics.feedback_analyzer import FeedbackAnalyzer, FeedbackTrend, VideoAnalytics
+from analytics.text_engine import TextEngine
+from benchmarks.synthetic import VIDEO_ID, make_feedback_logs
+
+
+@pytest.mark.benchmark(group="analyze_video_performance")
+def test_analyze_video_performance(benchmark, ratings_db, feedback_bucket, scale):
+    _, sizes = scale
+    analyzer = FeedbackAnalyzer(db_path=str(ratings_db), bucket_path=str(feedback_bucket))
+
+    analytics = benchmark(analyzer.analyze_video_performance, VIDEO_ID)
+
+    assert analytics.total_views == sizes["ratings"]
+    assert analytics.sentiment_trends
+
+
+@pytest.mark.benchmark(group="text_engine.analyze_batch")
+def test_text_engine_analyze_batch(benchmark, scale):
+    _, sizes = scale
+    comments = [log["comment"] + f" #{i}" for i, log in enumerate(make_feedback_logs(sizes["feedback"]))]
+
+    # A fresh engine per round: every comment is a cache miss
+    results = benchmark(lambda: TextEngine().analyze_batch(comments))
+
+    assert len(results) == len(comments)
+
+
+def _platform_analytics(records: int, trends_per_video: int = 30, per_trend: int = 100) -> list:
+    """VideoAnalytics carrying ``records`` feedback items in total, split into daily trends"""
+    rng = random.Random(records)
+    videos = []
+    for v in range(max(1, records // (trends_per_video * per_trend))):
+        trends = []
+        for _ in range(trends_per_video):
+            positive = rng.randint(0, per_trend)
+            negative = rng.randint(0, per_trend - positive)
+            shares = {"positive": positive / per_trend, "negative": negative / per_trend,
+                      "neutral": (per_trend - positive - negative) / per_trend}
+            trends.append(FeedbackTrend("2024-01-01", 3.0, per_trend, shares, [], 0.6))
+        videos.append(VideoAnalytics(f"v{v}", 0, 3.0, {}, trends, 0.0, []))
+    return videos
+
+
+@pytest.mark.benchmark(group="analyze_platform_sentiment")
+@pytest.mark.parametrize("records", [1_000_000, 5_000_000])
+def test_analyze_platform_sentiment(benchmark, records):
+    video_analytics = _platform_analytics(records)
+
+    summary = benchmark(FeedbackAnalyzer()._analyze_platform_sentiment, video_analytics)
+
+    assert abs(sum(summary.values()) - 1.0) < 0.01
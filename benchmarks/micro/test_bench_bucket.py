@@ -0,0 +1,72 @@
+# benchmarks/micro/test_bench_bucket.py - bhiv_bucket save/read paths
+import itertools
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import bhiv_bucket
+from benchmarks.synthetic import make_storyboard, write_script
+from bhiv_cache import get_storyboard_cache
+
+
+@pytest.fixture
+def bucket(workdir, monkeypatch):
+    root = workdir / "bucket"
+    monkeypatch.setattr(bhiv_bucket, "BUCKET_ROOT", root)
+    get_storyboard_cache().clear()
+    yield root
+    get_storyboard_cache().clear()
+
+
+@pytest.mark.benchmark(group="bucket.save_script")
+def test_save_script(benchmark, workdir, bucket, scale):
+    _, sizes = scale
+    script = write_script(workdir, sizes["lines"])
+
+    saved = benchmark(bhiv_bucket.save_script, str(script))
+
+    assert saved.endswith(script.name)
+
+
+@pytest.mark.benchmark(group="bucket.save_storyboard")
+def test_save_storyboard(benchmark, bucket, scale):
+    _, sizes = scale
+    storyboard = make_storyboard(sizes["scenes"])
+    names = (f"sb_{i}.json" for i in itertools.count())
+
+    benchmark(lambda: bhiv_bucket.save_storyboard(storyboard, next(names)))
+
+
+@pytest.mark.benchmark(group="bucket.read_storyboard.cold")
+def test_read_storyboard_cold(benchmark, bucket, scale):
+    _, sizes = scale
+    path = bhiv_bucket.save_storyboard(make_storyboard(sizes["scenes"]), "cold.json")
+    cache = get_storyboard_cache()
+
+    result = benchmark.pedantic(bhiv_bucket.read_storyboard, args=(path,),
+                                setup=lambda: cache.invalidate(path), rounds=50)
+
+    assert len(result["scenes"]) == sizes["scenes"]
+
+
+@pytest.mark.benchmark(group="bucket.read_storyboard.warm")
+def test_read_storyboard_warm(benchmark, bucket, scale):
+    _, sizes = scale
+    path = bhiv_bucket.save_storyboard(make_storyboard(sizes["scenes"]), "warm.json")
+    bhiv_bucket.read_storyboard(path)
+
+    result = benchmark(bhiv_bucket.read_storyboard, path)
+
+    assert len(result["scenes"]) == sizes["scenes"]
+
+
+@pytest.mark.benchmark(group="bucket.read_storyboard_shared.warm")
+def test_read_storyboard_shared_warm(benchmark, bucket, scale):
+    _, sizes = scale
+    path = bhiv_bucket.save_storyboard(make_storyboard(sizes["scenes"]), "shared.json")
+    bhiv_bucket.read_storyboard_shared(path)
+
+    result = benchmark(bhiv_bucket.read_storyboard_shared, path)
+
+    assert len(result["scenes"]) == sizes["scenes"]
@@ -0,0 +1,19 @@
+# benchmarks/micro/test_bench_security.py - Input sanitization on user-sized and hostile text
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+pytest.importorskip("fastapi")
+pytest.importorskip("jwt")
+
+from benchmarks.synthetic import make_user_input
+from security.auth import SecurityValidator
+
+
+@pytest.mark.benchmark(group="sanitize_input")
+def test_sanitize_input(benchmark, scale):
+    _, sizes = scale
+    text = make_user_input(sizes["chars"])
+
+    sanitized = benchmark(SecurityValidator.sanitize_input, text)
+
+    assert "<script" not in sanitized
@@ -0,0 +1,62 @@
+# benchmarks/micro/test_bench_video.py - Storyboard generation and feedback adaptation
+import json
+import sqlite3
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from benchmarks.synthetic import VIDEO_ID, make_storyboard, write_script
+from video import feedback_adapter
+from video.storyboard import generate_storyboard_from_file
+
+
+@pytest.mark.benchmark(group="generate_storyboard_from_file")
+def test_generate_storyboard(benchmark, workdir, scale):
+    _, sizes = scale
+    script = write_script(workdir, sizes["lines"])
+
+    storyboard = benchmark(generate_storyboard_from_file, str(script))
+
+    assert storyboard["scenes"]
+
+
+@pytest.mark.benchmark(group="generate_storyboard_from_file+write")
+def test_generate_storyboard_with_output(benchmark, workdir, scale):
+    _, sizes = scale
+    script = write_script(workdir, sizes["lines"])
+
+    benchmark(generate_storyboard_from_file, str(script), str(workdir / "storyboard.json"))
+
+    assert (workdir / "storyboard.json").exists()
+
+
+@pytest.mark.benchmark(group="adapt_storyboard")
+def test_adapt_storyboard(benchmark, workdir, ratings_db, scale, monkeypatch):
+    _, sizes = scale
+    monkeypatch.setattr(feedback_adapter, "DBPATH", ratings_db)
+    storyboard = make_storyboard(sizes["scenes"])
+
+    adapted = benchmark(feedback_adapter.adapt_storyboard, storyboard, VIDEO_ID)
+
+    assert len(adapted["scenes"]) == sizes["scenes"]
+
+
+@pytest.mark.benchmark(group="adapt_catalog")
+def test_adapt_catalog(benchmark, workdir, ratings_db, scale):
+    """Full catalog run: every video's storyboard counts as crossed, since the weights are reset each round"""
+    _, sizes = scale
+    storyboard = workdir / "storyboard.json"
+    storyboard.write_text(json.dumps(make_storyboard(sizes["scenes"])))
+    with sqlite3.connect(ratings_db) as conn:
+        conn.execute("UPDATE videos SET storyboard_path = ?", (str(storyboard),))
+        conn.execute("UPDATE ratings SET rating = CASE WHEN video_id = ? THEN 5 ELSE 1 END", (VIDEO_ID,))
+
+    def run():
+        with sqlite3.connect(ratings_db) as conn:
+            conn.execute("DROP TABLE IF EXISTS video_weights")
+        return feedback_adapter.adapt_catalog(ratings_db)
+
+    result = benchmark(run)
+
+    assert result["adapted"] == ["other-1", "other-2"]
@@ -0,0 +1,139 @@
+# benchmarks/streamlit_sessions.py - Queries per page view for N concurrent Streamlit sessions
+"""
+Simulates the gallery page of the Streamlit apps being rendered by many
+concurrent sessions against one shared DataService, and reports how many
+SQLite statements each page view costs.
+
+Modes:
+  uncached     every view hits SQLite (ttl=0)
+  flush-all    shared cache, but every rating clears everything
+               (what st.cache_data.clear() used to do)
+  keyed        shared cache with per-video/per-user invalidation
+
+Usage:
+  python -m benchmarks.streamlit_sessions --sessions 50 --views 20 --rate-every 10
+"""
+import argparse
+import json
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data_service import DataService
+from gallery import ensure_gallery_schema
+
+MODES = ("uncached", "flush-all", "keyed")
+
+
+def seed_database(db_path: Path, videos: int, ratings: int, users: int) -> None:
+    """Create the app.py schema and fill it with synthetic rows"""
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE videos (id TEXT PRIMARY KEY, title TEXT, script_content TEXT, created_at TEXT)")
+        conn.execute('''CREATE TABLE user_ratings
+                        (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, video_id TEXT,
+                         rating INTEGER, comment TEXT)''')
+        ensure_gallery_schema(conn)
+        conn.executemany(
+            "INSERT INTO videos VALUES (?,?,?,?)",
+            [(f"v{i:06d}", f"Video {i}", "Lesson line\n" * 5, (start + timedelta(minutes=i)).isoformat())
+             for i in range(videos)],
+        )
+        conn.executemany(
+            "INSERT INTO user_ratings (user_id, video_id, rating, comment) VALUES (?,?,?,?)",
+            [(f"u{rng.randrange(users)}", f"v{rng.randrange(videos):06d}", rng.randint(1, 5), "ok")
+             for _ in range(ratings)],
+        )
+        conn.commit()
+
+
+def run_session(service: DataService, mode: str, session_id: int, views: int, rate_every: int, pages: int) -> int:
+    rng = random.Random(session_id)
+    user_id = f"u{session_id}"
+    rendered = 0
+    for view in range(views):
+        cursor = None
+        for _ in range(rng.randrange(pages)):
+            _, cursor = service.get_video_page(cursor, ("title", "script_content"))
+            if cursor is None:
+                break
+        service.get_metrics()
+        videos, _ = service.get_video_page(cursor, ("title", "script_content"))
+        service.get_page_ratings([v["id"] for v in videos], user_id)
+        rendered += 1
+
+        if rate_every and view % rate_every == rate_every - 1 and videos:
+            video_id = rng.choice(videos)["id"]
+            service.add_rating(video_id, rng.randint(1, 5), "bench", user_id=user_id)
+            if mode == "flush-all":
+                service.clear()
+    return rendered
+
+
+def run_mode(db_path: Path, mode: str, sessions: int, views: int, rate_every: int, pages: int) -> dict:
+    service = DataService(db_path, ttl=0 if mode == "uncached" else 300)
+    counts = []
+    threads = [
+        threading.Thread(
+            target=lambda i=i: counts.append(run_session(service, mode, i, views, rate_every, pages))
+        )
+        for i in range(sessions)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    page_views = sum(counts)
+    stats = service.stats()
+    return {
+        "mode": mode,
+        "sessions": sessions,
+        "page_views": page_views,
+        "queries": stats["queries"],
+        "queries_per_page_view": round(stats["queries"] / max(page_views, 1), 3),
+        "hit_rate": stats["hit_rate"],
+        "elapsed_s": round(elapsed, 3),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--views", type=int, default=20, help="page views per session")
+    parser.add_argument("--rate-every", type=int, default=10, help="submit a rating every N views (0 = never)")
+    parser.add_argument("--pages", type=int, default=3, help="sessions browse up to this many pages deep")
+    parser.add_argument("--videos", type=int, default=2000)
+    parser.add_argument("--ratings", type=int, default=20000)
+    parser.add_argument("--mode", choices=MODES, action="append")
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    for mode in args.mode or MODES:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = Path(temp_dir) / "meta.db"
+            seed_database(db_path, args.videos, args.ratings, users=args.sessions)
+            result = run_mode(db_path, mode, args.sessions, args.views, args.rate_every, args.pages)
+        results.append(result)
+        print(f"{mode:>10}: {result['queries_per_page_view']:>7} queries/page view "
+              f"({result['queries']} queries, {result['page_views']} views, "
+              f"hit rate {result['hit_rate']:.1%}, {result['elapsed_s']}s)")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
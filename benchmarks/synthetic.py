@@ -0,0 +1,121 @@
+# benchmarks/synthetic.py - Deterministic synthetic data for the micro-benchmarks
+"""
+Generators for lesson scripts, storyboards, ratings and feedback logs at a
+few fixed scales. Everything is seeded, so two runs (or two commits) time
+exactly the same inputs and stored results stay comparable.
+"""
+import json
+import random
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+# name -> (script lines, storyboard scenes, ratings per video, feedback log entries, sanitize chars)
+SCALES: Dict[str, Dict[str, int]] = {
+    "small": {"lines": 20, "scenes": 5, "ratings": 50, "feedback": 50, "chars": 1_000},
+    "medium": {"lines": 500, "scenes": 50, "ratings": 2_000, "feedback": 2_000, "chars": 50_000},
+    "large": {"lines": 10_000, "scenes": 500, "ratings": 50_000, "feedback": 20_000, "chars": 1_000_000},
+}
+
+WORDS = ("lesson", "example", "concept", "explain", "practice", "topic", "student", "review", "chapter",
+         "summary", "clear", "slow", "fast", "unclear", "boring", "great", "confusing", "helpful")
+COMMENTS = ("Clear and helpful", "Too slow in the middle", "Pacing felt fast", "Unclear explanation",
+            "A bit boring", "Great examples", "Confusing second half", "")
+SENTIMENTS = ("positive", "neutral", "negative")
+VIDEO_ID = "bench-video"
+UNSAFE_FRAGMENTS = ("<script>alert(1)</script>", "javascript:void(0)", "<img onerror=x>", "<BODY ONLOAD=x>")
+
+
+def _sentence(rng: random.Random, words: int = 10) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def make_script(lines: int, seed: int = 0) -> str:
+    """Lesson script with ``lines`` non-empty lines separated by the odd blank line"""
+    rng = random.Random(seed)
+    out: List[str] = []
+    for _ in range(lines):
+        out.append(_sentence(rng, rng.randint(6, 16)))
+        if rng.random() < 0.2:
+            out.append("")
+    return "\n".join(out)
+
+
+def write_script(directory: Path, lines: int, seed: int = 0) -> Path:
+    path = Path(directory) / f"script_{lines}.txt"
+    path.write_text(make_script(lines, seed), encoding="utf-8")
+    return path
+
+
+def make_storyboard(scenes: int, seed: int = 0) -> Dict:
+    """Storyboard in the shape produced by ``video.storyboard``"""
+    rng = random.Random(seed)
+    return {
+        "title": "Synthetic Video",
+        "scenes": [
+            {
+                "scene_id": i + 1,
+                "text": _sentence(rng),
+                "duration_secs": rng.randint(2, 8),
+                "bg_color": "#FFFFFF",
+                "visual_hint": f"Scene {i + 1}",
+            }
+            for i in range(scenes)
+        ],
+    }
+
+
+def make_ratings_db(db_path: Path, video_ids: List[str], ratings_per_video: int, seed: int = 0) -> Path:
+    """``meta.db`` with the server's ``videos``/``ratings`` schema filled with random ratings"""
+    rng = random.Random(seed)
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute('''CREATE TABLE IF NOT EXISTS videos
+                        (id TEXT PRIMARY KEY, title TEXT, storyboard_path TEXT, video_path TEXT)''')
+        conn.execute('''CREATE TABLE IF NOT EXISTS ratings
+                        (id INTEGER PRIMARY KEY AUTOINCREMENT, video_id TEXT, rating INTEGER, comment TEXT)''')
+        conn.executemany("INSERT OR IGNORE INTO videos (id, title) VALUES (?, ?)",
+                         [(vid, f"Video {vid}") for vid in video_ids])
+        conn.executemany("INSERT INTO ratings (video_id, rating, comment) VALUES (?, ?, ?)",
+                         [(vid, rng.randint(1, 5), rng.choice(COMMENTS))
+                          for vid in video_ids for _ in range(ratings_per_video)])
+    return db_path
+
+
+def make_feedback_logs(entries: int, video_id: str = VIDEO_ID, days: int = 30, seed: int = 0) -> List[Dict]:
+    """Feedback log entries spread over ``days`` days, as read by ``FeedbackAnalyzer``"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    logs = []
+    for _ in range(entries):
+        rating = rng.randint(1, 5)
+        logs.append({
+            "video_id": video_id,
+            "rating": rating,
+            "comment": rng.choice(COMMENTS),
+            "timestamp": (start + timedelta(seconds=rng.randrange(days * 86400))).isoformat(),
+            "sentiment": {"sentiment": SENTIMENTS[0] if rating >= 4 else SENTIMENTS[2] if rating <= 2 else SENTIMENTS[1]},
+        })
+    return logs
+
+
+def write_feedback_logs(logs_dir: Path, video_id: str, entries: int, seed: int = 0) -> Path:
+    logs_dir = Path(logs_dir)
+    logs_dir.mkdir(parents=True, exist_ok=True)
+    path = logs_dir / f"feedback_{video_id}.json"
+    path.write_text(json.dumps(make_feedback_logs(entries, video_id, seed=seed)), encoding="utf-8")
+    return path
+
+
+def make_user_input(chars: int, seed: int = 0) -> str:
+    """Free text of roughly ``chars`` characters with script/handler fragments sprinkled in"""
+    rng = random.Random(seed)
+    parts: List[str] = []
+    size = 0
+    while size < chars:
+        part = rng.choice(UNSAFE_FRAGMENTS) if rng.random() < 0.05 else _sentence(rng)
+        parts.append(part)
+        size += len(part) + 1
+    return " ".join(parts)[:chars]
@@ -4,6 +4,9 @@ import shutil
 import os
 import json
 from typing import Optional
+from bhiv_cache import get_storyboard_cache, thaw
+from bhiv_metrics import record_bucket_io
+from bhiv_tracing import traced
 
 BUCKET_ROOT = Path(os.getenv("BHIV_BUCKET_PATH", "bucket"))
 
@@ -11,25 +14,40 @@ def init_bucket():
     for p in ["scripts","storyboards","videos","logs","ratings","tmp"]:
         (BUCKET_ROOT / p).mkdir(parents=True, exist_ok=True)
 
+@traced("bucket.save_script")
 def save_script(local_path: str, dest_name: Optional[str]=None) -> str:
     init_bucket()
     dest_name = dest_name or Path(local_path).name
     dest = BUCKET_ROOT / "scripts" / dest_name
     shutil.copy(local_path, dest)
+    record_bucket_io("write", "scripts", dest.stat().st_size)
     return str(dest)
 
+@traced("bucket.save_storyboard")
 def save_storyboard(storyboard_dict, filename: str) -> str:
     init_bucket()
     out = BUCKET_ROOT / "storyboards" / filename
-    out.write_text(json.dumps(storyboard_dict, ensure_ascii=False, indent=2), encoding="utf-8")
+    payload = json.dumps(storyboard_dict, ensure_ascii=False, indent=2).encode("utf-8")
+    out.write_bytes(payload)
+    record_bucket_io("write", "storyboards", len(payload))
+    get_storyboard_cache().invalidate(out)
     return str(out)
 
+@traced("bucket.save_video")
 def save_video(local_video_path: str, filename: Optional[str]=None) -> str:
     init_bucket()
     filename = filename or Path(local_video_path).name
     dest = BUCKET_ROOT / "videos" / filename
     shutil.copy(local_video_path, dest)
+    record_bucket_io("write", "videos", dest.stat().st_size)
     return str(dest)
 
+@traced("bucket.read_storyboard")
 def read_storyboard(path: str):
-    return json.loads(Path(path).read_text(encoding="utf-8"))
\ No newline at end of file
+    """Read a storyboard through the shared cache; returns a private mutable copy"""
+    return thaw(get_storyboard_cache().get(path))
+
+@traced("bucket.read_storyboard_shared")
+def read_storyboard_shared(path: str):
+    """The cached storyboard itself, without a copy: read-only and shared (see bhiv_cache.thaw)"""
+    return get_storyboard_cache().get(path)
\ No newline at end of file
@@ -0,0 +1,151 @@
+# bhiv_cache.py - Process-wide read-through storyboard cache
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, Optional, Tuple
+
+from bhiv_metrics import CallbackGauge, get_registry, record_bucket_io
+
+DEFAULT_MAX_BYTES = int(os.getenv("BHIV_STORYBOARD_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+
+def freeze(value: Any) -> Any:
+    """Return a read-only view of decoded JSON (dicts -> mappingproxy, lists -> tuple)"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def parsed_size(value: Any) -> int:
+    """Approximate memory held by decoded JSON (containers plus their keys and values)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(parsed_size(k) + parsed_size(v) for k, v in value.items())
+    elif isinstance(value, list):
+        size += sum(parsed_size(v) for v in value)
+    return size
+
+
+def thaw(value: Any) -> Any:
+    """Return a private mutable deep copy of a frozen storyboard"""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(v) for v in value]
+    return value
+
+
+class StoryboardCache:
+    """LRU cache of parsed storyboards keyed by path and validated by mtime + size.
+
+    Entries are stored frozen so that one caller cannot corrupt what another
+    caller reads; use ``thaw`` when a mutable copy is needed. ``max_bytes``
+    caps the parsed size of the entries (see ``parsed_size``), which is
+    several times the size of the JSON files.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        # path -> (mtime_ns, file size, parsed size, frozen storyboard)
+        self._entries: "OrderedDict[str, Tuple[int, int, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, path) -> Any:
+        """Return the frozen storyboard at ``path``, parsing it only if it changed"""
+        key = os.path.abspath(path)
+        try:
+            st = os.stat(key)
+        except FileNotFoundError:
+            self.invalidate(key)
+            raise
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[3]
+            self.misses += 1
+
+        decoded = json.loads(Path(key).read_text(encoding="utf-8"))
+        record_bucket_io("read", "storyboards", st.st_size)
+        data = freeze(decoded)
+        self._store(key, st.st_mtime_ns, st.st_size, parsed_size(decoded), data)
+        return data
+
+    def _store(self, key: str, mtime_ns: int, file_size: int, cost: int, data: Any) -> None:
+        if cost > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (mtime_ns, file_size, cost, data)
+            self._bytes += cost
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, _, evicted_cost, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_cost
+                self.evictions += 1
+
+    def invalidate(self, path) -> None:
+        """Drop a single entry (e.g. after the file was rewritten)"""
+        key = os.path.abspath(path)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit-rate and occupancy metrics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_storyboard_cache: Optional[StoryboardCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_storyboard_cache() -> StoryboardCache:
+    """Get the process-wide storyboard cache"""
+    global _storyboard_cache
+    if _storyboard_cache is None:
+        with _cache_lock:
+            if _storyboard_cache is None:
+                _storyboard_cache = StoryboardCache()
+    return _storyboard_cache
+
+
+def _cache_readings() -> Dict[Tuple[str, ...], float]:
+    stats = get_storyboard_cache().stats()
+    return {(name,): stats[name] for name in ("entries", "bytes", "hits", "misses", "evictions")}
+
+
+get_registry().register(CallbackGauge(
+    "bhiv_storyboard_cache", "Storyboard cache size and hit/miss counts", _cache_readings, ("stat",)))
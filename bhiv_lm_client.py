@@ -1,18 +1,60 @@
 import json
 from pathlib import Path
+from analytics.text_engine import get_text_engine
+from bhiv_tracing import traced
+
+# theme -> suggestion when a low/middling rating mentions it
+THEME_SUGGESTIONS = {
+    "pacing": "Improve pacing",
+    "clarity": "Clarify the explanations",
+    "engagement": "Make the content more engaging",
+    "examples": "Add more examples",
+    "quality": "Improve video quality",
+    "audio": "Improve audio quality",
+    "length": "Adjust the video length",
+}
 
 class BHIVLMClient:
     def __init__(self):
         self.logs_dir = Path("bucket/logs")
         self.logs_dir.mkdir(parents=True, exist_ok=True)
     
+    @traced("lm.analyze_feedback")
     async def analyze_feedback(self, video_id, rating, comment):
-        """Simple feedback analysis"""
-        return {
-            "sentiment": "positive" if rating >= 4 else "negative" if rating <= 2 else "neutral",
-            "suggestions": ["Improve pacing", "Add more examples"] if rating < 4 else ["Great work!"]
-        }
+        """Feedback analysis from the rating and the comment text"""
+        return self.analyze_feedback_batch([(rating, comment)])[0]
+
+    def analyze_feedback_batch(self, feedback):
+        """Analyze many ``(rating, comment)`` pairs with one text-engine batch"""
+        feedback = list(feedback)
+        texts = get_text_engine().analyze_batch([comment for _, comment in feedback])
+        results = []
+        for (rating, comment), text in zip(feedback, texts):
+            # The rating dominates; the comment can pull a borderline rating either way
+            score = 0.6 * (rating - 3) / 2 + 0.4 * text.polarity
+            results.append({
+                "sentiment": "positive" if score > 0.2 else "negative" if score < -0.2 else "neutral",
+                "polarity": text.polarity,
+                "themes": sorted(text.themes),
+                "suggestions": self._suggestions_for(rating, text.themes),
+            })
+        return results
+
+    def _extract_themes(self, comment):
+        """Themes (pacing, clarity, quality, ...) mentioned in a comment"""
+        return sorted(get_text_engine().analyze(comment).themes)
+
+    def _generate_suggestions(self, rating, comment):
+        return self._suggestions_for(rating, get_text_engine().analyze(comment).themes)
+
+    @staticmethod
+    def _suggestions_for(rating, themes):
+        if rating >= 4:
+            return ["Great work!"]
+        suggestions = [THEME_SUGGESTIONS[theme] for theme in sorted(themes) if theme in THEME_SUGGESTIONS]
+        return suggestions or ["Improve pacing", "Add more examples"]
     
+    @traced("lm.log_feedback")
     def log_feedback(self, video_id, rating, comment, analysis):
         """Log feedback analysis"""
         log_file = self.logs_dir / f"feedback_{video_id}.json"
@@ -0,0 +1,303 @@
+# bhiv_metrics.py - In-process request/DB/bucket metrics with Prometheus text exposition
+"""
+Metrics are plain in-memory counters updated on the hot path (a dict lookup
+and a locked add), so scraping never touches the database or the bucket.
+
+    REQUESTS.labels("GET", "/health", "200").inc()
+    DB_QUERY_SECONDS.labels("_insert_rating").observe(0.002)
+    get_registry().render()   # Prometheus text format 0.0.4
+"""
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def labels(self, *values: str):
+        """Child for one label combination (created on first use)"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return lines
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = float(value)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+
+class _HistogramValue:
+    __slots__ = ("upper_bounds", "counts", "sum", "_lock")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.upper_bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("_target", "_started")
+
+    def __init__(self, target):
+        self._target = target
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._target.observe(time.perf_counter() - self._started)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.upper_bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.upper_bounds)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.upper_bounds + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, values)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, values)} {cumulative}"
+
+
+class CallbackGauge(_Metric):
+    """Gauge read from ``callback`` at scrape time; the callback must be cheap and in-memory"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], Dict[Tuple[str, ...], float]],
+                 labelnames: Sequence[str] = ()):
+        self.callback = callback
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return None
+
+    def samples(self):
+        try:
+            readings = self.callback()
+        except Exception:
+            return
+        for values, value in readings.items():
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def unregister(self, name: str) -> None:
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+_registry = Registry()
+
+
+def get_registry() -> Registry:
+    return _registry
+
+
+# Platform metrics
+REQUESTS = _registry.register(Counter(
+    "bhiv_http_requests_total", "HTTP requests by method, route template and status", ("method", "route", "status")))
+REQUEST_SECONDS = _registry.register(Histogram(
+    "bhiv_http_request_duration_seconds", "HTTP request latency", ("method", "route")))
+IN_FLIGHT = _registry.register(Gauge(
+    "bhiv_http_requests_in_flight", "HTTP requests currently being served", ("method",)))
+DB_QUERY_SECONDS = _registry.register(Histogram(
+    "bhiv_db_query_duration_seconds", "Time spent in database operations", ("operation",), buckets=DB_BUCKETS))
+BUCKET_BYTES = _registry.register(Counter(
+    "bhiv_bucket_io_bytes_total", "Bytes read from / written to the bucket", ("direction", "kind")))
+UPLOADS = _registry.register(Counter("bhiv_uploads_total", "Scripts uploaded and processed"))
+RATINGS = _registry.register(Counter("bhiv_ratings_total", "Ratings submitted"))
+
+
+def record_bucket_io(direction: str, kind: str, nbytes: int) -> None:
+    BUCKET_BYTES.labels(direction, kind).inc(nbytes)
+
+
+_route_paths: Dict[object, str] = {}
+
+
+def route_template(scope) -> str:
+    """Route template (``/rate/{vid}``) of a request that has been routed, else ``unmatched``"""
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    path = _route_paths.get(endpoint)
+    if path is None:
+        router = getattr(scope.get("app"), "router", None)
+        for candidate in getattr(router, "routes", ()):
+            if getattr(candidate, "endpoint", getattr(candidate, "app", None)) == endpoint:
+                path = candidate.path
+                break
+        path = _route_paths.setdefault(endpoint, path or "unmatched")
+    return path
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route counts, latency and in-flight requests.
+
+    Routes are labelled by their template (``/rate/{vid}``), not the raw path,
+    so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        # The route is only known once routing has run, so in-flight is tracked per method
+        in_flight = IN_FLIGHT.labels(method)
+        in_flight.inc()
+        status_code = ["500"]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = str(message["status"])
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight.dec()
+            route = route_template(scope)
+            REQUESTS.labels(method, route, status_code[0]).inc()
+            REQUEST_SECONDS.labels(method, route).observe(elapsed)
@@ -0,0 +1,250 @@
+# data_service.py - Shared, process-wide read cache for the Streamlit front-ends
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, Optional, Set, Tuple
+
+from gallery import fetch_page_ratings, fetch_video_page
+
+# Close to the 5s st.cache_data refresh this replaced: writes from other
+# processes (the FastAPI backend) are not invalidated here, only aged out
+DEFAULT_TTL = 5.0
+# Every cursor and user is its own key, so keep only the most recently used ones
+DEFAULT_MAX_ENTRIES = 1024
+
+
+class _Load:
+    """An in-flight (or queued) load of one key; exists only while someone waits on it"""
+    __slots__ = ("lock", "waiters", "tags", "stale")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.waiters = 0
+        self.tags: Set[str] = set()
+        self.stale = False
+
+
+class DataService:
+    """Read-through cache over the metadata DB with tag-based invalidation.
+
+    One instance is shared by every Streamlit session (``st.cache_resource``).
+    Entries carry tags such as ``"videos"``, ``"ratings"``, ``"video:<id>"`` and
+    ``"user:<id>"``; a write invalidates only the tags it touches, so rating one
+    video leaves the other pages and users warm. The TTL is a safety net for
+    writes made by other processes (e.g. the FastAPI backend). At most
+    ``max_entries`` are kept, least recently used first out, and expired
+    entries are dropped when they are next looked up.
+    """
+
+    def __init__(self, db_path, ratings_table: str = "user_ratings", ttl: float = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.db_path = Path(db_path)
+        self.ratings_table = ratings_table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, Set[str]]]" = OrderedDict()
+        self._tag_index: Dict[str, Set[Hashable]] = defaultdict(set)
+        self._loads: Dict[Hashable, _Load] = {}
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # -- plumbing -------------------------------------------------------
+
+    def connect(self) -> sqlite3.Connection:
+        """Open a connection whose statements are counted in ``self.queries``"""
+        conn = sqlite3.connect(self.db_path)
+        conn.set_trace_callback(self._count_query)
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """``connect()`` as a transaction that is committed (or rolled back) and closed"""
+        conn = self.connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count_query(self, _statement: str) -> None:
+        with self._lock:
+            self.queries += 1
+
+    def _drop(self, key: Hashable, except_tag: Optional[str] = None) -> None:
+        """Remove ``key`` and its tag index references (caller holds the lock)"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            if tag != except_tag:
+                keys = self._tag_index.get(tag)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._tag_index[tag]
+
+    def _lookup(self, key: Hashable):
+        """The live entry for ``key`` or None, dropping it if expired (caller holds the lock)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def cached(self, key: Hashable, tags: Iterable[str], loader: Callable[[], Any]) -> Any:
+        """Return the cached value for ``key`` or load it once for all waiting sessions"""
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry[1]
+            load = self._loads.get(key)
+            if load is None:
+                load = self._loads[key] = _Load()
+            load.waiters += 1
+
+        # Single-flight: concurrent sessions missing the same key wait for one load
+        try:
+            with load.lock:
+                with self._lock:
+                    entry = self._lookup(key)
+                    if entry is not None:
+                        return entry[1]
+                    self.misses += 1
+                    load.tags = set(tags)
+                    load.stale = False
+
+                value = loader()
+                if self.ttl > 0:
+                    with self._lock:
+                        # A write to one of our tags landed while we were loading; don't cache a stale read
+                        if load.stale:
+                            return value
+                        self._drop(key)
+                        self._entries[key] = (time.monotonic() + self.ttl, value, load.tags)
+                        for tag in load.tags:
+                            self._tag_index[tag].add(key)
+                        while len(self._entries) > self.max_entries:
+                            self._drop(next(iter(self._entries)))
+                            self.evictions += 1
+                return value
+        finally:
+            with self._lock:
+                load.waiters -= 1
+                if load.waiters == 0:
+                    del self._loads[key]
+
+    def invalidate(self, *tags: str) -> None:
+        """Drop every entry carrying any of ``tags``"""
+        with self._lock:
+            for load in self._loads.values():
+                if not load.stale and not load.tags.isdisjoint(tags):
+                    load.stale = True
+            for tag in tags:
+                for key in self._tag_index.pop(tag, ()):
+                    self._drop(key, except_tag=tag)
+
+    def invalidate_video(self, video_id: str) -> None:
+        """A video's ratings changed: refresh its summaries and the global aggregates"""
+        self.invalidate(f"video:{video_id}", "ratings")
+
+    def invalidate_videos(self) -> None:
+        """A video was added or removed: page boundaries and counts shift"""
+        self.invalidate("videos")
+
+    def invalidate_user(self, user_id: str) -> None:
+        self.invalidate(f"user:{user_id}")
+
+    def clear(self) -> None:
+        with self._lock:
+            for load in self._loads.values():
+                load.stale = True
+            self._entries.clear()
+            self._tag_index.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "queries": self.queries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    # -- reads ----------------------------------------------------------
+
+    def get_metrics(self) -> Tuple[int, int, float]:
+        """(video_count, rating_count, avg_rating)"""
+        def load():
+            with self.connection() as conn:
+                cur = conn.cursor()
+                cur.execute("SELECT COUNT(*) FROM videos")
+                video_count = cur.fetchone()[0]
+                cur.execute(f"SELECT COUNT(*), AVG(rating) FROM {self.ratings_table}")
+                rating_count, avg_rating = cur.fetchone()
+            return video_count, rating_count, avg_rating or 0
+        return self.cached(("metrics",), {"metrics", "videos", "ratings"}, load)
+
+    def get_video_page(self, cursor=None, columns: Tuple[str, ...] = ("title",)):
+        """Cached ``gallery.fetch_video_page``"""
+        def load():
+            with self.connection() as conn:
+                return fetch_video_page(conn, columns, cursor)
+        return self.cached(("page", cursor, columns), {"videos"}, load)
+
+    def get_page_ratings(self, video_ids: Iterable[str], user_id: Optional[str] = None) -> Dict[str, Dict]:
+        """Ratings summary for a page; shared entries plus a per-user has-rated set"""
+        video_ids = tuple(video_ids)
+
+        def load():
+            with self.connection() as conn:
+                return fetch_page_ratings(conn, video_ids, ratings_table=self.ratings_table)
+        shared = self.cached(("ratings", video_ids), {f"video:{vid}" for vid in video_ids}, load)
+
+        rated = self.get_user_rated(user_id) if user_id is not None else frozenset()
+        return {
+            vid: {**summary, "has_rated": vid in rated}
+            for vid, summary in shared.items()
+        }
+
+    def get_user_rated(self, user_id: str) -> frozenset:
+        """Ids of every video ``user_id`` has rated"""
+        def load():
+            with self.connection() as conn:
+                rows = conn.execute(
+                    f"SELECT video_id FROM {self.ratings_table} WHERE user_id = ?", (user_id,)
+                ).fetchall()
+            return frozenset(row[0] for row in rows)
+        return self.cached(("user_rated", user_id), {f"user:{user_id}"}, load)
+
+    # -- writes ---------------------------------------------------------
+
+    def add_rating(self, video_id: str, rating: int, comment: str, user_id: Optional[str] = None) -> None:
+        """Insert a rating and invalidate only what it affects"""
+        with self.connection() as conn:
+            if user_id is None:
+                conn.execute(
+                    f"INSERT INTO {self.ratings_table} (video_id, rating, comment) VALUES (?,?,?)",
+                    (video_id, rating, comment),
+                )
+            else:
+                conn.execute(
+                    f"INSERT INTO {self.ratings_table} (user_id, video_id, rating, comment) VALUES (?,?,?,?)",
+                    (user_id, video_id, rating, comment),
+                )
+            conn.commit()
+        self.invalidate_video(video_id)
+        if user_id is not None:
+            self.invalidate_user(user_id)
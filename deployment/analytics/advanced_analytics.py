@@ -1,35 +1,190 @@
+# analytics/advanced_analytics.py - Dashboard analytics served from trigger-maintained aggregates
+"""
+Every dashboard refresh used to scan the ratings table. Instead it reads
+the trigger-maintained statistics of ``analytics.rating_stats``:
+
+    <ratings>_video_stats   per video: count, sum, sum of squares, positive/neutral/negative
+    <ratings>_daily_stats   per (day, video) the rating was written: count, sum
+
+so each query reads one row per video or per day and video, and results
+are cached in-process for ``ANALYTICS_CACHE_TTL`` seconds on top of that.
+Ratings written before the statistics existed have no day, so trends
+only cover ratings written since.
+"""
+import os
 import sqlite3
+import threading
+import time
 from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from analytics import rating_stats
+from analytics.text_engine import get_text_engine
+from bhiv_tracing import traced
+
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", "5"))
+TREND_DAYS = 30
+TREND_THRESHOLD = 0.01  # stars per day
+RECENT_COMMENTS = 500
+
+
+def linear_trend(points: List[tuple]) -> float:
+    """Least-squares slope of ``(x, y)`` points; 0 for fewer than two distinct x"""
+    n = len(points)
+    if n < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if var_x == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
 
-class Analytics:
-    def __init__(self):
-        self.db_path = Path("data/meta.db")
-    
-    def get_rating_trends(self):
-        """Get rating trends"""
+
+class AdvancedAnalytics:
+    def __init__(self, db_path="data/meta.db", ratings_table: str = "user_ratings",
+                 cache_ttl: float = ANALYTICS_CACHE_TTL):
+        self.db_path = Path(db_path)
+        self.ratings_table = ratings_table
+        self.video_stats = f"{ratings_table}_video_stats"
+        self.daily_stats = f"{ratings_table}_daily_stats"
+        self.cache_ttl = cache_ttl
+        self._cache: Dict[Any, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        return rating_stats.connect(self.db_path, self.ratings_table)
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        conn = self._connect()
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cur = conn.cursor()
-                cur.execute("SELECT AVG(rating) FROM user_ratings")
-                avg = cur.fetchone()[0] or 3.0
-                return {"trend": "stable", "improvement": 0.0}
-        except:
-            return {"trend": "stable", "improvement": 0.0}
-    
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def _cached(self, key: Any, loader: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        value = loader()
+        with self._lock:
+            self._cache[key] = (now + self.cache_ttl, value)
+        return value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    @traced("analytics.rating_trends")
+    def get_rating_trends(self, days: int = TREND_DAYS):
+        """Least-squares slope of the daily average rating over the last ``days`` days"""
+        def load():
+            try:
+                daily = self._query(
+                    f"SELECT julianday(day), SUM(count), SUM(sum) FROM {self.daily_stats} "
+                    f"WHERE day >= date('now', ?) GROUP BY day ORDER BY day", (rating_stats.window_start(days),))
+                total, rating_sum = self._query(
+                    f"SELECT COALESCE(SUM(count), 0), COALESCE(SUM(sum), 0) FROM {self.video_stats}")[0]
+            except sqlite3.Error:
+                return {"trend": "stable", "improvement": 0.0, "total_ratings": 0}
+
+            slope = linear_trend([(x, s / c) for x, c, s in daily])
+            span = daily[-1][0] - daily[0][0] if daily else 0
+            trend = "improving" if slope > TREND_THRESHOLD else "declining" if slope < -TREND_THRESHOLD else "stable"
+            return {
+                "trend": trend,
+                "improvement": round(slope * span, 3),  # fitted change across the window, in stars
+                "slope_per_day": round(slope, 4),
+                "average_rating": round(rating_sum / total, 2) if total else 0.0,
+                "total_ratings": total,
+                "days_with_ratings": len(daily),
+            }
+        return self._cached(("trends", days), load)
+
+    @traced("analytics.sentiment_analysis")
     def get_sentiment_analysis(self):
-        """Get sentiment analysis"""
-        return {
-            "total_analyzed": 0,
-            "sentiment_distribution": {"positive": 0, "neutral": 0, "negative": 0}
-        }
-    
+        """Rating-derived sentiment distribution plus themes of the most recent comments"""
+        def load():
+            try:
+                positive, neutral, negative = self._query(
+                    f"SELECT COALESCE(SUM(positive), 0), COALESCE(SUM(neutral), 0), COALESCE(SUM(negative), 0) "
+                    f"FROM {self.video_stats}")[0]
+                comments = [row[0] for row in self._query(
+                    f"SELECT comment FROM {self.ratings_table} WHERE comment IS NOT NULL AND comment != '' "
+                    f"ORDER BY id DESC LIMIT ?", (RECENT_COMMENTS,))]
+            except sqlite3.Error:
+                return {"total_analyzed": 0, "sentiment_distribution": {"positive": 0, "neutral": 0, "negative": 0},
+                        "top_themes": {}}
+
+            themes: Dict[str, int] = {}
+            for analysis in get_text_engine().analyze_batch(comments):
+                for theme in analysis.themes:
+                    themes[theme] = themes.get(theme, 0) + 1
+            return {
+                "total_analyzed": positive + neutral + negative,
+                "sentiment_distribution": {"positive": positive, "neutral": neutral, "negative": negative},
+                "top_themes": dict(sorted(themes.items(), key=lambda item: (-item[1], item[0]))[:10]),
+            }
+        return self._cached(("sentiment",), load)
+
+    @traced("analytics.video_performance")
+    def get_video_performance(self, video_id: str) -> Dict:
+        """Mean, count, spread and sentiment split of one video's ratings"""
+        def load():
+            try:
+                rows = self._query(
+                    f"SELECT count, sum, sum_sq, positive, neutral, negative FROM {self.video_stats} "
+                    f"WHERE video_id = ?", (video_id,))
+            except sqlite3.Error:
+                rows = []
+            count, total, total_sq, positive, neutral, negative = rows[0] if rows else (0, 0, 0, 0, 0, 0)
+            mean = total / count if count else 0.0
+            variance = max(0.0, total_sq / count - mean * mean) if count else 0.0
+            return {
+                "video_id": video_id,
+                "average_rating": round(mean, 2),
+                "total_ratings": count,
+                "rating_stddev": round(variance ** 0.5, 3),
+                "sentiment_distribution": {"positive": positive, "neutral": neutral, "negative": negative},
+            }
+        return self._cached(("video", video_id), load)
+
+    @traced("analytics.top_videos")
+    def get_top_videos(self, limit: int = 5, min_ratings: int = 1) -> List[Dict]:
+        """Highest Bayesian average first (see analytics.leaderboard), so one 5-star rating can't top the list"""
+        def load():
+            try:
+                rows = self._query(
+                    f'''SELECT s.video_id, COALESCE(v.title, s.video_id), s.sum * 1.0 / s.count, s.count
+                        FROM {self.video_stats} s LEFT JOIN videos v ON v.id = s.video_id
+                        WHERE s.count >= ? ORDER BY s.bayesian DESC, s.count DESC LIMIT ?''',
+                    (max(1, min_ratings), limit))
+            except sqlite3.Error:
+                return []
+            return [{"video_id": vid, "title": title, "avg_rating": round(avg, 2), "rating_count": count}
+                    for vid, title, avg, count in rows]
+        return self._cached(("top", limit, min_ratings), load)
+
+    @traced("analytics.platform_insights")
     def get_platform_insights(self):
         """Get platform insights"""
         return {
             "rating_trends": self.get_rating_trends(),
-            "sentiment_analysis": {"top_themes": {}},
-            "top_performing_videos": []
+            "sentiment_analysis": self.get_sentiment_analysis(),
+            "top_performing_videos": self.get_top_videos()
         }
 
-def get_analytics():
-    return Analytics()
\ No newline at end of file
+
+# Historical name
+Analytics = AdvancedAnalytics
+
+_analytics: Optional[AdvancedAnalytics] = None
+
+
+def get_analytics() -> AdvancedAnalytics:
+    """Shared instance, so the in-process cache survives between dashboard refreshes"""
+    global _analytics
+    if _analytics is None:
+        _analytics = AdvancedAnalytics()
+    return _analytics
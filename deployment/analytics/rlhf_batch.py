@@ -0,0 +1,277 @@
+# analytics/rlhf_batch.py - Catalog-wide RLHF rewards, confidences and learning trajectories
+"""
+``FeedbackAnalyzer.generate_rlhf_insights`` works one video at a time. This
+pass computes the same signals for every video at once, from the
+trigger-maintained rating statistics (see ``analytics.rating_stats``):
+
+    reward      0.6 * (avg - 3) / 2 + 0.4 * engagement      (_calculate_reward_signal)
+    confidence  min(n / 10, 1), scaled down for extreme averages while n < 5
+    trajectory  the reward over the cumulative ratings at the end of each day,
+                as parallel ``days`` / ``rewards`` lists (last TRAJECTORY_POINTS days)
+
+Rewards and confidences come from ``<ratings>_video_stats``; trajectories
+from ``<ratings>_daily_stats`` (one row per video and day), as segment
+cumulative sums over one sorted array. Ratings without a day (written
+before the statistics existed) are the starting point of each cumulative
+sum rather than a point of their own. With NumPy everything is array arithmetic; a
+plain Python loop computes the same values without it. Results replace
+the ``rlhf_rewards`` table in one transaction, and the per-video endpoint
+reads a single row.
+
+    python -m analytics.rlhf_batch          # one pass, e.g. from cron
+"""
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from analytics import rating_stats
+from bhiv_tracing import traced
+
+logger = logging.getLogger(__name__)
+
+TRAJECTORY_POINTS = int(os.getenv("BHIV_RLHF_TRAJECTORY_POINTS", "90"))
+RATING_WEIGHT = 0.6
+ENGAGEMENT_WEIGHT = 0.4
+
+COLUMNS = ("reward_signal", "confidence_score", "ratings", "average_rating", "engagement_score",
+           "initial_performance", "current_performance", "improvement_rate", "learning_stability")
+
+
+def ensure_rlhf_schema(conn: sqlite3.Connection) -> None:
+    conn.execute(f'''CREATE TABLE IF NOT EXISTS rlhf_rewards
+                     (video_id TEXT PRIMARY KEY, {", ".join(f"{c} REAL NOT NULL" for c in COLUMNS)},
+                      trajectory TEXT NOT NULL, computed_at REAL NOT NULL)''')
+
+
+def _engagement(avg, chars_per_rating):
+    if np is not None and isinstance(avg, np.ndarray):
+        return np.round(0.7 * avg / 5.0 + 0.3 * np.minimum(chars_per_rating / 100.0, 1.0), 3)
+    return round(0.7 * avg / 5.0 + 0.3 * min(chars_per_rating / 100.0, 1.0), 3)
+
+
+def _reward(avg, engagement):
+    value = RATING_WEIGHT * (avg - 3.0) / 2.0 + ENGAGEMENT_WEIGHT * engagement
+    return np.round(value, 3) if np is not None and isinstance(value, np.ndarray) else round(value, 3)
+
+
+def _confidence(n, avg):
+    if np is not None and isinstance(n, np.ndarray):
+        rating_confidence = np.where(n < 5, 1.0 - np.abs(avg - 3.0) / 2.0, 1.0)
+        return np.round(np.minimum(n / 10.0, 1.0) * rating_confidence, 3)
+    rating_confidence = 1.0 - abs(avg - 3.0) / 2.0 if n < 5 else 1.0
+    return round(min(n / 10.0, 1.0) * rating_confidence, 3)
+
+
+def _trajectory(days: List[str], rewards: List[float]) -> Dict[str, List]:
+    return {"days": days, "rewards": rewards}
+
+
+def compute_rewards(totals: Sequence[tuple], daily: Sequence[tuple]) -> Dict[str, Dict]:
+    """Signals per video from ``(video_id, n, rating_sum, comment_chars)`` totals and
+    ``(video_id, day, julian_day, n, rating_sum, comment_chars)`` daily rows sorted by video and day"""
+    if not totals:
+        return {}
+    if np is not None:
+        return _compute_numpy(totals, daily)
+    return _compute_python(totals, daily)
+
+
+def _compute_numpy(totals, daily) -> Dict[str, Dict]:
+    video_ids = [row[0] for row in totals]
+    n, rating_sum, chars = np.array([row[1:] for row in totals], dtype=float).T
+    avg = rating_sum / n
+    engagement = _engagement(avg, chars / n)
+    reward = _reward(avg, engagement)
+    confidence = _confidence(n, avg)
+
+    results = {vid: {"reward_signal": float(reward[i]), "confidence_score": float(confidence[i]),
+                     "ratings": int(n[i]), "average_rating": round(float(avg[i]), 3),
+                     "engagement_score": float(engagement[i]), "trajectory": _trajectory([], [])}
+               for i, vid in enumerate(video_ids)}
+    _fill_trajectories_numpy(results, daily, {row[0]: row[1:] for row in totals})
+    return results
+
+
+def _fill_trajectories_numpy(results: Dict[str, Dict], daily, totals: Dict[str, tuple]) -> None:
+    empty = {"initial_performance": 0.0, "current_performance": 0.0, "improvement_rate": 0.0,
+             "learning_stability": 0.0}
+    daily = [row for row in daily if row[0] in results]
+    if not daily:
+        for result in results.values():
+            result.update(empty)
+        return
+
+    group_ids = [row[0] for row in daily]
+    day, n, rating_sum, chars = np.array([row[2:] for row in daily], dtype=float).T
+    # Rows are sorted by video, so each video is one contiguous segment
+    starts = np.array([i for i in range(len(daily)) if i == 0 or group_ids[i] != group_ids[i - 1]])
+    lengths = np.diff(np.r_[starts, len(daily)])
+    group = np.repeat(np.arange(len(starts)), lengths)
+    # Undated ratings: the video's totals minus everything in its daily rows
+    totals = np.array([totals[group_ids[i]] for i in starts], dtype=float).T
+
+    def segment_cumsum(x, video_total):
+        total = np.cumsum(x)
+        undated = video_total - np.add.reduceat(x, starts)
+        return total - np.repeat(total[starts] - x[starts] - undated, lengths)
+
+    cum_n = segment_cumsum(n, totals[0])
+    cum_avg = segment_cumsum(rating_sum, totals[1]) / cum_n
+    reward = _reward(cum_avg, _engagement(cum_avg, segment_cumsum(chars, totals[2]) / cum_n))
+
+    # Least-squares slope of reward per day and its spread, per segment
+    x = day - np.repeat(day[starts], lengths)
+    count = lengths.astype(float)
+    sx, sy = np.bincount(group, x), np.bincount(group, reward)
+    sxx, sxy, syy = np.bincount(group, x * x), np.bincount(group, x * reward), np.bincount(group, reward * reward)
+    denom = count * sxx - sx * sx
+    slope = np.divide(count * sxy - sx * sy, denom, out=np.zeros_like(denom), where=denom > 0)
+    std = np.sqrt(np.maximum(syy / count - (sy / count) ** 2, 0.0))
+    stability = np.clip(1.0 - std, 0.0, 1.0)
+
+    ends = (starts + lengths).tolist()
+    labels, rewards = [row[1] for row in daily], reward.tolist()
+    for g, start in enumerate(starts.tolist()):
+        result = results[group_ids[start]]
+        first = max(start, ends[g] - TRAJECTORY_POINTS)
+        result["trajectory"] = _trajectory(labels[first:ends[g]], rewards[first:ends[g]])
+        result.update(initial_performance=rewards[start], current_performance=rewards[ends[g] - 1],
+                      improvement_rate=round(float(slope[g]), 4), learning_stability=round(float(stability[g]), 3))
+    for result in results.values():
+        if not result["trajectory"]["days"]:
+            result.update(empty)
+
+
+def _compute_python(totals, daily) -> Dict[str, Dict]:
+    results = {}
+    for vid, n, rating_sum, chars in totals:
+        avg = rating_sum / n
+        engagement = _engagement(avg, chars / n)
+        results[vid] = {"reward_signal": _reward(avg, engagement), "confidence_score": _confidence(n, avg),
+                        "ratings": n, "average_rating": round(avg, 3), "engagement_score": engagement,
+                        "trajectory": _trajectory([], []), "initial_performance": 0.0, "current_performance": 0.0,
+                        "improvement_rate": 0.0, "learning_stability": 0.0}
+
+    # Cumulative sums start from the undated ratings: the totals minus every daily row
+    cumulative = {vid: [float(n), float(rating_sum), float(chars)] for vid, n, rating_sum, chars in totals}
+    for vid, _, _, n, rating_sum, chars in daily:
+        if vid in cumulative:
+            acc = cumulative[vid]
+            acc[0] -= n
+            acc[1] -= rating_sum
+            acc[2] -= chars
+
+    series: Dict[str, List[tuple]] = {}
+    for vid, label, day, n, rating_sum, chars in daily:
+        if vid not in results:
+            continue
+        acc = cumulative[vid]
+        acc[0] += n
+        acc[1] += rating_sum
+        acc[2] += chars
+        avg = acc[1] / acc[0]
+        series.setdefault(vid, []).append((label, day, _reward(avg, _engagement(avg, acc[2] / acc[0]))))
+
+    for vid, points in series.items():
+        first_day = points[0][1]
+        xs = [day - first_day for _, day, _ in points]
+        ys = [reward for _, _, reward in points]
+        count = len(points)
+        sx, sy = sum(xs), sum(ys)
+        denom = count * sum(x * x for x in xs) - sx * sx
+        slope = (count * sum(x * y for x, y in zip(xs, ys)) - sx * sy) / denom if denom > 0 else 0.0
+        variance = max(sum(y * y for y in ys) / count - (sy / count) ** 2, 0.0)
+        results[vid].update(
+            trajectory=_trajectory([label for label, _, _ in points[-TRAJECTORY_POINTS:]], ys[-TRAJECTORY_POINTS:]),
+            initial_performance=ys[0], current_performance=ys[-1], improvement_rate=round(slope, 4),
+            learning_stability=round(min(1.0, max(0.0, 1.0 - variance ** 0.5)), 3))
+    return results
+
+
+def _load(conn: sqlite3.Connection, ratings_table: str = "ratings", video_ids: Optional[Sequence[str]] = None):
+    where, params = "", ()
+    if video_ids is not None:
+        params = tuple(video_ids)
+        where = f"WHERE video_id IN ({','.join('?' * len(params))})"
+    totals = conn.execute(f'''SELECT video_id, count, sum, comment_chars FROM {ratings_table}_video_stats
+                              {where} ORDER BY video_id''', params).fetchall()
+    daily = conn.execute(f'''SELECT video_id, day, julianday(day), count, sum, comment_chars
+                             FROM {ratings_table}_daily_stats {where} ORDER BY video_id, day''', params).fetchall()
+    return totals, daily
+
+
+def _connect(db_path, ratings_table: str) -> sqlite3.Connection:
+    conn = rating_stats.connect(db_path, ratings_table, timeout=30)
+    ensure_rlhf_schema(conn)
+    return conn
+
+
+@traced("analytics.rlhf_pass")
+def run_rlhf_pass(db_path="data/meta.db", ratings_table: str = "ratings") -> Dict:
+    """Recompute every video's signals and replace ``rlhf_rewards``; returns a summary"""
+    started = time.perf_counter()
+    conn = _connect(db_path, ratings_table)
+    try:
+        conn.execute("BEGIN")  # totals and daily rows from one read snapshot
+        totals, daily = _load(conn, ratings_table)
+        conn.execute("COMMIT")
+        results = compute_rewards(totals, daily)
+
+        now = time.time()
+        rows = [(vid, *(r[c] for c in COLUMNS), json.dumps(r["trajectory"]), now) for vid, r in results.items()]
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM rlhf_rewards")
+            conn.executemany(f"INSERT INTO rlhf_rewards VALUES ({','.join('?' * (len(COLUMNS) + 3))})", rows)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"RLHF pass over {len(results)} videos in {elapsed:.2f}s ({'numpy' if np is not None else 'python'})")
+    return {"videos": len(results), "seconds": round(elapsed, 3), "computed_at": now}
+
+
+def _row_to_dict(row: tuple) -> Dict:
+    result = dict(zip(("video_id",) + COLUMNS, row[:len(COLUMNS) + 1]))
+    result["ratings"] = int(result["ratings"])
+    result["trajectory"] = json.loads(row[len(COLUMNS) + 1])
+    result["computed_at"] = row[len(COLUMNS) + 2]
+    return result
+
+
+def get_rlhf_rewards(db_path="data/meta.db", video_id: str = "") -> Optional[Dict]:
+    """Stored signals of one video (primary-key lookup), or None before its first pass"""
+    with sqlite3.connect(db_path) as conn:
+        ensure_rlhf_schema(conn)
+        row = conn.execute("SELECT * FROM rlhf_rewards WHERE video_id = ?", (video_id,)).fetchone()
+    return _row_to_dict(row) if row else None
+
+
+def compute_video_rewards(db_path="data/meta.db", video_id: str = "", ratings_table: str = "ratings") -> Optional[Dict]:
+    """The same signals for one video, computed on demand"""
+    conn = _connect(db_path, ratings_table)
+    try:
+        totals, daily = _load(conn, ratings_table, [video_id])
+    finally:
+        conn.close()
+    result = compute_rewards(totals, daily).get(video_id)
+    if result is not None:
+        result["video_id"] = video_id
+    return result
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(run_rlhf_pass(), indent=2))
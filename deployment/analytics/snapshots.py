@@ -0,0 +1,463 @@
+# analytics/snapshots.py - Columnar (Arrow IPC) snapshots of ratings, videos and feedback for dashboards
+"""
+Dashboards aggregate over every rating and feedback entry; doing that against
+the OLTP SQLite database competes with uploads and ratings for its lock. The
+exporter periodically copies the analytics inputs into Arrow IPC files:
+
+    data/snapshots/
+      manifest.json                          high-water marks, row counts, live file list, export time
+      ratings/date=2024-05-01/part-*.arrow   append-only, partitioned by export (ingest) date
+      feedback/date=2024-05-01/part-*.arrow  bucket feedback logs, partitioned by event date
+      user_ratings/part-0.arrow              small or mutable tables, replaced whole
+      videos/part-0.arrow
+
+``ratings`` rows carry no timestamp, so their ``date=`` partition is the day
+the row was *exported*, not the day it was rated: use it to find what a
+given export added, never as a rating-time filter. Feedback log entries do
+have timestamps and are partitioned by them.
+
+Every export adds one ratings part; once a date partition holds more than
+one part (or today's holds ``COMPACT_PARTS``) they are merged into a single
+file, so the number of files a reader maps stays bounded. Feedback is
+exported from a high-water mark on the log files' mtimes: only logs written
+since the last export are parsed, and only the date partitions holding rows
+from those logs are rewritten. Superseded files are removed after the new
+manifest - whose ``files`` list is what readers load - has been published.
+
+Readers memory-map the files, so a scan maps pages straight from the page
+cache instead of copying rows through sqlite3. Every part is written sorted
+by ``video_id``, so a video's rows are one contiguous range per part and a
+per-video read is a concatenation of zero-copy slices, found through an
+index built once per snapshot version. ``FeedbackAnalyzer`` reads
+from here when ``BHIV_ANALYTICS_SOURCE=snapshot`` and falls back to SQLite
+while no snapshot exists (or pyarrow is not installed).
+
+    python -m analytics.snapshots            # one export, e.g. from cron
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+    pc = None
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_SOURCE = os.getenv("BHIV_ANALYTICS_SOURCE", "sqlite")
+SNAPSHOT_DIR = Path(os.getenv("BHIV_SNAPSHOT_DIR", "data/snapshots"))
+SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("BHIV_SNAPSHOT_INTERVAL", "0"))
+BATCH_ROWS = 50_000
+COMPACT_PARTS = int(os.getenv("BHIV_SNAPSHOT_COMPACT_PARTS", "8"))
+MANIFEST = "manifest.json"
+
+
+def _schemas() -> Dict[str, "pa.Schema"]:
+    return {
+        "ratings": pa.schema([("id", pa.int64()), ("video_id", pa.string()), ("rating", pa.int64()),
+                              ("comment", pa.string())]),
+        "user_ratings": pa.schema([("id", pa.int64()), ("user_id", pa.string()), ("video_id", pa.string()),
+                                   ("rating", pa.int64()), ("comment", pa.string())]),
+        "videos": pa.schema([("id", pa.string()), ("title", pa.string())]),
+        "feedback": pa.schema([("video_id", pa.string()), ("rating", pa.int64()), ("comment", pa.string()),
+                               ("timestamp", pa.string()), ("sentiment", pa.string()),
+                               ("source", pa.string())]),  # log file the row came from
+    }
+
+
+# table -> (query, incremental); incremental queries take the last exported id.
+# Rows come out grouped by video so that per-video reads can slice instead of copy.
+SQLITE_TABLES = {
+    "ratings": ("SELECT id, video_id, rating, comment FROM ratings WHERE id > ? ORDER BY video_id, id", True),
+    # user_ratings rows are replaced on re-rating (UNIQUE(user_id, video_id)), so they are copied whole
+    "user_ratings": ("SELECT id, user_id, video_id, rating, comment FROM user_ratings ORDER BY video_id, id", False),
+    "videos": ("SELECT id, title FROM videos", False),
+}
+
+# secondary sort key within a video when parts are merged
+ROW_ORDER = {"ratings": "id", "feedback": "timestamp"}
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("pyarrow is required for analytics snapshots (pip install pyarrow)")
+
+
+def _write_json_atomic(path: Path, data: Dict) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data, indent=2))
+    os.replace(tmp, path)
+
+
+def _read_part(path: Path) -> "pa.Table":
+    return pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+
+
+def _write_table(out: Path, table: "pa.Table") -> None:
+    tmp = out.with_suffix(".tmp")
+    tmp.parent.mkdir(parents=True, exist_ok=True)
+    with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=BATCH_ROWS):
+            writer.write_batch(batch)
+    os.replace(tmp, out)
+
+
+def _sort_by_video(table: "pa.Table", then: Optional[str] = None) -> "pa.Table":
+    keys = [("video_id", "ascending")] + ([(then, "ascending")] if then else [])
+    return table.take(pc.sort_indices(table, sort_keys=keys))
+
+
+def _video_ranges(part: "pa.Table") -> Tuple["pa.Table", Dict[str, tuple]]:
+    """``{video_id: (offset, length)}`` of a part; parts from older exports are sorted here first"""
+    vids = part["video_id"].to_pylist()
+    keys = [(vid is None, vid or "") for vid in vids]  # sort_indices puts nulls last
+    if any(a > b for a, b in zip(keys, keys[1:])):
+        # sort_indices is stable, so each video keeps its rows in export (id) order
+        part = _sort_by_video(part)
+        vids = part["video_id"].to_pylist()
+    ranges: Dict[str, tuple] = {}
+    for offset, vid in enumerate(vids):
+        start, length = ranges.get(vid, (offset, 0))
+        ranges[vid] = (start, length + 1)
+    return part, ranges
+
+
+class SnapshotExporter:
+    """Copies the analytics inputs out of SQLite and the bucket (see module docstring)"""
+
+    def __init__(self, db_path="data/meta.db", bucket_path="bucket", snapshot_dir=SNAPSHOT_DIR):
+        self.db_path = Path(db_path)
+        self.logs_path = Path(bucket_path) / "logs"
+        self.snapshot_dir = Path(snapshot_dir)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _manifest(self) -> Dict:
+        try:
+            return json.loads((self.snapshot_dir / MANIFEST).read_text())
+        except (OSError, ValueError):
+            return {"high_water": {}, "rows": {}}
+
+    def _rel(self, path: Path) -> str:
+        return path.relative_to(self.snapshot_dir).as_posix()
+
+    def _listed_files(self, manifest: Dict) -> Dict[str, List[str]]:
+        """Live files per table; snapshots written before the manifest listed them are scanned"""
+        if "files" in manifest:
+            return {table: list(files) for table, files in manifest["files"].items()}
+
+        def order(path: Path):
+            start = path.stem.split("-")[1] if "-" in path.stem else ""
+            return (path.parent.name, int(start) if start.isdigit() else 0)
+
+        return {table: [self._rel(p) for p in sorted((self.snapshot_dir / table).rglob("*.arrow"), key=order)]
+                for table in [*SQLITE_TABLES, "feedback"] if (self.snapshot_dir / table).exists()}
+
+    def export(self) -> Dict:
+        """Run one export; returns the new manifest"""
+        _require_pyarrow()
+        with self._lock:
+            started = time.perf_counter()
+            self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+            manifest = self._manifest()
+            manifest["exports"] = export_id = manifest.get("exports", 0) + 1
+            files = self._listed_files(manifest)
+            retired: List[str] = []
+            today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+            schemas = _schemas()
+
+            with sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True) as conn:
+                for table, (query, incremental) in SQLITE_TABLES.items():
+                    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+                                        (table,)).fetchone():
+                        continue
+                    if incremental:
+                        last_id = manifest["high_water"].get(table, 0)
+                        cursor = conn.execute(query, (last_id,))
+                        out = self.snapshot_dir / table / f"date={today}" / f"part-{last_id + 1}.arrow"
+                        written, high_water = self._write_cursor(cursor, schemas[table], out, id_column=0)
+                        if written:
+                            manifest["high_water"][table] = high_water
+                            manifest["rows"][table] = manifest["rows"].get(table, 0) + written
+                            files.setdefault(table, []).append(self._rel(out))
+                        files[table] = self._compact(table, files.get(table, []), today, export_id, retired)
+                    else:
+                        out = self.snapshot_dir / table / "part-0.arrow"
+                        written, _ = self._write_cursor(conn.execute(query), schemas[table], out)
+                        manifest["rows"][table] = written
+                        files[table] = [self._rel(out)]
+
+            manifest["rows"]["feedback"], files["feedback"] = self._export_feedback(
+                schemas["feedback"], manifest, files.get("feedback", []), export_id, retired)
+            files["feedback"] = self._compact("feedback", files["feedback"], today, export_id, retired)
+            manifest["files"] = files
+            manifest["exported_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+            _write_json_atomic(self.snapshot_dir / MANIFEST, manifest)
+            # Readers that loaded the previous manifest retry once its files are gone
+            for rel in retired:
+                (self.snapshot_dir / rel).unlink(missing_ok=True)
+            logger.info(f"Analytics snapshot exported in {time.perf_counter() - started:.2f}s: {manifest['rows']}")
+            return manifest
+
+    def _write_cursor(self, cursor, schema, out: Path, id_column: Optional[int] = None):
+        """Stream a cursor into one IPC file in BATCH_ROWS record batches; returns (rows, last id)"""
+        tmp = out.with_suffix(".tmp")
+        tmp.parent.mkdir(parents=True, exist_ok=True)
+        written, last_id = 0, 0
+        with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            while True:
+                rows = cursor.fetchmany(BATCH_ROWS)
+                if not rows:
+                    break
+                columns = list(zip(*rows))
+                writer.write_batch(pa.record_batch([pa.array(col, type=field.type)
+                                                    for col, field in zip(columns, schema)], schema=schema))
+                written += len(rows)
+                if id_column is not None:
+                    last_id = max(last_id, max(row[id_column] for row in rows))
+        if written or id_column is None:
+            os.replace(tmp, out)
+        else:
+            tmp.unlink()
+        return written, last_id
+
+    def _compact(self, table: str, parts: List[str], today: str, export_id: int,
+                 retired: List[str]) -> List[str]:
+        """Merge each date partition's parts into one file (today's once it reaches COMPACT_PARTS)"""
+        by_partition: Dict[str, List[str]] = defaultdict(list)
+        for rel in parts:
+            by_partition[rel.rsplit("/", 1)[0]].append(rel)
+        result: List[str] = []
+        for partition, members in by_partition.items():
+            threshold = COMPACT_PARTS if partition.endswith(f"date={today}") else 2
+            if len(members) < max(threshold, 2):
+                result.extend(members)
+                continue
+            merged = pa.concat_tables([_read_part(self.snapshot_dir / rel) for rel in members])
+            out = self.snapshot_dir / partition / f"compact-{export_id}.arrow"
+            _write_table(out, _sort_by_video(merged, ROW_ORDER[table]))
+            result.append(self._rel(out))
+            retired.extend(members)
+        return result
+
+    def _export_feedback(self, schema, manifest: Dict, parts: List[str], export_id: int,
+                         retired: List[str]) -> Tuple[int, List[str]]:
+        """Export feedback logs changed since the last export; returns (total rows, live parts)
+
+        Log files are rewritten whole, so a changed log replaces every row
+        previously exported from it: the date partitions holding such rows
+        (or rows of logs that were deleted) are rewritten without them, and
+        the log's current entries are added. Other partitions are untouched.
+        """
+        high_water = manifest["high_water"].get("feedback", 0)
+        existing = [(rel, _read_part(self.snapshot_dir / rel)) for rel in parts]
+        if any("source" not in part.schema.names for _, part in existing):
+            # written before rows recorded their log file: start over
+            retired.extend(rel for rel, _ in existing)
+            existing, high_water = [], 0
+
+        logs = {}
+        for log_file in self.logs_path.glob("feedback_*.json") if self.logs_path.exists() else ():
+            try:
+                logs[log_file.name] = (log_file, log_file.stat().st_mtime_ns)
+            except OSError:
+                continue
+        # >= rather than >: a log rewritten within the filesystem's mtime granularity
+        # of the last export is read again, which is harmless since rows are replaced
+        changed = {name for name, (_, mtime) in logs.items() if mtime >= high_water}
+        exported = set()
+        for _, part in existing:
+            exported.update(pc.unique(part["source"]).to_pylist())
+        stale = changed | (exported - logs.keys())
+
+        by_date: Dict[str, List[tuple]] = defaultdict(list)
+        for name in sorted(changed):
+            log_file, mtime = logs[name]
+            try:
+                entries = json.loads(log_file.read_text())
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable feedback log {log_file}: {e}")
+                continue
+            fallback = datetime.fromtimestamp(mtime / 1e9, timezone.utc).isoformat()
+            for entry in entries if isinstance(entries, list) else [entries]:
+                timestamp = entry.get("timestamp") or fallback
+                sentiment = entry.get("sentiment") or entry.get("analysis") or {}
+                by_date[timestamp[:10]].append((
+                    entry.get("video_id") or log_file.stem[len("feedback_"):],
+                    entry.get("rating"),
+                    entry.get("comment"),
+                    timestamp,
+                    sentiment.get("sentiment") if isinstance(sentiment, dict) else sentiment,
+                    name,
+                ))
+
+        live: List[str] = []
+        kept: Dict[str, List["pa.Table"]] = defaultdict(list)
+        stale_set = pa.array(sorted(stale), type=pa.string())
+        for rel, part in existing:
+            mask = pc.is_in(part["source"], value_set=stale_set)
+            if not pc.any(mask).as_py():
+                live.append(rel)
+                continue
+            kept[rel.rsplit("/", 1)[0].split("date=", 1)[1]].append(part.filter(pc.invert(mask)))
+            retired.append(rel)
+
+        for date in sorted(kept.keys() | by_date.keys()):
+            tables = [t for t in kept.get(date, []) if t.num_rows]
+            rows = by_date.get(date)
+            if rows:
+                columns = list(zip(*rows))
+                tables.append(pa.table([pa.array(col, type=field.type) for col, field in zip(columns, schema)],
+                                       schema=schema))
+            if not tables:
+                continue
+            out = self.snapshot_dir / "feedback" / f"date={date}" / f"part-{export_id}.arrow"
+            _write_table(out, _sort_by_video(pa.concat_tables(tables), ROW_ORDER["feedback"]))
+            live.append(self._rel(out))
+
+        if logs:
+            manifest["high_water"]["feedback"] = max(high_water, max(mtime for _, mtime in logs.values()))
+        total = sum(_read_part(self.snapshot_dir / rel).num_rows for rel in live)
+        return total, live
+
+    # -- periodic export ------------------------------------------------
+
+    def start(self, interval: float = SNAPSHOT_INTERVAL_SECONDS) -> None:
+        """Export every ``interval`` seconds on a daemon thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def loop():
+            while True:
+                try:
+                    self.export()
+                except (OSError, sqlite3.Error, RuntimeError) as e:
+                    logger.warning(f"Analytics snapshot export failed: {e}")
+                if self._stop.wait(interval):
+                    return
+
+        self._thread = threading.Thread(target=loop, name="bhiv-snapshots", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+class SnapshotReader:
+    """Memory-mapped access to the latest snapshot; tables are reloaded when the manifest changes"""
+
+    def __init__(self, snapshot_dir=SNAPSHOT_DIR):
+        self.snapshot_dir = Path(snapshot_dir)
+        self._tables: Dict[str, "pa.Table"] = {}
+        self._by_video: Dict[str, list] = {}  # table -> [(part, {video_id: (offset, length)}), ...]
+        self._files: Optional[Dict[str, List[str]]] = None
+        self._version: Optional[tuple] = None
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        return pa is not None and (self.snapshot_dir / MANIFEST).exists()
+
+    def _check_version(self) -> None:
+        stat = (self.snapshot_dir / MANIFEST).stat()
+        version = (stat.st_ino, stat.st_mtime_ns)  # the manifest is replaced, never rewritten in place
+        if version != self._version:
+            self._tables = {}
+            self._by_video = {}
+            try:
+                self._files = json.loads((self.snapshot_dir / MANIFEST).read_text()).get("files")
+            except (OSError, ValueError):
+                self._files = None
+            self._version = version
+
+    def _reloading(self, load):
+        """Run ``load`` under the lock; retry if an export removed the files it was reading"""
+        with self._lock:
+            for attempt in range(3):
+                try:
+                    self._check_version()
+                    return load()
+                except FileNotFoundError:
+                    if attempt == 2:
+                        raise
+                    self._version = None
+
+    def table(self, name: str) -> "pa.Table":
+        _require_pyarrow()
+        return self._reloading(lambda: self._table(name))
+
+    def _parts(self, name: str) -> List["pa.Table"]:
+        if self._files is not None:
+            paths = [self.snapshot_dir / rel for rel in self._files.get(name, [])]
+        else:
+            paths = sorted((self.snapshot_dir / name).rglob("*.arrow"))
+        return [_read_part(path) for path in paths]
+
+    def _table(self, name: str) -> "pa.Table":
+        table = self._tables.get(name)
+        if table is None:
+            parts = self._parts(name)
+            table = pa.concat_tables(parts) if parts else _schemas()[name].empty_table()
+            self._tables[name] = table
+        return table
+
+    def video_rows(self, name: str, video_id: str) -> "pa.Table":
+        """Rows of one video in export (id) order: zero-copy slices of the mapped parts"""
+        _require_pyarrow()
+
+        def load():
+            index = self._by_video.get(name)
+            if index is None:
+                index = self._by_video[name] = [_video_ranges(part) for part in self._parts(name)]
+            return index
+
+        index = self._reloading(load)
+        pieces = [part.slice(*ranges[video_id]) for part, ranges in index if video_id in ranges]
+        if pieces:
+            return pa.concat_tables(pieces)
+        return index[0][0].slice(0, 0) if index else _schemas()[name].empty_table()
+
+    def to_pandas(self, name: str):
+        """DataFrame view of a table (zero-copy for null-free numeric columns)"""
+        return self.table(name).to_pandas()
+
+    def rows(self, name: str, video_id: Optional[str] = None, columns: Optional[List[str]] = None) -> List[Dict]:
+        table = self.table(name) if video_id is None else self.video_rows(name, video_id)
+        if columns is not None:
+            table = table.select(columns)
+        return table.to_pylist()
+
+    def mean(self, name: str, column: str) -> Optional[float]:
+        value = pc.mean(self.table(name)[column]).as_py()
+        return float(value) if value is not None else None
+
+
+_readers: Dict[Path, SnapshotReader] = {}
+
+
+def get_snapshot_reader(snapshot_dir=SNAPSHOT_DIR) -> SnapshotReader:
+    """Shared reader per directory, so every analyzer reuses the same mapped tables"""
+    snapshot_dir = Path(snapshot_dir)
+    reader = _readers.get(snapshot_dir)
+    if reader is None:
+        reader = _readers.setdefault(snapshot_dir, SnapshotReader(snapshot_dir))
+    return reader
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(SnapshotExporter().export(), indent=2))
@@ -0,0 +1,300 @@
+# analytics/text_engine.py - Batch sentiment and keyword analysis for feedback comments
+"""
+Each comment is normalized and tokenized once, matched against the theme
+keywords, scanned once with an Aho-Corasick automaton, scored for sentiment,
+and cached under a hash of its normalized text. Batches only do work for
+comments the cache has not seen:
+
+    engine = get_text_engine()
+    results = engine.analyze_batch(["Too slow", "Great examples!"])
+    results[0].keywords     # frozenset({"slow"})
+    results[0].themes       # frozenset({"pacing"})
+    results[1].sentiment    # "positive"
+
+Theme keywords (``keywords``, ``themes``) match whole words only, so
+"function" is not "fun" and "breakfast" is not "fast". The few keywords the
+analytics always tested with ``in`` (``SUBSTRING_KEYWORDS``) keep that
+substring meaning in ``mentions`` and ``keyword_counts``: "unclear" still
+mentions "clear". Optional accelerators are used when installed:
+``pyahocorasick`` for substring matching, NumPy for lexicon aggregation,
+TextBlob as an alternative sentiment backend
+(``BHIV_SENTIMENT_BACKEND=textblob``).
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import Counter, OrderedDict, deque
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+SENTIMENT_BACKEND = os.getenv("BHIV_SENTIMENT_BACKEND", "lexicon")
+TEXT_CACHE_SIZE = int(os.getenv("BHIV_TEXT_CACHE_SIZE", "50000"))
+POSITIVE_THRESHOLD = 0.1
+NEGATIVE_THRESHOLD = -0.1
+
+# Keyword (a whole word) -> theme; every keyword used by the analytics and the LM client lives here
+THEME_KEYWORDS: Dict[str, str] = {
+    "slow": "pacing", "slower": "pacing", "fast": "pacing", "faster": "pacing", "pace": "pacing",
+    "pacing": "pacing", "rushed": "pacing", "drag": "pacing",
+    "clear": "clarity", "unclear": "clarity", "confusing": "clarity", "understand": "clarity",
+    "explain": "clarity", "explained": "clarity", "explanation": "clarity",
+    "boring": "engagement", "engaging": "engagement", "interesting": "engagement", "fun": "engagement",
+    "example": "examples", "examples": "examples", "demo": "examples", "demos": "examples",
+    "quality": "quality", "resolution": "quality", "blurry": "quality",
+    "audio": "audio", "sound": "audio", "voice": "audio", "music": "audio",
+    "long": "length", "longer": "length", "short": "length", "shorter": "length",
+}
+# Keywords the analytics checked with ``in`` before this engine; counted as substrings
+SUBSTRING_KEYWORDS = frozenset({"slow", "fast", "clear", "unclear", "confusing", "boring", "example"})
+
+LEXICON: Dict[str, float] = {
+    "great": 0.8, "excellent": 1.0, "good": 0.7, "amazing": 0.9, "awesome": 0.9, "love": 0.8,
+    "loved": 0.8, "helpful": 0.6, "clear": 0.5, "useful": 0.5, "nice": 0.6, "perfect": 1.0,
+    "engaging": 0.6, "interesting": 0.5, "fun": 0.6, "best": 0.9, "well": 0.3, "easy": 0.4,
+    "thanks": 0.4, "thank": 0.4, "enjoyed": 0.7, "informative": 0.6,
+    "bad": -0.7, "terrible": -1.0, "awful": -1.0, "poor": -0.6, "boring": -0.7, "confusing": -0.6,
+    "unclear": -0.5, "slow": -0.4, "rushed": -0.4, "hate": -0.9, "worst": -1.0, "useless": -0.8,
+    "hard": -0.3, "difficult": -0.3, "annoying": -0.7, "blurry": -0.5, "wrong": -0.6, "waste": -0.8,
+    "disappointing": -0.7, "dull": -0.6,
+}
+NEGATORS = frozenset({"not", "no", "never", "isn't", "wasn't", "don't", "didn't", "hardly"})
+
+_TOKEN_RE = re.compile(r"[a-z']+")
+
+
+class CommentAnalysis(NamedTuple):
+    polarity: float
+    sentiment: str
+    keywords: FrozenSet[str]   # theme keywords present as whole words
+    mentions: FrozenSet[str] = frozenset()  # SUBSTRING_KEYWORDS present anywhere in the text
+
+    @property
+    def themes(self) -> FrozenSet[str]:
+        return frozenset(THEME_KEYWORDS[k] for k in self.keywords if k in THEME_KEYWORDS)
+
+
+def normalize(text: Optional[str]) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def tokenize(normalized: str) -> List[str]:
+    return _TOKEN_RE.findall(normalized)
+
+
+def label_for(polarity: float) -> str:
+    if polarity > POSITIVE_THRESHOLD:
+        return "positive"
+    if polarity < NEGATIVE_THRESHOLD:
+        return "negative"
+    return "neutral"
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton: all keywords found in one left-to-right pass"""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = tuple(sorted({k.lower() for k in keywords if k}))
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self.keywords:
+                self._automaton.add_word(keyword, keyword)
+            self._automaton.make_automaton()
+        else:
+            self._automaton = None
+            self._build()
+
+    def _build(self) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[FrozenSet[str]] = [frozenset()]
+        for keyword in self.keywords:
+            state = 0
+            for char in keyword:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(frozenset())
+                state = nxt
+            self._out[state] = self._out[state] | {keyword}
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(char, 0)
+                self._out[nxt] = self._out[nxt] | self._out[self._fail[nxt]]
+
+    def find(self, normalized: str) -> FrozenSet[str]:
+        """Keywords occurring anywhere in already-normalized text"""
+        if self._automaton is not None:
+            return frozenset(value for _, value in self._automaton.iter(normalized))
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        for char in normalized:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return frozenset(found)
+
+
+class SentimentScorer:
+    """Lexicon polarity in [-1, 1] (mean of the scored words) for whole batches"""
+
+    def __init__(self, lexicon: Dict[str, float] = LEXICON, backend: str = SENTIMENT_BACKEND):
+        self.lexicon = lexicon
+        self.backend = backend
+        self._textblob = None
+        if backend == "textblob":
+            try:
+                from textblob import TextBlob
+                self._textblob = TextBlob
+            except ImportError:
+                self.backend = "lexicon"
+
+    def score_batch(self, texts: Sequence[str], token_lists: Sequence[List[str]]) -> List[float]:
+        if self._textblob is not None:
+            return [round(float(self._textblob(text).sentiment.polarity), 3) for text in texts]
+
+        # One pass over the tokens collects (comment index, signed word score) pairs
+        owners: List[int] = []
+        scores: List[float] = []
+        lexicon = self.lexicon
+        for index, tokens in enumerate(token_lists):
+            previous = ""
+            for token in tokens:
+                value = lexicon.get(token)
+                if value is not None:
+                    owners.append(index)
+                    scores.append(-value if previous in NEGATORS else value)
+                previous = token
+
+        if np is not None and scores:
+            sums = np.bincount(np.asarray(owners), weights=np.asarray(scores), minlength=len(token_lists))
+            counts = np.bincount(np.asarray(owners), minlength=len(token_lists))
+            means = np.divide(sums, counts, out=np.zeros(len(token_lists)), where=counts > 0)
+            return [round(float(v), 3) for v in np.clip(means, -1.0, 1.0)]
+
+        sums_list = [0.0] * len(token_lists)
+        counts_list = [0] * len(token_lists)
+        for owner, value in zip(owners, scores):
+            sums_list[owner] += value
+            counts_list[owner] += 1
+        return [round(max(-1.0, min(1.0, s / c)), 3) if c else 0.0 for s, c in zip(sums_list, counts_list)]
+
+
+class TextEngine:
+    """Cached batch analysis of comments (see module docstring)"""
+
+    def __init__(self, keywords: Iterable[str] = THEME_KEYWORDS, scorer: Optional[SentimentScorer] = None,
+                 cache_size: int = TEXT_CACHE_SIZE, substring_keywords: Iterable[str] = SUBSTRING_KEYWORDS):
+        self.keywords = frozenset(k.lower() for k in keywords if k)
+        self.matcher = KeywordMatcher(substring_keywords)
+        self.scorer = scorer or SentimentScorer()
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[bytes, CommentAnalysis]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(normalized: str) -> bytes:
+        return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).digest()
+
+    def analyze(self, comment: Optional[str]) -> CommentAnalysis:
+        return self.analyze_batch([comment])[0]
+
+    def analyze_batch(self, comments: Sequence[Optional[str]]) -> List[CommentAnalysis]:
+        normalized = [normalize(c) for c in comments]
+        keys = [self._key(text) for text in normalized]
+        results: List[Optional[CommentAnalysis]] = [None] * len(comments)
+        pending: Dict[bytes, List[int]] = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    results[i] = cached
+                    self.hits += 1
+                else:
+                    pending.setdefault(key, []).append(i)
+            self.misses += len(pending)
+
+        if pending:
+            positions = [indexes[0] for indexes in pending.values()]
+            texts = [normalized[i] for i in positions]
+            token_lists = [tokenize(t) for t in texts]
+            polarities = self.scorer.score_batch(texts, token_lists)
+            fresh: List[Tuple[bytes, CommentAnalysis]] = []
+            for (key, indexes), text, tokens, polarity in zip(pending.items(), texts, token_lists, polarities):
+                analysis = CommentAnalysis(polarity, label_for(polarity), self.keywords.intersection(tokens),
+                                           self.matcher.find(text))
+                fresh.append((key, analysis))
+                for i in indexes:
+                    results[i] = analysis
+            with self._lock:
+                for key, analysis in fresh:
+                    self._cache[key] = analysis
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return results  # type: ignore[return-value]
+
+    def keyword_counts(self, comments: Sequence[Optional[str]]) -> Counter:
+        """How many comments mention each keyword (as a word, or anywhere for SUBSTRING_KEYWORDS)"""
+        counts: Counter = Counter()
+        for analysis in self.analyze_batch(comments):
+            counts.update(analysis.keywords | analysis.mentions)
+        return counts
+
+    def sentiment_distribution(self, comments: Sequence[Optional[str]]) -> Dict[str, int]:
+        counts = Counter(analysis.sentiment for analysis in self.analyze_batch(comments))
+        return {label: counts.get(label, 0) for label in ("positive", "neutral", "negative")}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "backend": self.scorer.backend,
+                "matcher": "pyahocorasick" if self.matcher._automaton is not None else "python",
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self.hits = self.misses = 0
+
+
+_engine: Optional[TextEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_text_engine() -> TextEngine:
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = TextEngine()
+    return _engine
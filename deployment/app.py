@@ -7,6 +7,7 @@ import json
 import sys
 import hashlib
 import asyncio
+from datetime import datetime
 # Add current directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
@@ -16,6 +17,9 @@ try:
     from bhiv_lm_client import get_lm_client
     from analytics.advanced_analytics import get_analytics
     from security.config import config
+    from bhiv_bucket import read_storyboard_shared
+    from gallery import ensure_gallery_schema
+    from data_service import DataService
 except ImportError as e:
     st.error(f"Import error: {e}. Please ensure all modules are available.")
     st.stop()
@@ -45,10 +49,22 @@ def init_db():
             c.execute('''CREATE TABLE user_ratings
                          (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, video_id TEXT, rating INTEGER, comment TEXT,
                           UNIQUE(user_id, video_id))''')
+        
+        if 'videos' not in tables:
+            c.execute('''CREATE TABLE videos
+                         (id TEXT PRIMARY KEY, title TEXT, storyboard_path TEXT, video_path TEXT)''')
         conn.commit()
+        ensure_gallery_schema(conn)
 
 init_db()
 
+@st.cache_resource
+def get_data_service():
+    """One read cache shared by every session in this process"""
+    return DataService(DBPATH)
+
+data_service = get_data_service()
+
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
@@ -72,12 +88,6 @@ def register_user(username, password):
     except sqlite3.IntegrityError:
         return None
 
-def has_user_rated(user_id, video_id):
-    with sqlite3.connect(DBPATH) as conn:
-        c = conn.cursor()
-        c.execute("SELECT 1 FROM user_ratings WHERE user_id = ? AND video_id = ?", (user_id, video_id))
-        return c.fetchone() is not None
-
 # Streamlit App
 st.set_page_config(
     page_title="BHIV Platform", 
@@ -279,24 +289,14 @@ with col2:
         st.rerun()
 
 # Enhanced Metrics with Analytics
-@st.cache_data(ttl=5)
 def get_metrics():
-    with sqlite3.connect(DBPATH) as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM videos")
-        video_count = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM user_ratings")
-        rating_count = cur.fetchone()[0]
-        cur.execute("SELECT AVG(rating) FROM user_ratings")
-        avg_rating = cur.fetchone()[0] or 0
-    
-    # Get advanced analytics
-    analytics = get_analytics()
-    trends = analytics.get_rating_trends()
-    sentiment = analytics.get_sentiment_analysis()
+    def load_analytics():
+        analytics = get_analytics()
+        return analytics.get_rating_trends(), analytics.get_sentiment_analysis()
     
+    trends, sentiment = data_service.cached(("analytics_metrics",), {"metrics", "ratings"}, load_analytics)
     return {
-        'basic': (video_count, rating_count, avg_rating),
+        'basic': data_service.get_metrics(),
         'trends': trends,
         'sentiment': sentiment
     }
@@ -378,13 +378,15 @@ if uploaded_file and st.button("Generate Video", type="primary"):
                 columns = [col[1] for col in c.fetchall()]
                 
                 if 'storyboard_path' in columns and 'video_path' in columns:
-                    c.execute("INSERT INTO videos (id, title, storyboard_path, video_path) VALUES (?,?,?,?)",
-                              (video_id, uploaded_file.name, str(storyboard_path), str(video_path)))
+                    c.execute("INSERT INTO videos (id, title, storyboard_path, video_path, created_at) VALUES (?,?,?,?,?)",
+                              (video_id, uploaded_file.name, str(storyboard_path), str(video_path), datetime.now().isoformat()))
                 else:
-                    c.execute("INSERT INTO videos (id, title) VALUES (?,?)",
-                              (video_id, uploaded_file.name))
+                    c.execute("INSERT INTO videos (id, title, created_at) VALUES (?,?,?)",
+                              (video_id, uploaded_file.name, datetime.now().isoformat()))
                 conn.commit()
             
+            data_service.invalidate_videos()
+            st.session_state.gallery_cursors = [None]
             st.success(f"✅ Video generated! ID: {video_id}")
             st.balloons()
             script_path.unlink()
@@ -404,62 +406,56 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-with sqlite3.connect(DBPATH) as conn:
-    cur = conn.cursor()
-    cur.execute("PRAGMA table_info(videos)")
-    columns = [col[1] for col in cur.fetchall()]
-    
-    if 'video_path' in columns and 'storyboard_path' in columns:
-        cur.execute("SELECT id, title, video_path, storyboard_path FROM videos ORDER BY rowid DESC")
-        videos = cur.fetchall()
-    else:
-        cur.execute("SELECT id, title FROM videos ORDER BY rowid DESC")
-        video_data = cur.fetchall()
-        videos = []
-        for vid, title in video_data:
-            vpath = VIDEOS / f"{vid}.mp4"
-            spath = STORYBOARDS / f"{vid}_storyboard.json"
-            videos.append((vid, title, str(vpath) if vpath.exists() else None, str(spath) if spath.exists() else None))
+# Keyset pagination: the stack holds the cursor each visited page started from
+if 'gallery_cursors' not in st.session_state:
+    st.session_state.gallery_cursors = [None]
+
+def get_page_columns():
+    with sqlite3.connect(DBPATH) as conn:
+        cur = conn.cursor()
+        cur.execute("PRAGMA table_info(videos)")
+        columns = [col[1] for col in cur.fetchall()]
+    return ("title", "video_path", "storyboard_path") if 'video_path' in columns and 'storyboard_path' in columns else ("title",)
+
+page_columns = data_service.cached(("video_columns",), {"schema"}, get_page_columns)
+videos, next_cursor = data_service.get_video_page(st.session_state.gallery_cursors[-1], page_columns)
+page_ratings = data_service.get_page_ratings([v["id"] for v in videos], st.session_state.user_id)
 
 if videos:
-    for video_data in videos:
-        if len(video_data) == 4:
-            video_id, title, video_path, storyboard_path = video_data
-        else:
-            video_id, title = video_data[:2]
-            video_path = str(VIDEOS / f"{video_id}.mp4")
-            storyboard_path = str(STORYBOARDS / f"{video_id}_storyboard.json")
+    for video in videos:
+        video_id, title = video["id"], video["title"]
+        video_path = video.get("video_path") or str(VIDEOS / f"{video_id}.mp4")
+        storyboard_path = video.get("storyboard_path") or str(STORYBOARDS / f"{video_id}_storyboard.json")
         
         with st.expander(f"📹 {title} (ID: {video_id})"):
             col1, col2 = st.columns([2, 1])
             
             with col1:
                 if video_path and Path(video_path).exists():
-                    st.video(video_path)
+                    # Only ship the video bytes once the viewer asks for them
+                    if st.toggle("▶️ Load video", key=f"play_{video_id}"):
+                        st.video(video_path)
                 else:
                     st.warning("⚠️ Video not found")
             
             with col2:
                 if storyboard_path and Path(storyboard_path).exists():
                     try:
-                        storyboard = json.loads(Path(storyboard_path).read_text())
+                        storyboard = read_storyboard_shared(storyboard_path)
                         st.info(f"🎨 Storyboard: {len(storyboard.get('scenes', []))} scenes")
                     except:
                         st.info("🎨 Storyboard available")
                 
-                with sqlite3.connect(DBPATH) as conn:
-                    cur = conn.cursor()
-                    cur.execute("SELECT rating, comment FROM user_ratings WHERE video_id = ? ORDER BY id DESC", (video_id,))
-                    video_ratings = cur.fetchall()
+                ratings_summary = page_ratings[video_id]
                 
-                if video_ratings:
-                    st.write(f"📊 **{len(video_ratings)} ratings:**")
-                    for r, c in video_ratings[:3]:
+                if ratings_summary["count"]:
+                    st.write(f"📊 **{ratings_summary['count']} ratings:**")
+                    for r, c in ratings_summary["recent"]:
                         st.write(f"⭐ {r}/5 - {c if c else 'No comment'}")
                 else:
                     st.write("📊 No ratings yet")
                 
-                if has_user_rated(st.session_state.user_id, video_id):
+                if ratings_summary["has_rated"]:
                     st.info("✅ You have already rated this video")
                 else:
                     st.markdown("#### ⭐ Rate This Video")
@@ -479,12 +475,8 @@ if videos:
                     
                     if st.button("🚀 Submit Rating", key=f"submit_{video_id}", type="primary"):
                         try:
-                            # Save rating to database
-                            with sqlite3.connect(DBPATH) as conn:
-                                c = conn.cursor()
-                                c.execute("INSERT INTO user_ratings (user_id, video_id, rating, comment) VALUES (?,?,?,?)",
-                                          (st.session_state.user_id, video_id, rating, comment))
-                                conn.commit()
+                            # Save rating to database (invalidates only this video's cached data)
+                            data_service.add_rating(video_id, rating, comment, user_id=st.session_state.user_id)
                             
                             # Analyze feedback with LM client
                             if config['analytics_enabled']:
@@ -497,10 +489,21 @@ if videos:
                             
                             st.success("✅ Rating submitted successfully!")
                             st.balloons()
-                            st.cache_data.clear()
                             st.rerun()
                         except Exception as e:
                             st.error(f"❌ Failed to save rating: {str(e)}")
+
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if len(st.session_state.gallery_cursors) > 1 and st.button("⬅️ Newer", key="gallery_prev"):
+            st.session_state.gallery_cursors.pop()
+            st.rerun()
+    with col_page:
+        st.markdown(f"<p style='text-align: center;'>Page {len(st.session_state.gallery_cursors)}</p>", unsafe_allow_html=True)
+    with col_next:
+        if next_cursor and st.button("Older ➡️", key="gallery_next"):
+            st.session_state.gallery_cursors.append(next_cursor)
+            st.rerun()
 else:
     st.markdown("""
     <div style="text-align: center; padding: 3rem; background: #21262d; border-radius: 10px; color: #f0f6fc;">
@@ -520,8 +523,10 @@ st.markdown("""
 # Analytics Dashboard
 with st.expander("📊 Advanced Analytics"):
     if config['analytics_enabled']:
-        analytics = get_analytics()
-        insights = analytics.get_platform_insights()
+        insights = data_service.cached(
+            ("platform_insights",), {"metrics", "ratings", "videos"},
+            lambda: get_analytics().get_platform_insights()
+        )
         
         col1, col2 = st.columns(2)
         
@@ -548,5 +553,5 @@ with st.expander("📊 Advanced Analytics"):
         st.info("Analytics disabled. Enable in configuration to see detailed insights.")
 
 if st.button("🔄 Refresh Dashboard", type="secondary"):
-    st.cache_data.clear()
+    data_service.invalidate("metrics")
     st.rerun()
\ No newline at end of file
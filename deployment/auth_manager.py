@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional, Dict
 import hashlib
+from session_store import SessionStore
 
 class AuthManager:
     def __init__(self):
@@ -12,9 +13,11 @@ class AuthManager:
         self.secret_key = "bhiv-secret-key-2024"
         self.users_file.parent.mkdir(exist_ok=True)
         self.load_data()
+        self.sessions = SessionStore(self.sessions_file.with_suffix(".db"))
+        self.sessions.import_json(self.sessions_file)
     
     def load_data(self):
-        """Load users and sessions from files"""
+        """Load users from file (sessions live in the session store)"""
         # Load users
         if self.users_file.exists():
             with open(self.users_file, 'r') as f:
@@ -22,24 +25,12 @@ class AuthManager:
         else:
             self.users = {"admin": {"password": self.hash_password("admin123"), "role": "admin"}}
             self.save_users()
-        
-        # Load sessions
-        if self.sessions_file.exists():
-            with open(self.sessions_file, 'r') as f:
-                self.sessions = json.load(f)
-        else:
-            self.sessions = {}
     
     def save_users(self):
         """Save users to file"""
         with open(self.users_file, 'w') as f:
             json.dump(self.users, f, indent=2)
     
-    def save_sessions(self):
-        """Save sessions to file"""
-        with open(self.sessions_file, 'w') as f:
-            json.dump(self.sessions, f, indent=2)
-    
     def hash_password(self, password: str) -> str:
         """Hash password"""
         return hashlib.sha256(password.encode()).hexdigest()
@@ -75,13 +66,7 @@ class AuthManager:
         token = self.create_token(username)
         session_id = hashlib.md5(f"{username}{datetime.now()}".encode()).hexdigest()
         
-        self.sessions[session_id] = {
-            "username": username,
-            "token": token,
-            "created_at": datetime.now().isoformat(),
-            "last_access": datetime.now().isoformat()
-        }
-        self.save_sessions()
+        self.sessions.create(session_id, username, token)
         
         return {
             "success": True,
@@ -94,13 +79,12 @@ class AuthManager:
     def auto_login(self, session_id: str = None, token: str = None) -> Optional[Dict]:
         """Auto login using session_id or token"""
         # Try session_id first
-        if session_id and session_id in self.sessions:
-            session = self.sessions[session_id]
+        session = self.sessions.get(session_id) if session_id else None
+        if session:
             username = self.verify_token(session["token"])
             if username:
-                # Update last access
-                session["last_access"] = datetime.now().isoformat()
-                self.save_sessions()
+                # Update last access (batched, flushed in the background)
+                self.sessions.touch(session_id)
                 return {
                     "success": True,
                     "username": username,
@@ -124,9 +108,7 @@ class AuthManager:
     
     def logout(self, session_id: str):
         """Logout user and remove session"""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
-            self.save_sessions()
+        if self.sessions.delete(session_id):
             return {"success": True, "message": "Logged out"}
         return {"success": False, "message": "Session not found"}
     
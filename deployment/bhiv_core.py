@@ -1,9 +1,20 @@
 from pathlib import Path
-from bhiv_bucket import save_script, init_bucket
+import logging
+from bhiv_bucket import BUCKET_ROOT, save_script, save_storyboard, save_video, init_bucket
 from video.bhiv_integration import BHIVClient
+from video.storyboard import generate_storyboard_from_file
+from video.renditions import DEFAULT_RENDITION, get_rendition, render_rendition, rendition_filename
+from video.packaging import ensure_package
 import json
 import uuid
 from bhiv_lm_client import get_lm_client
+from bhiv_tracing import span, traced
+from bhiv_events import RATING_TOPIC, EventConsumer, get_event_log
+from video.feedback_adapter import adapt_catalog
+from video.policy_store import get_policy_store
+
+logger = logging.getLogger(__name__)
+DBPATH = Path("data/meta.db")
 
 
 class BHIVOrchestrator:
@@ -11,10 +22,11 @@ class BHIVOrchestrator:
         self.client = BHIVClient()
         init_bucket()
     
+    @traced("orchestrator.ingest_script")
     def ingest_script(self, script_path, metadata=None):
         """Ingest script into BHIV system"""
         script_id = str(uuid.uuid4())[:8]
-        bucket_key = f"scripts/{script_id}.txt"
+        bucket_key = f"{script_id}.txt"  # save_script already files it under scripts/
         
         # Save to bucket
         bucket_path = save_script(script_path, bucket_key)
@@ -33,6 +45,7 @@ class BHIVOrchestrator:
         
         return script_id, bucket_path
     
+    @traced("orchestrator.process_webhook")
     def process_webhook(self, script_id, action="process"):
         """Handle webhook for script processing"""
         meta_path = Path("bucket") / f"meta_{script_id}.json"
@@ -45,12 +58,80 @@ class BHIVOrchestrator:
         
         return {"script_id": script_id, "status": meta["status"]}
     
+    @traced("orchestrator.process_feedback")
     def process_feedback(self, video_id, rating, comment):
         lm_client = get_lm_client()
-        analysis = lm_client.analyze_feedback(video_id, rating, comment)
+        analysis = lm_client.analyze_feedback_batch([(rating, comment)])[0]
         log_file = lm_client.log_feedback(video_id, rating, comment, analysis)
         return {"analysis": analysis, "log_file": str(log_file)}
 
 
 def get_orchestrator():
     return BHIVOrchestrator()
+
+
+def process_script_upload(script_path, user_id=None):
+    """Script -> bucket -> storyboard -> rendered video; each stage is a span of one trace"""
+    with span("upload.pipeline", user_id=user_id or "") as pipeline:
+        orchestrator = get_orchestrator()
+        video_id, bucket_path = orchestrator.ingest_script(script_path, {"uploaded_by": user_id})
+        if pipeline is not None:
+            pipeline.set_attribute("video_id", video_id)
+
+        storyboard = generate_storyboard_from_file(bucket_path, video_id=video_id,
+                                                   policy=get_policy_store(DBPATH).snapshot())
+        storyboard_path = save_storyboard(storyboard, f"{video_id}.json")
+
+        # Only the default rendition is encoded here; the rest on first request (video.renditions)
+        rendition = get_rendition(DEFAULT_RENDITION)
+        tmp_video = BUCKET_ROOT / "tmp" / f"{video_id}.mp4"
+        render_rendition(storyboard, str(tmp_video), rendition)
+        video_path = save_video(str(tmp_video), rendition_filename(video_id, rendition))
+        tmp_video.unlink(missing_ok=True)
+
+        # HLS for the default rendition; on failure /stream still serves the MP4
+        playlist = ensure_package(video_id, DEFAULT_RENDITION)
+
+        return {"id": video_id, "storyboard": storyboard_path, "video": video_path,
+                "playlist": str(playlist) if playlist else None}
+
+
+# Rating events: the API appends them, these consumers do the follow-up work in batches
+
+def notify_on_rate(video_id, rating, comment, db_path=DBPATH):
+    """Queue a rating for the consumers; returns its event offset"""
+    payload = {"video_id": video_id, "rating": rating, "comment": comment}
+    return get_event_log(db_path).append(RATING_TOPIC, payload)
+
+
+@traced("events.sentiment")
+def analyze_rating_events(events):
+    """LM analysis of a batch of ratings, one feedback log entry each"""
+    lm_client = get_lm_client()
+    ratings = [event.payload for event in events]
+    analyses = lm_client.analyze_feedback_batch([(r["rating"], r["comment"]) for r in ratings])
+    for r, analysis in zip(ratings, analyses):
+        lm_client.log_feedback(r["video_id"], r["rating"], r["comment"], analysis)
+
+
+def adapt_rated_storyboards(events, db_path=DBPATH):
+    """Re-adapt the batch's rated videos whose average crossed the threshold"""
+    adapt_catalog(db_path, video_ids={event.payload["video_id"] for event in events})
+
+
+def start_rating_consumers(db_path=DBPATH):
+    """Start the sentiment and adaptation consumers; returns them for ``stop()``
+
+    Rating rollups need no consumer: the statistics tables are trigger-maintained
+    in the rating's own transaction (see analytics.rating_stats).
+    """
+    log = get_event_log(db_path)
+    log.forget("rollup", RATING_TOPIC)  # retired; its offset would hold back pruning
+    consumers = [
+        EventConsumer(log, "sentiment", RATING_TOPIC, analyze_rating_events),
+        EventConsumer(log, "adaptation", RATING_TOPIC, lambda events: adapt_rated_storyboards(events, db_path)),
+    ]
+    for consumer in consumers:
+        consumer.start()
+    logger.info(f"Started rating consumers: {[c.name for c in consumers]}")
+    return consumers
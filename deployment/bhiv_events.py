@@ -0,0 +1,281 @@
+# bhiv_events.py - Append-only event log with per-consumer offsets
+"""
+Ratings used to be processed inline: the request inserted the rating and then
+ran LM analysis, storyboard adaptation and rollups before answering. Now the
+request appends one event to the ``events`` table, in the same transaction
+as the rating row, and returns. Independent consumers - sentiment analysis
+and storyboard adaptation, see ``bhiv_core.start_rating_consumers`` - read
+the log in batches and commit their own offset afterwards:
+
+    events          id (the offset), topic, payload (JSON), created_at
+    event_offsets   (consumer, topic) -> last processed offset
+
+Rollups are no longer a consumer: the rating statistics are trigger-maintained
+in the rating's own transaction (``analytics.rating_stats``).
+
+Delivery is at-least-once: a consumer that crashes mid-batch sees that
+batch again, so handlers must be idempotent. A batch that keeps failing is
+skipped after ``MAX_ATTEMPTS`` so it cannot stall its consumer forever.
+
+Events every consumer of their topic has committed are deleted, at most
+every ``EVENT_PRUNE_INTERVAL`` seconds per topic, so the table only holds
+the backlog of the slowest consumer. An ``EventConsumer`` registers its
+offset row when it is created; one that is retired must be ``forget``-ed,
+or its offset holds back pruning for good.
+
+Consumers run on daemon threads. Appends from this process wake them up
+at once; appends from other processes are picked up by polling every
+``EVENT_POLL_INTERVAL`` seconds.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+EVENT_BATCH_SIZE = int(os.getenv("BHIV_EVENT_BATCH_SIZE", "100"))
+EVENT_POLL_INTERVAL = float(os.getenv("BHIV_EVENT_POLL_INTERVAL", "1.0"))
+EVENT_PRUNE_INTERVAL = float(os.getenv("BHIV_EVENT_PRUNE_INTERVAL", "60"))
+MAX_ATTEMPTS = 3
+
+RATING_TOPIC = "rating"
+
+
+class Event(NamedTuple):
+    offset: int
+    topic: str
+    payload: Dict[str, Any]
+    created_at: float
+
+
+def ensure_event_schema(conn: sqlite3.Connection) -> None:
+    conn.execute('''CREATE TABLE IF NOT EXISTS events
+                    (id INTEGER PRIMARY KEY AUTOINCREMENT, topic TEXT NOT NULL, payload TEXT NOT NULL,
+                     created_at REAL NOT NULL)''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_events_topic ON events (topic, id)")
+    conn.execute('''CREATE TABLE IF NOT EXISTS event_offsets
+                    (consumer TEXT NOT NULL, topic TEXT NOT NULL, position INTEGER NOT NULL,
+                     PRIMARY KEY (consumer, topic))''')
+
+
+class EventLog:
+    """The ``events`` table plus consumer offsets (see module docstring)"""
+
+    def __init__(self, db_path="data/meta.db"):
+        self.db_path = Path(db_path)
+        self._ready = False
+        self._lock = threading.Lock()
+        self._listeners: List[threading.Event] = []
+        self._pruned_at: Dict[str, float] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    with conn:
+                        ensure_event_schema(conn)
+                    self._ready = True
+        return conn
+
+    def append(self, topic: str, payload: Dict[str, Any], conn: Optional[sqlite3.Connection] = None) -> int:
+        """Append one event and return its offset
+
+        With ``conn`` the event joins the caller's open transaction (so it
+        commits, or not, together with the caller's own writes) and the caller
+        must call ``notify()`` after committing.
+        """
+        if conn is not None:
+            if not self._ready:
+                with self._lock:
+                    ensure_event_schema(conn)
+                    self._ready = True
+            return self._insert(conn, topic, payload)
+
+        conn = self._connect()
+        try:
+            with conn:
+                offset = self._insert(conn, topic, payload)
+        finally:
+            conn.close()
+        self.notify()
+        return offset
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, topic: str, payload: Dict[str, Any]) -> int:
+        cur = conn.execute("INSERT INTO events (topic, payload, created_at) VALUES (?, ?, ?)",
+                           (topic, json.dumps(payload), time.time()))
+        return cur.lastrowid
+
+    def read(self, topic: str, after: int = 0, limit: int = EVENT_BATCH_SIZE) -> List[Event]:
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT id, topic, payload, created_at FROM events "
+                                "WHERE topic = ? AND id > ? ORDER BY id LIMIT ?", (topic, after, limit)).fetchall()
+        finally:
+            conn.close()
+        return [Event(offset, topic, json.loads(payload), created_at) for offset, topic, payload, created_at in rows]
+
+    def committed(self, consumer: str, topic: str) -> int:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT position FROM event_offsets WHERE consumer = ? AND topic = ?",
+                               (consumer, topic)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else 0
+
+    def register(self, consumer: str, topic: str) -> None:
+        """Record ``consumer`` before its first commit, so pruning waits for it"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR IGNORE INTO event_offsets (consumer, topic, position) VALUES (?, ?, 0)",
+                             (consumer, topic))
+        finally:
+            conn.close()
+
+    def forget(self, consumer: str, topic: str) -> None:
+        """Drop a retired consumer's offset so it no longer holds back pruning"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM event_offsets WHERE consumer = ? AND topic = ?", (consumer, topic))
+        finally:
+            conn.close()
+
+    def commit(self, consumer: str, topic: str, offset: int) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute('''INSERT INTO event_offsets (consumer, topic, position) VALUES (?, ?, ?)
+                                ON CONFLICT(consumer, topic) DO UPDATE SET position = MAX(position, excluded.position)''',
+                             (consumer, topic, offset))
+        finally:
+            conn.close()
+        if time.monotonic() - self._pruned_at.get(topic, float("-inf")) >= EVENT_PRUNE_INTERVAL:
+            self.prune(topic)
+
+    def prune(self, topic: str) -> int:
+        """Delete the events of ``topic`` that every registered consumer has committed; returns how many"""
+        self._pruned_at[topic] = time.monotonic()
+        conn = self._connect()
+        try:
+            with conn:
+                return conn.execute('''DELETE FROM events WHERE topic = ?
+                                       AND id <= (SELECT MIN(position) FROM event_offsets WHERE topic = ?)''',
+                                    (topic, topic)).rowcount
+        finally:
+            conn.close()
+
+    def lag(self, consumer: str, topic: str) -> int:
+        """Offsets between ``consumer``'s position and the topic's newest event
+
+        Read from the (topic, id) index instead of counting rows. Offsets are
+        shared by all topics, so with several topics this is an upper bound.
+        """
+        after = self.committed(consumer, topic)
+        conn = self._connect()
+        try:
+            newest = conn.execute("SELECT MAX(id) FROM events WHERE topic = ?", (topic,)).fetchone()[0]
+        finally:
+            conn.close()
+        return max(0, (newest or 0) - after)
+
+    def subscribe(self) -> threading.Event:
+        wake = threading.Event()
+        with self._lock:
+            self._listeners.append(wake)
+        return wake
+
+    def notify(self) -> None:
+        """Wake this process's consumers (called after an append commits)"""
+        for wake in list(self._listeners):
+            wake.set()
+
+
+class EventConsumer:
+    """Feeds batches of one topic to ``handler`` and commits the offset after each batch"""
+
+    def __init__(self, log: EventLog, name: str, topic: str, handler: Callable[[List[Event]], Any],
+                 batch_size: int = EVENT_BATCH_SIZE, poll_interval: float = EVENT_POLL_INTERVAL):
+        self.log = log
+        self.name = name
+        self.topic = topic
+        self.handler = handler
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wake = log.subscribe()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._failures = 0
+        log.register(name, topic)
+
+    def poll_once(self) -> int:
+        """Process at most one batch; returns the number of events handled"""
+        batch = self.log.read(self.topic, self.log.committed(self.name, self.topic), self.batch_size)
+        if not batch:
+            return 0
+        try:
+            self.handler(batch)
+        except Exception as e:
+            self._failures += 1
+            if self._failures < MAX_ATTEMPTS:
+                logger.warning(f"Consumer {self.name} failed on events {batch[0].offset}-{batch[-1].offset} "
+                               f"(attempt {self._failures}): {e}")
+                raise
+            logger.error(f"Consumer {self.name} skipping events {batch[0].offset}-{batch[-1].offset} "
+                         f"after {self._failures} attempts: {e}")
+        self._failures = 0
+        self.log.commit(self.name, self.topic, batch[-1].offset)
+        return len(batch)
+
+    def drain(self) -> int:
+        """Process everything currently in the log (used by tests and one-off runs)"""
+        total = 0
+        while True:
+            handled = self.poll_once()
+            total += handled
+            if handled < self.batch_size:
+                return total
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    if self.poll_once() == self.batch_size:
+                        continue
+                except Exception:
+                    pass  # already logged; retried after the poll interval
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+        self._thread = threading.Thread(target=loop, name=f"bhiv-consumer-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+_logs: Dict[str, EventLog] = {}
+
+
+def get_event_log(db_path="data/meta.db") -> EventLog:
+    key = str(db_path)
+    log = _logs.get(key)
+    if log is None:
+        log = _logs.setdefault(key, EventLog(db_path))
+    return log
@@ -0,0 +1,383 @@
+# bhiv_tracing.py - Lightweight span tracer with JSONL export and an opt-in sampling profiler
+"""
+Spans nest through a context variable, so they follow a request across
+``await`` points and (via ``backend.concurrency``) into the worker pools:
+
+    with span("upload.render", video_id=vid):
+        ...
+
+    @traced("bucket.save_script")
+    def save_script(...): ...
+
+Tracing is off unless ``BHIV_TRACING=1``, and then only ``BHIV_TRACE_SAMPLE``
+of new traces are recorded. Finished spans are queued and a background
+thread appends them to ``BHIV_TRACE_FILE`` as one OTLP/JSON span per line,
+so request threads never touch the disk; the file is rotated to ``.1``,
+``.2``... once it reaches ``BHIV_TRACE_MAX_BYTES``. A request carrying ``X-BHIV-Profile: <BHIV_PROFILE_TOKEN>`` is also
+sampled by a stack profiler that writes a collapsed-stack file (one
+``frame;frame;frame count`` line per stack) for flamegraph.pl / speedscope.
+"""
+import atexit
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from bhiv_metrics import route_template
+
+TRACING_ENABLED = os.getenv("BHIV_TRACING", "0") == "1"
+TRACE_FILE = Path(os.getenv("BHIV_TRACE_FILE", "data/traces/spans.jsonl"))
+TRACE_SAMPLE_RATE = float(os.getenv("BHIV_TRACE_SAMPLE", "0.01"))
+TRACE_MAX_BYTES = int(os.getenv("BHIV_TRACE_MAX_BYTES", str(64 * 1024 * 1024)))
+TRACE_BACKUPS = int(os.getenv("BHIV_TRACE_BACKUPS", "3"))
+PROFILE_DIR = Path(os.getenv("BHIV_PROFILE_DIR", "data/profiles"))
+PROFILE_TOKEN = os.getenv("BHIV_PROFILE_TOKEN", "")
+PROFILE_INTERVAL = float(os.getenv("BHIV_PROFILE_INTERVAL", "0.005"))
+EXPORT_BATCH = 64
+EXPORT_INTERVAL = 1.0  # seconds a partial batch may wait for the writer
+EXPORT_QUEUE_LIMIT = 10000  # spans buffered before new ones are dropped
+SERVICE_NAME = "bhiv-gurukul-platform"
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("bhiv_current_span", default=None)
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attributes", "start_ns", "end_ns",
+                 "status", "sampled")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool, attributes: Dict):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.status = "OK"
+        self.sampled = sampled
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_otlp(self) -> Dict:
+        """OTLP/JSON span representation"""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": 1 if self.status == "OK" else 2},
+            "resource": {"service.name": SERVICE_NAME},
+        }
+
+
+def _otlp_value(value: Any) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class JsonlSpanExporter:
+    """Queues finished spans; a writer thread appends them to a rotating JSONL file in batches"""
+
+    def __init__(self, path: Path = TRACE_FILE, batch_size: int = EXPORT_BATCH,
+                 max_bytes: int = TRACE_MAX_BYTES, backups: int = TRACE_BACKUPS,
+                 interval: float = EXPORT_INTERVAL, queue_limit: int = EXPORT_QUEUE_LIMIT):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.interval = interval
+        self.queue_limit = queue_limit
+        self.dropped = 0
+        self._buffer: List[Span] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def export(self, span: Span) -> None:
+        """Queue a span; serialization and file I/O happen on the writer thread"""
+        with self._lock:
+            if len(self._buffer) >= self.queue_limit:
+                self.dropped += 1  # the writer is stuck (disk full?); never grow without bound
+                return
+            self._buffer.append(span)
+            full = len(self._buffer) >= self.batch_size
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="bhiv-trace-exporter", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+        if full:
+            self._wake.set()
+
+    def flush(self) -> None:
+        """Write everything queued so far (called by the writer, at exit, and by tests)"""
+        with self._lock:
+            spans, self._buffer = self._buffer, []
+        if spans:
+            self._write([json.dumps(span.to_otlp(), separators=(",", ":")) for span in spans])
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def _rotate(self) -> None:
+        for i in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{i}")
+            if older.exists():
+                os.replace(older, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backups > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+
+    def _write(self, lines: List[str]) -> None:
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        with self._write_lock:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    if self.path.stat().st_size + len(data) > self.max_bytes:
+                        self._rotate()
+                except FileNotFoundError:
+                    pass
+                with open(self.path, "ab") as f:
+                    f.write(data)
+            except OSError:
+                pass  # tracing must never break the request
+
+
+class SamplingProfiler:
+    """Samples the stacks of the threads currently working for one trace.
+
+    Threads register themselves while they run a span of a profiled trace,
+    so idle pool workers and unrelated requests stay out of the flame graph.
+    """
+
+    def __init__(self, trace_id: str, interval: float = PROFILE_INTERVAL):
+        self.trace_id = trace_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.threads: Counter = Counter()  # thread ident -> active span depth
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"bhiv-profiler-{trace_id[:8]}", daemon=True)
+
+    def enter(self, ident: int) -> None:
+        with self._lock:
+            self.threads[ident] += 1
+
+    def exit(self, ident: int) -> None:
+        with self._lock:
+            self.threads[ident] -= 1
+            if self.threads[ident] <= 0:
+                del self.threads[ident]
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def _run(self) -> None:
+        names = {}
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                idents = list(self.threads)
+            if not idents:
+                continue
+            frames = sys._current_frames()
+            for ident in idents:
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                if ident not in names:
+                    names[ident] = next((t.name for t in threading.enumerate() if t.ident == ident), str(ident))
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names[ident])
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self, directory: Optional[Path] = None) -> Optional[Path]:
+        """Stop sampling and write the collapsed stacks; returns the file path"""
+        self._stop.set()
+        self._thread.join(timeout=1)
+        if not self.stacks:
+            return None
+        directory = Path(directory or PROFILE_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        out = directory / f"{self.trace_id}.folded"
+        out.write_text("".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common()), encoding="utf-8")
+        return out
+
+
+class Tracer:
+    def __init__(self, exporter: Optional[JsonlSpanExporter] = None, sample_rate: float = TRACE_SAMPLE_RATE,
+                 enabled: bool = TRACING_ENABLED):
+        self.exporter = exporter or JsonlSpanExporter()
+        self.sample_rate = sample_rate
+        self.enabled = enabled
+        self._profilers: Dict[str, SamplingProfiler] = {}
+
+    @contextlib.contextmanager
+    def span(self, name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None, **attributes):
+        """Open a child of the current span (or a new root / remote-parented span)"""
+        if not self.enabled:
+            yield None
+            return
+
+        parent: Optional[Span] = _current_span.get()
+        if trace_id is not None:
+            sampled = True
+        elif parent is not None:
+            trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+        else:
+            trace_id, sampled = secrets.token_hex(16), random.random() < self.sample_rate
+
+        current = Span(name, trace_id, parent_id, sampled, attributes)
+        token = _current_span.set(current)
+        profiler = self._profilers.get(trace_id)
+        ident = threading.get_ident()
+        if profiler is not None:
+            profiler.enter(ident)
+        try:
+            yield current
+        except BaseException as e:
+            current.status = "ERROR"
+            current.attributes["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            current.end_ns = time.time_ns()
+            if profiler is not None:
+                profiler.exit(ident)
+            _current_span.reset(token)
+            if current.sampled:
+                self.exporter.export(current)
+
+    def start_profiling(self, trace_id: str) -> SamplingProfiler:
+        profiler = self._profilers[trace_id] = SamplingProfiler(trace_id)
+        profiler.start()
+        return profiler
+
+    def stop_profiling(self, trace_id: str) -> Optional[Path]:
+        profiler = self._profilers.pop(trace_id, None)
+        return profiler.stop() if profiler is not None else None
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def span(name: str, **attributes):
+    """Span that starts a new trace when none is active"""
+    return _tracer.span(name, **attributes)
+
+
+def child_span(name: str, **attributes):
+    """Span only inside an active trace; a no-op otherwise (helpers called outside requests)"""
+    if _current_span.get() is None:
+        return contextlib.nullcontext()
+    return _tracer.span(name, **attributes)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def traced(name: Optional[str] = None):
+    """Decorator wrapping a sync or async function in a child span (see ``child_span``)"""
+    def decorate(func):
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _current_span.get() is None:
+                    return await func(*args, **kwargs)
+                with _tracer.span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with _tracer.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _parse_traceparent(value: str):
+    """W3C traceparent ``00-<trace_id>-<parent_id>-<flags>`` -> (trace_id, parent_id)"""
+    parts = value.split("-")
+    if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16:
+        return parts[1], parts[2]
+    return None, None
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a root span per request.
+
+    Honours an incoming ``traceparent`` header, returns ``X-Trace-Id``, and
+    profiles the request when ``X-BHIV-Profile`` matches ``BHIV_PROFILE_TOKEN``.
+    """
+
+    def __init__(self, app, tracer: Optional[Tracer] = None):
+        self.app = app
+        self.tracer = tracer or _tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or ())
+        trace_id, parent_id = _parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        profile = bool(PROFILE_TOKEN) and headers.get(b"x-bhiv-profile", b"").decode("latin-1") == PROFILE_TOKEN
+
+        if profile:
+            trace_id = trace_id or secrets.token_hex(16)
+            self.tracer.start_profiling(trace_id)
+
+        with self.tracer.span("http.request", trace_id=trace_id, parent_id=parent_id,
+                              **{"http.method": scope["method"], "http.target": scope["path"]}) as root:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    root.set_attribute("http.status_code", message["status"])
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"x-trace-id", root.trace_id.encode())]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                root.name = f"{scope['method']} {route_template(scope)}"
+                if profile:
+                    profile_path = self.tracer.stop_profiling(root.trace_id)
+                    if profile_path is not None:
+                        root.set_attribute("profile.file", str(profile_path))
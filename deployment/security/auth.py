@@ -1,14 +1,25 @@
 # security/auth.py - Professional Authentication & Authorization
 import os
+import asyncio
+import calendar
+import math
 import jwt
 import bcrypt
 from datetime import datetime, timedelta
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 from fastapi import HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
+from security.store import AuthStore, UserExistsError
+from backend.concurrency import run_db
+from bhiv_metrics import CallbackGauge, get_registry
 import secrets
+import hashlib
+import threading
+import time
 import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +28,16 @@ SECRET_KEY = os.getenv("JWT_SECRET_KEY", secrets.token_urlsafe(32))
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
+TOKEN_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "10000"))
+BCRYPT_POOL_SIZE = int(os.getenv("BCRYPT_POOL_SIZE", str(min(4, os.cpu_count() or 2))))
+BCRYPT_MAX_QUEUE = int(os.getenv("BCRYPT_MAX_QUEUE", "64"))
+LOGIN_FREE_ATTEMPTS = int(os.getenv("LOGIN_FREE_ATTEMPTS", "5"))
+LOGIN_MAX_LOCKOUT_SECONDS = float(os.getenv("LOGIN_MAX_LOCKOUT_SECONDS", "300"))
+# Per-account backoff is softer so nobody can lock a known username (e.g. admin) out for long
+LOGIN_ACCOUNT_FREE_ATTEMPTS = int(os.getenv("LOGIN_ACCOUNT_FREE_ATTEMPTS", "20"))
+LOGIN_ACCOUNT_MAX_DELAY_SECONDS = float(os.getenv("LOGIN_ACCOUNT_MAX_DELAY_SECONDS", "5"))
+USER_VIEW_TTL_SECONDS = float(os.getenv("AUTH_USER_CACHE_TTL", "30"))
+USER_VIEW_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
 
 # Security scheme
 security = HTTPBearer()
@@ -50,21 +71,261 @@ class UserLogin(BaseModel):
     username: str
     password: str
 
+class VerifiedTokenCache:
+    """Bounded LRU of already-verified access tokens.
+    
+    Keyed by the SHA-256 digest of the token (raw tokens are never held as
+    keys) and honouring each token's own ``exp``, so a cached token stops
+    being accepted at exactly the moment ``jwt.decode`` would reject it.
+    """
+    
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_purge = 0.0
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+    
+    def get(self, token: str) -> Optional[TokenData]:
+        key = self._digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, token_data = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return token_data
+    
+    def put(self, token: str, token_data: TokenData, expires_at: float) -> None:
+        if self.max_size <= 0:
+            return
+        key = self._digest(token)
+        now = time.time()
+        with self._lock:
+            if now >= self._next_purge:
+                # Periodic sweep so expired tokens don't hold slots until LRU reaches them
+                for stale in [k for k, (exp, _) in self._entries.items() if exp <= now]:
+                    del self._entries[stale]
+                self._next_purge = now + 60
+            self._entries[key] = (expires_at, token_data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+class PasswordHasher:
+    """Dedicated, bounded pool for bcrypt work.
+    
+    bcrypt releases the GIL, so a small thread pool uses real cores while the
+    event loop keeps serving other requests. Work beyond ``workers +
+    max_queue`` outstanding jobs is rejected with 503 instead of queueing
+    without bound.
+    """
+    
+    def __init__(self, workers: int = BCRYPT_POOL_SIZE, max_queue: int = BCRYPT_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bhiv-bcrypt")
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self._wait_total = 0.0
+        self._run_total = 0.0
+    
+    @property
+    def queue_depth(self) -> int:
+        """Jobs waiting for a free worker"""
+        return max(0, self.pending - self.workers)
+    
+    def pressure(self) -> float:
+        """Queue fill ratio in [0, 1]"""
+        if self.max_queue <= 0:
+            return 0.0
+        return min(1.0, self.queue_depth / self.max_queue)
+    
+    async def _submit(self, func, *args):
+        with self._lock:
+            if self.pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Authentication service busy, retry shortly",
+                    headers={"Retry-After": "1"},
+                )
+            self.pending += 1
+            self.max_depth = max(self.max_depth, self.queue_depth)
+        
+        enqueued = time.perf_counter()
+        
+        def job():
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self._wait_total += started - enqueued
+                    self._run_total += finished - started
+        
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, job)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+    
+    async def hash(self, password: str) -> str:
+        return await self._submit(_bcrypt_hash, password)
+    
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._submit(_bcrypt_verify, password, hashed_password)
+    
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            done = self.completed or 1
+            return {
+                "workers": self.workers,
+                "in_flight": min(self.pending, self.workers),
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_depth,
+                "queue_limit": self.max_queue,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self._wait_total / done * 1000, 3),
+                "avg_run_ms": round(self._run_total / done * 1000, 3),
+            }
+    
+    def shutdown(self, wait: bool = True) -> None:
+        self.executor.shutdown(wait=wait)
+
+class LoginThrottle:
+    """Per-IP and per-username backoff for failed logins, checked before bcrypt runs.
+    
+    Each client IP gets ``free_attempts`` failures; after that every further
+    failure doubles its lockout up to ``max_delay``. Each username gets a
+    softer backoff (``account_free_attempts``, capped at
+    ``account_max_delay``): enough to slow a guessing campaign spread over
+    many IPs, but a stranger sending bad passwords for someone else's
+    account cannot lock its owner out for more than a few seconds. The
+    allowances shrink as the bcrypt queue fills, so bursts are shed earlier
+    when hashing capacity is scarce. Failures are forgotten after ``window``
+    seconds of quiet, and the table is bounded (LRU) so a spray of random
+    usernames cannot grow it.
+    """
+    
+    def __init__(self, free_attempts: int = LOGIN_FREE_ATTEMPTS, base_delay: float = 1.0,
+                 max_delay: float = LOGIN_MAX_LOCKOUT_SECONDS, window: float = 900.0, max_keys: int = 100000,
+                 account_free_attempts: int = LOGIN_ACCOUNT_FREE_ATTEMPTS,
+                 account_max_delay: float = LOGIN_ACCOUNT_MAX_DELAY_SECONDS):
+        self.free_attempts = free_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.window = window
+        self.max_keys = max_keys
+        self.account_free_attempts = account_free_attempts
+        self.account_max_delay = account_max_delay
+        self._failures: "OrderedDict[str, list]" = OrderedDict()  # key -> [count, last_failure]
+        self._lock = threading.Lock()
+        self.rejected = 0
+    
+    def _limits(self, client_ip: str, username: str) -> List[Tuple[str, int, float]]:
+        """(key, free attempts, max delay) for each counter an attempt is charged to"""
+        return [
+            (f"ip:{client_ip}", self.free_attempts, self.max_delay),
+            (f"user:{username.strip().lower()}", self.account_free_attempts, self.account_max_delay),
+        ]
+    
+    def retry_after(self, client_ip: str, username: str, pressure: float = 0.0) -> float:
+        """Seconds the caller must wait, or 0 if the attempt may proceed"""
+        now = time.time()
+        wait = 0.0
+        with self._lock:
+            for key, free_attempts, max_delay in self._limits(client_ip, username):
+                entry = self._failures.get(key)
+                if entry is None:
+                    continue
+                count, last_failure = entry
+                if now - last_failure > self.window:
+                    del self._failures[key]
+                    continue
+                allowed = max(1, int(free_attempts * (1.0 - pressure)))
+                if count >= allowed:
+                    delay = min(max_delay, self.base_delay * 2 ** (count - allowed))
+                    wait = max(wait, last_failure + delay - now)
+            if wait > 0:
+                self.rejected += 1
+        return max(0.0, wait)
+    
+    def record_failure(self, client_ip: str, username: str) -> None:
+        now = time.time()
+        with self._lock:
+            for key, _, _ in self._limits(client_ip, username):
+                entry = self._failures.get(key)
+                if entry is None or now - entry[1] > self.window:
+                    entry = [0, now]
+                entry[0] += 1
+                entry[1] = now
+                self._failures[key] = entry
+                self._failures.move_to_end(key)
+            while len(self._failures) > self.max_keys:
+                self._failures.popitem(last=False)
+    
+    def record_success(self, client_ip: str, username: str) -> None:
+        with self._lock:
+            for key, _, _ in self._limits(client_ip, username):
+                self._failures.pop(key, None)
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"tracked_keys": len(self._failures), "rejected": self.rejected}
+
+def _bcrypt_hash(password: str) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+def _bcrypt_verify(password: str, hashed_password: str) -> bool:
+    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+
 class AuthManager:
     """Professional authentication and authorization manager"""
     
-    def __init__(self):
-        self.users_db = {}  # In production, use proper database
-        self.refresh_tokens = {}  # Store refresh tokens
+    def __init__(self, store: Optional[AuthStore] = None):
+        self.store = store or AuthStore()  # Users and refresh tokens, shared across workers
+        self.token_cache = VerifiedTokenCache()
+        self.password_hasher = PasswordHasher()
+        self.login_throttle = LoginThrottle()
+        # Per-process public User objects (bounded LRU), refreshed from the store after a short TTL
+        self._user_views: "OrderedDict[str, Tuple[float, User]]" = OrderedDict()
+        self._user_views_lock = threading.Lock()
         self._create_default_admin()
+        # The refresh-token purger is started by the application (see backend/server.py startup)
     
     def _create_default_admin(self):
         """Create default admin user"""
         admin_password = os.getenv("ADMIN_PASSWORD", "admin123")
         
-        if "admin" not in self.users_db:
+        if self.store.get_user_by_username("admin") is None:
             hashed_password = self.hash_password(admin_password)
-            self.users_db["admin"] = {
+            created = self.store.add_user({
                 "id": "admin",
                 "username": "admin",
                 "email": "admin@bhiv.platform",
@@ -73,17 +334,25 @@ class AuthManager:
                 "is_active": True,
                 "created_at": datetime.now(),
                 "last_login": None
-            }
-            logger.info("Default admin user created")
+            }, ignore_existing=True)  # another worker may have won the race
+            if created:
+                logger.info("Default admin user created")
     
     def hash_password(self, password: str) -> str:
-        """Hash password using bcrypt"""
-        salt = bcrypt.gensalt()
-        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+        """Hash password using bcrypt (blocking; use hash_password_async from handlers)"""
+        return _bcrypt_hash(password)
     
     def verify_password(self, password: str, hashed_password: str) -> bool:
-        """Verify password against hash"""
-        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+        """Verify password against hash (blocking; use verify_password_async from handlers)"""
+        return _bcrypt_verify(password, hashed_password)
+    
+    async def hash_password_async(self, password: str) -> str:
+        """Hash password on the bcrypt pool"""
+        return await self.password_hasher.hash(password)
+    
+    async def verify_password_async(self, password: str, hashed_password: str) -> bool:
+        """Verify password on the bcrypt pool"""
+        return await self.password_hasher.verify(password, hashed_password)
     
     def create_access_token(self, data: Dict, expires_delta: Optional[timedelta] = None) -> str:
         """Create JWT access token"""
@@ -105,16 +374,31 @@ class AuthManager:
         to_encode = {
             "user_id": user_id,
             "exp": expire,
-            "type": "refresh"
+            "type": "refresh",
+            "jti": secrets.token_urlsafe(12)
         }
         
         token = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-        self.refresh_tokens[token] = user_id
+        self.store.save_refresh_token(token, user_id, calendar.timegm(expire.utctimetuple()))
         
         return token
     
+    def _refresh_user_view(self, user_dict: Dict) -> User:
+        """Rebuild the cached public User after its record changed"""
+        user = User(**{k: v for k, v in user_dict.items() if k != "password_hash"})
+        with self._user_views_lock:
+            self._user_views[user.username] = (time.monotonic() + USER_VIEW_TTL_SECONDS, user)
+            self._user_views.move_to_end(user.username)
+            while len(self._user_views) > USER_VIEW_CACHE_SIZE:
+                self._user_views.popitem(last=False)
+        return user
+    
     def verify_token(self, token: str) -> TokenData:
-        """Verify and decode JWT token"""
+        """Verify and decode JWT token (verified tokens are cached until they expire)"""
+        cached = self.token_cache.get(token)
+        if cached is not None:
+            return cached
+        
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
             
@@ -129,7 +413,9 @@ class AuthManager:
                     headers={"WWW-Authenticate": "Bearer"},
                 )
             
-            return TokenData(username=username, user_id=user_id, roles=roles)
+            token_data = TokenData(username=username, user_id=user_id, roles=roles)
+            self.token_cache.put(token, token_data, float(payload["exp"]))
+            return token_data
             
         except jwt.ExpiredSignatureError:
             raise HTTPException(
@@ -144,9 +430,16 @@ class AuthManager:
                 headers={"WWW-Authenticate": "Bearer"},
             )
     
+    def _mark_login(self, user: Dict) -> Dict:
+        """Update last login"""
+        user["last_login"] = datetime.now()
+        self.store.update_last_login(user["id"], user["last_login"])
+        self._refresh_user_view(user)
+        return user
+    
     def authenticate_user(self, username: str, password: str) -> Optional[Dict]:
         """Authenticate user credentials"""
-        user = self.users_db.get(username)
+        user = self.store.get_user_by_username(username)
         
         if not user:
             return None
@@ -157,21 +450,44 @@ class AuthManager:
         if not self.verify_password(password, user["password_hash"]):
             return None
         
-        # Update last login
-        user["last_login"] = datetime.now()
+        return self._mark_login(user)
+    
+    async def authenticate_user_async(self, username: str, password: str) -> Optional[Dict]:
+        """Authenticate user credentials with bcrypt on the hashing pool and SQLite on the DB pool"""
+        user = await run_db(self.store.get_user_by_username, username)
         
-        return user
+        if not user or not user["is_active"]:
+            return None
+        
+        if not await self.verify_password_async(password, user["password_hash"]):
+            return None
+        
+        return await run_db(self._mark_login, user)
+    
+    @staticmethod
+    def _username_taken() -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username already exists"
+        )
+    
+    def _check_username_free(self, username: str) -> None:
+        if self.store.get_user_by_username(username) is not None:
+            raise self._username_taken()
     
     def create_user(self, user_data: UserCreate) -> User:
         """Create new user"""
-        if user_data.username in self.users_db:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username already exists"
-            )
-        
+        self._check_username_free(user_data.username)
+        return self._store_user(user_data, self.hash_password(user_data.password))
+    
+    async def create_user_async(self, user_data: UserCreate) -> User:
+        """Create new user, hashing the password on the bcrypt pool"""
+        await run_db(self._check_username_free, user_data.username)
+        hashed_password = await self.hash_password_async(user_data.password)
+        return await run_db(self._store_user, user_data, hashed_password)
+    
+    def _store_user(self, user_data: UserCreate, hashed_password: str) -> User:
         user_id = secrets.token_urlsafe(16)
-        hashed_password = self.hash_password(user_data.password)
         
         user_dict = {
             "id": user_id,
@@ -184,18 +500,42 @@ class AuthManager:
             "last_login": None
         }
         
-        self.users_db[user_data.username] = user_dict
+        try:
+            # The UNIQUE index settles races between requests and workers
+            self.store.add_user(user_dict)
+        except UserExistsError:
+            raise self._username_taken()
         
-        return User(**{k: v for k, v in user_dict.items() if k != "password_hash"})
+        return self._refresh_user_view(user_dict)
+    
+    def get_cached_user(self, username: str) -> Optional[User]:
+        """The cached User view if it is still fresh; never touches the store"""
+        with self._user_views_lock:
+            entry = self._user_views.get(username)
+            if entry is not None and entry[0] > time.monotonic():
+                self._user_views.move_to_end(username)
+                return entry[1]
+        return None
     
     def get_user(self, username: str) -> Optional[User]:
-        """Get user by username"""
-        user_dict = self.users_db.get(username)
+        """Get user by username (cached for a few seconds, treat as read-only)"""
+        user = self.get_cached_user(username)
+        if user is not None:
+            return user
         
-        if not user_dict:
+        user_dict = self.store.get_user_by_username(username)
+        if user_dict is None:
+            with self._user_views_lock:
+                self._user_views.pop(username, None)
             return None
-        
-        return User(**{k: v for k, v in user_dict.items() if k != "password_hash"})
+        return self._refresh_user_view(user_dict)
+    
+    def list_users(self) -> List[Dict]:
+        """All users without password hashes"""
+        return [
+            {k: v for k, v in user.items() if k != "password_hash"}
+            for user in self.store.list_users()
+        ]
     
     def login(self, login_data: UserLogin) -> Dict:
         """User login"""
@@ -208,6 +548,34 @@ class AuthManager:
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
+        return self._issue_tokens(user)
+    
+    async def login_async(self, login_data: UserLogin, client_ip: str = "unknown") -> Dict:
+        """User login for async handlers: throttled first, bcrypt off the event loop"""
+        retry_after = self.login_throttle.retry_after(
+            client_ip, login_data.username, self.password_hasher.pressure()
+        )
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+        
+        user = await self.authenticate_user_async(login_data.username, login_data.password)
+        
+        if not user:
+            self.login_throttle.record_failure(client_ip, login_data.username)
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Incorrect username or password",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        
+        self.login_throttle.record_success(client_ip, login_data.username)
+        return await run_db(self._issue_tokens, user)  # stores the refresh token
+    
+    def _issue_tokens(self, user: Dict) -> Dict:
         # Create tokens
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = self.create_access_token(
@@ -236,7 +604,7 @@ class AuthManager:
     
     def refresh_access_token(self, refresh_token: str) -> Dict:
         """Refresh access token"""
-        if refresh_token not in self.refresh_tokens:
+        if self.store.get_refresh_token_user(refresh_token) is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid refresh token"
@@ -246,12 +614,8 @@ class AuthManager:
             payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
             user_id = payload.get("user_id")
             
-            # Find user by ID
-            user = None
-            for u in self.users_db.values():
-                if u["id"] == user_id:
-                    user = u
-                    break
+            # Find user by ID (indexed lookup)
+            user = self.store.get_user_by_id(user_id)
             
             if not user or not user["is_active"]:
                 raise HTTPException(
@@ -278,7 +642,7 @@ class AuthManager:
             
         except jwt.ExpiredSignatureError:
             # Remove expired refresh token
-            del self.refresh_tokens[refresh_token]
+            self.store.delete_refresh_token(refresh_token)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Refresh token expired"
@@ -288,15 +652,41 @@ class AuthManager:
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid refresh token"
             )
+    
+    async def refresh_access_token_async(self, refresh_token: str) -> Dict:
+        """Refresh access token with the store lookups on the DB pool"""
+        return await run_db(self.refresh_access_token, refresh_token)
 
-# Global auth manager instance
-auth_manager = AuthManager()
+# Global auth manager instance, created on first use (the server does so at startup),
+# so importing this module neither creates data/auth.db nor hashes the admin password
+_auth_manager: Optional[AuthManager] = None
+_auth_manager_lock = threading.Lock()
+
+def get_auth_manager() -> AuthManager:
+    """Get auth manager instance"""
+    global _auth_manager
+    if _auth_manager is None:
+        with _auth_manager_lock:
+            if _auth_manager is None:
+                _auth_manager = AuthManager()
+    return _auth_manager
+
+def _bcrypt_pool_readings() -> Dict[Tuple[str, ...], float]:
+    if _auth_manager is None:  # scraping must not create the manager
+        return {}
+    return {(name,): value for name, value in _auth_manager.password_hasher.stats().items()}
+
+get_registry().register(CallbackGauge(
+    "bhiv_auth_bcrypt_pool", "bcrypt pool queue depth and counters", _bcrypt_pool_readings, ("stat",)))
 
 # Dependency functions
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
-    """Get current authenticated user"""
+    """Get current authenticated user (store lookups only on a view-cache miss, on the DB pool)"""
+    auth_manager = get_auth_manager()
     token_data = auth_manager.verify_token(credentials.credentials)
-    user = auth_manager.get_user(token_data.username)
+    user = auth_manager.get_cached_user(token_data.username)
+    if user is None:
+        user = await run_db(auth_manager.get_user, token_data.username)
     
     if user is None:
         raise HTTPException(
@@ -317,14 +707,37 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
     
     return current_user
 
-def require_roles(required_roles: List[str]):
-    """Decorator to require specific roles"""
-    def role_checker(current_user: User = Depends(get_current_active_user)) -> User:
-        if not any(role in current_user.roles for role in required_roles):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Insufficient permissions"
-            )
+async def get_token_data(credentials: HTTPAuthorizationCredentials = Depends(security)) -> TokenData:
+    """Get verified token claims without looking the user up"""
+    return get_auth_manager().verify_token(credentials.credentials)
+
+def require_roles(required_roles: List[str], stateless: bool = False):
+    """Decorator to require specific roles
+    
+    With ``stateless=True`` the check runs on the token claims alone and the
+    dependency returns ``TokenData`` instead of ``User``: no user lookup and no
+    active-user check, so a deactivated account keeps access until its
+    access token expires.
+    """
+    allowed = frozenset(required_roles)
+    
+    def forbidden():
+        return HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Insufficient permissions"
+        )
+    
+    if stateless:
+        async def claims_checker(token_data: TokenData = Depends(get_token_data)) -> TokenData:
+            if allowed.isdisjoint(token_data.roles):
+                raise forbidden()
+            return token_data
+        
+        return claims_checker
+    
+    async def role_checker(current_user: User = Depends(get_current_active_user)) -> User:
+        if allowed.isdisjoint(current_user.roles):
+            raise forbidden()
         return current_user
     
     return role_checker
@@ -333,6 +746,9 @@ def require_roles(required_roles: List[str]):
 require_admin = require_roles([UserRole.ADMIN])
 require_user = require_roles([UserRole.USER, UserRole.ADMIN])
 require_viewer = require_roles([UserRole.VIEWER, UserRole.USER, UserRole.ADMIN])
+# Claims-only variants for high-QPS endpoints
+require_user_claims = require_roles([UserRole.USER, UserRole.ADMIN], stateless=True)
+require_viewer_claims = require_roles([UserRole.VIEWER, UserRole.USER, UserRole.ADMIN], stateless=True)
 
 class SecurityValidator:
     """Security validation utilities"""
@@ -383,7 +799,3 @@ class SecurityValidator:
             sanitized = sanitized.replace(pattern.upper(), "")
         
         return sanitized.strip()
-
-def get_auth_manager() -> AuthManager:
-    """Get auth manager instance"""
-    return auth_manager
\ No newline at end of file
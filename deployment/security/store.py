@@ -0,0 +1,196 @@
+# security/store.py - Persistent user and refresh-token store
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+AUTH_DB_PATH = os.getenv("AUTH_DB_PATH", "data/auth.db")
+PURGE_INTERVAL_SECONDS = float(os.getenv("AUTH_PURGE_INTERVAL", "300"))
+
+
+class UserExistsError(Exception):
+    """Raised when a username is already taken"""
+
+
+def hash_token(token: str) -> str:
+    """Refresh tokens are stored as SHA-256 digests, never in clear"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class AuthStore:
+    """SQLite-backed users and refresh tokens.
+
+    Shared by every worker process through the database file (WAL mode), so
+    accounts and refresh tokens survive restarts and are visible to all
+    workers. Users are indexed by id (primary key) and username (unique);
+    refresh tokens by digest (primary key), user id and expiry, so lookups
+    and the expiry purge never scan the whole table.
+    """
+
+    def __init__(self, db_path=AUTH_DB_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._purger: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA busy_timeout = 30000")
+        return conn
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """A connection as one transaction, committed (or rolled back) and then closed"""
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_schema(self) -> None:
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute('''CREATE TABLE IF NOT EXISTS users
+                            (id TEXT PRIMARY KEY, username TEXT NOT NULL UNIQUE, email TEXT,
+                             password_hash TEXT NOT NULL, roles TEXT NOT NULL,
+                             is_active INTEGER NOT NULL DEFAULT 1,
+                             created_at TEXT NOT NULL, last_login TEXT)''')
+            conn.execute('''CREATE TABLE IF NOT EXISTS refresh_tokens
+                            (token_hash TEXT PRIMARY KEY, user_id TEXT NOT NULL,
+                             expires_at REAL NOT NULL, created_at REAL NOT NULL)''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_refresh_tokens_expires ON refresh_tokens(expires_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user ON refresh_tokens(user_id)")
+
+    @staticmethod
+    def _row_to_user(row) -> Optional[Dict]:
+        if row is None:
+            return None
+        user_id, username, email, password_hash, roles, is_active, created_at, last_login = row
+        return {
+            "id": user_id,
+            "username": username,
+            "email": email,
+            "password_hash": password_hash,
+            "roles": json.loads(roles),
+            "is_active": bool(is_active),
+            "created_at": datetime.fromisoformat(created_at),
+            "last_login": datetime.fromisoformat(last_login) if last_login else None,
+        }
+
+    _USER_COLUMNS = "id, username, email, password_hash, roles, is_active, created_at, last_login"
+
+    # -- users ----------------------------------------------------------
+
+    def add_user(self, user: Dict, ignore_existing: bool = False) -> bool:
+        """Insert a user dict; returns False if ignored, raises UserExistsError otherwise"""
+        verb = "INSERT OR IGNORE" if ignore_existing else "INSERT"
+        try:
+            with self._connection() as conn:
+                cur = conn.execute(
+                    f"{verb} INTO users ({self._USER_COLUMNS}) VALUES (?,?,?,?,?,?,?,?)",
+                    (user["id"], user["username"], user["email"], user["password_hash"],
+                     json.dumps(user["roles"]), int(user.get("is_active", True)),
+                     user["created_at"].isoformat(),
+                     user["last_login"].isoformat() if user.get("last_login") else None),
+                )
+                return cur.rowcount == 1
+        except sqlite3.IntegrityError:
+            raise UserExistsError(user["username"])
+
+    def get_user_by_username(self, username: str) -> Optional[Dict]:
+        with self._connection() as conn:
+            row = conn.execute(f"SELECT {self._USER_COLUMNS} FROM users WHERE username = ?", (username,)).fetchone()
+        return self._row_to_user(row)
+
+    def get_user_by_id(self, user_id: str) -> Optional[Dict]:
+        with self._connection() as conn:
+            row = conn.execute(f"SELECT {self._USER_COLUMNS} FROM users WHERE id = ?", (user_id,)).fetchone()
+        return self._row_to_user(row)
+
+    def update_last_login(self, user_id: str, when: datetime) -> None:
+        with self._connection() as conn:
+            conn.execute("UPDATE users SET last_login = ? WHERE id = ?", (when.isoformat(), user_id))
+
+    def set_active(self, user_id: str, is_active: bool) -> None:
+        with self._connection() as conn:
+            conn.execute("UPDATE users SET is_active = ? WHERE id = ?", (int(is_active), user_id))
+
+    def list_users(self) -> List[Dict]:
+        with self._connection() as conn:
+            rows = conn.execute(f"SELECT {self._USER_COLUMNS} FROM users ORDER BY created_at").fetchall()
+        return [self._row_to_user(row) for row in rows]
+
+    # -- refresh tokens -------------------------------------------------
+
+    def save_refresh_token(self, token: str, user_id: str, expires_at: float) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO refresh_tokens (token_hash, user_id, expires_at, created_at) VALUES (?,?,?,?)",
+                (hash_token(token), user_id, expires_at, time.time()),
+            )
+
+    def get_refresh_token_user(self, token: str) -> Optional[str]:
+        """User id for a stored, unexpired refresh token"""
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT user_id FROM refresh_tokens WHERE token_hash = ? AND expires_at > ?",
+                (hash_token(token), time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def delete_refresh_token(self, token: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM refresh_tokens WHERE token_hash = ?", (hash_token(token),))
+
+    def revoke_user_tokens(self, user_id: str) -> int:
+        with self._connection() as conn:
+            return conn.execute("DELETE FROM refresh_tokens WHERE user_id = ?", (user_id,)).rowcount
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        """Delete expired refresh tokens (range scan on the expiry index)"""
+        with self._connection() as conn:
+            removed = conn.execute(
+                "DELETE FROM refresh_tokens WHERE expires_at <= ?", (time.time() if now is None else now,)
+            ).rowcount
+        if removed:
+            logger.info(f"Purged {removed} expired refresh tokens")
+        return removed
+
+    def count_refresh_tokens(self) -> int:
+        with self._connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM refresh_tokens").fetchone()[0]
+
+    # -- background purge -----------------------------------------------
+
+    def start_purger(self, interval: float = PURGE_INTERVAL_SECONDS) -> None:
+        """Purge expired tokens every ``interval`` seconds on a daemon thread"""
+        if self._purger is not None and self._purger.is_alive():
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.purge_expired()
+                except sqlite3.Error as e:
+                    logger.warning(f"Refresh token purge failed: {e}")
+
+        self._purger = threading.Thread(target=loop, name="bhiv-auth-purge", daemon=True)
+        self._purger.start()
+
+    def stop_purger(self) -> None:
+        self._stop.set()
+        if self._purger is not None:
+            self._purger.join(timeout=5)
+            self._purger = None
@@ -0,0 +1,255 @@
+# video/policy_store.py - Versioned per-video, per-scene-type policy weights
+"""
+Storyboard generation scales each scene's duration by a policy weight for
+the video and the scene's type:
+
+    SCENE_TYPES     intro, concept, example, summary   (see ``scene_type``)
+    DEFAULT_POLICY  "*", the catalog-wide row used for videos without their own
+
+Weights live in SQLite next to the videos:
+
+    policy_versions   version, created_at, source       one row per batch update
+    policy_weights    video_id -> version, weights      current weights (float32 blob)
+    policy_history    (video_id, version) -> weights    every row ever written
+
+``PolicyStore.update`` applies a whole batch (e.g. from
+``FeedbackAnalyzer.update_policy``) in one transaction under a new
+version, so readers see all of it or none of it, and ``rollback`` restores
+any earlier version. A video the rollback drops gets a tombstone (an empty
+weights blob) in the history at the new version, so the policy as of any
+version, rollbacks included, is the latest non-tombstone row per video. Readers get a ``PolicySnapshot``: the current weights
+as one flat float32 array plus a video -> row index, reloaded only when
+the version changes.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Tuple
+
+SCENE_TYPES = ("intro", "concept", "example", "summary")
+DEFAULT_POLICY = "*"
+MIN_WEIGHT = float(os.getenv("BHIV_POLICY_MIN_WEIGHT", "0.5"))
+MAX_WEIGHT = float(os.getenv("BHIV_POLICY_MAX_WEIGHT", "2.0"))
+
+_TYPE_INDEX = {name: i for i, name in enumerate(SCENE_TYPES)}
+_TOMBSTONE = b""  # history row of a video that has no weights as of that version
+_EXAMPLE = re.compile(r"\b(example|for instance|e\.g\.|such as|let's try)\b", re.IGNORECASE)
+_SUMMARY = re.compile(r"\b(summary|in summary|to summarize|recap|conclusion|key takeaways?)\b", re.IGNORECASE)
+
+
+def scene_type(text: str, index: int, count: int) -> str:
+    """Classify a scene from its text and position in the storyboard"""
+    if _EXAMPLE.search(text):
+        return "example"
+    if _SUMMARY.search(text) or (count > 2 and index == count - 1):
+        return "summary"
+    if index == 0 and count > 1:
+        return "intro"
+    return "concept"
+
+
+def _pack(weights) -> bytes:
+    return array("f", weights).tobytes()
+
+
+def _unpack(blob: bytes) -> array:
+    weights = array("f")
+    weights.frombytes(blob)
+    # Rows written before a scene type was added default to 1.0 for it
+    weights.extend([1.0] * (len(SCENE_TYPES) - len(weights)))
+    return weights[:len(SCENE_TYPES)]
+
+
+def ensure_policy_schema(conn: sqlite3.Connection) -> None:
+    conn.execute('''CREATE TABLE IF NOT EXISTS policy_versions
+                    (version INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, source TEXT)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS policy_weights
+                    (video_id TEXT PRIMARY KEY, version INTEGER NOT NULL, weights BLOB NOT NULL)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS policy_history
+                    (video_id TEXT NOT NULL, version INTEGER NOT NULL, weights BLOB NOT NULL,
+                     PRIMARY KEY (video_id, version))''')
+
+
+class PolicySnapshot:
+    """Immutable view of one policy version: a flat float32 array, one row of SCENE_TYPES per video"""
+
+    def __init__(self, version: int, index: Dict[str, int], weights: array):
+        self.version = version
+        self._index = index
+        self._weights = weights
+        self._default = index.get(DEFAULT_POLICY)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _row(self, video_id: Optional[str]) -> Optional[int]:
+        row = self._index.get(video_id) if video_id is not None else None
+        return row if row is not None else self._default
+
+    def weights(self, video_id: Optional[str] = None) -> Tuple[float, ...]:
+        """Weights in SCENE_TYPES order (the catalog default, else 1.0, for unknown videos)"""
+        row = self._row(video_id)
+        if row is None:
+            return (1.0,) * len(SCENE_TYPES)
+        start = row * len(SCENE_TYPES)
+        return tuple(self._weights[start:start + len(SCENE_TYPES)])
+
+    def weight(self, video_id: Optional[str], scene: str) -> float:
+        row = self._row(video_id)
+        if row is None:
+            return 1.0
+        return self._weights[row * len(SCENE_TYPES) + _TYPE_INDEX[scene]]
+
+
+class PolicyStore:
+    """Policy weights in SQLite with an in-memory snapshot of the current version (see module docstring)"""
+
+    def __init__(self, db_path="data/meta.db"):
+        self.db_path = Path(db_path)
+        self._snapshot = PolicySnapshot(0, {}, array("f"))
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        if not self._ready:
+            ensure_policy_schema(conn)
+            self._ready = True
+        return conn
+
+    @staticmethod
+    def _current_version(conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT COALESCE(MAX(version), 0) FROM policy_versions").fetchone()[0]
+
+    def snapshot(self) -> PolicySnapshot:
+        """Current weights; costs one indexed lookup unless a new version was written"""
+        conn = self._connect()
+        try:
+            version = self._current_version(conn)
+            if version == self._snapshot.version:
+                return self._snapshot
+            with self._lock:
+                if version != self._snapshot.version:
+                    conn.execute("BEGIN")  # version and rows from the same read transaction
+                    version = self._current_version(conn)
+                    rows = conn.execute("SELECT video_id, weights FROM policy_weights ORDER BY video_id").fetchall()
+                    conn.execute("COMMIT")
+                    weights = array("f")
+                    for _, blob in rows:
+                        weights.extend(_unpack(blob))
+                    self._snapshot = PolicySnapshot(version, {vid: i for i, (vid, _) in enumerate(rows)}, weights)
+                return self._snapshot
+        finally:
+            conn.close()
+
+    def update(self, updates: Mapping[str, Mapping[str, float]], source: str = "", scale: bool = True) -> int:
+        """Apply a batch atomically under one new version; returns it
+
+        ``updates`` maps video ids (or DEFAULT_POLICY) to ``{scene_type: value}``.
+        With ``scale`` each value multiplies the current weight, otherwise it
+        replaces it. Results are clamped to [MIN_WEIGHT, MAX_WEIGHT].
+        """
+        for changes in updates.values():
+            unknown = set(changes) - set(SCENE_TYPES)
+            if unknown:
+                raise ValueError(f"unknown scene types {sorted(unknown)}; expected {SCENE_TYPES}")
+        if not updates:
+            return self.snapshot().version
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                video_ids = sorted(updates)
+                current = dict(conn.execute(
+                    f"SELECT video_id, weights FROM policy_weights WHERE video_id IN ({','.join('?' * len(video_ids))})",
+                    video_ids).fetchall())
+                version = conn.execute("INSERT INTO policy_versions (created_at, source) VALUES (?, ?)",
+                                       (time.time(), source)).lastrowid
+                rows = []
+                for vid in video_ids:
+                    weights = _unpack(current[vid]) if vid in current else array("f", [1.0] * len(SCENE_TYPES))
+                    for scene, value in updates[vid].items():
+                        i = _TYPE_INDEX[scene]
+                        weights[i] = min(MAX_WEIGHT, max(MIN_WEIGHT, weights[i] * value if scale else value))
+                    rows.append((vid, version, _pack(weights)))
+                self._write(conn, rows)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        return version
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, rows: List[tuple]) -> None:
+        conn.executemany('''INSERT INTO policy_weights (video_id, version, weights) VALUES (?, ?, ?)
+                            ON CONFLICT(video_id) DO UPDATE SET version = excluded.version,
+                                weights = excluded.weights''', rows)
+        conn.executemany("INSERT INTO policy_history (video_id, version, weights) VALUES (?, ?, ?)", rows)
+
+    def rollback(self, version: int) -> int:
+        """Restore every video's weights as of ``version`` (recorded as a new version); returns it"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if not conn.execute("SELECT 1 FROM policy_versions WHERE version = ?", (version,)).fetchone():
+                    raise ValueError(f"unknown policy version {version}")
+                restored = conn.execute('''SELECT h.video_id, h.weights FROM policy_history h
+                                           WHERE h.version = (SELECT MAX(version) FROM policy_history
+                                                              WHERE video_id = h.video_id AND version <= ?)
+                                             AND length(h.weights) > 0''',
+                                        (version,)).fetchall()
+                dropped = conn.execute("SELECT video_id FROM policy_weights").fetchall()
+                new_version = conn.execute("INSERT INTO policy_versions (created_at, source) VALUES (?, ?)",
+                                           (time.time(), f"rollback:{version}")).lastrowid
+                conn.execute("DELETE FROM policy_weights")
+                self._write(conn, [(vid, new_version, blob) for vid, blob in restored])
+                kept = {vid for vid, _ in restored}
+                conn.executemany("INSERT INTO policy_history (video_id, version, weights) VALUES (?, ?, ?)",
+                                 [(vid, new_version, _TOMBSTONE) for (vid,) in dropped if vid not in kept])
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        return new_version
+
+    def versions(self, limit: int = 20) -> List[Dict]:
+        conn = self._connect()
+        try:
+            rows = conn.execute('''SELECT v.version, v.created_at, v.source, COUNT(h.video_id)
+                                   FROM policy_versions v
+                                   LEFT JOIN policy_history h ON h.version = v.version AND length(h.weights) > 0
+                                   GROUP BY v.version ORDER BY v.version DESC LIMIT ?''', (limit,)).fetchall()
+        finally:
+            conn.close()
+        return [{"version": v, "created_at": created, "source": source, "videos": n} for v, created, source, n in rows]
+
+    def history(self, video_id: str) -> List[Tuple[int, Optional[Tuple[float, ...]]]]:
+        """Every version that wrote ``video_id``; weights are None where a rollback dropped it"""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT version, weights FROM policy_history WHERE video_id = ? ORDER BY version",
+                                (video_id,)).fetchall()
+        finally:
+            conn.close()
+        return [(version, tuple(_unpack(blob)) if blob else None) for version, blob in rows]
+
+
+_stores: Dict[str, PolicyStore] = {}
+
+
+def get_policy_store(db_path="data/meta.db") -> PolicyStore:
+    key = str(db_path)
+    store = _stores.get(key)
+    if store is None:
+        store = _stores.setdefault(key, PolicyStore(db_path))
+    return store
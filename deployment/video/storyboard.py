@@ -1,19 +1,35 @@
 import json
 from pathlib import Path
+from bhiv_tracing import traced
+from video.policy_store import scene_type
 
-def generate_storyboard_from_file(script_path, output_path=None):
-    """Generate storyboard from script file"""
+BASE_DURATION_SECS = 4
+MIN_DURATION_SECS = 2
+
+@traced("video.generate_storyboard")
+def generate_storyboard_from_file(script_path, output_path=None, video_id=None, policy=None):
+    """Generate storyboard from script file
+
+    ``policy`` (a ``video.policy_store.PolicySnapshot``) scales each scene's
+    duration by the weight for ``video_id`` and the scene's type.
+    """
     script_text = Path(script_path).read_text()
     
     # Simple storyboard generation
     lines = [line.strip() for line in script_text.split('\n') if line.strip()]
+    lines = lines[:5]  # Max 5 scenes
     scenes = []
     
-    for i, line in enumerate(lines[:5]):  # Max 5 scenes
+    for i, line in enumerate(lines):
+        kind = scene_type(line, i, len(lines))
+        duration = BASE_DURATION_SECS
+        if policy is not None:
+            duration = max(MIN_DURATION_SECS, round(BASE_DURATION_SECS * policy.weight(video_id, kind), 1))
         scenes.append({
             "scene_id": i + 1,
             "text": line,
-            "duration_secs": 4,
+            "scene_type": kind,
+            "duration_secs": duration,
             "bg_color": "#FFFFFF",
             "visual_hint": f"Scene {i+1}"
         })
@@ -0,0 +1,263 @@
+# video/text_cache.py - Pre-rendered scene text bitmaps, cached in memory and on disk
+"""
+moviepy's ``TextClip`` shells out to ImageMagick for every scene of every
+render. Scene text is instead rasterized once with Pillow into an RGBA
+bitmap keyed by everything that affects its pixels:
+
+    TextStyle   font, size, width, color, background
+    key         sha256(text + style)
+
+Bitmaps are kept in an LRU capped at TEXT_CACHE_BYTES and persisted under
+TEXT_CACHE_DIR as ``<key>.rgba`` (a small header plus zlib-compressed
+pixels), so a restart or another worker reuses them without re-rendering.
+``TextCache.prerender`` fills every distinct text of a storyboard across a
+thread pool before encoding starts.
+"""
+import hashlib
+import logging
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+
+from bhiv_metrics import CallbackGauge, get_registry
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:  # Pillow is optional; renders fall back to TextClip
+    Image = ImageDraw = ImageFont = None
+
+logger = logging.getLogger(__name__)
+
+TEXT_CACHE_DIR = Path(os.getenv("BHIV_TEXT_CACHE_DIR", "data/tmp/text_cache"))
+TEXT_CACHE_BYTES = int(os.getenv("BHIV_TEXT_CACHE_BYTES", str(64 * 1024 * 1024)))
+TEXT_CACHE_WORKERS = int(os.getenv("BHIV_TEXT_CACHE_WORKERS", "4"))
+DEFAULT_FONT = os.getenv("BHIV_TEXT_FONT", "DejaVuSans.ttf")
+
+_MAGIC = b"BTX1"
+_HEADER = struct.Struct("<4sII")
+
+
+class TextStyle(NamedTuple):
+    font: str = DEFAULT_FONT
+    size: int = 24
+    width: int = 600
+    color: str = "white"
+    background: Optional[str] = None
+
+
+class Bitmap(NamedTuple):
+    """Straight (non-premultiplied) RGBA pixels, row-major"""
+    width: int
+    height: int
+    rgba: bytes
+
+    def to_array(self):
+        """(height, width, 4) uint8 array, as moviepy's ImageClip expects"""
+        import numpy as np
+        return np.frombuffer(self.rgba, dtype=np.uint8).reshape(self.height, self.width, 4)
+
+
+def text_key(text: str, style: TextStyle) -> str:
+    return hashlib.sha256(repr((text,) + tuple(style)).encode("utf-8")).hexdigest()
+
+
+def _font(style: TextStyle):
+    try:
+        return ImageFont.truetype(style.font, style.size)
+    except OSError:
+        try:
+            return ImageFont.load_default(style.size)
+        except TypeError:  # Pillow < 10.1 has a single fixed-size bitmap font
+            return ImageFont.load_default()
+
+
+def _wrap(draw, text: str, font, width: int):
+    lines = []
+    for paragraph in text.splitlines() or [""]:
+        line = ""
+        for word in paragraph.split():
+            candidate = f"{line} {word}".strip()
+            if line and draw.textlength(candidate, font=font) > width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def rasterize(text: str, style: TextStyle) -> Bitmap:
+    """Render ``text`` centered and word-wrapped to ``style.width`` pixels"""
+    if Image is None:
+        raise RuntimeError("Pillow is required to rasterize scene text")
+    font = _font(style)
+    measure = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+    wrapped = _wrap(measure, text, font, style.width)
+    left, top, right, bottom = measure.multiline_textbbox((0, 0), wrapped, font=font, align="center")
+    height = max(1, bottom - min(top, 0))
+    image = Image.new("RGBA", (style.width, height), style.background or (0, 0, 0, 0))
+    ImageDraw.Draw(image).multiline_text((style.width // 2, -min(top, 0)), wrapped, font=font,
+                                         fill=style.color, anchor="ma", align="center")
+    return Bitmap(style.width, height, image.tobytes())
+
+
+def _encode(bitmap: Bitmap) -> bytes:
+    return _HEADER.pack(_MAGIC, bitmap.width, bitmap.height) + zlib.compress(bitmap.rgba, 1)
+
+
+def _decode(data: bytes) -> Bitmap:
+    magic, width, height = _HEADER.unpack_from(data)
+    if magic != _MAGIC:
+        raise ValueError("not a text bitmap")
+    rgba = zlib.decompress(data[_HEADER.size:])
+    if len(rgba) != width * height * 4:
+        raise ValueError("truncated text bitmap")
+    return Bitmap(width, height, rgba)
+
+
+class TextCache:
+    """LRU of rendered text bitmaps in front of a directory of ``.rgba`` files"""
+
+    def __init__(self, cache_dir=TEXT_CACHE_DIR, max_bytes: int = TEXT_CACHE_BYTES,
+                 rasterizer: Callable[[str, TextStyle], Bitmap] = rasterize):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._rasterize = rasterizer
+        self._entries: "OrderedDict[str, Bitmap]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._pending: Dict[str, threading.Event] = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.renders = 0
+        self.evictions = 0
+
+    @property
+    def available(self) -> bool:
+        return self._rasterize is not rasterize or Image is not None
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.rgba"
+
+    def _remember(self, key: str, bitmap: Bitmap) -> None:
+        size = len(bitmap.rgba)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.rgba)
+            self._entries[key] = bitmap
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.rgba)
+                self.evictions += 1
+
+    def _load(self, key: str) -> Optional[Bitmap]:
+        try:
+            return _decode(self._path(key).read_bytes())
+        except FileNotFoundError:
+            return None
+        except (ValueError, struct.error, zlib.error) as e:
+            logger.warning(f"Discarding unreadable text bitmap {key}: {e}")
+            self._path(key).unlink(missing_ok=True)
+            return None
+
+    def _save(self, key: str, bitmap: Bitmap) -> None:
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = self._path(key).with_suffix(f".{threading.get_ident()}.tmp")
+            tmp.write_bytes(_encode(bitmap))
+            os.replace(tmp, self._path(key))
+        except OSError as e:  # the in-memory copy is still usable
+            logger.warning(f"Could not persist text bitmap {key}: {e}")
+
+    def get(self, text: str, style: TextStyle = TextStyle()) -> Bitmap:
+        """Bitmap for ``text``: memory, then disk, then rendered (once, even under concurrency)"""
+        key = text_key(text, style)
+        while True:
+            with self._lock:
+                bitmap = self._entries.get(key)
+                if bitmap is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return bitmap
+                waiter = self._pending.get(key)
+                if waiter is None:
+                    self._pending[key] = threading.Event()
+                    break
+            waiter.wait()  # then re-check; if the render failed (or was too big to keep) this thread fills it
+        return self._fill(key, text, style)
+
+    def _fill(self, key: str, text: str, style: TextStyle) -> Bitmap:
+        try:
+            bitmap = self._load(key)
+            if bitmap is not None:
+                with self._lock:
+                    self.disk_hits += 1
+            else:
+                bitmap = self._rasterize(text, style)
+                with self._lock:
+                    self.renders += 1
+                self._save(key, bitmap)
+            self._remember(key, bitmap)
+            return bitmap
+        finally:
+            with self._lock:
+                self._pending.pop(key).set()
+
+    def prerender(self, texts: Iterable[str], style: TextStyle = TextStyle(),
+                  workers: int = TEXT_CACHE_WORKERS) -> Dict[str, Bitmap]:
+        """Render every distinct text in parallel; returns text -> bitmap"""
+        distinct = list(dict.fromkeys(texts))
+        if len(distinct) <= 1 or workers <= 1:
+            return {text: self.get(text, style) for text in distinct}
+        with ThreadPoolExecutor(max_workers=min(workers, len(distinct))) as pool:
+            return dict(zip(distinct, pool.map(lambda text: self.get(text, style), distinct)))
+
+    def clear(self) -> None:
+        """Drop the in-memory entries (files on disk are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "renders": self.renders,
+                "evictions": self.evictions,
+            }
+
+
+_text_cache: Optional[TextCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_text_cache() -> TextCache:
+    """Get the process-wide text bitmap cache"""
+    global _text_cache
+    if _text_cache is None:
+        with _cache_lock:
+            if _text_cache is None:
+                _text_cache = TextCache()
+    return _text_cache
+
+
+def _cache_readings() -> Dict[Tuple[str, ...], float]:
+    stats = get_text_cache().stats()
+    return {(name,): stats[name] for name in ("entries", "bytes", "hits", "disk_hits", "renders", "evictions")}
+
+
+get_registry().register(CallbackGauge(
+    "bhiv_text_cache", "Scene text bitmap cache size and hit/render counts", _cache_readings, ("stat",)))
@@ -0,0 +1,104 @@
+# gallery.py - Keyset-paginated video gallery queries shared by the Streamlit apps
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+PAGE_SIZE = 10
+RECENT_RATINGS = 3
+
+Cursor = Tuple[Optional[str], str]
+
+
+def ensure_gallery_schema(conn: sqlite3.Connection, ratings_table: str = "user_ratings") -> None:
+    """Add the columns and indexes keyset pagination relies on (idempotent)"""
+    c = conn.cursor()
+    c.execute("PRAGMA table_info(videos)")
+    columns = [col[1] for col in c.fetchall()]
+    if "created_at" not in columns:
+        c.execute("ALTER TABLE videos ADD COLUMN created_at TEXT")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_videos_created_id ON videos (created_at, id)")
+    c.execute(f"CREATE INDEX IF NOT EXISTS idx_{ratings_table}_video ON {ratings_table} (video_id, id)")
+    conn.commit()
+
+
+def fetch_video_page(
+    conn: sqlite3.Connection,
+    columns: Sequence[str],
+    cursor: Optional[Cursor] = None,
+    page_size: int = PAGE_SIZE,
+) -> Tuple[List[Dict], Optional[Cursor]]:
+    """Return one page of videos, newest first, and the cursor for the next page.
+
+    Pages are addressed by the (created_at, id) of the last row seen instead of
+    an OFFSET, so every page costs the same regardless of how deep it is.
+    Rows without a created_at sort after all dated rows. They are paged as a
+    separate segment, because an ``IS NULL`` branch in the keyset predicate
+    would turn the index seek into a scan.
+    """
+    select = ", ".join(dict.fromkeys(["id", "created_at", *columns]))
+    cur = conn.cursor()
+    cur.row_factory = sqlite3.Row
+
+    def segment(where: str, order: str, params: list, limit: int) -> list:
+        return cur.execute(f"SELECT {select} FROM videos WHERE {where} ORDER BY {order} LIMIT ?",
+                           (*params, limit)).fetchall()
+
+    rows = []
+    if cursor is None or cursor[0] is not None:
+        where, params = "created_at IS NOT NULL", []
+        if cursor is not None:
+            where, params = "created_at IS NOT NULL AND (created_at, id) < (?, ?)", list(cursor)
+        rows = segment(where, "created_at DESC, id DESC", params, page_size + 1)
+    if len(rows) <= page_size:
+        where, params = "created_at IS NULL", []
+        if cursor is not None and cursor[0] is None:
+            where, params = "created_at IS NULL AND id < ?", [cursor[1]]
+        rows += segment(where, "id DESC", params, page_size + 1 - len(rows))
+
+    page = [dict(row) for row in rows[:page_size]]
+    next_cursor = None
+    if len(rows) > page_size:
+        last = page[-1]
+        next_cursor = (last["created_at"], last["id"])
+    return page, next_cursor
+
+
+def fetch_page_ratings(
+    conn: sqlite3.Connection,
+    video_ids: Iterable[str],
+    user_id: Optional[str] = None,
+    ratings_table: str = "user_ratings",
+    recent_limit: int = RECENT_RATINGS,
+) -> Dict[str, Dict]:
+    """Ratings summary for a whole page in a single query.
+
+    Returns ``{video_id: {"count", "recent": [(rating, comment), ...], "has_rated"}}``
+    for every requested id. ``has_rated`` needs a ``user_id`` column and is
+    False when ``user_id`` is None.
+    """
+    video_ids = list(video_ids)
+    summary = {vid: {"count": 0, "recent": [], "has_rated": False} for vid in video_ids}
+    if not video_ids:
+        return summary
+
+    has_rated = "MAX(user_id = ?) OVER w" if user_id is not None else "0"
+    params = ([user_id] if user_id is not None else []) + video_ids + [recent_limit]
+    placeholders = ",".join("?" * len(video_ids))
+    rows = conn.execute(
+        f"""SELECT video_id, rating, comment, total, has_rated FROM (
+                SELECT video_id, rating, comment,
+                       COUNT(*) OVER w AS total,
+                       {has_rated} AS has_rated,
+                       ROW_NUMBER() OVER (PARTITION BY video_id ORDER BY id DESC) AS rn
+                FROM {ratings_table}
+                WHERE video_id IN ({placeholders})
+                WINDOW w AS (PARTITION BY video_id)
+            ) WHERE rn <= ? ORDER BY video_id, rn""",
+        params,
+    ).fetchall()
+
+    for video_id, rating, comment, total, rated in rows:
+        entry = summary[video_id]
+        entry["count"] = total
+        entry["has_rated"] = bool(rated)
+        entry["recent"].append((rating, comment))
+    return summary
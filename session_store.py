@@ -0,0 +1,221 @@
+# session_store.py - Embedded session store with write-coalesced last_access updates
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", str(7 * 24 * 3600)))
+SESSION_FLUSH_INTERVAL = float(os.getenv("SESSION_FLUSH_INTERVAL", "5"))
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "600"))
+MAX_PENDING_TOUCHES = 1000
+
+
+class SessionStore:
+    """SQLite-backed sessions keyed by session id.
+
+    Creating and deleting a session is a single-row write; nothing rewrites
+    the whole store. ``touch`` only records the new ``last_access`` in memory,
+    and a background thread flushes all pending touches in one transaction
+    every ``flush_interval`` seconds (or sooner once ``MAX_PENDING_TOUCHES``
+    pile up). Sessions idle for longer than ``ttl`` are swept. Several
+    worker processes can share the file; each row is updated independently,
+    so one worker's write cannot overwrite another's.
+    """
+
+    def __init__(self, db_path, ttl: float = SESSION_TTL_SECONDS,
+                 flush_interval: float = SESSION_FLUSH_INTERVAL,
+                 sweep_interval: float = SESSION_SWEEP_INTERVAL,
+                 background: bool = True):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.sweep_interval = sweep_interval
+        self._pending: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._init_schema()
+        if background:
+            self.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """A connection as one transaction, committed (or rolled back) and then closed"""
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_schema(self) -> None:
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute('''CREATE TABLE IF NOT EXISTS sessions
+                            (session_id TEXT PRIMARY KEY, username TEXT NOT NULL, token TEXT NOT NULL,
+                             created_at TEXT NOT NULL, last_access REAL NOT NULL)''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_access ON sessions(last_access)")
+
+    # -- keyed operations -----------------------------------------------
+
+    def create(self, session_id: str, username: str, token: str) -> Dict:
+        now = time.time()
+        created_at = datetime.fromtimestamp(now).isoformat()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, username, token, created_at, last_access) VALUES (?,?,?,?,?)",
+                (session_id, username, token, created_at, now),
+            )
+        return self._to_dict(session_id, username, token, created_at, now)
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        """The session, or None if it is unknown or has been idle longer than the TTL"""
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT session_id, username, token, created_at, last_access FROM sessions WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        with self._lock:
+            last_access = max(row[4], self._pending.get(session_id, 0.0))
+        if last_access < time.time() - self.ttl:
+            return None
+        return self._to_dict(row[0], row[1], row[2], row[3], last_access)
+
+    def touch(self, session_id: str) -> None:
+        """Record an access; persisted on the next flush"""
+        with self._lock:
+            self._pending[session_id] = time.time()
+            backlog = len(self._pending)
+        if backlog >= MAX_PENDING_TOUCHES:
+            self._wake.set()
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            self._pending.pop(session_id, None)
+        with self._connection() as conn:
+            return conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,)).rowcount > 0
+
+    def count(self) -> int:
+        with self._connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    @staticmethod
+    def _to_dict(session_id, username, token, created_at, last_access) -> Dict:
+        return {
+            "session_id": session_id,
+            "username": username,
+            "token": token,
+            "created_at": created_at,
+            "last_access": datetime.fromtimestamp(last_access).isoformat(),
+        }
+
+    # -- batched persistence --------------------------------------------
+
+    def flush(self) -> int:
+        """Write all pending touches in one transaction; returns how many were written"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            with self._connection() as conn:
+                # MAX() keeps a newer value written by another worker
+                conn.executemany(
+                    "UPDATE sessions SET last_access = MAX(last_access, ?) WHERE session_id = ?",
+                    [(ts, sid) for sid, ts in pending.items()],
+                )
+        except sqlite3.Error:
+            with self._lock:
+                for sid, ts in pending.items():
+                    self._pending[sid] = max(ts, self._pending.get(sid, 0.0))
+            raise
+        return len(pending)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Delete sessions idle for longer than the TTL"""
+        self.flush()
+        cutoff = (time.time() if now is None else now) - self.ttl
+        with self._connection() as conn:
+            removed = conn.execute("DELETE FROM sessions WHERE last_access < ?", (cutoff,)).rowcount
+        if removed:
+            logger.info(f"Swept {removed} expired sessions")
+        return removed
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="bhiv-session-flush", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self) -> None:
+        next_sweep = time.monotonic() + self.sweep_interval
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                if time.monotonic() >= next_sweep:
+                    self.sweep()
+                    next_sweep = time.monotonic() + self.sweep_interval
+            except sqlite3.Error as e:
+                logger.warning(f"Session flush failed: {e}")
+
+    def close(self) -> None:
+        """Stop the background thread and persist anything pending"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    # -- migration ------------------------------------------------------
+
+    def import_json(self, json_path) -> int:
+        """One-time import of a legacy sessions.json; the file is renamed afterwards"""
+        json_path = Path(json_path)
+        try:
+            with open(json_path, 'r') as f:
+                sessions = json.load(f)
+        except FileNotFoundError:
+            return 0  # nothing to migrate, or another worker already did
+
+        rows = []
+        for session_id, session in sessions.items():
+            last_access = session.get("last_access") or session.get("created_at")
+            try:
+                last_access_ts = datetime.fromisoformat(last_access).timestamp()
+            except (TypeError, ValueError):
+                last_access_ts = time.time()
+            rows.append((session_id, session["username"], session["token"],
+                         session.get("created_at", last_access), last_access_ts))
+
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO sessions (session_id, username, token, created_at, last_access) VALUES (?,?,?,?,?)",
+                rows,
+            )
+        try:
+            json_path.rename(json_path.with_name(json_path.name + ".migrated"))
+        except FileNotFoundError:
+            pass
+        logger.info(f"Imported {len(rows)} sessions from {json_path}")
+        return len(rows)
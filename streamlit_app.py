@@ -7,6 +7,8 @@ import hashlib
 import os
 from pathlib import Path
 from datetime import datetime
+from gallery import ensure_gallery_schema
+from data_service import DataService
 
 # Configuration - Standalone mode (no external API)
 STANDALONE_MODE = True
@@ -133,6 +135,7 @@ def init_db():
         c.execute("ALTER TABLE videos ADD COLUMN created_at TEXT DEFAULT '2024-01-01T00:00:00'")
     
     conn.commit()
+    ensure_gallery_schema(conn, ratings_table="ratings")
     conn.close()
 
 init_db()
@@ -142,38 +145,21 @@ init_db()
 def check_api_health():
     return True  # Always online in standalone mode
 
-@st.cache_data(ttl=10)
+@st.cache_resource
+def get_data_service():
+    """One read cache shared by every session in this process"""
+    return DataService("data/app.db", ratings_table="ratings")
+
+data_service = get_data_service()
+
 def get_metrics():
-    conn = sqlite3.connect("data/app.db")
-    c = conn.cursor()
-    c.execute("SELECT COUNT(*) FROM videos")
-    video_count = c.fetchone()[0]
-    c.execute("SELECT COUNT(*) FROM ratings")
-    rating_count = c.fetchone()[0]
-    c.execute("SELECT AVG(rating) FROM ratings")
-    avg_rating = c.fetchone()[0] or 0
-    conn.close()
-    
+    video_count, rating_count, avg_rating = data_service.get_metrics()
     return {
         "videos_generated": video_count,
         "total_ratings": rating_count,
         "average_rating": avg_rating
     }
 
-@st.cache_data(ttl=5)
-def get_videos():
-    conn = sqlite3.connect("data/app.db")
-    c = conn.cursor()
-    try:
-        c.execute("SELECT id, title, video_path, created_at FROM videos ORDER BY created_at DESC")
-        videos = [{"id": row[0], "title": row[1], "video_path": row[2], "created_at": row[3]} for row in c.fetchall()]
-    except sqlite3.OperationalError:
-        # Fallback if columns don't exist
-        c.execute("SELECT id, title FROM videos ORDER BY rowid DESC")
-        videos = [{"id": row[0], "title": row[1], "video_path": None, "created_at": "2024-01-01T00:00:00"} for row in c.fetchall()]
-    conn.close()
-    return videos
-
 def create_video(title, content):
     video_id = str(uuid.uuid4())[:8]
     conn = sqlite3.connect("data/app.db")
@@ -182,23 +168,19 @@ def create_video(title, content):
               (video_id, title, content, datetime.now().isoformat()))
     conn.commit()
     conn.close()
+    data_service.invalidate_videos()
     return video_id
 
-def get_video_ratings(video_id):
-    conn = sqlite3.connect("data/app.db")
-    c = conn.cursor()
-    c.execute("SELECT rating, comment FROM ratings WHERE video_id = ?", (video_id,))
-    ratings = c.fetchall()
-    conn.close()
-    return ratings
-
-def add_rating(video_id, rating, comment):
-    conn = sqlite3.connect("data/app.db")
-    c = conn.cursor()
-    c.execute("INSERT INTO ratings (video_id, rating, comment) VALUES (?, ?, ?)",
-              (video_id, rating, comment))
-    conn.commit()
-    conn.close()
+def get_recent_ratings():
+    def load():
+        with data_service.connection() as conn:
+            return conn.execute("""
+                SELECT v.title, r.rating, r.comment 
+                FROM ratings r 
+                JOIN videos v ON r.video_id = v.id 
+                ORDER BY r.id DESC LIMIT 5
+            """).fetchall()
+    return data_service.cached(("recent_ratings",), {"ratings", "videos"}, load)
 
 # Status Dashboard
 metrics = get_metrics()
@@ -258,9 +240,9 @@ if uploaded_file is not None:
             try:
                 content = uploaded_file.read().decode('utf-8')
                 video_id = create_video(uploaded_file.name, content)
+                st.session_state.gallery_cursors = [None]
                 st.success(f"✅ Video generated! ID: {video_id}")
                 st.balloons()
-                st.cache_data.clear()
                 time.sleep(1)
                 st.rerun()
             except Exception as e:
@@ -276,7 +258,12 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-videos = get_videos()
+# Keyset pagination: the stack holds the cursor each visited page started from
+if 'gallery_cursors' not in st.session_state:
+    st.session_state.gallery_cursors = [None]
+
+videos, next_cursor = data_service.get_video_page(st.session_state.gallery_cursors[-1], ("title", "video_path"))
+page_ratings = data_service.get_page_ratings([video['id'] for video in videos])
 
 if videos:
     for video in videos:
@@ -284,13 +271,15 @@ if videos:
         <div class="video-card">
             <h3>📹 {video['title']}</h3>
             <p style="opacity: 0.8;">ID: {video['id']}</p>
-            <p style="opacity: 0.6; font-size: 0.9rem;">Created: {video['created_at'][:10]}</p>
+            <p style="opacity: 0.6; font-size: 0.9rem;">Created: {(video['created_at'] or '')[:10]}</p>
         </div>
         """, unsafe_allow_html=True)
         
-        # Display video if path exists
+        # Display video if path exists, but only load it once the card is opened
         if video.get('video_path') and os.path.exists(video['video_path']):
-            st.video(video['video_path'])
+            with st.expander("▶️ Watch video"):
+                if st.toggle("Load video", key=f"play_{video['id']}"):
+                    st.video(video['video_path'])
         else:
             st.info(f"🎬 Video file not found for {video['id']}")
         
@@ -314,36 +303,38 @@ if videos:
         
         with col3:
             if st.button("Submit", key=f"submit_{video['id']}"):
-                add_rating(video['id'], rating, comment)
+                data_service.add_rating(video['id'], rating, comment)
                 st.success("Rating submitted!")
-                st.cache_data.clear()
                 time.sleep(1)
                 st.rerun()
         
         # Show existing ratings
-        ratings = get_video_ratings(video['id'])
-        if ratings:
-            st.markdown("**Previous Ratings:**")
-            for r_rating, r_comment in ratings:
+        ratings_summary = page_ratings[video['id']]
+        if ratings_summary["count"]:
+            st.markdown(f"**Previous Ratings ({ratings_summary['count']}):**")
+            for r_rating, r_comment in ratings_summary["recent"]:
                 st.markdown(f"⭐ {r_rating}/5 - {r_comment}")
         
         st.divider()
+
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if len(st.session_state.gallery_cursors) > 1 and st.button("⬅️ Newer", key="gallery_prev"):
+            st.session_state.gallery_cursors.pop()
+            st.rerun()
+    with col_page:
+        st.markdown(f"<p style='text-align: center;'>Page {len(st.session_state.gallery_cursors)}</p>", unsafe_allow_html=True)
+    with col_next:
+        if next_cursor and st.button("Older ➡️", key="gallery_next"):
+            st.session_state.gallery_cursors.append(next_cursor)
+            st.rerun()
 else:
     st.info("No videos found. Upload a script to generate your first video!")
 
 # Show ratings for videos
 if videos:
     st.markdown("### 📊 Recent Ratings")
-    conn = sqlite3.connect("data/app.db")
-    c = conn.cursor()
-    c.execute("""
-        SELECT v.title, r.rating, r.comment 
-        FROM ratings r 
-        JOIN videos v ON r.video_id = v.id 
-        ORDER BY r.id DESC LIMIT 5
-    """)
-    recent_ratings = c.fetchall()
-    conn.close()
+    recent_ratings = get_recent_ratings()
     
     if recent_ratings:
         for title, rating, comment in recent_ratings:
@@ -361,5 +352,5 @@ st.markdown("""
 
 # Auto-refresh
 if st.button("🔄 Refresh Dashboard", type="secondary"):
-    st.cache_data.clear()
+    data_service.invalidate("metrics")
     st.rerun()
\ No newline at end of file
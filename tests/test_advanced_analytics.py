@@ -0,0 +1,79 @@
+# tests/test_advanced_analytics.py - Unit tests for the aggregate-backed dashboard analytics
+import sqlite3
+
+import pytest
+
+import sys
+sys.path.append('..')
+
+from analytics.advanced_analytics import AdvancedAnalytics, linear_trend
+
+
+class TestAdvancedAnalytics:
+    """Trigger-maintained aggregates must always match a full scan"""
+
+    @pytest.fixture
+    def db_path(self, tmp_path):
+        path = tmp_path / "meta.db"
+        with sqlite3.connect(path) as conn:
+            conn.execute("CREATE TABLE videos (id TEXT PRIMARY KEY, title TEXT)")
+            conn.execute('''CREATE TABLE user_ratings
+                            (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, video_id TEXT,
+                             rating INTEGER, comment TEXT, UNIQUE(user_id, video_id))''')
+            conn.executemany("INSERT INTO videos VALUES (?, ?)", [("a", "Alpha"), ("b", "Beta")])
+            conn.executemany("INSERT INTO user_ratings (user_id, video_id, rating, comment) VALUES (?,?,?,?)",
+                             [("u1", "a", 5, "Great examples"), ("u2", "a", 4, "clear"), ("u1", "b", 2, "too slow")])
+        return path
+
+    def _scan(self, db_path):
+        with sqlite3.connect(db_path) as conn:
+            return {vid: (count, total) for vid, count, total in conn.execute(
+                "SELECT video_id, COUNT(*), SUM(rating) FROM user_ratings GROUP BY video_id")}
+
+    def test_backfill_and_incremental_writes_match_a_scan(self, db_path):
+        analytics = AdvancedAnalytics(db_path, cache_ttl=0)
+        assert analytics.get_video_performance("a")["total_ratings"] == 2
+
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("INSERT INTO user_ratings (user_id, video_id, rating) VALUES ('u3', 'b', 3)")
+            conn.execute("UPDATE user_ratings SET rating = 1 WHERE user_id = 'u2' AND video_id = 'a'")
+            conn.execute("UPDATE user_ratings SET video_id = 'a' WHERE user_id = 'u3'")
+            conn.execute("DELETE FROM user_ratings WHERE user_id = 'u1' AND video_id = 'b'")
+
+        for vid, (count, total) in self._scan(db_path).items():
+            performance = analytics.get_video_performance(vid)
+            assert performance["total_ratings"] == count
+            assert performance["average_rating"] == round(total / count, 2)
+        assert analytics.get_video_performance("b")["total_ratings"] == 0
+        assert analytics.get_rating_trends()["total_ratings"] == 3
+        assert analytics.get_sentiment_analysis()["sentiment_distribution"] == {
+            "positive": 1, "neutral": 1, "negative": 1}
+
+    def test_top_videos_and_themes(self, db_path):
+        analytics = AdvancedAnalytics(db_path)
+        insights = analytics.get_platform_insights()
+
+        assert [v["video_id"] for v in insights["top_performing_videos"]] == ["a", "b"]
+        assert insights["top_performing_videos"][0] == {
+            "video_id": "a", "title": "Alpha", "avg_rating": 4.5, "rating_count": 2}
+        assert insights["sentiment_analysis"]["top_themes"]["examples"] == 1
+        assert insights["sentiment_analysis"]["top_themes"]["pacing"] == 1
+
+    def test_results_are_cached(self, db_path):
+        analytics = AdvancedAnalytics(db_path, cache_ttl=60)
+        before = analytics.get_rating_trends()
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("INSERT INTO user_ratings (user_id, video_id, rating) VALUES ('u9', 'a', 1)")
+
+        assert analytics.get_rating_trends() is before
+        analytics.invalidate()
+        assert analytics.get_rating_trends()["total_ratings"] == 4
+
+    def test_linear_trend(self):
+        assert linear_trend([(0, 3.0), (1, 3.5), (2, 4.0)]) == pytest.approx(0.5)
+        assert linear_trend([(0, 4.0)]) == 0.0
+        assert linear_trend([(1, 2.0), (1, 4.0)]) == 0.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -10,6 +10,7 @@ import sys
 sys.path.append('..')
 
 from backend.server import app
+from security.auth import User, get_current_user
 
 class TestAPIEndpoints:
     """Test suite for FastAPI endpoints"""
@@ -19,6 +20,16 @@ class TestAPIEndpoints:
         """Create test client"""
         return TestClient(app)
     
+    @pytest.fixture
+    def as_user(self):
+        """Authenticate requests as an active user; set ``.is_active = False`` to deactivate"""
+        from datetime import datetime
+        user = User(id="u1", username="viewer", email="viewer@example.com", roles=["viewer"],
+                    created_at=datetime.now())
+        app.dependency_overrides[get_current_user] = lambda: user
+        yield user
+        app.dependency_overrides.pop(get_current_user, None)
+    
     @pytest.fixture
     def sample_script_file(self):
         """Create sample script file for upload testing"""
@@ -140,11 +151,11 @@ class TestAPIEndpoints:
             # FileResponse should be called
             mock_response.assert_called_once()
     
-    @patch('bhiv_core.notify_on_rate')
-    def test_rate_endpoint_success(self, mock_notify, client):
+    def test_rate_endpoint_success(self, client, as_user):
         """Test successful video rating"""
-        mock_notify.return_value = {"analysis": "positive feedback"}
-        
+        from backend.server import event_log
+        from bhiv_events import RATING_TOPIC
+
         response = client.post(
             "/rate/test123",
             data={"rating": 5, "comment": "Great video!"}
@@ -153,12 +164,12 @@ class TestAPIEndpoints:
         assert response.status_code == 200
         data = response.json()
         assert "Thanks for rating" in data["message"]
-        assert "improvement_triggered" in data
         
-        # Verify feedback processing was called
-        mock_notify.assert_called_once_with("test123", 5, "Great video!")
+        # Feedback processing is queued, not run inline
+        event = event_log.read(RATING_TOPIC, data["event_offset"] - 1, 1)[0]
+        assert event.payload == {"video_id": "test123", "rating": 5, "comment": "Great video!"}
     
-    def test_rate_endpoint_invalid_rating(self, client):
+    def test_rate_endpoint_invalid_rating(self, client, as_user):
         """Test rating with invalid rating value"""
         response = client.post(
             "/rate/test123",
@@ -168,20 +179,79 @@ class TestAPIEndpoints:
         assert response.status_code == 400
         assert "rating must be 1..5" in response.json()["detail"]
     
-    @patch('bhiv_core.notify_on_rate')
-    def test_rate_endpoint_processing_error(self, mock_notify, client):
-        """Test rating with feedback processing error"""
-        mock_notify.side_effect = Exception("Feedback processing failed")
+    def test_rate_endpoint_processing_error(self, as_user):
+        """A failed event append rolls the rating back with it"""
+        import sqlite3
+        from backend.server import DBPATH, event_log
+        client = TestClient(app, raise_server_exceptions=False)
+        comment = "Average video (event log down)"
+
+        with patch.object(event_log, "append", side_effect=sqlite3.OperationalError("database is locked")):
+            response = client.post(
+                "/rate/test123",
+                data={"rating": 3, "comment": comment}
+            )
+        
+        assert response.status_code == 500
+        with sqlite3.connect(DBPATH) as conn:
+            stored = conn.execute("SELECT COUNT(*) FROM ratings WHERE comment = ?", (comment,)).fetchone()[0]
+        assert stored == 0
+    
+    def test_rate_endpoint_rejects_inactive_user(self, client, as_user):
+        """A deactivated account cannot keep rating on a still-valid token"""
+        as_user.is_active = False
         
         response = client.post(
             "/rate/test123",
-            data={"rating": 3, "comment": "Average video"}
+            data={"rating": 4, "comment": "Still here"}
         )
         
-        assert response.status_code == 200  # Should still return 200
-        data = response.json()
-        assert "Thanks for rating" in data["message"]
-        assert "improvement_error" in data
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Inactive user"
+
+    def test_role_dependencies_stay_on_the_event_loop(self):
+        """Role checks do no blocking work, so FastAPI must not send them through its threadpool"""
+        import inspect
+        from security.auth import require_admin, require_user, require_user_claims
+        
+        for dependency in (require_admin, require_user, require_user_claims):
+            assert inspect.iscoroutinefunction(dependency)
+
+    def test_stream_file_checks_run_on_the_io_pool(self, client, tmp_path):
+        """exists()/stat() of the video file must not block the event loop"""
+        import threading
+        video = tmp_path / "test123.mp4"
+        video.write_bytes(b"mp4")
+        threads = []
+
+        def stored_video(vid):
+            threads.append(threading.current_thread().name)
+            return video, 3
+
+        with patch('backend.server._stored_video', stored_video):
+            response = client.get("/stream/test123")
+
+        assert response.status_code == 200 and response.content == b"mp4"
+        assert threads and threads[0].startswith("bhiv-io")
+
+    def test_hls_segment_stat_runs_on_the_io_pool(self, client, tmp_path):
+        """The segment lookup and its size for the I/O metrics come from one run_io call"""
+        import threading
+        segment = tmp_path / "seg_00000_0123456789ab.ts"
+        segment.write_bytes(b"ts")
+        threads = []
+
+        def segment_file(vid, rendition, name):
+            threads.append(threading.current_thread().name)
+            return (segment, 2) if name == segment.name else None
+
+        with patch('backend.server._segment_file', segment_file):
+            found = client.get(f"/stream/test123/hls/360p/{segment.name}")
+            missing = client.get("/stream/test123/hls/360p/seg_00001_0123456789ab.ts")
+
+        assert found.status_code == 200 and found.content == b"ts"
+        assert missing.status_code == 404
+        assert threads and all(name.startswith("bhiv-io") for name in threads)
 
 @pytest.mark.integration
 class TestAPIIntegration:
@@ -0,0 +1,124 @@
+# tests/test_auth_store.py - Unit Tests for the persistent user and refresh-token store
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+import sys
+sys.path.append('..')
+
+from security.store import AuthStore, UserExistsError, hash_token
+
+
+def make_user(user_id="u1", username="alice"):
+    return {
+        "id": user_id,
+        "username": username,
+        "email": f"{username}@example.com",
+        "password_hash": "hash",
+        "roles": ["user"],
+        "is_active": True,
+        "created_at": datetime(2024, 1, 1, 12, 0),
+        "last_login": None,
+    }
+
+
+class TestAuthStore:
+    """Test suite for users, refresh tokens and expiry purging"""
+
+    @pytest.fixture
+    def db_path(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            yield Path(temp_dir) / "auth.db"
+
+    @pytest.fixture
+    def store(self, db_path):
+        return AuthStore(db_path)
+
+    def test_user_round_trip(self, store):
+        """Users come back with the same types they were stored with"""
+        store.add_user(make_user())
+
+        by_name = store.get_user_by_username("alice")
+        assert by_name == make_user()
+        assert store.get_user_by_id("u1") == by_name
+        assert store.get_user_by_username("bob") is None
+
+    def test_duplicate_username_rejected(self, store):
+        """The unique index rejects a second account with the same name"""
+        store.add_user(make_user())
+        with pytest.raises(UserExistsError):
+            store.add_user(make_user(user_id="u2"))
+        assert store.add_user(make_user(user_id="u2"), ignore_existing=True) is False
+
+    def test_state_survives_reopen(self, db_path):
+        """A second store on the same file (restart / other worker) sees the data"""
+        first = AuthStore(db_path)
+        first.add_user(make_user())
+        first.save_refresh_token("tok", "u1", time.time() + 60)
+
+        second = AuthStore(db_path)
+        assert second.get_user_by_username("alice")["id"] == "u1"
+        assert second.get_refresh_token_user("tok") == "u1"
+
+    def test_refresh_tokens_are_hashed(self, store, db_path):
+        """Only digests of refresh tokens are written to disk"""
+        store.save_refresh_token("secret-token", "u1", time.time() + 60)
+        with sqlite3.connect(db_path) as conn:
+            stored = [row[0] for row in conn.execute("SELECT token_hash FROM refresh_tokens")]
+        assert stored == [hash_token("secret-token")]
+
+    def test_expired_tokens_rejected_and_purged(self, store):
+        """Expired tokens are invisible to lookups and removed by the purge"""
+        store.save_refresh_token("old", "u1", time.time() - 1)
+        store.save_refresh_token("new", "u1", time.time() + 60)
+
+        assert store.get_refresh_token_user("old") is None
+        assert store.purge_expired() == 1
+        assert store.count_refresh_tokens() == 1
+        assert store.get_refresh_token_user("new") == "u1"
+
+    def test_background_purger(self, store):
+        """The purge thread removes expired tokens without being called"""
+        store.save_refresh_token("old", "u1", time.time() - 1)
+        store.start_purger(interval=0.01)
+        try:
+            deadline = time.time() + 2
+            while store.count_refresh_tokens() and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            store.stop_purger()
+        assert store.count_refresh_tokens() == 0
+
+    def test_connections_are_closed(self, store, monkeypatch):
+        """Every call closes its connection instead of leaving it to the garbage collector"""
+        opened = []
+        connect = store._connect
+        monkeypatch.setattr(store, "_connect", lambda: opened.append(connect()) or opened[-1])
+
+        store.add_user(make_user())
+        store.get_user_by_username("alice")
+        store.save_refresh_token("tok", "u1", time.time() + 60)
+        store.get_refresh_token_user("tok")
+        with pytest.raises(UserExistsError):
+            store.add_user(make_user())
+
+        assert len(opened) == 5
+        for conn in opened:
+            with pytest.raises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+
+    def test_expiry_lookup_uses_index(self, store):
+        """The purge is a range scan on the expiry index, not a table scan"""
+        with store._connect() as conn:
+            plan = conn.execute(
+                "EXPLAIN QUERY PLAN DELETE FROM refresh_tokens WHERE expires_at <= ?", (0,)
+            ).fetchall()
+        assert any("idx_refresh_tokens_expires" in row[-1] for row in plan)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -10,7 +10,7 @@ sys.path.append('..')
 
 from bhiv_bucket import (
     init_bucket, save_script, save_storyboard, 
-    save_video, read_storyboard, BUCKET_ROOT
+    save_video, read_storyboard, read_storyboard_shared, BUCKET_ROOT
 )
 
 class TestBHIVBucket:
@@ -129,6 +129,17 @@ class TestBHIVBucket:
         assert len(read_data["scenes"]) == 1
         assert read_data["scenes"][0]["text"] == "Test scene"
     
+    def test_read_storyboard_returns_a_private_copy(self, temp_bucket):
+        """Callers may mutate and serialize what read_storyboard returns"""
+        path = save_storyboard({"title": "Copy", "scenes": [{"scene_id": 1}]}, "copy_test.json")
+
+        first = read_storyboard(path)
+        first["scenes"][0]["scene_id"] = 2
+        json.dumps(first)
+
+        assert read_storyboard(path)["scenes"][0]["scene_id"] == 1
+        assert read_storyboard_shared(path) is read_storyboard_shared(path)
+    
     def test_read_storyboard_file_not_found(self):
         """Test reading non-existent storyboard file"""
         with pytest.raises(FileNotFoundError):
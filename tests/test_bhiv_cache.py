@@ -0,0 +1,102 @@
+# tests/test_bhiv_cache.py - Unit Tests for the storyboard cache
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+import sys
+sys.path.append('..')
+
+from bhiv_cache import StoryboardCache, freeze, parsed_size, thaw
+
+
+class TestStoryboardCache:
+    """Test suite for the read-through storyboard cache"""
+
+    @pytest.fixture
+    def storyboard_file(self):
+        """Create a storyboard JSON file"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "sb.json"
+            path.write_text(json.dumps({"title": "T", "scenes": [{"scene_id": 1, "duration_secs": 4}]}))
+            yield path
+
+    def test_second_read_is_a_hit(self, storyboard_file):
+        """Unchanged files are served from memory"""
+        cache = StoryboardCache()
+        first = cache.get(storyboard_file)
+        second = cache.get(storyboard_file)
+
+        assert first is second
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_mtime_change_invalidates(self, storyboard_file):
+        """Rewriting the file causes a re-parse"""
+        cache = StoryboardCache()
+        cache.get(storyboard_file)
+
+        storyboard_file.write_text(json.dumps({"title": "Changed", "scenes": []}))
+        st = storyboard_file.stat()
+        os.utime(storyboard_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+        assert cache.get(storyboard_file)["title"] == "Changed"
+        assert cache.stats()["misses"] == 2
+
+    def test_entries_are_immutable(self, storyboard_file):
+        """Callers cannot corrupt shared entries"""
+        cache = StoryboardCache()
+        storyboard = cache.get(storyboard_file)
+
+        with pytest.raises(TypeError):
+            storyboard["title"] = "hacked"
+        with pytest.raises(TypeError):
+            storyboard["scenes"][0]["duration_secs"] = 1
+
+        copy = thaw(storyboard)
+        copy["scenes"][0]["duration_secs"] = 1
+        assert cache.get(storyboard_file)["scenes"][0]["duration_secs"] == 4
+        assert json.loads(json.dumps(copy))["scenes"][0]["duration_secs"] == 1
+
+    def test_lru_eviction_respects_memory_cap(self):
+        """Least recently used entries are evicted once the byte cap is exceeded"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            paths = []
+            for i in range(3):
+                path = Path(temp_dir) / f"sb{i}.json"
+                path.write_text(json.dumps({"title": "x" * 100, "scenes": []}))
+                paths.append(path)
+
+            size = parsed_size(json.loads(paths[0].read_text()))
+            assert size > paths[0].stat().st_size  # the cap charges memory, not file size
+            cache = StoryboardCache(max_bytes=size * 2)
+            cache.get(paths[0])
+            cache.get(paths[1])
+            cache.get(paths[0])  # paths[1] is now least recently used
+            cache.get(paths[2])
+
+            stats = cache.stats()
+            assert stats["entries"] == 2
+            assert stats["evictions"] == 1
+            assert stats["bytes"] <= size * 2
+
+            cache.get(paths[0])
+            assert cache.stats()["hits"] == 2
+
+    def test_missing_file_raises(self):
+        """Missing files raise FileNotFoundError like a plain read"""
+        with pytest.raises(FileNotFoundError):
+            StoryboardCache().get("nonexistent_storyboard.json")
+
+    def test_freeze_roundtrip(self):
+        """freeze/thaw preserve the JSON structure"""
+        data = {"a": [1, {"b": [2, 3]}], "c": "d"}
+        assert thaw(freeze(data)) == data
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
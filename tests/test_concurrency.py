@@ -0,0 +1,89 @@
+# tests/test_concurrency.py - Unit Tests for the API executor pools
+import asyncio
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+import sys
+sys.path.append('..')
+
+from backend.concurrency import get_connection, run_cpu, run_db, run_encode, run_io
+
+
+class TestConcurrency:
+    """Blocking work must leave the event loop thread"""
+
+    def test_work_runs_off_the_loop_thread(self):
+        """Each pool runs work on its own named worker threads"""
+        async def scenario():
+            loop_thread = threading.current_thread().name
+            names = await asyncio.gather(
+                run_db(lambda: threading.current_thread().name),
+                run_io(lambda: threading.current_thread().name),
+                run_encode(lambda: threading.current_thread().name),
+            )
+            return loop_thread, names
+
+        loop_thread, (db_name, io_name, encode_name) = asyncio.run(scenario())
+
+        assert loop_thread not in (db_name, io_name, encode_name)
+        assert db_name.startswith("bhiv-db")
+        assert io_name.startswith("bhiv-io")
+        assert encode_name.startswith("bhiv-encode")
+
+    def test_cpu_work_runs_in_another_process(self):
+        """CPU-bound Python is not serialised on this process's GIL"""
+        assert asyncio.run(run_cpu(os.getpid)) != os.getpid()
+
+    def test_loop_stays_responsive_during_blocking_work(self):
+        """A slow DB call does not delay other coroutines"""
+        import time
+
+        async def scenario():
+            slow = asyncio.ensure_future(run_db(time.sleep, 0.3))
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            waited = time.perf_counter() - started
+            await slow
+            return waited
+
+        assert asyncio.run(scenario()) < 0.2
+
+    def test_connection_reused_per_thread(self):
+        """DB workers keep one connection per database"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = Path(temp_dir) / "meta.db"
+
+            async def scenario():
+                return await run_db(lambda: get_connection(db_path) is get_connection(db_path))
+
+            assert asyncio.run(scenario()) is True
+
+    def test_durable_connection_is_separate_and_fully_synced(self):
+        """Rating writes get synchronous=FULL without changing the other pooled connection"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = Path(temp_dir) / "meta.db"
+            durable, fast = get_connection(db_path, durable=True), get_connection(db_path)
+
+            assert durable is not fast
+            assert durable.execute("PRAGMA synchronous").fetchone()[0] == 2  # FULL
+            assert fast.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+            durable.close()
+            fast.close()
+
+    def test_exceptions_propagate(self):
+        """Errors raised in a pool surface in the awaiting handler"""
+        def boom():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            asyncio.run(run_encode(boom))
+        with pytest.raises(ValueError):
+            asyncio.run(run_cpu(int, "not a number"))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
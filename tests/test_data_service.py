@@ -0,0 +1,150 @@
+# tests/test_data_service.py - Unit Tests for the shared Streamlit data service
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import sys
+sys.path.append('..')
+
+from data_service import DataService
+from gallery import ensure_gallery_schema
+
+
+class TestDataService:
+    """Test suite for the shared read cache and keyed invalidation"""
+
+    @pytest.fixture
+    def service(self):
+        """DataService over a small temporary database"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = Path(temp_dir) / "meta.db"
+            with sqlite3.connect(db_path) as conn:
+                conn.execute("CREATE TABLE videos (id TEXT PRIMARY KEY, title TEXT, created_at TEXT)")
+                conn.execute('''CREATE TABLE user_ratings
+                                (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, video_id TEXT,
+                                 rating INTEGER, comment TEXT)''')
+                ensure_gallery_schema(conn)
+                for i in range(4):
+                    conn.execute("INSERT INTO videos VALUES (?,?,?)", (f"v{i}", f"Video {i}", f"2024-01-0{i + 1}"))
+                conn.execute("INSERT INTO user_ratings (user_id, video_id, rating, comment) VALUES ('u1', 'v0', 4, 'ok')")
+                conn.commit()
+            yield DataService(db_path)
+
+    def test_repeated_page_views_do_not_query(self, service):
+        """A warm cache serves page views without touching SQLite"""
+        service.get_metrics()
+        service.get_page_ratings(["v0", "v1"], "u1")
+        queries = service.queries
+
+        for _ in range(10):
+            assert service.get_metrics() == (4, 1, 4.0)
+            summary = service.get_page_ratings(["v0", "v1"], "u1")
+
+        assert service.queries == queries
+        assert summary["v0"]["has_rated"] is True
+        assert summary["v1"]["has_rated"] is False
+
+    def test_rating_invalidates_only_that_video(self, service):
+        """Rating one video keeps unrelated pages and users warm"""
+        service.get_page_ratings(["v0"], "u1")
+        service.get_page_ratings(["v2"], "u1")
+        service.get_user_rated("u2")
+
+        service.add_rating("v0", 5, "great", user_id="u1")
+
+        keys = set(service._entries)
+        assert ("ratings", ("v0",)) not in keys
+        assert ("user_rated", "u1") not in keys
+        assert ("ratings", ("v2",)) in keys
+        assert ("user_rated", "u2") in keys
+
+        assert service.get_page_ratings(["v0"], "u1")["v0"]["count"] == 2
+        assert service.get_metrics()[1] == 2
+
+    def test_new_video_shifts_pages(self, service):
+        """invalidate_videos refreshes listings and counts"""
+        page, _ = service.get_video_page()
+        assert page[0]["id"] == "v3"
+
+        with service.connection() as conn:
+            conn.execute("INSERT INTO videos VALUES ('v9', 'New', '2024-02-01')")
+            conn.commit()
+        service.invalidate_videos()
+
+        page, _ = service.get_video_page()
+        assert page[0]["id"] == "v9"
+        assert service.get_metrics()[0] == 5
+
+    def test_concurrent_misses_load_once(self, service):
+        """Sessions missing the same key share a single load"""
+        calls = []
+        gate = threading.Event()
+
+        def loader():
+            calls.append(1)
+            gate.wait(1)
+            return "value"
+
+        threads = [threading.Thread(target=service.cached, args=("k", {"t"}, loader)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        gate.set()
+        for t in threads:
+            t.join()
+
+        assert len(calls) == 1
+        assert service.stats()["hits"] == 7
+        assert service._loads == {}  # no per-key state outlives the load
+
+    def test_only_overlapping_writes_discard_an_inflight_load(self, service):
+        """A load is cached unless one of its own tags was invalidated while it ran"""
+        def loader(tag):
+            def load():
+                service.invalidate(tag)  # a write lands mid-load
+                return "value"
+            return load
+
+        service.cached("a", {"video:v1"}, loader("video:v2"))
+        assert "a" in service._entries
+
+        service.cached("b", {"video:v1"}, loader("video:v1"))
+        assert "b" not in service._entries
+
+    def test_entries_are_bounded_and_expired_ones_dropped(self, service):
+        """Distinct keys cannot grow the cache past max_entries; lookups sweep expired keys"""
+        service.max_entries = 3
+        for i in range(5):
+            service.cached(("page", i), {"videos", f"user:u{i}"}, lambda: i)
+        service.cached(("page", 2), {"videos"}, lambda: "reloaded")  # touch: now most recent
+        service.cached(("page", 5), {"videos"}, lambda: 5)
+
+        assert list(service._entries) == [("page", 4), ("page", 2), ("page", 5)]
+        assert service.stats()["evictions"] == 3
+        assert set(service._tag_index) == {"videos", "user:u2", "user:u4"}
+
+        service.ttl = 0.01
+        service.cached("short", {"user:u9"}, lambda: 1)
+        time.sleep(0.02)
+        service.cached("other", {"videos"}, lambda: 2)
+        service.cached("short", {"user:u9"}, lambda: 3)  # expired: dropped and reloaded
+        assert service._entries["short"][1] == 3
+        assert service._tag_index["user:u9"] == {"short"}
+
+    def test_connections_are_closed(self, service, monkeypatch):
+        """Reads do not leak connections"""
+        opened = []
+        connect = service.connect
+        monkeypatch.setattr(service, "connect", lambda: opened.append(connect()) or opened[-1])
+
+        service.get_metrics()
+
+        with pytest.raises(sqlite3.ProgrammingError):
+            opened[0].execute("SELECT 1")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,145 @@
+# tests/test_engagement.py - Unit tests for the indexed engagement top-K
+import random
+import sqlite3
+
+import pytest
+
+import sys
+sys.path.append('..')
+
+from analytics.advanced_analytics import AdvancedAnalytics
+from analytics.engagement import EngagementIndex
+from analytics.feedback_analyzer import FeedbackAnalyzer
+
+
+def _expected_score(ratings):
+    avg = sum(r for r, _ in ratings) / len(ratings)
+    chars = sum(len(c) for _, c in ratings) / len(ratings)
+    return round(0.7 * avg / 5 + 0.3 * min(chars / 100, 1.0), 3)
+
+
+class TestEngagementIndex:
+    """Test suite for trigger-maintained engagement scores"""
+
+    @pytest.fixture
+    def db_path(self, tmp_path):
+        path = tmp_path / "meta.db"
+        with sqlite3.connect(path) as conn:
+            conn.execute("CREATE TABLE videos (id TEXT PRIMARY KEY, title TEXT, storyboard_path TEXT, video_path TEXT)")
+            conn.execute('''CREATE TABLE ratings
+                            (id INTEGER PRIMARY KEY AUTOINCREMENT, video_id TEXT, rating INTEGER, comment TEXT)''')
+            conn.execute("INSERT INTO ratings (video_id, rating, comment) VALUES ('seed', 3, 'existing row')")
+        return path
+
+    def test_top_k_matches_a_full_sort(self, db_path):
+        rng = random.Random(7)
+        index = EngagementIndex(db_path)
+        index.top()  # installs the triggers and backfills 'seed'
+
+        written = {"seed": [(3, "existing row")]}
+        with sqlite3.connect(db_path) as conn:
+            for _ in range(400):
+                vid, rating, comment = f"v{rng.randrange(40)}", rng.randint(1, 5), "x" * rng.randrange(150)
+                conn.execute("INSERT INTO ratings (video_id, rating, comment) VALUES (?,?,?)", (vid, rating, comment))
+                written.setdefault(vid, []).append((rating, comment))
+
+        expected = {vid: _expected_score(r) for vid, r in written.items()}
+        top = index.top(k=10)
+        scores = [v["engagement_score"] for v in top]
+        assert len(top) == 10 and scores == sorted(scores, reverse=True)
+        for v in top:  # SQLite and Python may round the last digit differently
+            assert v["engagement_score"] == pytest.approx(expected[v["video_id"]], abs=0.0011)
+        left_out = [score for vid, score in expected.items() if vid not in {v["video_id"] for v in top}]
+        assert max(left_out) <= min(scores) + 0.0011
+        assert index.top(k=10, window="week") == [v for v in top if v["video_id"] != "seed"][:10]
+
+    def test_windows_only_count_recent_days(self, db_path):
+        index = EngagementIndex(db_path)
+        index.top()
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("INSERT INTO ratings (video_id, rating, comment) VALUES ('new', 4, '')")
+            conn.execute("INSERT INTO ratings_daily_stats VALUES (date('now', '-3 days'), 'old', 1, 5, 500)")
+            conn.execute("INSERT INTO ratings_daily_stats VALUES (date('now', '-20 days'), 'ancient', 1, 5, 500)")
+
+        # 'seed' predates the triggers: its day is unknown, so it is only in the all-time ranking
+        assert [v["video_id"] for v in index.top(window="day")] == ["new"]
+        assert [v["video_id"] for v in index.top(window="week")] == ["old", "new"]
+        assert [v["video_id"] for v in index.top(window="all")] == ["new", "seed"]
+        assert [v["video_id"] for v in index.top(window="month")][0] in {"old", "ancient"}
+        with pytest.raises(ValueError):
+            index.top(window="year")
+
+    def test_windows_count_whole_days_ending_today(self, db_path):
+        """A window of N days is today plus N-1 earlier days, for the top-K and the dashboard trends alike"""
+        index = EngagementIndex(db_path)
+        index.top()
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("INSERT INTO ratings_daily_stats VALUES (date('now', '-6 days'), 'edge', 1, 4, 0)")
+            conn.execute("INSERT INTO ratings_daily_stats VALUES (date('now', '-7 days'), 'outside', 1, 5, 0)")
+
+        assert [v["video_id"] for v in index.top(window="week")] == ["edge"]
+        trends = AdvancedAnalytics(db_path, ratings_table="ratings", cache_ttl=0)
+        assert trends.get_rating_trends(days=7)["days_with_ratings"] == 1
+        assert trends.get_rating_trends(days=8)["days_with_ratings"] == 2
+
+    def test_delete_removes_video_from_totals(self, db_path):
+        index = EngagementIndex(db_path)
+        index.top()
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("DELETE FROM ratings WHERE video_id = 'seed'")
+
+        assert index.top() == []
+
+    def test_edits_and_deletes_keep_windows_exact(self, db_path):
+        """Updates and deletes correct the daily row of the day the rating was written"""
+        index = EngagementIndex(db_path)
+        index.top()
+        with sqlite3.connect(db_path) as conn:
+            conn.executemany("INSERT INTO ratings (video_id, rating, comment) VALUES (?, ?, ?)",
+                             [("a", 5, "x" * 40), ("a", 1, ""), ("b", 2, "y" * 10)])
+            conn.execute("UPDATE ratings_daily_stats SET day = date('now', '-2 days')")
+            conn.execute("UPDATE ratings_rating_days SET day = date('now', '-2 days')")
+            conn.execute("UPDATE ratings SET rating = 4, comment = 'zz' WHERE video_id = 'a' AND rating = 1")
+            conn.execute("UPDATE ratings SET video_id = 'a' WHERE video_id = 'b'")
+            conn.execute("DELETE FROM ratings WHERE video_id = 'a' AND rating = 5")
+            daily = conn.execute("SELECT day = date('now', '-2 days'), video_id, count, sum, comment_chars "
+                                 "FROM ratings_daily_stats").fetchall()
+
+        assert daily == [(1, "a", 2, 6, 12)]
+        assert index.top(window="day") == []
+        (a,) = index.top(window="week")
+        assert a == {"video_id": "a", "engagement_score": _expected_score([(4, "zz"), (2, "y" * 10)]),
+                     "rating": 3.0, "ratings": 2}
+        assert [v["video_id"] for v in index.top()] == ["seed", "a"]
+
+    def test_ratings_tables_are_indexed_separately(self, db_path):
+        """Installing the index for another ratings table leaves this one's scores alone"""
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("CREATE TABLE user_ratings (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, "
+                         "video_id TEXT, rating INTEGER, comment TEXT)")
+            conn.execute("INSERT INTO user_ratings (user_id, video_id, rating) VALUES ('u1', 'other', 5)")
+        before = EngagementIndex(db_path).top()
+
+        assert [v["video_id"] for v in EngagementIndex(db_path, "user_ratings").top()] == ["other"]
+        assert EngagementIndex(db_path).top() == before and before[0]["video_id"] == "seed"
+
+    def test_platform_analytics_uses_the_index(self, db_path, tmp_path):
+        with sqlite3.connect(db_path) as conn:
+            conn.executemany("INSERT INTO videos (id, title) VALUES (?, ?)", [("seed", "S"), ("star", "T")])
+            conn.execute("INSERT INTO ratings (video_id, rating, comment) VALUES ('star', 5, 'great examples')")
+
+        analyzer = FeedbackAnalyzer(str(db_path), str(tmp_path / "bucket"))
+        analyzed = []
+        analyze = analyzer.analyze_video_performance
+        analyzer.analyze_video_performance = lambda video_id: analyzed.append(video_id) or analyze(video_id)
+        analytics = analyzer.get_platform_analytics(top_k=1)
+
+        assert analytics["top_performing_videos"] == [{"video_id": "star", "engagement_score": 0.742, "rating": 5.0}]
+        # totals come from the index; only the top-K videos are analysed
+        assert analyzed == ["star"]
+        assert (analytics["total_videos"], analytics["total_ratings"], analytics["average_platform_rating"]) == \
+            (2, 2, 4.0)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,100 @@
+# tests/test_events.py - Unit tests for the rating event log and its consumers
+import sqlite3
+import threading
+
+import pytest
+
+import sys
+sys.path.append('..')
+
+from bhiv_events import MAX_ATTEMPTS, RATING_TOPIC, EventConsumer, EventLog
+
+
+class TestEventLog:
+    """Test suite for the append-only event log and consumer offsets"""
+
+    @pytest.fixture
+    def log(self, tmp_path):
+        return EventLog(tmp_path / "meta.db")
+
+    def test_append_commits_with_the_callers_transaction(self, log):
+        with sqlite3.connect(log.db_path) as conn:
+            conn.execute("CREATE TABLE ratings (id INTEGER PRIMARY KEY AUTOINCREMENT, video_id TEXT, rating INTEGER)")
+        conn = sqlite3.connect(log.db_path)
+        with conn:
+            conn.execute("INSERT INTO ratings (video_id, rating) VALUES ('v1', 4)")
+            first = log.append(RATING_TOPIC, {"video_id": "v1", "rating": 4}, conn=conn)
+        with pytest.raises(RuntimeError):
+            with conn:
+                conn.execute("INSERT INTO ratings (video_id, rating) VALUES ('v2', 1)")
+                log.append(RATING_TOPIC, {"video_id": "v2", "rating": 1}, conn=conn)
+                raise RuntimeError("request failed")
+        conn.close()
+
+        assert [e.payload["video_id"] for e in log.read(RATING_TOPIC)] == ["v1"]
+        assert log.read(RATING_TOPIC)[0].offset == first
+        assert log.read("other") == []
+
+    def test_consumers_keep_independent_offsets(self, log):
+        for i in range(25):
+            log.append(RATING_TOPIC, {"video_id": f"v{i % 3}", "rating": i % 5 + 1})
+        batches = []
+        sentiment = EventConsumer(log, "sentiment", RATING_TOPIC, batches.append, batch_size=10)
+        adaptation = EventConsumer(log, "adaptation", RATING_TOPIC, lambda events: None, batch_size=10)
+
+        assert sentiment.drain() == 25
+        assert [len(b) for b in batches] == [10, 10, 5]
+        assert log.lag("sentiment", RATING_TOPIC) == 0
+        assert log.lag("adaptation", RATING_TOPIC) == 25
+
+        log.append(RATING_TOPIC, {"video_id": "v9", "rating": 5})
+        assert sentiment.poll_once() == 1 and batches[-1][0].payload["video_id"] == "v9"
+        assert adaptation.drain() == 26
+
+    def test_failed_batches_are_retried_then_skipped(self, log):
+        log.append(RATING_TOPIC, {"video_id": "v1", "rating": 1})
+        calls = []
+
+        def flaky(events):
+            calls.append(events[0].offset)
+            raise ValueError("analysis backend down")
+
+        consumer = EventConsumer(log, "adaptation", RATING_TOPIC, flaky)
+        for _ in range(MAX_ATTEMPTS - 1):
+            with pytest.raises(ValueError):
+                consumer.poll_once()
+            assert log.lag("adaptation", RATING_TOPIC) == 1
+        assert consumer.poll_once() == 1
+        assert len(calls) == MAX_ATTEMPTS and log.lag("adaptation", RATING_TOPIC) == 0
+
+    def test_events_are_pruned_below_the_slowest_consumer(self, log):
+        for i in range(10):
+            log.append(RATING_TOPIC, {"video_id": f"v{i}", "rating": 5})
+        fast = EventConsumer(log, "sentiment", RATING_TOPIC, lambda events: None, batch_size=10)
+        slow = EventConsumer(log, "adaptation", RATING_TOPIC, lambda events: None, batch_size=4)
+
+        assert fast.drain() == 10
+        assert log.prune(RATING_TOPIC) == 0  # adaptation has not committed anything yet
+        assert slow.poll_once() == 4
+        assert log.prune(RATING_TOPIC) == 4
+        assert [e.offset for e in log.read(RATING_TOPIC)] == list(range(5, 11))
+        assert log.lag("adaptation", RATING_TOPIC) == 6 and log.lag("sentiment", RATING_TOPIC) == 0
+
+        log.forget("adaptation", RATING_TOPIC)
+        assert log.prune(RATING_TOPIC) == 6
+        assert log.read(RATING_TOPIC) == [] and log.lag("sentiment", RATING_TOPIC) == 0
+        assert log.append(RATING_TOPIC, {"video_id": "v10", "rating": 4}) == 11  # offsets are never reused
+
+    def test_started_consumer_is_woken_by_appends(self, log):
+        done = threading.Event()
+        consumer = EventConsumer(log, "sentiment", RATING_TOPIC, lambda events: done.set(), poll_interval=30)
+        consumer.start()
+        try:
+            log.append(RATING_TOPIC, {"video_id": "v1", "rating": 5})
+            assert done.wait(5)
+        finally:
+            consumer.stop()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
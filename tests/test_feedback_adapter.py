@@ -0,0 +1,95 @@
+# tests/test_feedback_adapter.py - Unit tests for single and catalog-wide storyboard adaptation
+import json
+import re
+import sqlite3
+
+import pytest
+
+import sys
+sys.path.append('..')
+
+from video import feedback_adapter
+
+
+def _storyboard(durations):
+    return {"title": "T", "scenes": [{"scene_id": i, "text": "x", "duration_secs": d} for i, d in enumerate(durations)]}
+
+
+class TestFeedbackAdapter:
+    """Test suite for threshold-crossing storyboard adaptation"""
+
+    @pytest.fixture
+    def catalog(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("bhiv_bucket.BUCKET_ROOT", tmp_path / "bucket")
+        db_path = tmp_path / "meta.db"
+        monkeypatch.setattr(feedback_adapter, "DBPATH", db_path)
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("CREATE TABLE videos (id TEXT PRIMARY KEY, title TEXT, storyboard_path TEXT, video_path TEXT)")
+            conn.execute('''CREATE TABLE ratings
+                            (id INTEGER PRIMARY KEY AUTOINCREMENT, video_id TEXT, rating INTEGER, comment TEXT)''')
+            for vid, ratings in {"good": [5, 4], "bad": [1, 2], "unrated": []}.items():
+                path = tmp_path / f"{vid}.json"
+                path.write_text(json.dumps(_storyboard([4, 2, 5])))
+                conn.execute("INSERT INTO videos (id, storyboard_path) VALUES (?, ?)", (vid, str(path)))
+                conn.executemany("INSERT INTO ratings (video_id, rating) VALUES (?, ?)", [(vid, r) for r in ratings])
+        return db_path
+
+    def _adapted(self, tmp_path, vid):
+        return [s["duration_secs"] for s in json.loads((tmp_path / "bucket" / "storyboards" / f"{vid}_adapted.json")
+                                                       .read_text())["scenes"]]
+
+    def test_only_crossed_videos_are_rewritten(self, catalog, tmp_path):
+        first = feedback_adapter.adapt_catalog(catalog)
+        assert first == {"videos": 3, "adapted": ["bad"], "failed": []}
+        assert self._adapted(tmp_path, "bad") == [3, 2, 4]
+
+        weights = feedback_adapter.get_weights(catalog)
+        assert weights["bad"]["adapted"] and weights["bad"]["avg_rating"] == 1.5
+        assert not weights["good"]["adapted"] and weights["unrated"]["ratings"] == 0
+
+        assert feedback_adapter.adapt_catalog(catalog)["adapted"] == []
+
+        with sqlite3.connect(catalog) as conn:
+            conn.executemany("INSERT INTO ratings (video_id, rating) VALUES (?, ?)", [("bad", 5)] * 4 + [("good", 1)] * 6)
+        assert feedback_adapter.adapt_catalog(catalog, video_ids=["bad"])["adapted"] == ["bad"]
+        assert self._adapted(tmp_path, "bad") == [4, 2, 5]  # restored from the original
+        assert feedback_adapter.adapt_catalog(catalog)["adapted"] == ["good"]
+
+    def test_catalog_reads_the_rating_stats(self, catalog, monkeypatch):
+        """Averages come from the per-video stats rows, not a scan of the ratings table"""
+        feedback_adapter.adapt_catalog(catalog)  # installs the stats triggers and backfills them
+        statements = []
+        connect = feedback_adapter.rating_stats.connect
+
+        def tracing_connect(*args, **kwargs):
+            conn = connect(*args, **kwargs)
+            conn.set_trace_callback(statements.append)
+            return conn
+        monkeypatch.setattr(feedback_adapter.rating_stats, "connect", tracing_connect)
+
+        with sqlite3.connect(catalog) as conn:
+            conn.executemany("INSERT INTO ratings (video_id, rating) VALUES ('good', ?)", [(1,)] * 6)
+        assert feedback_adapter.adapt_catalog(catalog)["adapted"] == ["good"]
+        assert feedback_adapter.get_weights(catalog)["good"]["ratings"] == 8
+        selects = [sql for sql in statements if sql.lstrip().startswith("SELECT")]
+        assert selects and not any(re.search(r"FROM ratings\b(?!_)", sql) for sql in selects)
+
+    def test_failed_videos_are_retried(self, catalog, tmp_path):
+        (tmp_path / "bad.json").write_text("{not json")
+        assert feedback_adapter.adapt_catalog(catalog)["failed"] == ["bad"]
+        assert not feedback_adapter.get_weights(catalog)["bad"]["adapted"]
+
+        (tmp_path / "bad.json").write_text(json.dumps(_storyboard([4])))
+        assert feedback_adapter.adapt_catalog(catalog)["adapted"] == ["bad"]
+
+    def test_single_storyboard_records_its_weight(self, catalog):
+        adapted = feedback_adapter.adapt_storyboard(_storyboard([4, 2]), "bad")
+
+        assert [s["duration_secs"] for s in adapted["scenes"]] == [3, 2]
+        weights = feedback_adapter.get_weights(catalog)
+        assert weights == {"bad": {"avg_rating": 1.5, "ratings": 2, "adapted": False,
+                                   "updated_at": weights["bad"]["updated_at"]}}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,52 @@
+# tests/test_feedback_analyzer.py - Unit tests for platform-level feedback aggregation
+import pytest
+
+import sys
+sys.path.append('..')
+
+from analytics.feedback_analyzer import FeedbackAnalyzer, FeedbackTrend, VideoAnalytics
+
+
+def _video(video_id, *trend_counts):
+    """VideoAnalytics whose trends hold the given {sentiment: count} tallies"""
+    trends = []
+    for counts in trend_counts:
+        total = sum(counts.values())
+        trends.append(FeedbackTrend(period="2024-01-01", average_rating=3.0, total_feedback=total,
+                                    sentiment_distribution={k: v / total for k, v in counts.items()},
+                                    improvement_areas=[], user_satisfaction_score=0.6))
+    return VideoAnalytics(video_id=video_id, total_views=0, average_rating=3.0, rating_distribution={},
+                          sentiment_trends=trends, engagement_score=0.0, improvement_suggestions=[])
+
+
+class TestPlatformSentiment:
+    """Test suite for FeedbackAnalyzer._analyze_platform_sentiment"""
+
+    def test_thirds_are_not_truncated(self):
+        """1/3 * 3 used to truncate to 0 and drop sentiments entirely"""
+        analyzer = FeedbackAnalyzer()
+        summary = analyzer._analyze_platform_sentiment([
+            _video("a", {"positive": 1, "neutral": 1, "negative": 1}),
+            _video("b", {"positive": 7, "negative": 3}, {"neutral": 5}),
+        ])
+
+        assert summary == {"positive": round(8 / 18, 3), "neutral": round(6 / 18, 3), "negative": round(4 / 18, 3)}
+
+    def test_weighted_by_feedback_volume(self):
+        analyzer = FeedbackAnalyzer()
+        summary = analyzer._analyze_platform_sentiment([
+            _video("big", {"positive": 999}),
+            _video("small", {"negative": 1}),
+        ])
+
+        assert summary == {"positive": 0.999, "negative": 0.001}
+
+    def test_no_feedback(self):
+        analyzer = FeedbackAnalyzer()
+
+        assert analyzer._analyze_platform_sentiment([]) == {"positive": 0, "negative": 0, "neutral": 0}
+        assert analyzer._analyze_platform_sentiment([_video("empty")]) == {"positive": 0, "negative": 0, "neutral": 0}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
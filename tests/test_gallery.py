@@ -0,0 +1,100 @@
+# tests/test_gallery.py - Unit Tests for gallery pagination queries
+import sqlite3
+
+import pytest
+
+import sys
+sys.path.append('..')
+
+from gallery import ensure_gallery_schema, fetch_video_page, fetch_page_ratings
+
+
+class TestGalleryQueries:
+    """Test suite for keyset pagination and batched rating lookups"""
+
+    @pytest.fixture
+    def conn(self):
+        """In-memory database with videos and ratings"""
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE TABLE videos (id TEXT PRIMARY KEY, title TEXT)")
+        conn.execute('''CREATE TABLE user_ratings
+                        (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, video_id TEXT,
+                         rating INTEGER, comment TEXT)''')
+        ensure_gallery_schema(conn)
+
+        for i in range(23):
+            created_at = None if i < 3 else f"2024-01-{i:02d}T00:00:00"
+            conn.execute("INSERT INTO videos (id, title, created_at) VALUES (?,?,?)",
+                         (f"v{i:02d}", f"Video {i}", created_at))
+        # Two videos share a timestamp to exercise the id tie-breaker
+        conn.execute("UPDATE videos SET created_at = '2024-01-10T00:00:00' WHERE id = 'v11'")
+        for i in range(6):
+            conn.execute("INSERT INTO user_ratings (user_id, video_id, rating, comment) VALUES (?,?,?,?)",
+                         (f"u{i}", "v10", i % 5 + 1, f"comment {i}"))
+        conn.commit()
+        yield conn
+        conn.close()
+
+    def test_pages_cover_every_video_once(self, conn):
+        """Walking the cursors visits each row exactly once, newest first"""
+        seen, cursor = [], None
+        while True:
+            page, cursor = fetch_video_page(conn, ("title",), cursor, page_size=5)
+            assert len(page) <= 5
+            seen.extend(video["id"] for video in page)
+            if cursor is None:
+                break
+
+        assert len(seen) == 23
+        assert len(set(seen)) == 23
+        assert seen[0] == "v22"
+        assert seen[-3:] == ["v02", "v01", "v00"]  # undated rows sort last
+
+    def test_last_page_has_no_cursor(self, conn):
+        """A page that reaches the end reports no next cursor"""
+        page, cursor = fetch_video_page(conn, ("title",), page_size=50)
+        assert len(page) == 23
+        assert cursor is None
+
+    def test_deep_pages_seek_the_index(self, conn):
+        """Every page query, dated or not, is an index search rather than a scan"""
+        statements = []
+        conn.set_trace_callback(statements.append)
+        cursor = None
+        while True:
+            _, cursor = fetch_video_page(conn, ("title",), cursor, page_size=5)
+            if cursor is None:
+                break
+
+        assert statements
+        for sql in statements:
+            plan = " ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"))
+            assert "SEARCH videos USING INDEX idx_videos_created_id" in plan, (sql, plan)
+            assert "SCAN" not in plan and "TEMP B-TREE" not in plan, (sql, plan)
+
+    def test_page_ratings_single_query(self, conn):
+        """Counts, recent ratings and has-rated come back for the whole page"""
+        statements = []
+        conn.set_trace_callback(statements.append)
+
+        summary = fetch_page_ratings(conn, ["v10", "v11"], user_id="u0")
+
+        assert len(statements) == 1
+        assert summary["v10"]["count"] == 6
+        assert summary["v10"]["recent"][0] == (1, "comment 5")
+        assert len(summary["v10"]["recent"]) == 3
+        assert summary["v10"]["has_rated"] is True  # u0's rating is not among the recent ones
+        assert summary["v11"] == {"count": 0, "recent": [], "has_rated": False}
+
+    def test_page_ratings_without_user(self, conn):
+        """has_rated is False when no user is given"""
+        summary = fetch_page_ratings(conn, ["v10"])
+        assert summary["v10"]["has_rated"] is False
+
+    def test_empty_page(self, conn):
+        """No ids means no query"""
+        assert fetch_page_ratings(conn, []) == {}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
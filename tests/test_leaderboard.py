@@ -0,0 +1,167 @@
+# tests/test_leaderboard.py - Unit tests for the confidence-adjusted leaderboard
+import random
+import sqlite3
+
+import pytest
+
+import sys
+sys.path.append('..')
+
+from analytics import rating_stats
+from analytics.leaderboard import RANKINGS, Leaderboard, bayesian_average, wilson_lower_bound
+from analytics.rating_stats import _has_math_functions
+
+
+class TestLeaderboard:
+    """Test suite for trigger-maintained Bayesian/Wilson rankings"""
+
+    @pytest.fixture
+    def db_path(self, tmp_path):
+        path = tmp_path / "meta.db"
+        with sqlite3.connect(path) as conn:
+            conn.execute('''CREATE TABLE ratings
+                            (id INTEGER PRIMARY KEY AUTOINCREMENT, video_id TEXT, rating INTEGER, comment TEXT)''')
+            conn.executemany("INSERT INTO ratings (video_id, rating) VALUES (?, ?)", [("seed", 4), ("seed", 2)])
+        return path
+
+    @pytest.fixture
+    def rankings(self, db_path):
+        conn = sqlite3.connect(db_path)
+        try:
+            return RANKINGS if _has_math_functions(conn) else ("bayesian",)
+        finally:
+            conn.close()
+
+    def _fill(self, db_path, board, count=300, videos=30):
+        board.page()  # installs the triggers and backfills 'seed'
+        rng = random.Random(11)
+        written = {"seed": [4, 2]}
+        with sqlite3.connect(db_path) as conn:
+            for _ in range(count):
+                vid, rating = f"v{rng.randrange(videos)}", rng.randint(1, 5)
+                conn.execute("INSERT INTO ratings (video_id, rating) VALUES (?, ?)", (vid, rating))
+                written.setdefault(vid, []).append(rating)
+        return written
+
+    def test_scores_match_the_formulas(self, db_path, rankings):
+        board = Leaderboard(db_path)
+        written = self._fill(db_path, board)
+
+        formulas = {"bayesian": bayesian_average, "wilson": wilson_lower_bound}
+        for ranking in rankings:
+            entries, _ = board.page(ranking, page_size=100)
+            assert {e["video_id"] for e in entries} == set(written)
+            for e in entries:
+                ratings = written[e["video_id"]]
+                assert e["ratings"] == len(ratings)
+                assert e["score"] == pytest.approx(formulas[ranking](len(ratings), sum(ratings)), abs=1e-4)
+
+    def test_a_single_five_star_does_not_win(self, db_path, rankings):
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("INSERT INTO ratings (video_id, rating) VALUES ('lucky', 5)")
+            conn.executemany("INSERT INTO ratings (video_id, rating) VALUES ('steady', ?)", [(5,), (5,), (5,), (4,)] * 10)
+        board = Leaderboard(db_path)
+
+        for ranking in rankings:
+            entries, _ = board.page(ranking)
+            assert entries[0]["video_id"] == "steady"
+            assert board.rank_of("lucky", ranking) == 2
+        assert board.rank_of("missing") is None
+
+    def test_pages_cover_every_video_once(self, db_path, rankings):
+        board = Leaderboard(db_path)
+        written = self._fill(db_path, board)
+
+        for ranking in rankings:
+            seen, cursor = [], None
+            while True:
+                entries, cursor = board.page(ranking, cursor, page_size=7)
+                seen.extend(entries)
+                if cursor is None:
+                    break
+            assert sorted(e["video_id"] for e in seen) == sorted(written)
+            scores = [e["score"] for e in seen]
+            assert scores == sorted(scores, reverse=True)
+        with pytest.raises(ValueError):
+            board.page("median")
+
+    def test_pages_and_ranks_seek_the_index(self, db_path, rankings, monkeypatch):
+        """Cursor pages and rank counts are index searches on (-score, video_id), never scans"""
+        board = Leaderboard(db_path)
+        self._fill(db_path, board)
+        statements = []
+        connect = rating_stats.connect
+
+        def traced_connect(*args, **kwargs):
+            conn = connect(*args, **kwargs)
+            conn.set_trace_callback(statements.append)
+            return conn
+
+        monkeypatch.setattr(rating_stats, "connect", traced_connect)
+        for ranking in rankings:
+            _, cursor = board.page(ranking, page_size=7)
+            board.page(ranking, cursor, page_size=7)
+            board.rank_of("seed", ranking)
+
+        with sqlite3.connect(db_path) as conn:
+            plans = [(sql, " ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")))
+                     for sql in statements if "ratings_video_stats" in sql and "video_id = " not in sql]
+        assert len(plans) == 4 * len(rankings)
+        for sql, plan in plans:
+            assert "SEARCH ratings_video_stats USING" in plan and "_rank" in plan, (sql, plan)
+            assert "SCAN" not in plan and "TEMP B-TREE" not in plan, (sql, plan)
+
+    def test_upgrades_descending_score_indexes(self, db_path):
+        """Stats tables from before the rank columns gain them in place, keeping their rows"""
+        board = Leaderboard(db_path)
+        board.page()
+        with sqlite3.connect(db_path) as conn:
+            for score in ("bayesian", "wilson"):
+                conn.execute(f"DROP INDEX idx_ratings_video_stats_{score}_rank")
+                conn.execute(f"ALTER TABLE ratings_video_stats DROP COLUMN {score}_rank")
+                conn.execute(f"CREATE INDEX idx_ratings_video_stats_{score} ON ratings_video_stats ({score} DESC, video_id)")
+            conn.execute("INSERT INTO ratings_daily_stats VALUES ('2024-01-01', 'seed', 1, 3, 0)")
+        rating_stats._schema_ready.clear()
+
+        (seed,), _ = board.page()
+        assert seed["video_id"] == "seed" and board.rank_of("seed") == 1
+        with sqlite3.connect(db_path) as conn:
+            indexes = {row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='ratings_video_stats'")}
+            assert conn.execute("SELECT COUNT(*) FROM ratings_daily_stats").fetchone()[0] == 1
+        assert "idx_ratings_video_stats_bayesian_rank" in indexes
+        assert "idx_ratings_video_stats_bayesian" not in indexes
+
+    def test_edits_rescore_both_videos(self, db_path, rankings):
+        """Changing a rating or moving it to another video updates both rows"""
+        board = Leaderboard(db_path)
+        board.page()
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("INSERT INTO ratings (video_id, rating) VALUES ('other', 1)")
+            conn.execute("UPDATE ratings SET rating = 5 WHERE video_id = 'seed' AND rating = 2")
+            conn.execute("UPDATE ratings SET video_id = 'seed' WHERE video_id = 'other'")
+
+        (seed,), _ = board.page(page_size=5)
+        assert (seed["video_id"], seed["ratings"], seed["average_rating"]) == ("seed", 3, round(10 / 3, 2))
+        assert seed["score"] == pytest.approx(bayesian_average(3, 10), abs=1e-4)
+        if "wilson" in rankings:
+            entries, _ = board.page("wilson")
+            assert entries[0]["score"] == pytest.approx(wilson_lower_bound(3, 10), abs=1e-4)
+        assert board.rank_of("other") is None
+
+    def test_delete_updates_scores(self, db_path):
+        board = Leaderboard(db_path)
+        board.page()
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("DELETE FROM ratings WHERE video_id = 'seed' AND rating = 2")
+        entries, _ = board.page()
+        assert entries[0]["ratings"] == 1
+        assert entries[0]["score"] == pytest.approx(bayesian_average(1, 4), abs=1e-4)
+
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("DELETE FROM ratings")
+        assert board.page() == ([], None)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
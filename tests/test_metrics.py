@@ -0,0 +1,100 @@
+# tests/test_metrics.py - Unit Tests for request metrics and Prometheus exposition
+import asyncio
+
+import pytest
+
+import sys
+sys.path.append('..')
+
+from bhiv_metrics import Counter, Histogram, MetricsMiddleware, Registry, REQUESTS, REQUEST_SECONDS, IN_FLIGHT
+
+
+class FakeRoute:
+    def __init__(self, path, endpoint):
+        self.path = path
+        self.endpoint = endpoint
+
+
+class FakeApp:
+    """Minimal ASGI app that routes like Starlette (sets scope["endpoint"])"""
+
+    def __init__(self):
+        self.router = self
+        self.routes = [FakeRoute("/rate/{vid}", self.rate)]
+
+    async def rate(self):
+        pass
+
+    async def __call__(self, scope, receive, send):
+        scope["app"] = self
+        if scope["path"].startswith("/rate/"):
+            scope["endpoint"] = self.rate
+            status = 200
+        else:
+            status = 404
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+
+def call(app, method, path):
+    async def send(message):
+        pass
+
+    async def receive():
+        return {"type": "http.request"}
+
+    asyncio.run(app({"type": "http", "method": method, "path": path}, receive, send))
+
+
+class TestMetrics:
+    """Test suite for metric types, text format and the ASGI middleware"""
+
+    def test_counter_and_histogram_text(self):
+        """Counters and cumulative histogram buckets render in Prometheus format"""
+        registry = Registry()
+        hits = registry.register(Counter("hits_total", "Hits", ("route",)))
+        latency = registry.register(Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0)))
+
+        hits.labels('/a"b').inc()
+        hits.labels('/a"b').inc(2)
+        for value in (0.05, 0.5, 5.0):
+            latency.observe(value)
+
+        text = registry.render()
+        assert '# TYPE hits_total counter' in text
+        assert 'hits_total{route="/a\\"b"} 3.0' in text
+        assert 'latency_seconds_bucket{le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{le="1.0"} 2' in text
+        assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+        assert 'latency_seconds_count 3' in text
+        assert 'latency_seconds_sum 5.55' in text
+
+    def test_duplicate_registration_rejected(self):
+        """A metric name can only be registered once"""
+        registry = Registry()
+        registry.register(Counter("x_total", "X"))
+        with pytest.raises(ValueError):
+            registry.register(Counter("x_total", "X"))
+
+    def test_label_count_checked(self):
+        """Wrong label arity is an error, not a silent new series"""
+        with pytest.raises(ValueError):
+            Counter("y_total", "Y", ("a", "b")).labels("only-one")
+
+    def test_middleware_labels_by_route_template(self):
+        """Requests are counted under the route template, unmatched paths share one label"""
+        app = MetricsMiddleware(FakeApp())
+        before = REQUESTS.labels("POST", "/rate/{vid}", "200").value
+
+        call(app, "POST", "/rate/abc")
+        call(app, "POST", "/rate/def")
+        call(app, "GET", "/nope")
+
+        assert REQUESTS.labels("POST", "/rate/{vid}", "200").value == before + 2
+        assert REQUESTS.labels("GET", "unmatched", "404").value >= 1
+        assert REQUEST_SECONDS.labels("POST", "/rate/{vid}").counts[-1] == 0  # fast, no +Inf overflow
+        assert IN_FLIGHT.labels("POST").value == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
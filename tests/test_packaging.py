@@ -0,0 +1,86 @@
+# tests/test_packaging.py - Unit tests for HLS segment planning and packaging
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import sys
+sys.path.append('..')
+
+import bhiv_bucket
+from video import packaging
+from video.packaging import Segment, ensure_package, master_playlist, plan_segments, segment_path
+
+
+class TestPackaging:
+    """Test suite for segment plans, playlists and lazy packaging"""
+
+    @pytest.fixture
+    def bucket(self, tmp_path, monkeypatch):
+        root = tmp_path / "bucket"
+        monkeypatch.setattr(bhiv_bucket, "BUCKET_ROOT", root)
+        bhiv_bucket.init_bucket()
+        scenes = [{"text": "Intro", "duration_secs": 3}, {"text": "Concept", "duration_secs": 6}]
+        (root / "storyboards" / "v1.json").write_text(json.dumps({"scenes": scenes}))
+        return root
+
+    @pytest.fixture
+    def encodes(self, monkeypatch):
+        calls = []
+
+        def render(storyboard, segments, output_paths, size, fps, bitrate, workers):
+            calls.append((size, list(segments)))
+            for segment, path in zip(segments, output_paths):
+                path.write_bytes(f"{segment.scene_index}@{segment.offset}".encode())
+        monkeypatch.setattr(packaging, "render_scene_segments", render)
+        return calls
+
+    def test_scenes_are_cut_into_bounded_segments(self):
+        scenes = [{"duration_secs": 3}, {"duration_secs": 9}, {"duration_secs": 4}, {"duration_secs": 0}]
+
+        segments = plan_segments(scenes, target=4)
+
+        assert segments == [Segment(0, 0.0, 0.0, 3.0), Segment(1, 3.0, 0.0, 3.0), Segment(1, 6.0, 3.0, 3.0),
+                            Segment(1, 9.0, 6.0, 3.0), Segment(2, 12.0, 0.0, 4.0)]
+
+    def test_playlists(self):
+        text = packaging.media_playlist([Segment(0, 0.0, 0.0, 3.0), Segment(1, 3.0, 0.0, 2.5)], ["a.ts", "b.ts"])
+        assert text.splitlines() == ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:3",
+                                     "#EXT-X-MEDIA-SEQUENCE:0", "#EXT-X-PLAYLIST-TYPE:VOD",
+                                     "#EXT-X-INDEPENDENT-SEGMENTS", "#EXTINF:3.000,", "a.ts",
+                                     "#EXTINF:2.500,", "b.ts", "#EXT-X-ENDLIST"]
+        master = master_playlist().splitlines()
+        assert master[3].startswith("#EXT-X-STREAM-INF:BANDWIDTH=500000,RESOLUTION=480x360")
+        assert master[4] == "360p/index.m3u8"
+
+    def test_package_is_built_once_and_published_whole(self, bucket, encodes):
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            playlists = list(pool.map(lambda _: ensure_package("v1", "360p"), range(3)))
+
+        assert len(set(playlists)) == 1 and len(encodes) == 1
+        assert len(packaging._locks) == 0  # shared with video.renditions: dropped after each package
+        assert encodes[0][0] == (480, 360) and len(encodes[0][1]) == 3  # 3s intro + 6s concept as 2 x 3s
+        names = [line for line in playlists[0].read_text().splitlines() if not line.startswith("#")]
+        assert segment_path("v1", "360p", names[2]).read_bytes() == b"1@3.0"
+        assert segment_path("v1", "360p", "../../storyboards/v1.json") is None
+        assert not list((bucket / "tmp").iterdir())
+
+        ensure_package("v1", "720p")
+        other = [line for line in (bucket / "hls" / "v1" / "720p" / "index.m3u8").read_text().splitlines()
+                 if not line.startswith("#")]
+        assert set(other).isdisjoint(names)  # digest differs per rendition, so URLs are never reused
+
+    def test_failed_packaging_publishes_nothing(self, bucket, monkeypatch):
+        def render(storyboard, segments, output_paths, **kwargs):
+            output_paths[0].write_bytes(b"only one")
+        monkeypatch.setattr(packaging, "render_scene_segments", render)
+
+        assert ensure_package("v1", "480p") is None
+        assert not (bucket / "hls" / "v1" / "480p").exists()
+        assert ensure_package("missing", "480p") is None
+        with pytest.raises(ValueError):
+            ensure_package("v1", "4k")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
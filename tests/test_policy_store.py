@@ -0,0 +1,107 @@
+# tests/test_policy_store.py - Unit tests for the versioned storyboard policy weights
+import sqlite3
+
+import pytest
+
+import sys
+sys.path.append('..')
+
+from analytics.feedback_analyzer import FeedbackAnalyzer
+from video.policy_store import DEFAULT_POLICY, MAX_WEIGHT, SCENE_TYPES, PolicyStore, scene_type
+from video.storyboard import generate_storyboard_from_file
+
+
+class TestPolicyStore:
+    """Test suite for policy weights, versions and their use in storyboard generation"""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        return PolicyStore(tmp_path / "meta.db")
+
+    def test_batch_update_is_one_version(self, store):
+        assert store.snapshot().weights("v1") == (1.0,) * len(SCENE_TYPES)
+
+        version = store.update({"v1": {"example": 1.5}, "v2": {"concept": 0.5}, DEFAULT_POLICY: {"intro": 0.8}})
+        snapshot = store.snapshot()
+
+        assert snapshot.version == version and len(snapshot) == 3
+        assert snapshot.weight("v1", "example") == 1.5
+        assert snapshot.weight("v2", "concept") == 0.5
+        assert snapshot.weight("unknown", "intro") == pytest.approx(0.8)  # catalog default
+        assert store.snapshot() is snapshot  # unchanged version, no reload
+
+        store.update({"v1": {"example": 2.0}})
+        assert store.snapshot().weight("v1", "example") == MAX_WEIGHT  # 1.5 * 2.0, clamped
+        assert [v for v, _ in store.history("v1")] == [version, version + 1]
+
+    def test_invalid_batch_writes_nothing(self, store):
+        store.update({"v1": {"example": 1.5}})
+        with pytest.raises(ValueError):
+            store.update({"v1": {"example": 0.5}, "v2": {"outro": 1.2}})
+        assert store.snapshot().weight("v1", "example") == 1.5
+        assert len(store.versions()) == 1
+
+    def test_rollback_restores_an_earlier_version(self, store):
+        first = store.update({"v1": {"concept": 1.2}})
+        store.update({"v1": {"concept": 1.5}, "v2": {"summary": 0.7}})
+
+        restored = store.rollback(first)
+
+        snapshot = store.snapshot()
+        assert snapshot.version == restored
+        assert snapshot.weight("v1", "concept") == pytest.approx(1.2)
+        assert snapshot.weights("v2") == (1.0,) * len(SCENE_TYPES)
+        with pytest.raises(ValueError):
+            store.rollback(99)
+
+    def test_rolling_back_to_a_rollback_version(self, store):
+        """Videos a rollback dropped stay dropped when that rollback version is restored later"""
+        first = store.update({"A": {"concept": 1.2}})
+        store.update({"B": {"concept": 1.5}})
+        rolled_back = store.rollback(first)
+        store.update({"A": {"concept": 1.5}})
+
+        store.rollback(rolled_back)
+
+        snapshot = store.snapshot()
+        assert len(snapshot) == 1
+        assert snapshot.weight("A", "concept") == pytest.approx(1.2)
+        assert snapshot.weights("B") == (1.0,) * len(SCENE_TYPES)
+        assert store.history("B")[-1] == (rolled_back, None)
+        assert [v["videos"] for v in store.versions()] == [1, 1, 1, 1, 1]
+
+    def test_storyboard_durations_follow_the_policy(self, store, tmp_path):
+        script = tmp_path / "lesson.txt"
+        script.write_text("Welcome\nVariables hold values\nFor example x = 1\nIn summary, use names")
+        store.update({"v1": {"example": 1.5, "intro": 0.25}})
+
+        storyboard = generate_storyboard_from_file(script, video_id="v1", policy=store.snapshot())
+
+        assert [s["scene_type"] for s in storyboard["scenes"]] == ["intro", "concept", "example", "summary"]
+        assert [s["duration_secs"] for s in storyboard["scenes"]] == [2, 4.0, 6.0, 4.0]
+        assert scene_type("Anything", 0, 1) == "concept"
+
+    def test_rlhf_updates_are_applied_as_one_version(self, tmp_path):
+        db_path = tmp_path / "meta.db"
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("CREATE TABLE videos (id TEXT PRIMARY KEY, title TEXT, storyboard_path TEXT, video_path TEXT)")
+            conn.execute('''CREATE TABLE ratings
+                            (id INTEGER PRIMARY KEY AUTOINCREMENT, video_id TEXT, rating INTEGER, comment TEXT)''')
+            conn.executemany("INSERT INTO videos (id, title) VALUES (?, ?)", [("v1", "A"), ("v2", "B")])
+        analyzer = FeedbackAnalyzer(str(db_path), str(tmp_path / "bucket"))
+        negative = [{"comment": "needs an example, too slow", "sentiment": {"sentiment": "negative"}}] * 10
+        analyzer._get_feedback_logs = lambda vid: negative if vid == "v1" else []
+
+        updates = analyzer.generate_rlhf_insights("v1")["policy_updates"]
+        result = analyzer.update_policy()
+
+        assert updates["example"] > 1 and updates["concept"] < 1
+        assert result["videos_updated"] == 1
+        snapshot = PolicyStore(db_path).snapshot()
+        assert snapshot.version == result["version"]
+        assert snapshot.weight("v1", "example") == pytest.approx(updates["example"])
+        assert snapshot.weights("v2") == (1.0,) * len(SCENE_TYPES)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,79 @@
+# tests/test_renditions.py - Unit tests for the rendition ladder and lazy encoding
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import sys
+sys.path.append('..')
+
+import bhiv_bucket
+from video import renditions
+from video.renditions import DEFAULT_RENDITION, LADDER, ensure_rendition, select_rendition
+
+
+class TestRenditions:
+    """Test suite for rendition selection and on-demand encoding"""
+
+    @pytest.fixture
+    def bucket(self, tmp_path, monkeypatch):
+        root = tmp_path / "bucket"
+        monkeypatch.setattr(bhiv_bucket, "BUCKET_ROOT", root)
+        bhiv_bucket.init_bucket()
+        (root / "storyboards" / "v1.json").write_text(json.dumps({"scenes": [{"text": "Hello", "duration_secs": 2}]}))
+        (root / "videos" / "v1.mp4").write_bytes(b"default")
+        return root
+
+    @pytest.fixture
+    def encodes(self, monkeypatch):
+        calls = []
+        lock = threading.Lock()
+
+        def render(storyboard, output_path, size, fps, bitrate):
+            time.sleep(0.02)
+            with lock:
+                calls.append((size, fps, bitrate))
+            with open(output_path, "wb") as f:
+                f.write(f"{size[1]}p {storyboard['scenes'][0]['text']}".encode())
+        monkeypatch.setattr(renditions, "render_video_from_storyboard", render)
+        return calls
+
+    def test_selection_from_parameter_and_hints(self):
+        assert select_rendition().name == DEFAULT_RENDITION
+        assert select_rendition("720p").name == "720p"
+        assert select_rendition(save_data="on").name == LADDER[0].name
+        assert select_rendition(downlink="0.5").name == "360p"
+        assert select_rendition(downlink="1.5").name == "480p"
+        assert select_rendition(downlink="10").name == DEFAULT_RENDITION  # hints never step up
+        assert select_rendition(downlink="fast").name == DEFAULT_RENDITION
+        with pytest.raises(ValueError):
+            select_rendition("4k")
+
+    def test_renditions_are_encoded_once_on_first_request(self, bucket, encodes):
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            paths = list(pool.map(lambda _: ensure_rendition("v1", "360p"), range(4)))
+
+        assert len(set(paths)) == 1 and paths[0].name == "v1_360p.mp4"
+        assert paths[0].read_bytes() == b"360p Hello"
+        assert encodes == [((480, 360), 24, "500k")]
+        assert len(renditions._locks) == 0  # per-encode locks do not outlive the encode
+        assert renditions.encoded_rendition("v1", "360p") == paths[0]
+        assert renditions.encoded_rendition("v1", "720p") is None
+        assert ensure_rendition("v1", DEFAULT_RENDITION).read_bytes() == b"default"
+        assert not list((bucket / "tmp").iterdir())
+        listed = {r["name"]: r["encoded"] for r in renditions.list_renditions("v1")}
+        assert listed == {"360p": True, "480p": True, "720p": False}
+
+    def test_failed_or_impossible_encodes_are_not_cached(self, bucket, monkeypatch):
+        monkeypatch.setattr(renditions, "render_video_from_storyboard",
+                            lambda storyboard, output_path, **kwargs: open(output_path, "wb").close())
+
+        assert ensure_rendition("v1", "720p") is None  # empty placeholder from a failed render
+        assert not (bucket / "videos" / "v1_720p.mp4").exists()
+        assert ensure_rendition("missing", "720p") is None  # no storyboard to render from
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
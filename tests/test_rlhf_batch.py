@@ -0,0 +1,96 @@
+# tests/test_rlhf_batch.py - Unit tests for the catalog-wide RLHF pass
+import random
+import sqlite3
+
+import pytest
+
+import sys
+sys.path.append('..')
+
+from analytics import rlhf_batch
+from analytics.feedback_analyzer import FeedbackAnalyzer
+
+
+class TestRLHFBatch:
+    """Test suite for vectorized rewards, confidences and trajectories"""
+
+    @pytest.fixture
+    def db_path(self, tmp_path):
+        path = tmp_path / "meta.db"
+        with sqlite3.connect(path) as conn:
+            conn.execute("CREATE TABLE videos (id TEXT PRIMARY KEY, title TEXT, storyboard_path TEXT, video_path TEXT)")
+            conn.execute('''CREATE TABLE ratings
+                            (id INTEGER PRIMARY KEY AUTOINCREMENT, video_id TEXT, rating INTEGER, comment TEXT)''')
+            conn.executemany("INSERT INTO ratings (video_id, rating, comment) VALUES (?, ?, ?)",
+                             [("v1", 5, "x" * 50), ("v1", 3, ""), ("v2", 1, "bad")])
+        return path
+
+    @staticmethod
+    def _daily(db_path):
+        """On top of the undated fixture rows: two ratings for v1 yesterday and one today"""
+        with sqlite3.connect(db_path) as conn:
+            conn.executemany("INSERT INTO ratings (video_id, rating, comment) VALUES ('v1', ?, '')", [(5,), (5,)])
+            conn.execute("UPDATE ratings_daily_stats SET day = date('now', '-1 days')")
+            conn.execute("UPDATE ratings_rating_days SET day = date('now', '-1 days')")
+            conn.execute("INSERT INTO ratings (video_id, rating, comment) VALUES ('v1', 1, ?)", ("x" * 300,))
+
+    def test_pass_matches_the_per_video_formulas(self, db_path):
+        analyzer = FeedbackAnalyzer(str(db_path), "unused")
+        summary = rlhf_batch.run_rlhf_pass(db_path)
+        assert summary["videos"] == 2
+
+        v1 = rlhf_batch.get_rlhf_rewards(db_path, "v1")
+        engagement = round(0.7 * 4.0 / 5 + 0.3 * 25 / 100, 3)
+        assert v1["engagement_score"] == engagement
+        assert v1["reward_signal"] == analyzer._calculate_reward_signal(4.0, engagement)
+        assert v1["confidence_score"] == analyzer._calculate_confidence_score(2, 4.0)
+        assert rlhf_batch.get_rlhf_rewards(db_path, "missing") is None
+
+    def test_trajectory_follows_cumulative_daily_ratings(self, db_path):
+        rlhf_batch.run_rlhf_pass(db_path)
+        self._daily(db_path)
+        rlhf_batch.run_rlhf_pass(db_path)
+
+        v1 = rlhf_batch.get_rlhf_rewards(db_path, "v1")
+        rewards = v1["trajectory"]["rewards"]
+        # The two undated fixture ratings (avg 4, 25 chars each) are where the cumulative sums start
+        expected = [rlhf_batch._reward(avg, rlhf_batch._engagement(avg, chars))
+                    for avg, chars in ((18 / 4, 50 / 4), (19 / 5, 350 / 5))]
+        assert rewards == pytest.approx(expected) and len(v1["trajectory"]["days"]) == 2
+        assert v1["initial_performance"] == rewards[0] and v1["current_performance"] == rewards[-1]
+        assert v1["improvement_rate"] == pytest.approx(rewards[1] - rewards[0], abs=1e-4)
+        assert 0 < v1["learning_stability"] <= 1
+        assert rlhf_batch.get_rlhf_rewards(db_path, "v2")["improvement_rate"] == 0.0
+
+        trajectory = FeedbackAnalyzer(str(db_path), "unused")._analyze_learning_trajectory("v1")
+        assert trajectory["trajectory"] == v1["trajectory"] and trajectory["current_performance"] == rewards[-1]
+
+    def test_numpy_and_python_paths_agree(self, db_path, monkeypatch):
+        pytest.importorskip("numpy")
+        rng = random.Random(3)
+        with sqlite3.connect(db_path) as conn:
+            conn.executemany("INSERT INTO ratings (video_id, rating, comment) VALUES (?, ?, ?)",
+                             [(f"v{rng.randrange(30)}", rng.randint(1, 5), "c" * rng.randrange(200))
+                              for _ in range(500)])
+        rlhf_batch.run_rlhf_pass(db_path)
+        self._daily(db_path)
+        conn = sqlite3.connect(db_path)
+        totals, daily = rlhf_batch._load(conn)
+        conn.close()
+
+        vectorized = rlhf_batch.compute_rewards(totals, daily)
+        monkeypatch.setattr(rlhf_batch, "np", None)
+        plain = rlhf_batch.compute_rewards(totals, daily)
+
+        assert vectorized.keys() == plain.keys()
+        for vid, result in plain.items():
+            for key, value in result.items():
+                if key == "trajectory":
+                    assert vectorized[vid][key]["days"] == value["days"]
+                    assert vectorized[vid][key]["rewards"] == pytest.approx(value["rewards"])
+                else:
+                    assert vectorized[vid][key] == pytest.approx(value, abs=1e-3), (vid, key)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,144 @@
+# tests/test_session_store.py - Unit Tests for the embedded session store
+import json
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+import sys
+sys.path.append('..')
+
+from session_store import SessionStore
+
+
+class TestSessionStore:
+    """Test suite for keyed session updates, batched touches and expiry"""
+
+    @pytest.fixture
+    def temp_dir(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            yield Path(temp_dir)
+
+    @pytest.fixture
+    def store(self, temp_dir):
+        store = SessionStore(temp_dir / "sessions.db", ttl=60, background=False)
+        yield store
+        store.close()
+
+    def test_create_get_delete(self, store):
+        """Sessions are stored and removed by key"""
+        store.create("s1", "alice", "tok1")
+        store.create("s2", "bob", "tok2")
+
+        assert store.get("s1")["username"] == "alice"
+        assert store.delete("s1") is True
+        assert store.get("s1") is None
+        assert store.delete("s1") is False
+        assert store.count() == 1
+
+    def test_touches_are_batched(self, store, temp_dir):
+        """touch() does not write until flush, then writes all touches at once"""
+        for i in range(5):
+            store.create(f"s{i}", "alice", "tok")
+        before = store.get("s0")["last_access"]
+        time.sleep(0.01)
+
+        statements = []
+        original_connect = store._connect
+
+        def counting_connect():
+            conn = original_connect()
+            conn.set_trace_callback(statements.append)
+            return conn
+        store._connect = counting_connect
+
+        for i in range(5):
+            store.touch(f"s{i}")
+        assert statements == []
+
+        # Pending touches are already visible to readers of this process
+        assert store.get("s0")["last_access"] > before
+
+        statements.clear()
+        assert store.flush() == 5
+        assert sum(s.startswith("UPDATE") for s in statements) == 5
+        assert sum(s == "COMMIT" for s in statements) == 1
+
+        reopened = SessionStore(temp_dir / "sessions.db", background=False)
+        assert reopened.get("s0")["last_access"] > before
+
+    def test_flush_keeps_newer_value(self, store, temp_dir):
+        """A stale touch from one worker never moves last_access backwards"""
+        store.create("s1", "alice", "tok")
+        other = SessionStore(temp_dir / "sessions.db", background=False)
+
+        store.touch("s1")
+        time.sleep(0.01)
+        other.touch("s1")
+        other.flush()
+        newest = other.get("s1")["last_access"]
+
+        store.flush()
+        assert store.get("s1")["last_access"] == newest
+
+    def test_connections_are_closed(self, store, monkeypatch):
+        """Keyed operations and timer-driven flushes close their connections"""
+        opened = []
+        connect = store._connect
+        monkeypatch.setattr(store, "_connect", lambda: opened.append(connect()) or opened[-1])
+
+        store.create("s1", "alice", "tok")
+        store.touch("s1")
+        store.flush()
+        store.get("s1")
+        store.delete("s1")
+
+        assert len(opened) == 4
+        for conn in opened:
+            with pytest.raises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+
+    def test_sweep_removes_idle_sessions(self, store):
+        """Sessions idle past the TTL are hidden and swept"""
+        store.create("old", "alice", "tok")
+        store.create("new", "bob", "tok")
+
+        later = time.time() + 120
+        with store._connect() as conn:
+            conn.execute("UPDATE sessions SET last_access = ? WHERE session_id = 'new'", (later,))
+
+        assert store.sweep(now=later) == 1
+        assert store.get("old") is None
+
+    def test_background_flush(self, temp_dir):
+        """The flush thread persists touches without an explicit flush"""
+        store = SessionStore(temp_dir / "sessions.db", flush_interval=0.01)
+        try:
+            store.create("s1", "alice", "tok")
+            store.touch("s1")
+            deadline = time.time() + 2
+            while store._pending and time.time() < deadline:
+                time.sleep(0.01)
+            assert not store._pending
+        finally:
+            store.close()
+
+    def test_import_legacy_json(self, store, temp_dir):
+        """sessions.json is imported once and moved aside"""
+        legacy = temp_dir / "sessions.json"
+        legacy.write_text(json.dumps({
+            "abc": {"username": "alice", "token": "tok",
+                    "created_at": "2024-01-01T00:00:00", "last_access": "2024-01-02T00:00:00"},
+        }))
+        store.ttl = float("inf")
+
+        assert store.import_json(legacy) == 1
+        assert store.get("abc")["username"] == "alice"
+        assert not legacy.exists()
+        assert store.import_json(legacy) == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
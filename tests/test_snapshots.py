@@ -0,0 +1,162 @@
+# tests/test_snapshots.py - Unit tests for the columnar analytics snapshots
+import json
+import os
+import sqlite3
+
+import pytest
+
+import sys
+sys.path.append('..')
+
+from analytics import snapshots
+from analytics.feedback_analyzer import FeedbackAnalyzer
+from analytics.snapshots import SnapshotExporter, SnapshotReader
+
+
+class TestAnalyticsSnapshots:
+    """Test suite for the Arrow snapshot exporter and the snapshot read mode"""
+
+    @pytest.fixture
+    def sources(self, tmp_path):
+        """meta.db with ratings/videos plus one bucket feedback log"""
+        db_path = tmp_path / "meta.db"
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("CREATE TABLE videos (id TEXT PRIMARY KEY, title TEXT, storyboard_path TEXT, video_path TEXT)")
+            conn.execute('''CREATE TABLE ratings
+                            (id INTEGER PRIMARY KEY AUTOINCREMENT, video_id TEXT, rating INTEGER, comment TEXT)''')
+            conn.execute("INSERT INTO videos (id, title) VALUES ('v1', 'One'), ('v2', 'Two')")
+            conn.executemany("INSERT INTO ratings (video_id, rating, comment) VALUES (?,?,?)",
+                             [("v1", 5, "great"), ("v1", 3, "ok"), ("v2", 1, "too slow")])
+        logs = tmp_path / "bucket" / "logs"
+        logs.mkdir(parents=True)
+        (logs / "feedback_v1.json").write_text(json.dumps([
+            {"video_id": "v1", "rating": 5, "comment": "clear", "timestamp": "2024-03-01T10:00:00",
+             "sentiment": {"sentiment": "positive"}},
+            {"video_id": "v1", "rating": 2, "comment": "slow", "timestamp": "2024-03-02T10:00:00",
+             "sentiment": {"sentiment": "negative"}},
+        ]))
+        return db_path, tmp_path / "bucket", tmp_path / "snapshots"
+
+    def test_snapshot_mode_falls_back_to_sqlite_without_a_snapshot(self, sources):
+        db_path, bucket, snapshot_dir = sources
+        analyzer = FeedbackAnalyzer(str(db_path), str(bucket), source="snapshot", snapshot_dir=snapshot_dir)
+
+        assert analyzer.analyze_video_performance("v1").total_views == 2
+        assert len(analyzer._get_feedback_logs("v1")) == 2
+
+    def test_export_and_read_back(self, sources):
+        pytest.importorskip("pyarrow")
+        db_path, bucket, snapshot_dir = sources
+        manifest = SnapshotExporter(db_path, bucket, snapshot_dir).export()
+
+        assert manifest["rows"] == {"ratings": 3, "videos": 2, "feedback": 2}
+        assert sorted(p.name for p in (snapshot_dir / "feedback").iterdir()) == ["date=2024-03-01", "date=2024-03-02"]
+
+        sqlite_result = FeedbackAnalyzer(str(db_path), str(bucket)).analyze_video_performance("v1")
+        snapshot_result = FeedbackAnalyzer("missing.db", "missing", source="snapshot",
+                                           snapshot_dir=snapshot_dir).analyze_video_performance("v1")
+        assert snapshot_result == sqlite_result
+
+    def test_incremental_ratings_export(self, sources):
+        pytest.importorskip("pyarrow")
+        db_path, bucket, snapshot_dir = sources
+        exporter = SnapshotExporter(db_path, bucket, snapshot_dir)
+        reader = SnapshotReader(snapshot_dir)
+        exporter.export()
+        assert reader.table("ratings").num_rows == 3
+
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("INSERT INTO ratings (video_id, rating, comment) VALUES ('v2', 4, 'better')")
+        manifest = exporter.export()
+
+        assert manifest["high_water"]["ratings"] == 4
+        assert reader.table("ratings").num_rows == 4
+        assert reader.mean("ratings", "rating") == pytest.approx(13 / 4)
+
+    def test_per_video_rows_come_from_one_index(self, sources):
+        """Video lookups use ranges indexed once per snapshot version, keeping id order"""
+        pytest.importorskip("pyarrow")
+        db_path, bucket, snapshot_dir = sources
+        exporter = SnapshotExporter(db_path, bucket, snapshot_dir)
+        reader = SnapshotReader(snapshot_dir)
+        exporter.export()
+        assert [r["id"] for r in reader.rows("ratings", video_id="v2")] == [3]
+        assert reader.rows("ratings", video_id="missing") == []
+        index = reader._by_video["ratings"]
+        reader.rows("ratings", video_id="v1")
+        assert reader._by_video["ratings"] is index
+
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("INSERT INTO ratings (video_id, rating, comment) VALUES ('v2', 4, 'better')")
+        exporter.export()
+
+        assert [(r["id"], r["rating"]) for r in reader.rows("ratings", video_id="v2", columns=["id", "rating"])] == \
+            [(3, 1), (4, 4)]
+        assert [r["comment"] for r in reader.rows("ratings", video_id="v1")] == ["great", "ok"]
+
+    def test_video_rows_do_not_copy(self, sources):
+        """Per-video reads are slices of the memory-mapped parts, not take() copies"""
+        pa = pytest.importorskip("pyarrow")
+        db_path, bucket, snapshot_dir = sources
+        exporter = SnapshotExporter(db_path, bucket, snapshot_dir)
+        reader = SnapshotReader(snapshot_dir)
+        exporter.export()
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("INSERT INTO ratings (video_id, rating, comment) VALUES ('v1', 4, 'again')")
+        exporter.export()
+
+        allocated = pa.total_allocated_bytes()
+        assert [r["id"] for r in reader.rows("ratings", video_id="v1", columns=["id"])] == [1, 2, 4]
+        assert reader.video_rows("feedback", "v1").num_rows == 2
+        assert pa.total_allocated_bytes() == allocated
+
+    def test_ratings_parts_are_compacted(self, sources, monkeypatch):
+        """Parts merge into one file per partition once today's reaches COMPACT_PARTS"""
+        pytest.importorskip("pyarrow")
+        monkeypatch.setattr(snapshots, "COMPACT_PARTS", 3)
+        db_path, bucket, snapshot_dir = sources
+        exporter = SnapshotExporter(db_path, bucket, snapshot_dir)
+        reader = SnapshotReader(snapshot_dir)
+        exporter.export()
+        for rating in (4, 2):
+            with sqlite3.connect(db_path) as conn:
+                conn.execute("INSERT INTO ratings (video_id, rating, comment) VALUES ('v1', ?, 'more')", (rating,))
+            manifest = exporter.export()
+
+        files = manifest["files"]["ratings"]
+        assert len(files) == 1 and files[0].endswith("compact-3.arrow")
+        assert [p.name for p in (snapshot_dir / "ratings").rglob("*.arrow")] == ["compact-3.arrow"]
+        assert reader.table("ratings").num_rows == 5
+        assert [r["id"] for r in reader.rows("ratings", video_id="v1", columns=["id"])] == [1, 2, 4, 5]
+
+    def test_feedback_export_is_incremental(self, sources):
+        """Only changed logs are re-read, and only the partitions holding their rows are rewritten"""
+        pytest.importorskip("pyarrow")
+        db_path, bucket, snapshot_dir = sources
+        logs = bucket / "logs"
+        (logs / "feedback_v2.json").write_text(json.dumps(
+            {"video_id": "v2", "rating": 4, "comment": "nice", "timestamp": "2024-04-01T09:00:00"}))
+        exporter = SnapshotExporter(db_path, bucket, snapshot_dir)
+        reader = SnapshotReader(snapshot_dir)
+        first = exporter.export()
+        assert first["rows"]["feedback"] == 3
+        v1_parts = [f for f in first["files"]["feedback"] if "2024-04-01" not in f]
+
+        # rewritten later: replaces its previous row
+        (logs / "feedback_v2.json").write_text(json.dumps(
+            {"video_id": "v2", "rating": 1, "comment": "changed my mind", "timestamp": "2024-04-01T09:30:00"}))
+        os.utime(logs / "feedback_v2.json", ns=(first["high_water"]["feedback"] + 10**9,) * 2)
+        second = exporter.export()
+
+        assert second["rows"]["feedback"] == 3
+        assert [f for f in second["files"]["feedback"] if "2024-04-01" not in f] == v1_parts
+        assert [r["comment"] for r in reader.rows("feedback", video_id="v2")] == ["changed my mind"]
+
+        (logs / "feedback_v1.json").unlink()
+        third = exporter.export()
+        assert third["rows"]["feedback"] == 1
+        assert reader.rows("feedback", video_id="v1") == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
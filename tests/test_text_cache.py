@@ -0,0 +1,80 @@
+# tests/test_text_cache.py - Unit tests for the scene text bitmap cache
+import threading
+import time
+
+import pytest
+
+import sys
+sys.path.append('..')
+
+from video import text_cache
+from video.text_cache import Bitmap, TextCache, TextStyle
+
+
+class TestTextCache:
+    """Test suite for parallel pre-rendering, the memory cap and disk persistence"""
+
+    @pytest.fixture
+    def rendered(self):
+        return []
+
+    @pytest.fixture
+    def rasterizer(self, rendered):
+        lock = threading.Lock()
+
+        def render(text, style):
+            time.sleep(0.01)
+            with lock:
+                rendered.append(text)
+            return Bitmap(style.width, 2, bytes([len(text) % 256]) * style.width * 2 * 4)
+        return render
+
+    def test_prerender_renders_each_distinct_text_once(self, tmp_path, rasterizer, rendered):
+        cache = TextCache(tmp_path, rasterizer=rasterizer)
+        texts = ["Welcome", "Variables", "Welcome", "Loops"] * 5
+
+        bitmaps = cache.prerender(texts, TextStyle(width=8), workers=4)
+
+        assert sorted(rendered) == ["Loops", "Variables", "Welcome"]
+        assert bitmaps["Loops"].width == 8 and len(bitmaps["Loops"].rgba) == 8 * 2 * 4
+        assert cache.get("Loops", TextStyle(width=8)) is bitmaps["Loops"]
+        assert cache.get("Loops", TextStyle(width=16)).width == 16  # style is part of the key
+        assert len(rendered) == 4
+
+    def test_bitmaps_survive_a_restart_on_disk(self, tmp_path, rasterizer, rendered):
+        TextCache(tmp_path, rasterizer=rasterizer).prerender(["Intro", "Summary"], workers=2)
+        (tmp_path / f"{text_cache.text_key('Summary', TextStyle())}.rgba").write_bytes(b"garbage")
+
+        fresh = TextCache(tmp_path, rasterizer=rasterizer)
+        first = fresh.get("Intro")
+
+        assert first.rgba == bytes([5]) * len(first.rgba)
+        assert fresh.get("Summary").width == TextStyle().width  # unreadable file is re-rendered
+        assert fresh.stats()["disk_hits"] == 1 and fresh.stats()["renders"] == 1
+        assert rendered == ["Intro", "Summary", "Summary"]
+
+    def test_memory_is_capped(self, tmp_path, rasterizer):
+        style = TextStyle(width=10)  # 80 bytes per bitmap
+        cache = TextCache(tmp_path, max_bytes=200, rasterizer=rasterizer)
+
+        cache.prerender(["a", "b", "c"], style, workers=1)
+
+        stats = cache.stats()
+        assert stats["entries"] == 2 and stats["bytes"] == 160 and stats["evictions"] == 1
+        cache.get("a", style)
+        assert cache.stats()["disk_hits"] == 1
+
+    def test_pillow_rasterizer_wraps_to_width(self):
+        pytest.importorskip("PIL")
+        style = TextStyle(size=16, width=120)
+
+        short = text_cache.rasterize("Hi", style)
+        long = text_cache.rasterize("A much longer scene title that has to wrap", style)
+
+        assert short.width == long.width == 120
+        assert long.height > short.height
+        assert any(short.rgba[3::4])  # some opaque pixels were drawn
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
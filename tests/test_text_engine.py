@@ -0,0 +1,76 @@
+# tests/test_text_engine.py - Unit tests for the batch text-analytics engine
+import pytest
+
+import sys
+sys.path.append('..')
+
+from analytics.text_engine import KeywordMatcher, SentimentScorer, TextEngine
+
+
+class TestTextEngine:
+    """Keyword matching, lexicon sentiment and the per-comment cache"""
+
+    def test_matcher_finds_overlapping_keywords_in_one_pass(self):
+        matcher = KeywordMatcher(["he", "she", "hers", "clear", "unclear"])
+
+        assert matcher.find("ushers were unclear") == {"he", "she", "hers", "clear", "unclear"}
+        assert matcher.find("nothing here") == {"he"}
+        assert matcher.find("") == frozenset()
+
+    def test_matcher_agrees_with_substring_checks(self):
+        keywords = ["ab", "abc", "bc", "c", "cab", "aa"]
+        matcher = KeywordMatcher(keywords)
+        for text in ["abcab", "aaab", "cccc", "bca", "a b c"]:
+            assert matcher.find(text) == {k for k in keywords if k in text}
+
+    def test_lexicon_sentiment_with_negation(self):
+        engine = TextEngine(scorer=SentimentScorer(backend="lexicon"))
+        great, negated, plain = engine.analyze_batch(["Great, clear video", "Not clear at all", "It is a video"])
+
+        assert great.sentiment == "positive"
+        assert negated.sentiment == "negative"
+        assert plain.polarity == 0.0 and plain.sentiment == "neutral"
+
+    def test_cache_reuses_normalized_comments(self):
+        engine = TextEngine()
+        first = engine.analyze_batch(["Too slow", "too   SLOW", None])
+
+        assert first[0] is first[1]
+        assert first[0].keywords == {"slow"} and first[0].themes == {"pacing"}
+        assert engine.stats()["misses"] == 2
+
+        engine.analyze_batch(["Too slow"])
+        assert engine.stats()["hits"] == 1
+
+    def test_themes_match_whole_words_only(self):
+        engine = TextEngine()
+        texts = ["I could not follow the function signature, bad", "so much empty space",
+                 "breakfast belongs in the intro", "unclear examples, too slow"]
+        function, space, breakfast, unclear = engine.analyze_batch(texts)
+
+        assert function.themes == space.themes == frozenset()
+        assert breakfast.keywords == frozenset() and breakfast.themes == frozenset()
+        assert unclear.keywords == {"unclear", "examples", "slow"}
+        assert unclear.themes == {"clarity", "examples", "pacing"}
+        # The legacy ``in`` checks keep their substring meaning
+        assert breakfast.mentions == {"fast"} and unclear.mentions == {"clear", "unclear", "example", "slow"}
+        counts = engine.keyword_counts(texts)
+        assert counts["fast"] == 1 and counts["clear"] == 1 and counts["fun"] == 0 and counts["long"] == 0
+
+    def test_word_boundaries_reach_policy_updates(self):
+        from analytics.feedback_analyzer import FeedbackAnalyzer
+
+        analyzer = FeedbackAnalyzer.__new__(FeedbackAnalyzer)
+        assert analyzer._policy_updates([{"comment": "I could not follow the function signature, bad"}], 1.0) == {}
+        assert analyzer._policy_updates([{"comment": "boring and far too long"}], 1.0) == {
+            "intro": 0.85, "concept": 0.9, "summary": 0.9}
+
+    def test_cache_is_bounded(self):
+        engine = TextEngine(cache_size=3)
+        engine.analyze_batch([f"comment {i}" for i in range(10)])
+
+        assert engine.stats()["entries"] == 3
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
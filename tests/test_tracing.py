@@ -0,0 +1,150 @@
+# tests/test_tracing.py - Unit Tests for span tracing and the sampling profiler
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+import sys
+sys.path.append('..')
+
+from bhiv_tracing import JsonlSpanExporter, Tracer, TracingMiddleware, child_span, traced
+import bhiv_tracing
+
+
+@pytest.fixture
+def tracer(monkeypatch):
+    """Fresh tracer writing to a temporary JSONL file, installed as the module tracer"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        tracer = Tracer(JsonlSpanExporter(Path(temp_dir) / "spans.jsonl"), sample_rate=1.0, enabled=True)
+        monkeypatch.setattr(bhiv_tracing, "_tracer", tracer)
+        monkeypatch.setattr(bhiv_tracing, "PROFILE_DIR", Path(temp_dir) / "profiles")
+        yield tracer
+
+
+def read_spans(tracer):
+    tracer.exporter.flush()
+    if not tracer.exporter.path.exists():
+        return []
+    return [json.loads(line) for line in tracer.exporter.path.read_text().splitlines()]
+
+
+@traced("test.stage")
+def stage():
+    time.sleep(0.001)
+    return "done"
+
+
+class TestTracing:
+    """Test suite for span nesting, export and profiling"""
+
+    def test_spans_nest_and_export(self, tracer):
+        """Child spans share the trace id and point at their parent"""
+        with tracer.span("root", video_id="v1"):
+            assert stage() == "done"
+
+        spans = {s["name"]: s for s in read_spans(tracer)}
+        root, child = spans["root"], spans["test.stage"]
+        assert child["traceId"] == root["traceId"]
+        assert child["parentSpanId"] == root["spanId"]
+        assert root["parentSpanId"] == ""
+        assert int(child["endTimeUnixNano"]) > int(child["startTimeUnixNano"])
+        assert {"key": "video_id", "value": {"stringValue": "v1"}} in root["attributes"]
+
+    def test_helpers_outside_a_trace_are_free(self, tracer):
+        """Decorated helpers called without an active trace record nothing"""
+        assert stage() == "done"
+        with child_span("db.query"):
+            pass
+        assert read_spans(tracer) == []
+
+    def test_errors_mark_span(self, tracer):
+        """An exception sets the error status and still exports the span"""
+        with pytest.raises(ValueError):
+            with tracer.span("root"):
+                raise ValueError("boom")
+
+        (root,) = read_spans(tracer)
+        assert root["status"]["code"] == 2
+        assert any(a["key"] == "error" for a in root["attributes"])
+
+    def test_context_crosses_worker_pools(self, tracer):
+        """Spans opened on the DB pool are children of the request span"""
+        from backend.concurrency import run_db
+
+        def query():
+            return "rows"
+
+        async def handler():
+            with tracer.span("request"):
+                return await run_db(query)
+
+        assert asyncio.run(handler()) == "rows"
+        spans = {s["name"]: s for s in read_spans(tracer)}
+        assert spans["db.query"]["parentSpanId"] == spans["request"]["spanId"]
+
+    def test_export_happens_off_the_request_thread(self, tracer):
+        """Finishing a root span only queues it; the writer thread puts it on disk"""
+        with tracer.span("root"):
+            pass
+        assert not tracer.exporter.path.exists()
+
+        tracer.exporter.interval = 0.01
+        tracer.exporter._wake.set()
+        deadline = time.monotonic() + 2
+        while not tracer.exporter.path.exists() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert [s["name"] for s in read_spans(tracer)] == ["root"]
+
+    def test_trace_file_rotates_by_size(self, tmp_path):
+        """The span file is rotated once it would exceed max_bytes, keeping a bounded number of backups"""
+        exporter = JsonlSpanExporter(tmp_path / "spans.jsonl", max_bytes=2000, backups=2)
+        tracer = Tracer(exporter, sample_rate=1.0, enabled=True)
+        for i in range(40):
+            with tracer.span("root", i=i):
+                pass
+            exporter.flush()
+
+        files = sorted(p.name for p in tmp_path.iterdir())
+        assert files == ["spans.jsonl", "spans.jsonl.1", "spans.jsonl.2"]
+        assert all((tmp_path / name).stat().st_size <= 2000 for name in files)
+        latest = [json.loads(line) for line in (tmp_path / "spans.jsonl").read_text().splitlines()]
+        assert {"key": "i", "value": {"intValue": "39"}} in latest[-1]["attributes"]
+
+    def test_profile_header_writes_collapsed_stacks(self, tracer, monkeypatch):
+        """A request with the profile token produces a folded-stack file"""
+        monkeypatch.setattr(bhiv_tracing, "PROFILE_TOKEN", "secret")
+
+        def busy():
+            deadline = time.perf_counter() + 0.1
+            while time.perf_counter() < deadline:
+                pass
+
+        async def app(scope, receive, send):
+            busy()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        async def receive():
+            return {"type": "http.request"}
+
+        scope = {"type": "http", "method": "GET", "path": "/slow",
+                 "headers": [(b"x-bhiv-profile", b"secret")]}
+        asyncio.run(TracingMiddleware(app, tracer)(scope, receive, send))
+
+        trace_id = dict(sent[0]["headers"])[b"x-trace-id"].decode()
+        folded = (bhiv_tracing.PROFILE_DIR / f"{trace_id}.folded").read_text()
+        assert "busy (test_tracing.py" in folded
+        line = folded.splitlines()[0]
+        assert int(line.rsplit(" ", 1)[1]) > 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
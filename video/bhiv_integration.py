@@ -1,6 +1,7 @@
 import os
 import requests
 from dotenv import load_dotenv
+from bhiv_tracing import traced
 
 load_dotenv()
 
@@ -15,6 +16,7 @@ class BHIVClient:
             return None
         return f"{self.bucket_path}/{bucket_key}"
     
+    @traced("lm.call_language_model")
     def call_language_model(self, prompt):
         if not self.lm_url or not self.api_key:
             return None
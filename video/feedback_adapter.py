@@ -1,34 +1,159 @@
 # ── video/feedback_adapter.py ──────────────────────────────────────────
+"""
+Feedback loop: a video whose average rating is below ADAPT_THRESHOLD gets
+a shorter storyboard (every scene 1 s shorter, min 2 s).
+
+``adapt_catalog`` is the batch job: every video's average comes from the
+trigger-maintained ``ratings_video_stats`` (see ``analytics.rating_stats``),
+one row per video instead of a scan of the ratings, then only storyboards
+whose average crossed the threshold since the last run are re-adapted, in
+parallel. The last average and state per
+video live in the ``video_weights`` table.
+
+    python -m video.feedback_adapter        # one catalog run, e.g. from cron
+"""
+import logging
+import os
 import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import json
+from typing import Dict, Iterable, Optional, Tuple
+from analytics import rating_stats
+from bhiv_bucket import save_storyboard
+from bhiv_cache import get_storyboard_cache, thaw
+from bhiv_tracing import traced
+
+logger = logging.getLogger(__name__)
+
+DBPATH           = Path("data/meta.db")      # same DB your server uses
+ADAPT_THRESHOLD  = float(os.getenv("BHIV_ADAPT_THRESHOLD", "3.0"))
+ADAPT_WORKERS    = int(os.getenv("BHIV_ADAPT_WORKERS", "8"))
+NEUTRAL_RATING   = 3.0                       # assumed for videos without ratings
+
+def ensure_weights_schema(conn: sqlite3.Connection) -> None:
+    conn.execute('''CREATE TABLE IF NOT EXISTS video_weights
+                    (video_id TEXT PRIMARY KEY, avg_rating REAL NOT NULL, ratings INTEGER NOT NULL,
+                     adapted INTEGER NOT NULL, updated_at REAL NOT NULL)''')
 
-DBPATH       = Path("data/meta.db")          # same DB your server uses
-WEIGHTS_PATH = Path("data/weights.json")     # optional – stores last rating
+def record_weights(conn: sqlite3.Connection, weights: Iterable[Tuple[str, float, int, bool]]) -> None:
+    """Upsert ``(video_id, avg_rating, ratings, adapted)`` rows"""
+    ensure_weights_schema(conn)
+    now = time.time()
+    conn.executemany('''INSERT INTO video_weights (video_id, avg_rating, ratings, adapted, updated_at)
+                        VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT(video_id) DO UPDATE SET avg_rating = excluded.avg_rating,
+                            ratings = excluded.ratings, adapted = excluded.adapted,
+                            updated_at = excluded.updated_at''',
+                     [(vid, avg, n, int(adapted), now) for vid, avg, n, adapted in weights])
 
+def get_weights(db_path=None) -> Dict[str, Dict]:
+    """Last recorded average and adaptation state per video"""
+    with sqlite3.connect(db_path or DBPATH) as conn:
+        ensure_weights_schema(conn)
+        rows = conn.execute("SELECT video_id, avg_rating, ratings, adapted, updated_at FROM video_weights").fetchall()
+    return {vid: {"avg_rating": avg, "ratings": n, "adapted": bool(adapted), "updated_at": updated}
+            for vid, avg, n, adapted, updated in rows}
+
+def _rating_stats(conn: sqlite3.Connection, video_id: str) -> Tuple[float, int]:
+    row = conn.execute("SELECT sum * 1.0 / count, count FROM ratings_video_stats WHERE video_id=?",
+                       (video_id,)).fetchone()
+    return row if row else (NEUTRAL_RATING, 0)      # no ratings → 3.0
+
+@traced("video.get_average_rating")
 def get_average_rating(video_id: str) -> float:
     """Return the mean rating (1-5). 3.0 if no ratings yet."""
-    conn = sqlite3.connect(DBPATH)
-    cur  = conn.cursor()
-    cur.execute("SELECT AVG(rating) FROM ratings WHERE video_id=?", (video_id,))
-    avg = cur.fetchone()[0] or 3.0      # None → 3.0
-    conn.close()
-    return avg
+    with rating_stats.connect(DBPATH) as conn:
+        return _rating_stats(conn, video_id)[0]
+
+def _adapt(storyboard, avg_rating: float, threshold: float = ADAPT_THRESHOLD) -> dict:
+    """Private adapted copy (frozen storyboards from the shared cache are fine)"""
+    storyboard = thaw(storyboard)
+    if avg_rating < threshold:
+        for scene in storyboard["scenes"]:
+            scene["duration_secs"] = max(2, scene["duration_secs"] - 1)
+    return storyboard
 
+@traced("video.adapt_storyboard")
 def adapt_storyboard(storyboard: dict, video_id: str) -> dict:
     """
-    Primitive feedback loop:
+    Primitive feedback loop for one storyboard:
     - If a video's average rating is <3, shorten every scene by 1 s (min 2 s).
-    - Save the last average rating in data/weights.json for simple tracking.
+    - Record the video's average in video_weights (its adapted state is
+      left to ``adapt_catalog``, which owns the saved adapted storyboards).
     """
-    avg_rating = get_average_rating(video_id)
+    with rating_stats.connect(DBPATH) as conn:
+        avg_rating, n = _rating_stats(conn, video_id)
+        ensure_weights_schema(conn)
+        conn.execute('''INSERT INTO video_weights (video_id, avg_rating, ratings, adapted, updated_at)
+                        VALUES (?, ?, ?, 0, ?)
+                        ON CONFLICT(video_id) DO UPDATE SET avg_rating = excluded.avg_rating,
+                            ratings = excluded.ratings, updated_at = excluded.updated_at''',
+                     (video_id, avg_rating, n, time.time()))
+    return _adapt(storyboard, avg_rating)
 
-    if avg_rating < 3:
-        for scene in storyboard["scenes"]:
-            scene["duration_secs"] = max(2, scene["duration_secs"] - 1)
+def _adapt_one(video_id: str, storyboard_path: str, avg_rating: float, threshold: float) -> str:
+    storyboard = get_storyboard_cache().get(storyboard_path)
+    return save_storyboard(_adapt(storyboard, avg_rating, threshold), f"{video_id}_adapted.json")
+
+@traced("video.adapt_catalog")
+def adapt_catalog(db_path=None, video_ids: Optional[Iterable[str]] = None,
+                  threshold: float = ADAPT_THRESHOLD, workers: int = ADAPT_WORKERS) -> Dict:
+    """
+    Batch feedback loop over the catalog (or just ``video_ids``):
+    - averages read from the per-video rating stats (no ratings scan),
+    - re-adapt, in parallel, only videos whose average crossed ``threshold``
+      since the last run (always from the original storyboard),
+    - record every average in video_weights; failed videos keep their old
+      state so the next run retries them.
+    """
+    db_path = db_path or DBPATH
+    with rating_stats.connect(db_path) as conn:
+        ensure_weights_schema(conn)
+        where, params = "", []
+        if video_ids is not None:
+            params = sorted(set(video_ids))
+            where = f"WHERE v.id IN ({','.join('?' * len(params))})"
+        rows = conn.execute(f'''SELECT v.id, v.storyboard_path, COALESCE(s.sum * 1.0 / s.count, ?),
+                                       COALESCE(s.count, 0), w.adapted
+                                FROM videos v
+                                LEFT JOIN ratings_video_stats s ON s.video_id = v.id
+                                LEFT JOIN video_weights w ON w.video_id = v.id
+                                {where}''', (NEUTRAL_RATING, *params)).fetchall()
 
-    # (optional) persist simple metadata for future research
-    WEIGHTS_PATH.write_text(json.dumps({"last_avg_rating": avg_rating}))
+    weights, crossed = {}, []
+    for vid, storyboard_path, avg, n, was_adapted in rows:
+        below = avg < threshold
+        weights[vid] = (vid, avg, n, below)
+        if below != bool(was_adapted):
+            if storyboard_path and Path(storyboard_path).exists():
+                crossed.append((vid, storyboard_path, avg))
+            else:
+                weights[vid] = (vid, avg, n, bool(was_adapted))
 
-    return storyboard
+    failed = []
+    if crossed:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(crossed))),
+                                thread_name_prefix="bhiv-adapt") as pool:
+            futures = {vid: pool.submit(_adapt_one, vid, path, avg, threshold) for vid, path, avg in crossed}
+        for vid, future in futures.items():
+            try:
+                future.result()
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Adapting storyboard for {vid} failed: {e}")
+                _, avg, n, below = weights[vid]
+                weights[vid] = (vid, avg, n, not below)
+                failed.append(vid)
+
+    with sqlite3.connect(db_path) as conn:
+        record_weights(conn, weights.values())
+
+    adapted = sorted(vid for vid, _, _ in crossed if vid not in failed)
+    logger.info(f"Adapted {len(adapted)} of {len(weights)} storyboards ({len(failed)} failed)")
+    return {"videos": len(weights), "adapted": adapted, "failed": sorted(failed)}
+
+if __name__ == "__main__":
+    import json
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(adapt_catalog(), indent=2))
 # ───────────────────────────────────────────────────────────────────────
@@ -1,39 +1,79 @@
 from pathlib import Path
 import json
+from concurrent.futures import ThreadPoolExecutor
+from bhiv_tracing import traced
+from video.text_cache import TextStyle, get_text_cache
 
-def render_video_from_storyboard(storyboard, output_path):
-    """Simple video renderer - creates placeholder"""
+SCENE_TEXT_STYLE = TextStyle(size=24, width=600, color='white')
+FRAME_SIZE = (640, 480)
+FPS = 24
+
+def _text_style(size):
+    """Scene text style scaled with the frame height"""
+    scale = size[1] / FRAME_SIZE[1]
+    return SCENE_TEXT_STYLE._replace(size=round(SCENE_TEXT_STYLE.size * scale),
+                                     width=round(SCENE_TEXT_STYLE.width * scale))
+
+def _prerender_text(scenes, style):
+    # Rasterize every scene's text up front, in parallel, instead of one ImageMagick call per scene
+    text_cache = get_text_cache()
+    if not text_cache.available:
+        return {}
     try:
-        from moviepy.editor import ColorClip, TextClip, CompositeVideoClip
-        
+        return text_cache.prerender((scene.get('text', '')[:50] for scene in scenes), style)
+    except Exception as e:
+        print(f"Text pre-render failed, falling back to TextClip: {e}")
+        return {}
+
+def _scene_clip(scene, size, style, bitmaps):
+    from moviepy.editor import ColorClip, ImageClip, TextClip, CompositeVideoClip
+
+    duration = scene.get('duration_secs', 4)
+    text = scene.get('text', '')
+
+    # Create background clip
+    bg_clip = ColorClip(size=size, color=(0, 0, 0), duration=duration)
+
+    # Create text clip
+    if text[:50] in bitmaps:
+        txt_clip = ImageClip(bitmaps[text[:50]].to_array(), transparent=True)
+    else:
+        txt_clip = TextClip(text[:50], fontsize=style.size, color=style.color, size=(style.width, None))
+    txt_clip = txt_clip.set_position('center').set_duration(duration)
+
+    # Composite
+    return CompositeVideoClip([bg_clip, txt_clip])
+
+@traced("video.render")
+def render_video_from_storyboard(storyboard, output_path, size=FRAME_SIZE, fps=FPS, bitrate=None):
+    """Simple video renderer - creates placeholder
+
+    ``size``/``fps``/``bitrate`` select the rendition (see video.renditions);
+    text is scaled with the frame height.
+    """
+    try:
+        from moviepy.editor import ColorClip, CompositeVideoClip
+
         clips = []
         total_duration = 0
-        
-        for scene in storyboard.get('scenes', []):
-            duration = scene.get('duration_secs', 4)
-            text = scene.get('text', '')
-            
-            # Create background clip
-            bg_clip = ColorClip(size=(640, 480), color=(0, 0, 0), duration=duration)
-            
-            # Create text clip
-            txt_clip = TextClip(text[:50], fontsize=24, color='white', size=(600, None))
-            txt_clip = txt_clip.set_position('center').set_duration(duration)
-            
-            # Composite
-            scene_clip = CompositeVideoClip([bg_clip, txt_clip])
+        scenes = storyboard.get('scenes', [])
+        style = _text_style(size)
+        bitmaps = _prerender_text(scenes, style)
+
+        for scene in scenes:
+            scene_clip = _scene_clip(scene, size, style, bitmaps)
             scene_clip = scene_clip.set_start(total_duration)
             clips.append(scene_clip)
-            total_duration += duration
-        
+            total_duration += scene.get('duration_secs', 4)
+
         if clips:
             final_video = CompositeVideoClip(clips)
-            final_video.write_videofile(output_path, fps=24, verbose=False, logger=None)
+            final_video.write_videofile(output_path, fps=fps, bitrate=bitrate, verbose=False, logger=None)
         else:
             # Create minimal placeholder
-            placeholder = ColorClip(size=(640, 480), color=(0, 0, 0), duration=5)
-            placeholder.write_videofile(output_path, fps=24, verbose=False, logger=None)
-            
+            placeholder = ColorClip(size=size, color=(0, 0, 0), duration=5)
+            placeholder.write_videofile(output_path, fps=fps, bitrate=bitrate, verbose=False, logger=None)
+
     except ImportError:
         # Fallback: create empty file
         Path(output_path).touch()
@@ -41,4 +81,28 @@ def render_video_from_storyboard(storyboard, output_path):
     except Exception as e:
         # Fallback: create empty file
         Path(output_path).touch()
-        print(f"Video generation failed, placeholder created: {e}")
\ No newline at end of file
+        print(f"Video generation failed, placeholder created: {e}")
+
+@traced("video.render_segments")
+def render_scene_segments(storyboard, segments, output_paths, size=FRAME_SIZE, fps=FPS, bitrate=None, workers=2):
+    """Encode each planned segment (see video.packaging.plan_segments) straight from its scene as MPEG-TS
+
+    Unlike render_video_from_storyboard there is no placeholder fallback:
+    errors (including a missing moviepy) propagate so nothing half-made gets packaged.
+    """
+    scenes = storyboard.get('scenes', [])
+    style = _text_style(size)
+    bitmaps = _prerender_text(scenes, style)
+
+    def encode(job):
+        segment, output_path = job
+        clip = _scene_clip(scenes[segment.scene_index], size, style, bitmaps)
+        clip = clip.subclip(segment.offset, segment.offset + segment.duration)
+        # Continuous timestamps across separately encoded segments, so no discontinuities in the playlist
+        clip.write_videofile(str(output_path), fps=fps, codec='libx264', bitrate=bitrate, audio=False,
+                             ffmpeg_params=['-output_ts_offset', f'{segment.start:.3f}'],
+                             verbose=False, logger=None)
+
+    # Each encode runs its own ffmpeg process
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        list(pool.map(encode, zip(segments, output_paths)))
@@ -0,0 +1,37 @@
+# video/locks.py - Per-key locks for on-demand encodes that do not outlive their users
+"""
+Lazy encodes (``video.renditions``, ``video.packaging``) serialize on a lock
+per (video, rendition) so concurrent first requests wait for one encode.
+Keeping one lock per key ever requested grows with the catalog; a
+``KeyedLocks`` entry exists only while some thread holds or waits for it,
+so the table is bounded by the number of encodes in flight.
+"""
+import threading
+from contextlib import contextmanager
+from typing import Dict, Hashable, Iterator, List
+
+
+class KeyedLocks:
+    """``with locks.hold(key):`` - one mutex per key, dropped when its last user leaves"""
+
+    def __init__(self):
+        self._locks: Dict[Hashable, List] = {}  # key -> [lock, holders and waiters]
+        self._guard = threading.Lock()
+
+    @contextmanager
+    def hold(self, key: Hashable) -> Iterator[None]:
+        with self._guard:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
+
+    def __len__(self) -> int:
+        with self._guard:
+            return len(self._locks)
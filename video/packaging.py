@@ -0,0 +1,163 @@
+# video/packaging.py - HLS packaging: per-scene MPEG-TS segments plus playlists
+"""
+Whole-MP4 streaming makes startup wait on the file and lets a CDN cache a
+video only as one object. Packaging turns a storyboard into HLS instead:
+
+    plan_segments     scenes -> segments of at most SEGMENT_SECS
+                      (a longer scene is split into equal parts, shorter ones
+                      stay whole, so segment boundaries are scene cuts)
+    bucket/hls/<vid>/<rendition>/index.m3u8          VOD media playlist
+    bucket/hls/<vid>/<rendition>/seg_<n>_<digest>.ts segments
+
+Each segment is encoded straight from its scene clip (see
+``video.generator.render_scene_segments``) with timestamps continuing
+from the previous one. Segment names carry a digest of the storyboard
+and rendition, so a given URL always names the same bytes and can be
+cached as immutable; playlists get a short max-age.
+
+The default rendition is packaged at upload; the others on the first
+playlist request, like ``video.renditions`` and under the same kind of
+per-(video, rendition) lock (``video.locks``). ``master_playlist`` lists
+the whole ladder for adaptive bitrate players.
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence
+
+import bhiv_bucket
+from bhiv_bucket import read_storyboard_shared
+from bhiv_metrics import record_bucket_io
+from video.generator import render_scene_segments
+from video.locks import KeyedLocks
+from video.renditions import LADDER, Rendition, get_rendition
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SECS = float(os.getenv("BHIV_HLS_SEGMENT_SECS", "4"))
+PACKAGE_WORKERS = int(os.getenv("BHIV_HLS_WORKERS", "2"))
+PLAYLIST = "index.m3u8"
+PLAYLIST_MEDIA_TYPE = "application/vnd.apple.mpegurl"
+SEGMENT_MEDIA_TYPE = "video/mp2t"
+PLAYLIST_CACHE_CONTROL = "public, max-age=60"
+SEGMENT_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_SEGMENT_NAME = re.compile(r"^seg_\d{5}_[0-9a-f]{12}\.ts$")
+
+_locks = KeyedLocks()
+
+
+class Segment(NamedTuple):
+    scene_index: int
+    start: float     # on the video timeline
+    offset: float    # within the scene
+    duration: float
+
+
+def plan_segments(scenes: Sequence, target: float = SEGMENT_SECS) -> List[Segment]:
+    """Cut scenes into segments no longer than ``target`` seconds"""
+    segments, start = [], 0.0
+    for i, scene in enumerate(scenes):
+        duration = float(scene.get("duration_secs", 4))
+        if duration <= 0:
+            continue
+        parts = max(1, math.ceil(duration / target - 1e-9))
+        for part in range(parts):
+            segments.append(Segment(i, round(start, 3), round(duration * part / parts, 3), round(duration / parts, 3)))
+            start += duration / parts
+    return segments
+
+
+def media_playlist(segments: Sequence[Segment], names: Sequence[str]) -> str:
+    target = max((math.ceil(s.duration) for s in segments), default=1)
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3", f"#EXT-X-TARGETDURATION:{target}", "#EXT-X-MEDIA-SEQUENCE:0",
+             "#EXT-X-PLAYLIST-TYPE:VOD", "#EXT-X-INDEPENDENT-SEGMENTS"]
+    for segment, name in zip(segments, names):
+        lines += [f"#EXTINF:{segment.duration:.3f},", name]
+    lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
+
+
+def master_playlist(ladder: Sequence[Rendition] = LADDER) -> str:
+    """Variant playlists relative to ``/stream/{vid}/hls/``, lowest bandwidth first"""
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-INDEPENDENT-SEGMENTS"]
+    for r in sorted(ladder, key=lambda r: r.bitrate_kbps):
+        lines += [f"#EXT-X-STREAM-INF:BANDWIDTH={r.bitrate_kbps * 1000},RESOLUTION={r.width}x{r.height},"
+                  f"FRAME-RATE={r.fps:.3f}", f"{r.name}/{PLAYLIST}"]
+    return "\n".join(lines) + "\n"
+
+
+def is_segment_name(name: str) -> bool:
+    """Guards the segment route against anything but files packaging wrote"""
+    return bool(_SEGMENT_NAME.match(name))
+
+
+def package_dir(video_id: str, rendition: Rendition) -> Path:
+    return bhiv_bucket.BUCKET_ROOT / "hls" / video_id / rendition.name
+
+
+def storyboard_path(video_id: str) -> Path:
+    return bhiv_bucket.BUCKET_ROOT / "storyboards" / f"{video_id}.json"
+
+
+def _segment_names(storyboard, rendition: Rendition, segments: Sequence[Segment]) -> List[str]:
+    digest = hashlib.sha256(json.dumps([storyboard.get("scenes", []), rendition, segments],
+                                       default=dict, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+    return [f"seg_{i:05d}_{digest}.ts" for i in range(len(segments))]
+
+
+def ensure_package(video_id: str, name: str) -> Optional[Path]:
+    """Media playlist for a rendition, packaging it now if needed; None if it cannot be produced"""
+    rendition = get_rendition(name)
+    playlist = package_dir(video_id, rendition) / PLAYLIST
+    if playlist.exists():
+        return playlist
+    if not storyboard_path(video_id).exists():
+        return None
+
+    with _locks.hold((video_id, rendition.name)):
+        if playlist.exists():  # another request finished it while we waited
+            return playlist
+        storyboard = read_storyboard_shared(str(storyboard_path(video_id)))
+        segments = plan_segments(storyboard.get("scenes", []))
+        if not segments:
+            return None
+        names = _segment_names(storyboard, rendition, segments)
+        staging = bhiv_bucket.BUCKET_ROOT / "tmp" / f"hls_{video_id}_{rendition.name}"
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+        try:
+            render_scene_segments(storyboard, segments, [staging / n for n in names],
+                                  size=(rendition.width, rendition.height), fps=rendition.fps,
+                                  bitrate=f"{rendition.bitrate_kbps}k", workers=PACKAGE_WORKERS)
+            if not all((staging / n).exists() and (staging / n).stat().st_size > 0 for n in names):
+                raise RuntimeError("missing or empty segments")
+            (staging / PLAYLIST).write_text(media_playlist(segments, names), encoding="utf-8")
+            size = sum(f.stat().st_size for f in staging.iterdir())
+
+            # The playlist only becomes visible once every segment is in place
+            dest = package_dir(video_id, rendition)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            shutil.rmtree(dest, ignore_errors=True)
+            os.replace(staging, dest)
+            record_bucket_io("write", "hls", size)
+        except Exception as e:
+            logger.warning(f"HLS packaging of {video_id} ({rendition.name}) failed: {e}")
+            return None
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+    logger.info(f"Packaged {video_id} ({rendition.name}) as {len(segments)} HLS segments")
+    return playlist
+
+
+def segment_path(video_id: str, name: str, segment: str) -> Optional[Path]:
+    """Path of an already packaged segment, or None"""
+    if not is_segment_name(segment):
+        return None
+    path = package_dir(video_id, get_rendition(name)) / segment
+    return path if path.exists() else None
@@ -0,0 +1,133 @@
+# video/renditions.py - Rendition ladder: default encoded at upload, the rest on first request
+"""
+Every video can be served at several renditions:
+
+    LADDER              360p (480x360), 480p (640x480), 720p (960x720)
+    DEFAULT_RENDITION   encoded eagerly by the upload pipeline as ``<vid>.mp4``
+
+The others are rendered from the stored storyboard the first time a client
+asks for them and kept in the bucket as ``<vid>_<name>.mp4``; concurrent
+requests for the same one wait for a single encode (``video.locks``). ``select_rendition``
+turns an explicit ``?rendition=`` or the Save-Data / Downlink client hints
+into a ladder entry; hints only ever step *down* from the default, so
+slow or metered connections get a smaller file and nobody is pushed a
+bigger one they did not ask for.
+"""
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+import bhiv_bucket
+from bhiv_bucket import init_bucket, read_storyboard_shared, save_video
+from video.generator import render_video_from_storyboard
+from video.locks import KeyedLocks
+
+logger = logging.getLogger(__name__)
+
+
+class Rendition(NamedTuple):
+    name: str
+    width: int
+    height: int
+    fps: int
+    bitrate_kbps: int
+
+
+LADDER = (
+    Rendition("360p", 480, 360, 24, 500),
+    Rendition("480p", 640, 480, 24, 1000),
+    Rendition("720p", 960, 720, 30, 2500),
+)
+RENDITIONS = {r.name: r for r in LADDER}
+DEFAULT_RENDITION = os.getenv("BHIV_DEFAULT_RENDITION", "480p")
+# Fraction of the reported downlink a rendition's bitrate may use
+BANDWIDTH_HEADROOM = float(os.getenv("BHIV_RENDITION_HEADROOM", "0.7"))
+
+_locks = KeyedLocks()
+
+
+def get_rendition(name: str) -> Rendition:
+    try:
+        return RENDITIONS[name]
+    except KeyError:
+        raise ValueError(f"unknown rendition {name!r}; expected one of {list(RENDITIONS)}") from None
+
+
+def select_rendition(requested: Optional[str] = None, save_data: Optional[str] = None,
+                     downlink: Optional[str] = None) -> Rendition:
+    """Pick a rendition from an explicit name, else from client hints (``Save-Data``, ``Downlink`` in Mbps)"""
+    if requested:
+        return get_rendition(requested)
+    default = get_rendition(DEFAULT_RENDITION)
+    if save_data and save_data.strip().lower() == "on":
+        return LADDER[0]
+    try:
+        budget_kbps = float(downlink) * 1000 * BANDWIDTH_HEADROOM if downlink else None
+    except ValueError:
+        budget_kbps = None
+    if budget_kbps is not None:
+        fitting = [r for r in LADDER if r.bitrate_kbps <= min(budget_kbps, default.bitrate_kbps)]
+        return fitting[-1] if fitting else LADDER[0]
+    return default
+
+
+def rendition_filename(video_id: str, rendition: Rendition) -> str:
+    if rendition.name == DEFAULT_RENDITION:
+        return f"{video_id}.mp4"
+    return f"{video_id}_{rendition.name}.mp4"
+
+
+def rendition_path(video_id: str, rendition: Rendition) -> Path:
+    return bhiv_bucket.BUCKET_ROOT / "videos" / rendition_filename(video_id, rendition)
+
+
+def render_rendition(storyboard, output_path: str, rendition: Rendition) -> None:
+    render_video_from_storyboard(storyboard, output_path, size=(rendition.width, rendition.height),
+                                 fps=rendition.fps, bitrate=f"{rendition.bitrate_kbps}k")
+
+
+def _encoded(path: Path) -> bool:
+    # Failed renders leave an empty placeholder; never cache one as a rendition
+    return path.exists() and path.stat().st_size > 0
+
+
+def encoded_rendition(video_id: str, name: str) -> Optional[Path]:
+    """Path of the rendition if it is already encoded; never encodes"""
+    path = rendition_path(video_id, get_rendition(name))
+    return path if _encoded(path) else None
+
+
+def ensure_rendition(video_id: str, name: str) -> Optional[Path]:
+    """Path of the encoded rendition, rendering it now if needed; None if it cannot be produced"""
+    rendition = get_rendition(name)
+    path = rendition_path(video_id, rendition)
+    if _encoded(path):
+        return path
+    if rendition.name == DEFAULT_RENDITION:
+        return None  # written by the upload pipeline, never re-rendered here
+    storyboard_path = bhiv_bucket.BUCKET_ROOT / "storyboards" / f"{video_id}.json"
+    if not storyboard_path.exists():
+        return None
+
+    with _locks.hold((video_id, rendition.name)):
+        if _encoded(path):  # another request finished it while we waited
+            return path
+        init_bucket()
+        tmp = bhiv_bucket.BUCKET_ROOT / "tmp" / path.name
+        try:
+            render_rendition(read_storyboard_shared(str(storyboard_path)), str(tmp), rendition)
+            if not _encoded(tmp):
+                logger.warning(f"Rendition {rendition.name} of {video_id} could not be encoded")
+                return None
+            save_video(str(tmp), path.name)
+        finally:
+            tmp.unlink(missing_ok=True)
+    logger.info(f"Encoded rendition {rendition.name} of {video_id}")
+    return path
+
+
+def list_renditions(video_id: str) -> List[Dict]:
+    """The ladder with what is already encoded for ``video_id``"""
+    return [{**r._asdict(), "default": r.name == DEFAULT_RENDITION,
+             "encoded": _encoded(rendition_path(video_id, r))} for r in LADDER]